@@ -0,0 +1,651 @@
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from omdb_stub import OmdbStub
+
+# --- Benchmarks for the v1 and v2 backends ---
+# Starts an app on a fake catalog of N movies, fires a fixed mix of requests at
+# /search, /recommendations, /profile and /filters and writes latency percentiles,
+# throughput and peak memory to a JSON file, so two commits can be compared:
+#
+#   python bench.py run --apps v1,v2 --sizes 1000,100000      -> results/bench-<commit>-<time>.json
+#   python bench.py run --sizes 1000000 --http --concurrency 16
+#   python bench.py compare results/old.json results/new.json
+#   python bench.py startup --sizes 1000,1000000                -> import + cold start to first request
+#   python bench.py shards --sizes 1000000 --shards 2,4,8       -> v2 split over worker processes vs one process
+#
+# Every (app, size) runs in its own fresh process: v1 and v2 both have a module called
+# profiles.py, and peak RSS only means something if nothing else ran in that process first.
+# OMDB is replaced by omdb_stub.py, so poster lookups take a known amount of time.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# app folder -> module to import (both have create_app(), importing them loads nothing)
+APPS = {
+    "v1": "movie_backend",
+    "v2": "app",
+}
+# Shouldnt be imported until the catalog actually needs them (see `startup`)
+HEAVY_MODULES = ["pandas", "sklearn", "kagglehub", "requests", "httpx"]
+# In this order, so /recommendations and /profile see users that have searched already
+ENDPOINTS = ["search", "recommendations", "profile", "filters"]
+
+
+def peak_rss_mb():
+    """Highest memory use of this process so far (None where the resource module doesnt exist)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb():
+    """Memory in use right now (Linux only, None elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def summarize(latencies, errors, wall):
+    """Percentiles (ms) + throughput for one endpoint"""
+    ms = np.asarray(latencies) * 1000
+    if not len(ms):
+        return {"requests": 0, "errors": errors}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_rps": round(len(ms) / wall, 1) if wall > 0 else None,
+    }
+
+
+# --- Ways of sending requests ---
+
+class TestClientDriver:
+    """Flask's test client - no sockets, one request at a time, measures the app itself"""
+
+    mode = "test_client"
+
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        data = response.get_data()
+        return response.status_code, data
+
+    def close(self):
+        pass
+
+
+class HttpDriver:
+    """A real threaded HTTP server on a random port, hit by a pool of clients"""
+
+    mode = "http"
+
+    def __init__(self, flask_app):
+        import requests
+        from werkzeug.serving import make_server
+
+        self._requests = requests
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no access log line per request
+        self.server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="bench-http")
+        self._thread.start()
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.request(method, self.base_url + path, json=body, headers=headers, timeout=60)
+        return response.status_code, response.content
+
+    def close(self):
+        self.server.shutdown()
+
+
+# --- The request mix ---
+
+def build_workload(driver, endpoint, count, users, seed):
+    """
+    The requests to send for one endpoint - the search params come from the apps own
+    /filters answer, so the same code works for v1 ("1990s") and v2 (1990)
+    """
+    rng = random.Random(f"{seed}-{endpoint}")
+    _, body = driver.request("GET", "/filters")
+    filters = json.loads(body)
+    ratings = [0] + [r for r in filters["ratings"] if r <= 8.5]
+
+    workload = []
+    for _ in range(count):
+        headers = {"X-User-Id": f"bench-user-{rng.randrange(users)}"}
+        if endpoint == "search":
+            body = {
+                "genre": rng.choice(filters["genres"]),
+                "decade": rng.choice(filters["decades"]),
+                "min_rating": rng.choice(ratings),
+            }
+            workload.append(("POST", "/search", body, headers))
+        else:
+            workload.append(("GET", f"/{endpoint}", None, headers))
+    return workload
+
+
+def run_endpoint(driver, workload, warmup, concurrency):
+    """Send the workload (after a few untimed warmup requests) and time every request"""
+    for method, path, body, headers in workload[:warmup]:
+        driver.request(method, path, body, headers)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def send(item):
+        nonlocal errors
+        method, path, body, headers = item
+        start = time.perf_counter()
+        try:
+            status, _ = driver.request(method, path, body, headers)
+            failed = status >= 400
+        except Exception:
+            failed = True
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(send, workload))
+    else:
+        for item in workload:
+            send(item)
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_worker(config):
+    """Runs inside the child process: start one app on one catalog size and benchmark it"""
+    # With --warm-start the parent made the folder and already built the snapshot in it
+    work_dir = config.get("work_dir") or tempfile.mkdtemp(prefix="movie-bench-")
+    stub = OmdbStub(latency=config["omdb_latency"], jitter=config["omdb_jitter"],
+                    miss_rate=config["omdb_miss_rate"]).start()
+    try:
+        # Everything the app writes goes to a throwaway folder, so every run starts cold
+        os.environ.update({
+            "MOVIE_CSV": config["csv"],
+            "MOVIE_SNAPSHOT_DIR": os.path.join(work_dir, "catalog_snapshot"),
+            "PROFILE_DB_FILE": os.path.join(work_dir, "profiles.sqlite3"),
+            "POSTER_CACHE_FILE": os.path.join(work_dir, "poster_cache.sqlite3"),
+            "LOG_FILE": os.path.join(work_dir, "app.log"),
+            "OMDB_URL": stub.url,
+            "OMDB_API_KEY": "bench",
+        })
+        app_dir = os.path.join(ROOT, config["app"])
+        sys.path.insert(0, app_dir)
+        module_name = APPS[config["app"]]
+        if config.get("startup"):
+            return measure_startup(config, module_name)
+        if config.get("shard_counts"):
+            return measure_shards(config, module_name)
+
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        imported = time.perf_counter() - started
+        module.create_app(background=False)
+        startup = time.perf_counter() - started
+        rss_startup = peak_rss_mb()
+        rss_now = current_rss_mb()
+        if config.get("prepare_only"):
+            return {}
+
+        driver = HttpDriver(module.app) if config["http"] else TestClientDriver(module.app)
+        concurrency = config["concurrency"] if config["http"] else 1
+        endpoints = {}
+        try:
+            for endpoint in ENDPOINTS:
+                workload = build_workload(driver, endpoint, config["requests"] + config["warmup"],
+                                          config["users"], config["seed"])
+                endpoints[endpoint] = run_endpoint(driver, workload, config["warmup"], concurrency)
+        finally:
+            driver.close()
+
+        return {
+            "app": config["app"],
+            "size": config["size"],
+            "mode": driver.mode,
+            "concurrency": concurrency,
+            "import_seconds": round(imported, 3),
+            "startup_seconds": round(startup, 3),
+            "warm_start": bool(config.get("work_dir")),
+            "peak_rss_mb_after_startup": rss_startup,
+            "rss_mb_after_startup": rss_now,
+            "peak_rss_mb": peak_rss_mb(),
+            "rss_mb": current_rss_mb(),
+            "omdb_stub_requests": stub.requests,
+            "endpoints": endpoints,
+        }
+    finally:
+        stub.stop()
+        if not config.get("work_dir"):
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def measure_startup(config, module_name):
+    """
+    How long until the app answers at all, until its catalog is in and until a real /search comes back -
+    counted from when the parent started this process (interpreter startup included), catalog loaded in the background
+    """
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    imported = time.perf_counter() - started
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+    client = module.create_app(background=True).test_client()
+
+    first_answer = None
+    while True:
+        status = client.get("/ready").status_code
+        now = time.monotonic() - config["spawned_at"]
+        if first_answer is None:
+            first_answer = now
+        if status == 200:
+            break
+        if now > config["timeout"]:
+            raise RuntimeError(f"{config['app']} wasnt ready after {config['timeout']}s")
+        time.sleep(0.005)
+    ready = now
+    response = client.post("/search", json={"genre": "", "decade": "", "min_rating": 0})
+    if response.status_code != 200:
+        raise RuntimeError(f"First /search failed with {response.status_code}")
+    first_request = time.monotonic() - config["spawned_at"]
+
+    return {
+        "app": config["app"],
+        "size": config["size"],
+        "warm_start": config["warm_start"],
+        "import_seconds": round(imported, 3),
+        "heavy_modules_after_import": heavy,
+        "first_answer_seconds": round(first_answer, 3),
+        "ready_seconds": round(ready, 3),
+        "first_request_seconds": round(first_request, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# --- Partitioned catalog (v2 CATALOG_SHARDS, see v2/partitions.py) ---
+# Same queries straight against the app functions (no HTTP, no posters) so only the search/scoring
+# part gets timed: once in this process, then split over N shard workers. Every answer has to come
+# out the same as the one process answer, the run fails otherwise.
+SHARD_QUERIES = ["search", "search_genre", "recommendations", "recommendations_user"]
+
+
+def shard_workloads(version, count, users, seed):
+    """Query -> list of arguments, from the catalog's own genres/decades"""
+    rng = random.Random(f"{seed}-shards")
+    facets = version.search_index.facets()
+    genres = [g for g, _ in facets["genres"]]
+    decades = [d for d, _ in facets["decades"]]
+    ratings = [0, 6, 7, 7.5, 8, 8.5]
+
+    def profile():
+        picked = rng.sample(decades, min(2, len(decades)))
+        return {
+            "searched_genres": {g: rng.randint(1, 5) for g in rng.sample(genres, min(3, len(genres)))},
+            "searched_decades": {str(d): rng.randint(1, 5) for d in picked},
+            "rating_sum": rng.choice(ratings[1:]) * 3,
+            "rating_count": 3,
+        }
+
+    return {
+        "search": [(rng.choice(genres), rng.choice(decades), rng.choice(ratings)) for _ in range(count)],
+        "search_genre": [(rng.choice(genres), None, rng.choice(ratings)) for _ in range(count)],
+        "recommendations": [(profile(), None) for _ in range(count)],
+        "recommendations_user": [(profile(), f"bench-user-{rng.randrange(users)}") for _ in range(count)],
+    }
+
+
+def run_shard_queries(module, version, query, workload, concurrency):
+    """(summary, answers) for one query type - answers as plain lists so runs can be compared"""
+    def send(args):
+        started = time.perf_counter()
+        if query.startswith("search"):
+            rows, scores = module.search_rows(*args, limit=10, version=version), None
+        else:
+            profile, user_id = args
+            rows, scores = module.recommend_rows(profile, limit=10, user_id=user_id, version=version)
+        elapsed = time.perf_counter() - started
+        return elapsed, (np.asarray(rows).tolist(), None if scores is None else np.asarray(scores).tolist())
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(send, workload))
+    else:
+        results = [send(args) for args in workload]
+    wall = time.perf_counter() - started
+    return summarize([elapsed for elapsed, _ in results], 0, wall), [answer for _, answer in results]
+
+
+def measure_shards(config, module_name):
+    """One process vs every (SHARD_BY, shard count) on the same catalog"""
+    module = importlib.import_module(module_name)
+    module.create_app(background=False)
+    from partitions import PartitionedCatalog
+    version = module.catalog_versions.current
+    workloads = shard_workloads(version, config["queries"], config["users"], config["seed"])
+
+    def run_all_queries():
+        version.recommendation_cache.clear()  # every setup starts with cold per-user caches
+        endpoints, answers = {}, {}
+        for query in SHARD_QUERIES:
+            run_shard_queries(module, version, query, workloads[query][:config["warmup"]], 1)
+            endpoints[query], answers[query] = run_shard_queries(module, version, query, workloads[query],
+                                                                 config["concurrency"])
+        return endpoints, answers
+
+    baseline, expected = run_all_queries()
+    runs = [{"by": None, "shards": 1, "start_seconds": 0.0, "identical": True, "endpoints": baseline}]
+    for by in config["by"]:
+        for shards in config["shard_counts"]:
+            if shards <= 1:
+                continue
+            started = time.perf_counter()
+            version.partitions = PartitionedCatalog(version.catalog, version.search_index,
+                                                    version.recommendation_cache, shards, by, searches=True)
+            start_seconds = time.perf_counter() - started
+            try:
+                endpoints, answers = run_all_queries()
+            finally:
+                version.partitions.close()
+                version.partitions = None
+            for query, s in endpoints.items():
+                s["speedup_p50"] = round(baseline[query]["p50_ms"] / s["p50_ms"], 2) if s["p50_ms"] else None
+            runs.append({"by": by, "shards": shards, "start_seconds": round(start_seconds, 3),
+                         "identical": answers == expected, "endpoints": endpoints})
+
+    return {"app": config["app"], "size": config["size"], "concurrency": config["concurrency"],
+            "cpu_count": os.cpu_count(), "peak_rss_mb": peak_rss_mb(), "runs": runs}
+
+
+def run_shards(args):
+    from synthetic import catalog_csv
+
+    results = {"meta": result_meta(args), "runs": []}
+    failed = False
+    for size in args.sizes:
+        print(f"📦 Catalog with {size:,} movies...")
+        config = {"app": "v2", "size": size, "csv": catalog_csv(size, args.seed), "seed": args.seed,
+                  "shard_counts": args.shards, "by": args.by, "queries": args.queries, "warmup": args.warmup,
+                  "users": args.users, "concurrency": args.concurrency,
+                  "omdb_latency": 0.0, "omdb_jitter": 0.0, "omdb_miss_rate": 0.0}
+        result = run_in_subprocess(config, verbose=args.verbose)
+        results["runs"].append(result)
+        for run in result["runs"]:
+            label = "1 process" if run["by"] is None else f"{run['shards']} shards by {run['by']}"
+            print(f"   {label:<20} " + "  ".join(
+                f"{query} {s['p50_ms']:.2f}ms" + (f" ({s['speedup_p50']}x)" if "speedup_p50" in s else "")
+                for query, s in run["endpoints"].items()) + ("" if run["identical"] else "  ❌ DIFFERENT RESULTS"))
+            failed |= not run["identical"]
+    save_results(results, args.out, "shards")
+    return 1 if failed else 0
+
+
+# --- Running everything + saving results ---
+
+def git_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def result_meta(args):
+    commit, dirty = git_info()
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "git_dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("func", "out")},
+    }
+
+
+def save_results(results, out, prefix):
+    out = out or os.path.join(
+        RESULTS_DIR, f"{prefix}-{results['meta']['git_commit'] or 'nogit'}-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Saved to {out}")
+
+
+def run_all(args):
+    from synthetic import catalog_csv  # only the parent makes the CSVs (pandas stays out of the workers)
+
+    results = {"meta": result_meta(args), "runs": []}
+
+    for size in args.sizes:
+        print(f"📦 Catalog with {size:,} movies...")
+        csv_path = catalog_csv(size, args.seed)
+        for app in args.apps:
+            config = {
+                "app": app, "size": size, "csv": csv_path, "seed": args.seed,
+                "requests": args.requests, "warmup": args.warmup, "users": args.users,
+                "http": args.http, "concurrency": args.concurrency,
+                "omdb_latency": args.omdb_latency, "omdb_jitter": args.omdb_jitter,
+                "omdb_miss_rate": args.omdb_miss_rate,
+            }
+            print(f"⏱️  {app} @ {size:,} ({'http' if args.http else 'test client'})")
+            if args.warm_start:
+                # Build the snapshot in a throwaway process first, like a deploy running
+                # `python catalog.py`, so the measured process starts the way production does
+                with tempfile.TemporaryDirectory(prefix="movie-bench-") as work_dir:
+                    run_in_subprocess({**config, "work_dir": work_dir, "prepare_only": True}, args.verbose)
+                    run = run_in_subprocess({**config, "work_dir": work_dir}, verbose=args.verbose)
+            else:
+                run = run_in_subprocess(config, verbose=args.verbose)
+            results["runs"].append(run)
+            print_run(run)
+
+    save_results(results, args.out, "bench")
+
+
+def run_startup(args):
+    """Cold start (nothing built yet) and warm start (snapshot already there) for each app + size"""
+    from synthetic import catalog_csv
+
+    results = {"meta": result_meta(args), "runs": []}
+    for size in args.sizes:
+        print(f"📦 Catalog with {size:,} movies...")
+        csv_path = catalog_csv(size, args.seed)
+        for app in args.apps:
+            config = {"app": app, "size": size, "csv": csv_path, "timeout": args.timeout,
+                      "omdb_latency": 0.0, "omdb_jitter": 0.0, "omdb_miss_rate": 0.0}
+            with tempfile.TemporaryDirectory(prefix="movie-bench-") as work_dir:
+                # Same folder twice: the first run builds the snapshot, the second one starts from it
+                cold = run_in_subprocess({**config, "startup": True, "work_dir": work_dir, "warm_start": False},
+                                         args.verbose)
+                warm = run_in_subprocess({**config, "startup": True, "work_dir": work_dir, "warm_start": True},
+                                         args.verbose)
+            for run in (cold, warm):
+                results["runs"].append(run)
+                print(f"   {app} {'warm' if run['warm_start'] else 'cold'}: import {run['import_seconds']}s, "
+                      f"answering {run['first_answer_seconds']}s, ready {run['ready_seconds']}s, "
+                      f"first /search {run['first_request_seconds']}s "
+                      f"(heavy modules at import: {', '.join(run['heavy_modules_after_import']) or 'none'})")
+    save_results(results, args.out, "startup")
+
+
+def run_in_subprocess(config, verbose=False):
+    with tempfile.TemporaryDirectory(prefix="movie-bench-cfg-") as tmp:
+        config_path = os.path.join(tmp, "config.json")
+        out_path = os.path.join(tmp, "result.json")
+        with open(config_path, "w") as f:
+            json.dump({**config, "spawned_at": time.monotonic()}, f)
+        # The apps print a lot, only show that with --verbose
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "_worker", config_path, out_path],
+            check=True, stdout=None if verbose else subprocess.DEVNULL,
+        )
+        with open(out_path) as f:
+            return json.load(f)
+
+
+def print_run(run):
+    print(f"   startup {run['startup_seconds']}s, RSS {run['rss_mb_after_startup']} MB after startup, "
+          f"peak RSS {run['peak_rss_mb']} MB")
+    for name, s in run["endpoints"].items():
+        if not s.get("requests"):
+            continue
+        print(f"   {name:<16} p50 {s['p50_ms']:>9.2f}ms  p95 {s['p95_ms']:>9.2f}ms  "
+              f"p99 {s['p99_ms']:>9.2f}ms  {s['throughput_rps']:>8} req/s  errors {s['errors']}")
+
+
+# --- Comparing two result files ---
+
+def compare(args):
+    """Prints old -> new for every run both files have, returns 1 if anything got slower than --threshold"""
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    def key(run):
+        return run["app"], run["size"], run["mode"], run["concurrency"], run.get("warm_start", False)
+
+    old_runs = {key(run): run for run in old["runs"]}
+    regressions = 0
+    print(f"{old['meta'].get('git_commit')} -> {new['meta'].get('git_commit')}")
+    for run in new["runs"]:
+        before = old_runs.get(key(run))
+        if before is None:
+            continue
+        print(f"\n{run['app']} @ {run['size']:,} ({run['mode']})")
+        rows = [("startup_seconds", before["startup_seconds"], run["startup_seconds"], False),
+                ("rss_mb_after_startup", before.get("rss_mb_after_startup"), run.get("rss_mb_after_startup"), False),
+                ("peak_rss_mb", before["peak_rss_mb"], run["peak_rss_mb"], False)]
+        for name, s in run["endpoints"].items():
+            b = before["endpoints"].get(name, {})
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+                if metric in s and metric in b:
+                    rows.append((f"{name}.{metric}", b[metric], s[metric], metric == "throughput_rps"))
+
+        for label, a, b, higher_is_better in rows:
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            worse = -change if higher_is_better else change
+            flag = " ⚠️" if worse > args.threshold else ""
+            regressions += bool(flag)
+            print(f"  {label:<32} {a:>10} -> {b:<10} {change:+7.1%}{flag}")
+
+    if regressions:
+        print(f"\n⚠️ {regressions} numbers got more than {args.threshold:.0%} worse")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the movie backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="benchmark the apps and save the results as JSON")
+    run.add_argument("--apps", default="v1,v2", type=lambda s: s.split(","))
+    run.add_argument("--sizes", default="1000,100000", type=lambda s: [int(x) for x in s.split(",")],
+                     help="catalog sizes, e.g. 1000,100000,1000000")
+    run.add_argument("--requests", type=int, default=300, help="timed requests per endpoint")
+    run.add_argument("--warmup", type=int, default=20, help="untimed requests per endpoint first")
+    run.add_argument("--users", type=int, default=50, help="how many different X-User-Id values")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--http", action="store_true", help="real HTTP server instead of the test client")
+    run.add_argument("--concurrency", type=int, default=8, help="parallel clients in --http mode")
+    run.add_argument("--omdb-latency", type=float, default=0.05, help="seconds the fake OMDB takes")
+    run.add_argument("--omdb-jitter", type=float, default=0.0)
+    run.add_argument("--omdb-miss-rate", type=float, default=0.1)
+    run.add_argument("--warm-start", action="store_true",
+                     help="build the catalog snapshot first and time a restart from it")
+    run.add_argument("--out", help="where to write the JSON (default: results/bench-<commit>-<time>.json)")
+    run.add_argument("--verbose", action="store_true", help="show the apps own output")
+    run.set_defaults(func=run_all)
+
+    cmp = sub.add_parser("compare", help="diff two result files")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="flag changes worse than this (0.10 = 10%%)")
+    cmp.set_defaults(func=compare)
+
+    startup = sub.add_parser("startup", help="time import, cold start and warm start up to the first request")
+    startup.add_argument("--apps", default="v1,v2", type=lambda s: s.split(","))
+    startup.add_argument("--sizes", default="1000,100000", type=lambda s: [int(x) for x in s.split(",")])
+    startup.add_argument("--seed", type=int, default=0)
+    startup.add_argument("--timeout", type=float, default=600, help="seconds to wait for /ready")
+    startup.add_argument("--out", help="where to write the JSON (default: results/startup-<commit>-<time>.json)")
+    startup.add_argument("--verbose", action="store_true", help="show the apps own output")
+    startup.set_defaults(func=run_startup)
+
+    shards = sub.add_parser("shards", help="v2 searches + recommendations in one process vs split over shard workers")
+    shards.add_argument("--sizes", default="100000,1000000", type=lambda s: [int(x) for x in s.split(",")])
+    shards.add_argument("--shards", default="2,4", type=lambda s: [int(x) for x in s.split(",")],
+                        help="shard counts to try (one process is always run as the baseline)")
+    shards.add_argument("--by", default="decade,hash", type=lambda s: s.split(","), help="SHARD_BY modes to try")
+    shards.add_argument("--queries", type=int, default=200, help="timed queries per type")
+    shards.add_argument("--warmup", type=int, default=10, help="untimed queries per type first")
+    shards.add_argument("--users", type=int, default=50, help="user ids for the cached recommendations")
+    shards.add_argument("--concurrency", type=int, default=1, help="queries sent at once (threads)")
+    shards.add_argument("--seed", type=int, default=0)
+    shards.add_argument("--out", help="where to write the JSON (default: results/shards-<commit>-<time>.json)")
+    shards.add_argument("--verbose", action="store_true", help="show the apps own output")
+    shards.set_defaults(func=run_shards)
+
+    worker = sub.add_parser("_worker")  # used internally, one per (app, size)
+    worker.add_argument("config")
+    worker.add_argument("out")
+
+    args = parser.parse_args(argv)
+    if args.command == "_worker":
+        with open(args.config) as f:
+            result = run_worker(json.load(f))
+        with open(args.out, "w") as f:
+            json.dump(result, f)
+        return 0
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
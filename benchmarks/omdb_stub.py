@@ -0,0 +1,107 @@
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+# --- Fake OMDB for benchmarks ---
+# Answers ?t=title&y=year like the real API, just after a configurable delay, so we can
+# measure how the app behaves with a slow/flaky poster service without hitting the real one.
+#
+#   python omdb_stub.py --port 8765 --latency 0.2 --miss-rate 0.1
+#   OMDB_URL=http://127.0.0.1:8765/ OMDB_API_KEY=anything python app.py
+
+
+class OmdbStub:
+    """A tiny threaded HTTP server pretending to be OMDB"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.05, jitter=0.0, miss_rate=0.0,
+                 error_rate=0.0, seed=0):
+        self.latency = latency        # seconds every answer takes
+        self.jitter = jitter          # +- this much extra, picked at random per request
+        self.miss_rate = miss_rate    # share of titles answered with "Movie not found!"
+        self.error_rate = error_rate  # share of requests answered with a 500
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass  # no access log spam in the benchmark output
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+        time.sleep(delay)
+
+        if roll < self.error_rate:
+            handler.send_response(500)
+            handler.end_headers()
+            return
+
+        query = parse_qs(urlparse(handler.path).query)
+        title = query.get("t", [""])[0]
+        year = query.get("y", [""])[0]
+        # Misses depend on the title (not on luck) so the same movie always gets the same answer
+        if not title or zlib.crc32(title.encode('utf-8')) % 1000 < self.miss_rate * 1000:
+            body = {"Response": "False", "Error": "Movie not found!"}
+        else:
+            body = {"Response": "True", "Title": title, "Year": year,
+                    "Poster": f"https://stub.omdb.local/posters/{quote(title)}-{year}_SX300.jpg"}
+
+        data = json.dumps(body).encode("utf-8")
+        try:
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(data)))
+            handler.end_headers()
+            handler.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up waiting (timeout tests do this on purpose)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="omdb-stub")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fake OMDB server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per answer")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--miss-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = OmdbStub(args.host, args.port, args.latency, args.jitter, args.miss_rate, args.error_rate)
+    print(f"🎞️ Fake OMDB running on {stub.url} (latency {args.latency}s)")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
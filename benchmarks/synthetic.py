@@ -0,0 +1,117 @@
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Fake IMDB catalogs for benchmarking ---
+# Same columns as imdb_top_1000.csv, but as many movies as you want (1k, 100k, 1M...).
+# Everything comes from a seeded RNG so the same size + seed always gives the same CSV,
+# which is what makes benchmark numbers comparable between commits.
+#
+#   python synthetic.py 100000            -> writes .data/catalog-100000-0.csv
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+
+# Roughly how common each genre is in the real top 1000 (Drama is in ~70% of them lol)
+GENRE_WEIGHTS = {
+    "Drama": 72, "Crime": 21, "Comedy": 23, "Adventure": 20, "Action": 19, "Thriller": 14,
+    "Romance": 13, "Biography": 11, "Mystery": 10, "Animation": 8, "Sci-Fi": 7, "Fantasy": 7,
+    "History": 6, "Family": 6, "War": 5, "Music": 4, "Horror": 3, "Western": 2, "Sport": 2,
+    "Film-Noir": 2, "Musical": 2,
+}
+CERTIFICATES = ["U", "UA", "A", "R", "PG-13", "PG", "G", "Passed", "Approved", None]
+TITLE_WORDS = [
+    "Night", "Last", "Dark", "City", "Lost", "Man", "Love", "Road", "River", "Silent", "Star",
+    "Blood", "Dream", "King", "Shadow", "Ghost", "Summer", "Winter", "Fire", "House", "Secret",
+    "Return", "War", "Garden", "Empire", "Storm", "Girl", "Wild", "Long", "Time", "Heart", "Iron",
+]
+PLOT_WORDS = [
+    "a", "young", "detective", "family", "must", "find", "the", "truth", "about", "their", "past",
+    "while", "war", "tears", "apart", "small", "town", "where", "two", "strangers", "fall", "in",
+    "love", "after", "heist", "goes", "wrong", "journey", "across", "country", "to", "save",
+    "world", "from", "ancient", "evil", "boxer", "fights", "for", "one", "last", "chance", "at",
+]
+FIRST_NAMES = ["Anna", "Ben", "Carlos", "Divya", "Emma", "Frank", "Grace", "Hiro", "Ingrid", "Jack",
+               "Kumar", "Lena", "Marco", "Nora", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tom"]
+LAST_NAMES = ["Smith", "Kurosawa", "Nolan", "Garcia", "Singh", "Bergman", "Rossi", "Kim", "Dubois",
+              "Fischer", "Okafor", "Novak", "Silva", "Murphy", "Chen", "Ivanova", "Lee", "Khan"]
+
+
+def _genre_combos():
+    """Every 1-3 genre combination, weighted so popular genres show up more often"""
+    names = list(GENRE_WEIGHTS)
+    weights = np.array([GENRE_WEIGHTS[g] for g in names], dtype=np.float64)
+    combos, combo_weights = [], []
+    for size, size_weight in ((1, 0.2), (2, 0.35), (3, 0.45)):
+        group = list(itertools.combinations(range(len(names)), size))
+        w = np.array([weights[list(c)].prod() for c in group])
+        combos.extend(", ".join(names[i] for i in c) for c in group)
+        combo_weights.extend(w / w.sum() * size_weight)
+    return np.array(combos, dtype=object), np.array(combo_weights)
+
+
+def _pick(rng, words, n, count):
+    """n strings made of `count` random words each (done column by column so its fast at 1M rows)"""
+    words = np.array(words, dtype=object)
+    out = words[rng.integers(0, len(words), n)]
+    for _ in range(count - 1):
+        out = out + " " + words[rng.integers(0, len(words), n)]
+    return out
+
+
+def make_catalog(size, seed=0):
+    """A dataframe that looks like the Kaggle IMDB CSV, with `size` movies"""
+    rng = np.random.default_rng(seed)
+    combos, combo_weights = _genre_combos()
+    people = _pick(rng, FIRST_NAMES, 400, 1) + " " + _pick(rng, LAST_NAMES, 400, 1)
+    ids = np.arange(size).astype(str)
+
+    # Most movies are recent, ratings bunch up around 7-8 like the real thing
+    years = np.clip(np.round(2025 - rng.exponential(25, size)), 1920, 2024).astype(int).astype(str).astype(object)
+    ratings = np.clip(np.round(rng.normal(7.9, 0.35, size), 1), 1.0, 9.8)
+    votes = np.round(rng.lognormal(12, 1.2, size)).astype(np.int64) + 25000
+    gross = np.where(rng.random(size) < 0.17, None,
+                     [f"{g:,}" for g in rng.integers(1000, 900_000_000, size)])
+    meta = np.where(rng.random(size) < 0.16, np.nan, rng.integers(30, 100, size).astype(float))
+
+    df = pd.DataFrame({
+        "Poster_Link": "https://m.media-amazon.com/images/M/bench" + ids + "._V1_UX67_CR0,0,67,98_AL_.jpg",
+        "Series_Title": _pick(rng, TITLE_WORDS, size, 3) + " " + ids,  # number on the end keeps titles unique
+        "Released_Year": years,
+        "Certificate": np.array(CERTIFICATES, dtype=object)[rng.integers(0, len(CERTIFICATES), size)],
+        "Runtime": rng.integers(70, 200, size).astype(str).astype(object) + " min",
+        "Genre": combos[rng.choice(len(combos), size, p=combo_weights)],
+        "IMDB_Rating": ratings,
+        "Overview": _pick(rng, PLOT_WORDS, size, 12) + ".",
+        "Meta_score": meta,
+        "Director": people[rng.integers(0, len(people), size)],
+        "Star1": people[rng.integers(0, len(people), size)],
+        "Star2": people[rng.integers(0, len(people), size)],
+        "Star3": people[rng.integers(0, len(people), size)],
+        "Star4": people[rng.integers(0, len(people), size)],
+        "No_of_Votes": votes,
+        "Gross": gross,
+    })
+    # The real CSV has the odd broken year (Apollo 13 is "PG"), keep a few so the cleaning code gets exercised
+    if size >= 1000:
+        df.loc[rng.choice(size, size // 1000, replace=False), "Released_Year"] = "PG"
+    return df
+
+
+def catalog_csv(size, seed=0, data_dir=DATA_DIR):
+    """Path to the CSV for this size + seed, generated the first time its asked for"""
+    path = os.path.join(data_dir, f"catalog-{size}-{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        make_catalog(size, seed).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    return path
+
+
+if __name__ == "__main__":
+    import sys
+
+    for arg in sys.argv[1:] or ["1000"]:
+        print(catalog_csv(int(arg)))
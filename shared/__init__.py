@@ -0,0 +1,2 @@
+# Code both apps use (v1/movie_backend.py and v2) - one copy, so a fix only has to land once.
+# v1 + v2 put the repo root on sys.path and import it as shared.<module>.
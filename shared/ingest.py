@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+import numpy as np
+
+# --- Streaming CSV ingest ---
+# A catalog can come as lots of CSV shards with millions of rows between them. Reading it with one
+# big pd.read_csv and cleaning it row by row needed several times the finished catalog in memory.
+# So every shard gets read INGEST_CHUNK_ROWS rows at a time instead:
+#   prepare(chunk) cleans it (vectorized) and turns it into whatever the app keeps -> (keys, part)
+#   append(part, keep) adds the rows that arent duplicates, then the chunk is gone
+# so on top of the catalog being built there is only about a chunk in memory at a time.
+#
+# INGEST_WORKERS > 1 reads the shards in that many worker processes (worker i gets shards i, i+N, i+2N...).
+# Each one sends its chunks back as soon as theyre cleaned through a queue that holds QUEUE_CHUNKS, then
+# waits for it to be emptied - so there are still only a few chunks per worker in memory, never whole shards.
+# The chunks get appended in file order, so the result is the same as one by one.
+# The same movie twice (in one shard or in two)? Only the first (title, year) is kept.
+
+INGEST_CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", 50_000))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", 1))
+QUEUE_CHUNKS = 2  # cleaned chunks a worker can get ahead of the main process by before it waits
+
+
+def find_csvs(source):
+    """
+    The CSV files a dataset setting points at, always in the same order: a file, a folder (every .csv
+    in it, subfolders too), a glob like shards/*.csv, or several of those joined with os.pathsep
+    """
+    import glob
+    paths = []
+    for part in str(source).split(os.pathsep):
+        if not part:
+            continue
+        if os.path.isdir(part):
+            for root, dirs, files in os.walk(part):
+                dirs.sort()
+                paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith(".csv"))
+        elif any(c in part for c in "*?["):
+            paths.extend(sorted(glob.glob(part, recursive=True)))
+        else:
+            paths.append(part)
+    return paths
+
+
+def source_files(source):
+    """Path + size + modified time of every file of a dataset - if any of it changes, whatever was built from it is stale"""
+    files = []
+    for path in find_csvs(source):
+        stat = os.stat(path)
+        files.append({"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime})
+    return files
+
+
+def row_keys(titles, years):
+    """A 64 bit hash per (title, year) - what counts as the same movie for the dedupe"""
+    import pandas as pd
+    # Same types every chunk, or "1917" (read as a number in some shard) and 1994 vs 1994.0 wouldnt match
+    keys = pd.DataFrame({"title": pd.Series(np.asarray(titles, dtype=object)).astype(str),
+                         "year": np.asarray(years, dtype=np.float64)})
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+class Dedup:
+    """Every key seen so far (8 bytes a movie) - says which rows of a new chunk are repeats"""
+
+    def __init__(self):
+        # A few sorted runs, each more than twice as big as the one after it. Keeping one sorted array
+        # meant copying all of it for every chunk (n^2 / chunk), this way a key only gets merged ~log n times
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def keep(self, keys):
+        """Bool per key, False for the ones seen before (in an earlier chunk or earlier in this one)"""
+        keys = np.asarray(keys, dtype=np.uint64)
+        order = np.argsort(keys, kind='stable')
+        ordered = keys[order]
+        repeat = np.zeros(len(keys), dtype=bool)
+        repeat[1:] = ordered[1:] == ordered[:-1]
+        # Looked up in sorted order - searchsorted is a lot faster when the keys it looks for are sorted too
+        for run in self.runs:
+            found = np.minimum(np.searchsorted(run, ordered), len(run) - 1)
+            repeat |= run[found] == ordered
+        keep = np.empty(len(keys), dtype=bool)
+        keep[order] = ~repeat
+        new = ordered[~repeat]
+        # Like adding 1 to a binary number - merge into the last run while it isnt more than twice as big
+        while self.runs and len(self.runs[-1]) <= 2 * len(new):
+            run = self.runs.pop()
+            new = np.insert(run, np.searchsorted(run, new), new)
+        if len(new):
+            self.runs.append(new)
+        return keep
+
+
+class IngestStats:
+    """Counts + timing for the report at the end"""
+
+    def __init__(self, paths, workers, chunk_rows):
+        self.files = len(paths)
+        self.bytes = sum(os.path.getsize(path) for path in paths)
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.chunks = 0
+        self.rows_read = 0
+        self.bad_rows = 0    # dropped by the cleaning (no usable year/rating...)
+        self.duplicates = 0  # (title, year) seen before
+        self.movies = 0
+        self.seconds = None
+        self._started = time.perf_counter()
+
+    def add(self, rows_read, rows_cleaned, rows_kept):
+        self.chunks += 1
+        self.rows_read += rows_read
+        self.bad_rows += rows_read - rows_cleaned
+        self.duplicates += rows_cleaned - rows_kept
+        self.movies += rows_kept
+
+    def finish(self):
+        self.seconds = round(time.perf_counter() - self._started, 3)
+        return self
+
+    def as_dict(self):
+        stats = {k: v for k, v in vars(self).items() if not k.startswith("_")}
+        stats["rows_per_second"] = round(self.rows_read / self.seconds) if self.seconds else None
+        stats["peak_rss_mb"] = peak_rss_mb()
+        return stats
+
+    def report(self):
+        seconds = max(self.seconds or 0, 1e-9)
+        peak = peak_rss_mb()
+        return (f"📥 Read {self.rows_read:,} rows from {self.files} file{'s' if self.files != 1 else ''} "
+                f"({self.bytes / 1e6:.1f} MB, {self.chunks} chunks of {self.chunk_rows:,}, {self.workers} "
+                f"worker{'s' if self.workers != 1 else ''}) in {seconds:.2f}s - {self.rows_read / seconds:,.0f} rows/s, "
+                f"{self.bytes / 1e6 / seconds:.1f} MB/s\n"
+                f"   {self.bad_rows:,} bad rows + {self.duplicates:,} duplicates dropped -> {self.movies:,} movies"
+                + (f", peak memory {peak:.0f} MB" if peak else ""))
+
+
+def peak_rss_mb():
+    """Highest memory use of this process so far (None where the resource module doesnt exist)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _read_chunks(path, prepare, chunk_rows):
+    import pandas as pd
+    with pd.read_csv(path, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            yield len(chunk), prepare(chunk)
+
+
+def _read_files(paths, prepare, chunk_rows, out):
+    # Runs in a worker process: every chunk of its shards (cleaned + packed so it pickles small),
+    # None after each shard, or the exception if something broke
+    try:
+        for path in paths:
+            for part in _read_chunks(path, prepare, chunk_rows):
+                out.put(part)  # waits while the queue is full
+            out.put(None)
+    except Exception as e:
+        out.put(e)
+
+
+def _next_part(parts, worker):
+    while True:
+        try:
+            part = parts.get(timeout=1)
+        except queue.Empty:
+            if not worker.is_alive():
+                raise RuntimeError(f"ingest worker died (exit code {worker.exitcode})")
+            continue
+        if isinstance(part, Exception):
+            raise part
+        return part
+
+
+def read_parts(paths, prepare, workers=1, chunk_rows=INGEST_CHUNK_ROWS):
+    """(rows read, prepare(chunk)) for every chunk of every file, in file order"""
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield from _read_chunks(path, prepare, chunk_rows)
+        return
+    workers = min(workers, len(paths))
+    # One queue per worker, and every worker does its shards in file order - so the one whose
+    # shard is next always has it coming, even while the others are waiting on full queues
+    queues = [multiprocessing.Queue(QUEUE_CHUNKS) for _ in range(workers)]
+    procs = [multiprocessing.Process(target=_read_files, args=(paths[i::workers], prepare, chunk_rows, queues[i]),
+                                     daemon=True, name=f"ingest-{i}")
+             for i in range(workers)]
+    for proc in procs:
+        proc.start()
+    try:
+        for i in range(len(paths)):
+            while True:
+                part = _next_part(queues[i % workers], procs[i % workers])
+                if part is None:
+                    break
+                yield part
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()  # only still running if we stopped early (error, generator closed)
+            proc.join()
+
+
+def ingest(paths, prepare, append, workers=None, chunk_rows=None):
+    """
+    Streams every file through prepare(chunk) -> (keys, part) and hands each part to append(part, keep),
+    keep = bool per row, False for repeats. Returns the IngestStats (print .report() for the summary)
+    """
+    workers = INGEST_WORKERS if workers is None else workers
+    chunk_rows = chunk_rows or INGEST_CHUNK_ROWS
+    stats = IngestStats(paths, workers, chunk_rows)
+    dedup = Dedup()
+    for rows_read, (keys, part) in read_parts(paths, prepare, workers, chunk_rows):
+        keep = dedup.keep(keys)
+        append(part, keep)
+        stats.add(rows_read, len(keys), int(keep.sum()))
+    return stats.finish()
@@ -0,0 +1,219 @@
+import atexit
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Per-user taste profiles ---
+# Used to be one global dict that every request changed, so everyone shared one profile
+# and with more than one server process each one had its own different copy.
+#
+# A profile is just nested counters, e.g. {"searched_genres": {"Drama": 3}, "rating_count": 3}.
+# Every update is a small "add these numbers" delta, which is what makes this work with
+# several server processes: each one keeps a small LRU cache of profiles, collects the
+# deltas in memory and every couple of seconds adds them all to the database in one go.
+# Adding is order independent, so two processes updating the same user never lose counts.
+
+# Each app keeps its own profiles.sqlite3 next to it (they store different counters), this overrides both
+PROFILE_DB_FILE = os.environ.get("PROFILE_DB_FILE")
+MAX_CACHED_PROFILES = 10000  # LRU size - least recently used profiles get dropped from memory
+FLUSH_INTERVAL = 2.0         # seconds between batched database writes
+MAX_PENDING = 500            # ...or write right away once this many users have unsaved changes
+CACHE_TTL = 5.0              # re-read a cached profile after this long to pick up other processes' changes
+
+
+def merge_counts(target, delta):
+    """Add the numbers in delta into target (recursing into nested dicts)"""
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            merge_counts(target.setdefault(key, {}), value)
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+
+class MemoryProfileBackend:
+    """Keeps profiles in a dict - for a single process or for trying things out"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self, user_id):
+        with self._lock:
+            return copy.deepcopy(self._data.get(user_id))
+
+    def merge(self, deltas):
+        with self._lock:
+            for user_id, delta in deltas.items():
+                merge_counts(self._data.setdefault(user_id, {}), delta)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+
+class SqliteProfileBackend:
+    """Profiles as JSON rows in a sqlite file, shared by every server process on the machine"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " user_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def load(self, user_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def merge(self, deltas):
+        """Add a batch of deltas in one transaction (IMMEDIATE so other processes wait their turn)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                for user_id, delta in deltas.items():
+                    row = self._conn.execute("SELECT data FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+                    profile = merge_counts(json.loads(row[0]) if row else {}, delta)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?)", (user_id, json.dumps(profile), now)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, user_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM profiles WHERE user_id = ?", (user_id,))
+
+
+class ProfileStore:
+    """LRU cache of profiles in front of a backend, with batched writes"""
+
+    def __init__(self, new_profile, backend=None, db_file="profiles.sqlite3", max_cached=MAX_CACHED_PROFILES,
+                 flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING, cache_ttl=CACHE_TTL):
+        self.new_profile = new_profile  # makes an empty profile
+        self._backend = backend  # the sqlite one gets opened on first use, importing the app stays I/O free
+        self.db_file = PROFILE_DB_FILE or db_file
+        self._backend_lock = threading.Lock()
+        self.max_cached = max_cached
+        self.max_pending = max_pending
+        self.cache_ttl = cache_ttl
+
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()  # user_id -> (profile, loaded_at)
+        self._pending = {}           # user_id -> delta not written to the backend yet
+        self._flushing = {}          # deltas being written right now (still count until they land)
+        self._generations = {}       # user_id -> how many times they were reset, see flush()
+        # Held while writing to the backend - reset() takes it too, so a flush that already has a user's
+        # deltas can't write them after reset() deleted the user (it either lands first or gets dropped)
+        self._write_lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, args=(flush_interval,), daemon=True, name="profile-flush"
+            )
+            self._flusher.start()
+        atexit.register(self.close)
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = SqliteProfileBackend(self.db_file)
+        return self._backend
+
+    def _load(self, user_id):
+        """Profile from the backend with our own unsaved changes added on top"""
+        profile = merge_counts(self.new_profile(), self.backend.load(user_id) or {})
+        for unsaved in (self._flushing, self._pending):
+            if user_id in unsaved:
+                merge_counts(profile, unsaved[user_id])
+        return profile
+
+    def _cached(self, user_id):
+        entry = self._cache.get(user_id)
+        if entry is None or time.monotonic() - entry[1] > self.cache_ttl:
+            entry = (self._load(user_id), time.monotonic())
+            self._cache[user_id] = entry
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)  # unsaved changes live in _pending, so nothing is lost
+        return entry[0]
+
+    def get(self, user_id):
+        """A copy of the user's profile (an empty one if they never searched)"""
+        with self._lock:
+            return copy.deepcopy(self._cached(user_id))
+
+    def add(self, user_id, delta):
+        """Add a delta like {"searched_genres": {"Drama": 1}} to the user's profile"""
+        with self._lock:
+            merge_counts(self._cached(user_id), delta)
+            merge_counts(self._pending.setdefault(user_id, {}), copy.deepcopy(delta))
+            flush_now = len(self._pending) >= self.max_pending
+        if flush_now:
+            self.flush()
+
+    def reset(self, user_id):
+        """Wipe the user's profile (written straight away, not batched)"""
+        with self._write_lock, self._lock:
+            # New generation = any deltas a flush took before this are from the old profile
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._cache.pop(user_id, None)
+            self._pending.pop(user_id, None)
+            self._flushing.pop(user_id, None)
+            self.backend.delete(user_id)
+
+    def flush(self):
+        """Write all the collected deltas to the backend in one batch"""
+        with self._lock:
+            if self._flushing:
+                return  # another thread is already writing
+            pending, self._pending = self._pending, {}
+            self._flushing = dict(pending)  # a copy, reset() takes users out of it
+            generations = {user_id: self._generations.get(user_id, 0) for user_id in pending}
+        if not pending:
+            return
+        try:
+            with self._write_lock:
+                with self._lock:
+                    # Users reset since we took their deltas - those counts were wiped, dont bring them back
+                    pending = {user_id: delta for user_id, delta in pending.items()
+                               if self._generations.get(user_id, 0) == generations[user_id]}
+                if pending:
+                    self.backend.merge(pending)
+        except Exception as e:
+            print(f"⚠️ Could not save profiles ({e}), will retry")
+            with self._lock:
+                for user_id, delta in pending.items():
+                    if self._generations.get(user_id, 0) == generations[user_id]:
+                        merge_counts(self._pending.setdefault(user_id, {}), delta)
+        finally:
+            with self._lock:
+                self._flushing = {}
+
+    def _flush_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {"cached_profiles": len(self._cache), "pending_writes": len(self._pending)}
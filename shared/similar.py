@@ -0,0 +1,286 @@
+import numpy as np
+
+# --- "More like this" for /similar/<id> ---
+# Every movie is a feature vector: its genres (multi-hot), decade and rating (scaled to 0..1) and,
+# if the CSV has them, who directed / starred in it. Similarity is the cosine between two vectors.
+# Each movie's NEIGHBORS most similar movies are worked out once when the catalog is built and kept
+# as two small (movies x NEIGHBORS) arrays, so a lookup is just reading one row of those.
+#
+# We never make the movies x movies matrix (1M movies = 4TB of float32). Instead:
+#   - movies with exactly the same genres/decade/rating (and the same number of credits) have the same
+#     vector apart from the names, so they get put in one group. 1M movies are ~50k groups
+#   - group vs group similarities get worked out BLOCK_CELLS at a time. For each group we keep the
+#     best groups until they hold NEIGHBORS + 1 movies, plus anything tied with the last one
+#   - inside a group everyone scores the same, so only its first NEIGHBORS + 1 movies can ever make a
+#     top list (ties go to catalog order)
+#   - sharing a director/star only ever adds to a score, so those pairs get added on top, a
+#     PAIR_BUDGET at a time
+# Names credited on more than PERSON_MAX_MOVIES movies get dropped, they say about as much as "the"
+# does in a title and would pair up half the catalog.
+
+NEIGHBORS = 10             # kept per movie, also the most /similar gives back
+GENRE_WEIGHT = 1.0         # per genre the movie has
+DECADE_WEIGHT = 0.75       # times the decade scaled to 0..1
+RATING_WEIGHT = 0.75       # times the rating scaled to 0..1
+CREDIT_WEIGHTS = {'director': 1.0, 'star': 0.75}  # per name
+PERSON_MAX_MOVIES = 256
+BLOCK_CELLS = 1 << 22      # group x group similarities per block (16MB of float32)
+PAIR_BUDGET = 1 << 22      # candidate pairs looked at per batch while adding the credits
+
+
+def content_features(genre_hot, decades, ratings):
+    """
+    Feature vector per movie from a (movies x genres) 0/1 array and decades/ratings already scaled to 0..1
+    (names go to NeighborIndex separately, theres way too many of them for columns)
+    """
+    genre_hot = np.asarray(genre_hot).reshape(len(decades), -1)
+    genres = genre_hot.shape[1]
+    features = np.empty((len(decades), genres + 2), dtype=np.float32)
+    features[:, :genres] = genre_hot
+    features[:, :genres] *= GENRE_WEIGHT
+    features[:, genres] = np.asarray(decades, dtype=np.float32) * DECADE_WEIGHT
+    features[:, genres + 1] = np.asarray(ratings, dtype=np.float32) * RATING_WEIGHT
+    return np.nan_to_num(features, copy=False)
+
+
+def _ranges(starts, lengths):
+    """starts[0] .. starts[0] + lengths[0] - 1, then the same for starts[1]... as one array"""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    ends = np.cumsum(lengths)
+    total = int(ends[-1]) if len(ends) else 0
+    return np.repeat(np.asarray(starts, dtype=np.int64) - ends + lengths, lengths) + np.arange(total)
+
+
+class _Credits:
+    """Who worked on what, as sparse rows - only what the neighbor build needs"""
+
+    def __init__(self, credits, size):
+        # credits: [(role, column)], e.g. [('director', Director column), ('star', Star1 column)...]
+        import pandas as pd  # only needed while building (same as in compact.py)
+        ids, weights, rows, names = {}, [], [], []
+        for role, column in credits:
+            values = column.to_list() if hasattr(column, 'to_list') else list(column)
+            codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+            # Column's own codes -> ids shared by every column with the same role (-1 = blank / not a name)
+            to_id = np.full(len(uniques) + 1, -1, dtype=np.int64)
+            for i, name in enumerate(uniques):
+                name = name.strip() if isinstance(name, str) else ""
+                if name:
+                    if (role, name) not in ids:
+                        ids[role, name] = len(ids)
+                        weights.append(CREDIT_WEIGHTS[role])
+                    to_id[i] = ids[role, name]
+            codes = to_id[codes]  # code -1 (missing) picks the -1 on the end
+            found = np.flatnonzero(codes >= 0)
+            rows.append(found)
+            names.append(codes[found])
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        names = np.concatenate(names) if names else np.empty(0, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+        # One entry per (movie, name) even if someone is listed twice, sorted by movie
+        # (sort + drop repeats, np.unique is a lot slower on this many numbers)
+        pairs = np.sort(rows * max(len(ids), 1) + names)
+        pairs = pairs[np.diff(pairs, prepend=-1) != 0]
+        rows, names = pairs // max(len(ids), 1), pairs % max(len(ids), 1)
+        del pairs
+        movies_per_name = np.bincount(names, minlength=len(ids))
+        kept = movies_per_name[names] <= PERSON_MAX_MOVIES
+        # Every kept name counts towards the length of the vector, even one nobody else shares
+        self.square_norms = np.bincount(rows[kept], weights=self.weights[names[kept]] ** 2, minlength=size)
+
+        # Only names on 2+ movies can make two movies more alike
+        shared = kept & (movies_per_name[names] >= 2)
+        rows, names = rows[shared], names[shared]
+        self.row_offsets = np.zeros(size + 1, dtype=np.int64)
+        self.row_offsets[1:] = np.cumsum(np.bincount(rows, minlength=size))
+        self.row_names = names
+        by_name = np.argsort(names, kind='stable')  # rows stay in order within each name
+        self.name_offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        self.name_offsets[1:] = np.cumsum(np.bincount(names, minlength=len(ids)))
+        self.name_rows = rows[by_name]
+
+    def has_shared(self):
+        return np.diff(self.row_offsets) > 0
+
+    def pair_counts(self, rows):
+        """How many (movie, other movie) pairs pairs() makes for each of these movies, before merging"""
+        counts = self.row_offsets[rows + 1] - self.row_offsets[rows]
+        per_entry = np.diff(self.name_offsets)[self.row_names[_ranges(self.row_offsets[rows], counts)]]
+        if not len(per_entry):
+            return np.zeros(len(rows), dtype=np.int64)
+        return np.add.reduceat(per_entry, np.cumsum(counts) - counts)
+
+    def pairs(self, rows):
+        """(row, other row, sum of weight^2 over the names they share) for these movies"""
+        counts = self.row_offsets[rows + 1] - self.row_offsets[rows]
+        names = self.row_names[_ranges(self.row_offsets[rows], counts)]
+        per_name = self.name_offsets[names + 1] - self.name_offsets[names]
+        others = self.name_rows[_ranges(self.name_offsets[names], per_name)]
+        movies = np.repeat(np.repeat(rows, counts), per_name)
+        weights = np.repeat(self.weights[names] ** 2, per_name)
+        keep = movies != others
+        size = len(self.row_offsets) - 1
+        keys = movies[keep] * size + others[keep]
+        order = np.argsort(keys, kind='stable')
+        keys, weights = keys[order], weights[keep][order]
+        if not len(keys):
+            return keys, keys, weights
+        first = np.concatenate(([True], keys[1:] != keys[:-1]))
+        keys = keys[first]
+        return keys // size, keys % size, np.add.reduceat(weights, np.flatnonzero(first))
+
+
+class NeighborIndex:
+    """Each movie's NEIGHBORS most similar movies (rows + cosine similarity), worked out up front"""
+
+    def __init__(self, features=None, credits=None, k=NEIGHBORS, shared=None):
+        """
+        features: (movies x n) array from content_features()
+        credits: optional [(role, column)] with role one of CREDIT_WEIGHTS, e.g. [('director', directors)]
+        shared: (arrays, meta) from shared_arrays(), e.g. memory mapped from a snapshot - skips the build
+        """
+        if shared is not None:
+            arrays, meta = shared
+            self.neighbors, self.scores = arrays['neighbors'], arrays['scores']
+        else:
+            self._build(np.ascontiguousarray(np.nan_to_num(np.asarray(features, dtype=np.float32))), credits or [], k)
+        self.size, self.k = self.neighbors.shape
+
+    # --- Building ---
+
+    def _build(self, features, credits, k):
+        size = len(features)
+        credits = _Credits(credits, size)
+        self.neighbors = np.full((size, k), -1, dtype=np.int32)
+        self.scores = np.zeros((size, k), dtype=np.float16)
+        if not size or not k:
+            return
+
+        # Groups of movies with the same vector apart from the names they share with someone:
+        # same content features, then same length of the names part
+        _, same_features = np.unique(features.view(np.dtype((np.void, features.strides[0]))).ravel(),
+                                     return_inverse=True)
+        credit_lengths, credit_codes = np.unique(credits.square_norms, return_inverse=True)
+        _, first, group_of = np.unique(same_features.ravel() * len(credit_lengths) + credit_codes.ravel(),
+                                       return_index=True, return_inverse=True)
+        del same_features, credit_codes
+        group_of = group_of.ravel()
+        norms = np.sqrt(np.einsum('ij,ij->i', features, features, dtype=np.float64) + credits.square_norms)
+        norms[norms == 0] = 1  # no features at all - everything scores 0 against it
+        unit = (features[first] / norms[first, None]).astype(np.float32)
+        groups = len(first)
+
+        by_group = np.argsort(group_of, kind='stable')  # movies of each group together, catalog order inside
+        group_sizes = np.bincount(group_of, minlength=groups)
+        group_starts = np.cumsum(group_sizes) - group_sizes
+        usable = np.minimum(group_sizes, k + 1)  # the most of a group any top list can need
+        has_shared = credits.has_shared()
+
+        take = min(k + 1, groups)
+        block = max(1, BLOCK_CELLS // groups)
+        for a in range(0, groups, block):
+            sims = unit[a:a + block] @ unit.T
+            # Score of each row's take-th best group - the best groups are the ones scoring at least that
+            if take < groups:
+                kth = np.partition(sims, groups - take, axis=1)[:, groups - take]
+            else:
+                kth = sims.min(axis=1)
+            candidates = {}
+            for g in range(a, a + len(sims)):
+                row = sims[g - a]
+                top = np.flatnonzero(row >= kth[g - a])
+                top = top[np.argsort(-row[top], kind='stable')]
+                # Enough groups for k + 1 movies (we might be one of them), and anything tied with the last
+                enough = min(int(np.searchsorted(np.cumsum(usable[top]), k + 1)), len(top) - 1)
+                near = top[row[top] >= row[top[enough]]]
+                rows = by_group[_ranges(group_starts[near], usable[near])]
+                scores = np.repeat(row[near], usable[near])
+                order = np.lexsort((rows, -scores))
+                rows, scores = rows[order], scores[order]
+
+                members = by_group[group_starts[g]:group_starts[g] + group_sizes[g]]
+                self._fill_plain(members[~has_shared[members]], rows[:k + 1], scores[:k + 1])
+                if has_shared[members].any():
+                    candidates[g] = (rows, scores)
+            if candidates:
+                self._fill_with_credits(candidates, sims, a, by_group, group_starts, group_sizes,
+                                        group_of, has_shared, norms, credits)
+
+    def _fill_plain(self, members, rows, scores):
+        """Movies sharing no names with anyone: the group's list, minus themselves"""
+        if not len(members):
+            return
+        k = self.neighbors.shape[1]
+        is_self = rows[None, :] == members[:, None]
+        pick = np.argsort(is_self, axis=1, kind='stable')[:, :k]  # pushes itself to the end
+        found, found_scores = rows[pick], scores[pick]
+        found_scores[found == members[:, None]] = 0
+        found[found == members[:, None]] = -1  # the whole catalog is smaller than k + 1
+        self.neighbors[members, :found.shape[1]] = found
+        self.scores[members, :found.shape[1]] = found_scores
+
+    def _fill_with_credits(self, candidates, sims, a, by_group, group_starts, group_sizes,
+                           group_of, has_shared, norms, credits):
+        """Movies that share a name with someone: their group's list plus everyone they share a name with"""
+        k = self.neighbors.shape[1]
+        movies = np.concatenate([
+            members[has_shared[members]]
+            for members in (by_group[group_starts[g]:group_starts[g] + group_sizes[g]] for g in candidates)
+        ])
+        cost = credits.pair_counts(movies) + np.array([len(candidates[g][0]) for g in group_of[movies].tolist()])
+        bounds = np.searchsorted(np.cumsum(cost), np.arange(PAIR_BUDGET, int(cost.sum()), PAIR_BUDGET))
+        for batch in np.split(movies, bounds):
+            if not len(batch):
+                continue
+            # The group's candidates for each movie...
+            batch_groups = group_of[batch]
+            base = [candidates[g] for g in batch_groups.tolist()]
+            lengths = np.array([len(rows) for rows, _ in base], dtype=np.int64)
+            movie = np.repeat(batch, lengths)
+            other = np.concatenate([rows for rows, _ in base])
+            score = np.concatenate([scores for _, scores in base]).astype(np.float64)
+            # ...and everyone they share a name with, scored with the names added in
+            pair_movie, pair_other, dot = credits.pairs(batch)
+            pair_score = (sims[group_of[pair_movie] - a, group_of[pair_other]]
+                          + dot / (norms[pair_movie] * norms[pair_other]))
+            movie = np.concatenate((movie, pair_movie))
+            other = np.concatenate((other, pair_other))
+            score = np.concatenate((score, pair_score))
+            keep = movie != other
+            movie, other, score = movie[keep], other[keep], score[keep]
+
+            # Same pair twice (in the group list and sharing a name) -> the higher score
+            order = np.lexsort((-score, other, movie))
+            movie, other, score = movie[order], other[order], score[order]
+            first = np.concatenate(([True], (movie[1:] != movie[:-1]) | (other[1:] != other[:-1])))
+            movie, other, score = movie[first], other[first], score[first]
+
+            # Best k per movie, ties in catalog order
+            order = np.lexsort((other, -score, movie))
+            movie, other, score = movie[order], other[order], score[order]
+            start = np.concatenate(([True], movie[1:] != movie[:-1]))
+            place = np.arange(len(movie)) - np.maximum.accumulate(np.where(start, np.arange(len(movie)), 0))
+            top = place < k
+            self.neighbors[movie[top], place[top]] = other[top]
+            self.scores[movie[top], place[top]] = score[top]
+
+    # --- Sharing through the snapshot ---
+
+    def shared_arrays(self):
+        return {'neighbors': self.neighbors, 'scores': self.scores}, {'k': int(self.neighbors.shape[1])}
+
+    def memory_usage(self):
+        """Bytes per part + 'total'"""
+        usage = {'neighbors': int(self.neighbors.nbytes), 'scores': int(self.scores.nbytes)}
+        usage['total'] = sum(usage.values())
+        return usage
+
+    # --- Lookups ---
+
+    def similar(self, row, limit=NEIGHBORS):
+        """Up to `limit` (row, similarity 0..1) most like this movie, most similar first"""
+        rows = np.asarray(self.neighbors[row, :limit])
+        scores = np.asarray(self.scores[row, :limit], dtype=np.float64)
+        keep = rows >= 0
+        return list(zip(rows[keep].tolist(), np.round(scores[keep], 3).tolist()))
@@ -0,0 +1,309 @@
+import unicodedata
+
+import numpy as np
+
+# --- Title autocomplete for /suggest ---
+# Built once when the catalog loads, so a keystroke never scans the titles.
+#
+# Prefix matches: every word of every title is an entry ("the dark knight" -> "the dark knight",
+# "dark knight", "knight"), kept as the first KEY_BYTES bytes in one sorted array. Everything starting
+# with what was typed is then one contiguous slice, found with two binary searches.
+# A slice can be huge ("the" matches half the catalog) so we dont look at all of it - the entries are
+# cut into blocks of LEAF_SIZE, and each block (and each pair of blocks, pair of pairs...) remembers
+# its TOP_PER_BLOCK best movies. Any slice is a handful of those plus two partial blocks at the ends.
+#
+# Typos: first the query with one typo undone (two neighbouring letters swapped back, or one extra
+# letter left out) as prefix lookups again - short words like "drak" share no trigrams with "dark".
+# Then a trigram index ("godfahter" still shares " go", "god", "odf", "dfa"... with "godfather").
+# Both are only used when the prefix matches dont fill the list. Each trigram keeps its TRIGRAM_CAP most
+# popular movies - super common trigrams dont help find anything anyway, and it keeps the size bounded.
+#
+# Movies are numbered by rank (0 = best rated, then most votes) like in v2/search_index.py, so
+# "best first" is just "smallest number first" everywhere in here.
+
+KEY_BYTES = 16         # how much of each title position the prefix keys keep (longer queries get checked)
+LEAF_SIZE = 256        # entries per block for the best-movies-in-a-slice lookup
+TOP_PER_BLOCK = 32     # best movies remembered per block, has to be >= MAX_SUGGESTIONS
+MAX_SUGGESTIONS = 20
+TRIGRAM_CAP = 2048     # most popular movies kept per trigram
+FUZZY_MIN_CHARS = 4    # dont guess at typos in anything shorter
+FUZZY_MIN_SHARED = 0.5  # share of the query's trigrams a title needs to count as a typo match
+BUILD_CHUNK = 1 << 16  # titles/entries handled at a time while building, keeps the build memory flat
+
+# Trigram letters: a-z, 0-9, space, and a separator between titles
+_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789 "
+_SEPARATOR = len(_ALPHABET)
+_BASE = len(_ALPHABET) + 1
+_CODES = np.full(256, _SEPARATOR, dtype=np.int64)
+_CODES[np.frombuffer(_ALPHABET.encode(), dtype=np.uint8)] = np.arange(len(_ALPHABET))
+_TO_SPACE = bytes(c if chr(c).isalnum() else 32 for c in range(128)) + b" " * 128
+
+
+def normalize(text):
+    """Lowercase, no accents, anything thats not a letter or digit becomes a single space"""
+    text = str(text).lower()
+    if not text.isascii():
+        # "é" -> "e" + accent, the accent goes. Anything else thats not ascii ("’", "ß"...) becomes a space
+        text = "".join(ch if ch.isascii() else ("" if unicodedata.combining(ch) else " ")
+                       for ch in unicodedata.normalize("NFKD", text))
+    return b" ".join(text.encode("ascii").translate(_TO_SPACE).split()).decode("ascii")
+
+
+def _one_typo_undone(text):
+    """text with two neighbouring letters swapped, or with one letter left out (spaces stay where they are)"""
+    swapped = {text[:i] + text[i + 1] + text[i] + text[i + 2:] for i in range(len(text) - 1)
+               if text[i] != " " and text[i + 1] != " "}
+    dropped = {text[:i] + text[i + 1:] for i in range(len(text)) if text[i] != " "}
+    variants = swapped | {variant for variant in dropped if len(variant.strip()) >= FUZZY_MIN_CHARS}
+    variants.discard(text)
+    return sorted(variants)
+
+
+def _trigrams(codes):
+    """Trigram ids for every window of a code array, -1 where a window crosses a separator"""
+    if len(codes) < 3:
+        return np.empty(0, dtype=np.int64)
+    a, b, c = codes[:-2], codes[1:-1], codes[2:]
+    ids = (a * _BASE + b) * _BASE + c
+    return np.where((a == _SEPARATOR) | (b == _SEPARATOR) | (c == _SEPARATOR), -1, ids)
+
+
+class SuggestIndex:
+    """Prefix + trigram title index for one catalog"""
+
+    def __init__(self, titles, ratings, votes=None, shared=None):
+        # Titles are only read again for queries longer than KEY_BYTES
+        self.titles = titles
+        if shared is not None:
+            self._attach(*shared)
+        else:
+            self._build(titles, ratings, votes)
+        self.size = len(self.order)
+
+    # --- Building ---
+
+    def _build(self, titles, ratings, votes):
+        size = len(ratings)
+        ratings = np.asarray(ratings, dtype=np.float64)
+        rating_key = np.where(np.isnan(ratings), -np.inf, ratings)
+        votes = np.zeros(size) if votes is None else np.nan_to_num(np.asarray(votes, dtype=np.float64))
+        # Best rated first, more votes breaks ties, then catalog order
+        self.order = np.lexsort((np.arange(size), -votes, -rating_key))
+
+        titles = titles.to_list() if hasattr(titles, 'to_list') else list(titles)
+        names = [normalize(titles[row]) for row in self.order.tolist()]
+        del titles
+        self._build_prefixes(names)
+        self._build_trigrams(names)
+
+    def _build_prefixes(self, names):
+        # All names in one buffer, a 0 byte after each - position -> rank is a binary search on the starts
+        blob = np.frombuffer("\0".join(names).encode("ascii") + b"\0", dtype=np.uint8)
+        lengths = np.fromiter((len(name) for name in names), dtype=np.int64, count=len(names))
+        starts = np.zeros(len(names), dtype=np.int64)
+        starts[1:] = np.cumsum(lengths + 1)[:-1]
+        ends = starts + lengths
+
+        # A word starts wherever a letter comes right after a space or the start of a title.
+        # Names are already single spaced, so a title has (spaces + 1) of them
+        letter = (blob != 0) & (blob != 32)
+        word_start = letter.copy()
+        word_start[1:] &= ~letter[:-1]
+        word_starts = np.flatnonzero(word_start)
+        words = np.fromiter((name.count(" ") + 1 if name else 0 for name in names), dtype=np.int64, count=len(names))
+        entry_ranks = np.repeat(np.arange(len(names), dtype=np.int32), words)
+        del letter, word_start
+
+        # First KEY_BYTES of each position as fixed size bytes - a space right after the end of the title
+        # (so "amelie " finds "Amelie" like "star " finds "Star Wars"), then zero padded
+        keys = np.empty(len(word_starts), dtype=f"S{KEY_BYTES}")
+        columns = np.arange(KEY_BYTES)
+        for i in range(0, len(word_starts), BUILD_CHUNK):
+            pos = word_starts[i:i + BUILD_CHUNK, None] + columns
+            end = ends[entry_ranks[i:i + BUILD_CHUNK], None]
+            chunk = np.where(pos < end, blob[np.minimum(pos, len(blob) - 1)], np.where(pos == end, 32, 0))
+            keys[i:i + BUILD_CHUNK] = np.ascontiguousarray(chunk.astype(np.uint8)).view(keys.dtype).ravel()
+
+        del blob, word_starts, starts, ends
+
+        # Ties keep rank order, so an exact same key lists the better movie first
+        by_key = np.argsort(keys, kind='stable')
+        self.keys = keys[by_key]
+        self.entry_ranks = entry_ranks[by_key].astype(np.int32)
+        self._build_tops()
+
+    def _build_tops(self):
+        # tops[0][b] = best TOP_PER_BLOCK ranks in block b, tops[1][b] = same for blocks 2b + 2b+1, ...
+        # Padding uses self.size, which is worse than any real rank
+        sentinel = len(self.order)
+        padding = -len(self.entry_ranks) % LEAF_SIZE
+        level = np.concatenate((self.entry_ranks, np.full(padding, sentinel, dtype=np.int32)))
+        level = np.sort(level.reshape(-1, LEAF_SIZE), axis=1)[:, :TOP_PER_BLOCK]
+        self.tops = [np.ascontiguousarray(level)]
+        while len(level) > 1:
+            if len(level) % 2:
+                level = np.vstack((level, np.full((1, level.shape[1]), sentinel, dtype=np.int32)))
+            level = np.sort(level.reshape(-1, 2 * level.shape[1]), axis=1)[:, :TOP_PER_BLOCK]
+            self.tops.append(np.ascontiguousarray(level))
+
+    def _build_trigrams(self, names):
+        # Go through the movies best first, so once a trigram has TRIGRAM_CAP movies the rest can be skipped
+        counts = np.zeros(_BASE ** 3, dtype=np.int64)
+        kept = []
+        for first in range(0, len(names), BUILD_CHUNK):
+            chunk = names[first:first + BUILD_CHUNK]
+            padded = "".join(f"\0 {name} " for name in chunk).encode("ascii") + b"\0"
+            codes = _CODES[np.frombuffer(padded, dtype=np.uint8)]
+            ids = _trigrams(codes)
+            ranks = first + np.cumsum(codes[:len(ids)] == _SEPARATOR) - 1
+            valid = ids >= 0
+            # One (trigram, rank) pair per movie even if the trigram is in the title twice
+            # (sort + drop repeats, np.unique is a lot slower on this many numbers)
+            pairs = np.sort(ids[valid] * len(names) + ranks[valid])
+            pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+            ids, ranks = pairs // len(names), pairs % len(names)
+            # Position of each pair within its trigram (pairs are sorted by trigram), on top of earlier chunks
+            position = np.arange(len(ids))
+            new_trigram = np.concatenate(([True], ids[1:] != ids[:-1]))
+            group_start = np.maximum.accumulate(np.where(new_trigram, position, 0))
+            room = position - group_start + counts[ids] < TRIGRAM_CAP
+            ids, ranks = ids[room].astype(np.int32), ranks[room].astype(np.int32)
+            counts += np.bincount(ids, minlength=len(counts))
+            kept.append((ids, ranks))
+
+        ids = np.concatenate([i for i, _ in kept]) if kept else np.empty(0, dtype=np.int32)
+        ranks = np.concatenate([r for _, r in kept]) if kept else np.empty(0, dtype=np.int32)
+        del kept
+        by_trigram = np.argsort(ids, kind='stable')  # chunks were in rank order, stable keeps it
+        self.trigram_postings = ranks[by_trigram]
+        self.trigram_offsets = np.zeros(_BASE ** 3 + 1, dtype=np.int64)
+        self.trigram_offsets[1:] = np.cumsum(counts)
+
+    # --- Sharing through the snapshot (v2) ---
+
+    def shared_arrays(self):
+        arrays = {
+            'order': self.order,
+            'keys': self.keys,
+            'entry_ranks': self.entry_ranks,
+            'trigram_postings': self.trigram_postings,
+            'trigram_offsets': self.trigram_offsets,
+        }
+        for i, level in enumerate(self.tops):
+            arrays[f'tops{i}'] = level
+        return arrays, {'levels': len(self.tops), 'key_bytes': KEY_BYTES}
+
+    def _attach(self, arrays, meta):
+        if meta['key_bytes'] != KEY_BYTES:
+            raise ValueError("Suggest index was built with a different KEY_BYTES")
+        self.order = arrays['order']
+        self.keys = arrays['keys']
+        self.entry_ranks = arrays['entry_ranks']
+        self.trigram_postings = arrays['trigram_postings']
+        self.trigram_offsets = arrays['trigram_offsets']
+        self.tops = [arrays[f'tops{i}'] for i in range(meta['levels'])]
+
+    def memory_usage(self):
+        """Bytes per part of the index + 'total'"""
+        usage = {
+            'prefix_keys': int(self.keys.nbytes),
+            'prefix_ranks': int(self.entry_ranks.nbytes),
+            'prefix_tops': sum(int(level.nbytes) for level in self.tops),
+            'trigrams': int(self.trigram_postings.nbytes + self.trigram_offsets.nbytes),
+            'order': int(self.order.nbytes),
+        }
+        usage['total'] = sum(usage.values())
+        return usage
+
+    # --- Lookups ---
+
+    def _prefix_slice(self, prefix):
+        """(lo, hi) of the entries whose first KEY_BYTES start with prefix"""
+        key = prefix[:KEY_BYTES]
+        lo = np.searchsorted(self.keys, np.bytes_(key), side='left')
+        hi = np.searchsorted(self.keys, np.bytes_(key + b"\xff" * (KEY_BYTES - len(key))), side='right')
+        return int(lo), int(hi)
+
+    def _best_in_slice(self, lo, hi, limit):
+        """Best `limit` ranks among the entries lo..hi, no repeats"""
+        block_first, block_end = -(-lo // LEAF_SIZE), hi // LEAF_SIZE
+        if block_first >= block_end:
+            parts = [self.entry_ranks[lo:hi]]
+        else:
+            # The partial blocks at both ends, then the biggest aligned groups of whole blocks that fit
+            parts = [self.entry_ranks[lo:block_first * LEAF_SIZE], self.entry_ranks[block_end * LEAF_SIZE:hi]]
+            block = block_first
+            while block < block_end:
+                level = 0
+                while (level + 1 < len(self.tops) and block % (2 << level) == 0
+                       and block + (2 << level) <= block_end):
+                    level += 1
+                parts.append(self.tops[level][block >> level])
+                block += 1 << level
+        ranks = np.unique(np.concatenate(parts))
+        return ranks[ranks < self.size][:limit]
+
+    def _prefix_matches(self, query, limit):
+        lo, hi = self._prefix_slice(query.encode("ascii"))
+        if lo >= hi:
+            return np.empty(0, dtype=np.int64)
+        if len(query) <= KEY_BYTES:
+            return self._best_in_slice(lo, hi, limit)
+        # Longer than the keys: everything in the slice matches the first KEY_BYTES, check the rest
+        found = []
+        for rank in np.unique(self.entry_ranks[lo:hi]).tolist():
+            name = f" {normalize(self.titles[self.order[rank]])} "
+            if " " + query in name:
+                found.append(rank)
+                if len(found) == limit:
+                    break
+        return np.asarray(found, dtype=np.int64)
+
+    def _typo_matches(self, query, limit, skip):
+        """Ranks of titles with a word starting with the query once one typo is undone - best rated first"""
+        if len(query) > KEY_BYTES:
+            return np.empty(0, dtype=np.int64)
+        found = []
+        for variant in _one_typo_undone(query):
+            lo, hi = self._prefix_slice(variant.encode("ascii"))
+            if lo < hi:  # most variants arent the start of anything, thats just the two binary searches
+                found.append(self._best_in_slice(lo, hi, min(limit + len(skip), TOP_PER_BLOCK)))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        ranks = np.unique(np.concatenate(found))
+        return ranks[~np.isin(ranks, skip)][:limit]
+
+    def _fuzzy_matches(self, query, limit, skip):
+        """Ranks of titles sharing enough trigrams with the query - most shared first, then best rated"""
+        ids = _trigrams(_CODES[np.frombuffer(f" {query}".encode("ascii"), dtype=np.uint8)])
+        ids = np.unique(ids[ids >= 0])
+        needed = max(2, int(np.ceil(len(ids) * FUZZY_MIN_SHARED)))
+        if len(ids) < needed:
+            return np.empty(0, dtype=np.int64)
+        offsets = self.trigram_offsets
+        postings = [self.trigram_postings[offsets[i]:offsets[i + 1]] for i in ids.tolist()]
+        ranks, shared = np.unique(np.concatenate(postings), return_counts=True)
+        good = (shared >= needed) & ~np.isin(ranks, skip)
+        ranks, shared = ranks[good], shared[good]
+        return ranks[np.lexsort((ranks, -shared))][:limit]
+
+    def suggest(self, query, limit=10):
+        """
+        Up to `limit` (row, 'prefix' or 'fuzzy') for what was typed so far - titles with a word
+        starting with it first (best rated first), then near misses if there arent enough of those
+        """
+        limit = min(limit, MAX_SUGGESTIONS)
+        text = normalize(query)
+        if not text or limit <= 0:
+            return []
+        # "star " means the word is finished - dont suggest "Stardust"
+        if not query[-1].isalnum():
+            text += " "
+
+        ranks = self._prefix_matches(text, limit)
+        matches = [(row, 'prefix') for row in self.order[ranks].tolist()]
+        if len(matches) < limit and len(text.strip()) >= FUZZY_MIN_CHARS:
+            typos = self._typo_matches(text, limit - len(matches), ranks)
+            fuzzy = self._fuzzy_matches(text, limit - len(matches) - len(typos), np.concatenate((ranks, typos)))
+            matches.extend((row, 'fuzzy') for row in self.order[np.concatenate((typos, fuzzy))].tolist())
+        return matches
@@ -0,0 +1,238 @@
+import numpy as np
+
+from .suggest import normalize
+
+# --- Free text search over plots + titles ("the group splits up in the haunted woods") ---
+# A BM25 inverted index: for every word, the movies whose overview/title has it and how much that
+# word counts for each of them (its "impact", worked out up front). A query only reads the lists of
+# its own words and adds those impacts up - it never looks at a movie that has none of them.
+#
+# Movies are numbered by rank (best rated first) like in v2/search_index.py, so equal scores go to
+# the better movie and the genre/decade/rating filters can be checked with the search index tables.
+#
+# Words are normalized like the /suggest titles, common words ("the", "in"...) are skipped and a
+# plural s is dropped, so "woods" finds "wood". A title word counts TITLE_WEIGHT times.
+
+K1 = 1.2               # BM25: how fast repeating a word stops helping
+B = 0.75               # BM25: how much longer overviews get marked down
+TITLE_WEIGHT = 2       # a word in the title counts as this many in the overview
+MAX_TERM_BYTES = 24    # longer words get cut to this (same at build and query time)
+MAX_TEXT_RESULTS = 100
+BUILD_CHUNK = 1 << 15  # movies tokenized at a time while building
+
+STOPWORDS = frozenset("""
+a about after all also an and any are as at be been before but by can could did do does during each for from
+had has have he her him his how if in into is it its just more most no not of off on one only or other our out
+over own same she so some such than that the their them then there these they this those through to too under
+until up very was we were what when where which while who whom why will with would you your
+""".split())
+
+
+def _stem(word):
+    """The few english endings worth folding: stories -> story, woods -> wood (but not glass, virus, this)"""
+    if len(word) > 4 and word.endswith("ies"):
+        word = word[:-3] + "y"
+    elif len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    return word[:MAX_TERM_BYTES]
+
+
+def terms(text):
+    """The words of a text that get indexed / searched for, in order"""
+    if not isinstance(text, str):
+        return []
+    return [_stem(word) for word in normalize(text).split() if len(word) > 1 and word not in STOPWORDS]
+
+
+# Bytes that are part of a word after normalize() - everything else splits words
+_WORD_BYTES = bytes(c if chr(c).isalnum() else 32 for c in range(128)) + b" " * 128
+
+
+def _words(texts):
+    """
+    Every word of a list of texts in one go, normalized like normalize(): (words, which text each is from).
+    Lowercasing + blanking out punctuation doesnt change the length of ascii text, so all of them can go
+    through as one string and word positions still say which text they came from
+    """
+    texts = ["" if not isinstance(text, str) else text if text.isascii() else normalize(text) for text in texts]
+    blob = " ".join(texts).encode("ascii").lower().translate(_WORD_BYTES)
+    letter = np.frombuffer(blob, dtype=np.uint8) != 32
+    word_start = letter.copy()
+    word_start[1:] &= ~letter[:-1]
+    text_starts = np.zeros(len(texts), dtype=np.int64)
+    text_starts[1:] = np.cumsum(np.fromiter((len(text) + 1 for text in texts[:-1]), dtype=np.int64,
+                                            count=max(len(texts) - 1, 0)))
+    return blob.split(), np.searchsorted(text_starts, np.flatnonzero(word_start), side='right') - 1
+
+
+class TextIndex:
+    """BM25 index over the titles + overviews of one catalog"""
+
+    def __init__(self, titles, overviews, order, shared=None):
+        """
+        titles / overviews: one per movie (overviews can be None if the CSV doesnt have them)
+        order: rank -> row, best rated first (SearchIndex.order in v2)
+        shared: (arrays, meta) from shared_arrays(), e.g. memory mapped from a snapshot - skips the build
+        """
+        self.order = order
+        self.size = len(order)
+        if shared is not None:
+            self._attach(*shared)
+        else:
+            self._build(titles, overviews)
+
+    # --- Building ---
+
+    def _build(self, titles, overviews):
+        import pandas as pd
+        vocabulary = {}  # term -> id, in the order we first see them
+        lengths = np.zeros(self.size, dtype=np.float32)
+        ranks, term_ids, counts = [], [], []
+
+        def term_id(word):
+            word = word.decode("ascii")
+            if len(word) < 2 or word in STOPWORDS:
+                return -1
+            return vocabulary.setdefault(_stem(word), len(vocabulary))
+
+        # Plain lists, reading a compact column one movie at a time is slow (same as suggest.py)
+        fields = [(titles, TITLE_WEIGHT)] + ([(overviews, 1)] if overviews is not None else [])
+        fields = [(column.to_list() if hasattr(column, 'to_list') else list(column), weight)
+                  for column, weight in fields]
+
+        for first in range(0, self.size, BUILD_CHUNK):
+            rows = np.asarray(self.order[first:first + BUILD_CHUNK]).tolist()
+            chunk_ranks, chunk_terms, chunk_weights = [], [], []
+            for values, weight in fields:
+                words, docs = _words([values[row] for row in rows])
+                # Each distinct word of the chunk gets looked up once
+                codes, distinct = pd.factorize(np.array(words, dtype=object))
+                ids = np.fromiter((term_id(word) for word in distinct), dtype=np.int64, count=len(distinct))[codes]
+                kept = ids >= 0
+                chunk_ranks.append(docs[kept] + first)
+                chunk_terms.append(ids[kept])
+                chunk_weights.append(np.full(int(kept.sum()), weight, dtype=np.float32))
+            # One (rank, term) entry per movie with the weighted count
+            keys = np.concatenate(chunk_ranks) << 32 | np.concatenate(chunk_terms)
+            if not len(keys):
+                continue
+            weights = np.concatenate(chunk_weights)
+            by_key = np.argsort(keys, kind='stable')
+            keys, weights = keys[by_key], weights[by_key]
+            starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            keys, weights = keys[starts], np.add.reduceat(weights, starts)
+            chunk_ranks = keys >> 32
+            lengths[first:first + len(rows)] = np.bincount(chunk_ranks - first, weights=weights, minlength=len(rows))
+            ranks.append(chunk_ranks.astype(np.int32))
+            term_ids.append((keys & 0xFFFFFFFF).astype(np.int32))
+            counts.append(weights)
+        del fields
+
+        ranks = np.concatenate(ranks) if ranks else np.empty(0, dtype=np.int32)
+        term_ids = np.concatenate(term_ids) if term_ids else np.empty(0, dtype=np.int32)
+        counts = np.concatenate(counts) if counts else np.empty(0, dtype=np.float32)
+
+        # BM25 impact of each (term, movie): idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average))
+        movies_per_term = np.bincount(term_ids, minlength=len(vocabulary))
+        idf = np.log1p((self.size - movies_per_term + 0.5) / (movies_per_term + 0.5))
+        average = max(float(lengths.mean()) if self.size else 0.0, 1.0)
+        norm = K1 * (1 - B + B * lengths[ranks] / average)
+        impacts = (idf[term_ids] * counts * (K1 + 1) / (counts + norm)).astype(np.float16)
+        del norm, counts
+
+        # Terms sorted so a word can be found with a binary search, postings grouped by term (rank order inside)
+        words = np.array(list(vocabulary), dtype=f"S{MAX_TERM_BYTES}")
+        del vocabulary
+        word_order = np.argsort(words, kind='stable')
+        self.terms = words[word_order]
+        new_id = np.empty(len(words), dtype=np.int32)
+        new_id[word_order] = np.arange(len(words), dtype=np.int32)
+        term_ids = new_id[term_ids]
+        by_term = np.argsort(term_ids, kind='stable')
+        self.postings = ranks[by_term]
+        self.impacts = impacts[by_term]
+        self.offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(np.bincount(term_ids, minlength=len(words)))
+
+    # --- Sharing through the snapshot ---
+
+    def shared_arrays(self):
+        arrays = {'terms': self.terms, 'offsets': self.offsets, 'postings': self.postings, 'impacts': self.impacts}
+        return arrays, {'max_term_bytes': MAX_TERM_BYTES}
+
+    def _attach(self, arrays, meta):
+        if meta.get('max_term_bytes') != MAX_TERM_BYTES:
+            raise ValueError("Text index was built with a different MAX_TERM_BYTES")
+        self.terms = arrays['terms']
+        self.offsets = arrays['offsets']
+        self.postings = arrays['postings']
+        self.impacts = arrays['impacts']
+
+    def memory_usage(self):
+        """Bytes per part of the index + 'total'"""
+        usage = {
+            'terms': int(self.terms.nbytes + self.offsets.nbytes),
+            'postings': int(self.postings.nbytes),
+            'impacts': int(self.impacts.nbytes),
+        }
+        usage['total'] = sum(usage.values())
+        return usage
+
+    # --- Lookups ---
+
+    def _term_ids(self, query):
+        """Ids of the query words that are in the index (each once)"""
+        words = np.unique(np.array(terms(query), dtype=f"S{MAX_TERM_BYTES}"))
+        found = np.searchsorted(self.terms, words)
+        inside = found < len(self.terms)
+        found, words = found[inside], words[inside]
+        return found[self.terms[found] == words]
+
+    def search(self, query, limit=10, keep=None):
+        """
+        Up to `limit` (row, relevance) for a free text query, most relevant first (ties: better rated first)
+        keep: optional bool array by rank, the movies passing the genre/decade/rating filters
+        """
+        ids = self._term_ids(query)
+        if not len(ids) or limit <= 0:
+            return []
+        lists = [(int(self.offsets[i]), int(self.offsets[i + 1])) for i in ids.tolist()]
+
+        # Several words with lots of postings: add them up in a catalog sized array, no sorting needed.
+        # Otherwise sort the postings by movie and sum the runs (one word: nothing to add up)
+        if len(lists) > 1 and sum(end - start for start, end in lists) * 8 > self.size:
+            totals = np.bincount(np.concatenate([self.postings[start:end] for start, end in lists]),
+                                 np.concatenate([self.impacts[start:end] for start, end in lists]),
+                                 minlength=self.size)
+            if keep is not None:
+                totals[~keep] = 0
+            top_score = totals.max()
+            if top_score <= 0:
+                return []
+            # The best ones are nearly always among those scoring at least half the top score - pulling out
+            # just those is way cheaper than every movie that matched. All of them if thats not enough
+            ranks = np.flatnonzero(totals >= top_score / 2)
+            if len(ranks) < limit:
+                ranks = np.flatnonzero(totals > 0)
+            scores = totals[ranks]
+        else:
+            ranks = np.concatenate([self.postings[start:end] for start, end in lists])
+            impacts = np.concatenate([self.impacts[start:end] for start, end in lists]).astype(np.float64)
+            if len(lists) > 1:
+                by_rank = np.argsort(ranks, kind='stable')
+                ranks, impacts = ranks[by_rank], impacts[by_rank]
+                starts = np.flatnonzero(np.concatenate(([True], ranks[1:] != ranks[:-1])))
+                ranks, impacts = ranks[starts], np.add.reduceat(impacts, starts)
+            scores = impacts
+            if keep is not None:
+                passed = keep[ranks]
+                ranks, scores = ranks[passed], scores[passed]
+
+        if len(ranks) > limit:
+            # Everything scoring at least the limit-th best (ties included), then sort just those
+            cutoff = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            best = scores >= cutoff
+            ranks, scores = ranks[best], scores[best]
+        top = np.lexsort((ranks, -scores))[:limit]
+        return [(row, round(float(score), 3)) for row, score in
+                zip(np.asarray(self.order)[ranks[top]].tolist(), scores[top].tolist())]
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The apps are flat folders of modules (python app.py from inside v2/), so the tests import them the
+# same way: v1/ and v2/ on the path, the repo root for shared/, benchmarks/ for the synthetic catalogs
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("benchmarks", "v1", "v2", ""):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Read when the apps get imported - keep the poster cache out of v2/ and never call the real OMDB
+WORK_DIR = tempfile.mkdtemp(prefix="movie-tests-")
+os.environ.setdefault("POSTER_CACHE_FILE", os.path.join(WORK_DIR, "posters.sqlite3"))
+os.environ["OMDB_API_KEY"] = "YOUR_API_KEY_HERE"
+
+CATALOG_SIZE = 2000
+
+
+@pytest.fixture(scope="session")
+def catalog_csv(tmp_path_factory):
+    """A synthetic IMDB-like CSV (see benchmarks/synthetic.py) - lots of tied ratings, all the genres"""
+    from synthetic import catalog_csv as make_csv
+    return make_csv(CATALOG_SIZE, seed=0, data_dir=str(tmp_path_factory.mktemp("data")))
+
+
+@pytest.fixture(scope="session")
+def v1_app(catalog_csv, tmp_path_factory):
+    import movie_backend
+    work = tmp_path_factory.mktemp("v1")
+    movie_backend.DATASET_CSV = catalog_csv
+    movie_backend.SNAPSHOT_DIR = str(work / "catalog_snapshot")
+    movie_backend.profile_store.db_file = str(work / "profiles.sqlite3")
+    return movie_backend.create_app()
+
+
+@pytest.fixture(scope="session")
+def v2_app(catalog_csv, tmp_path_factory):
+    import app
+    import catalog
+    work = tmp_path_factory.mktemp("v2")
+    catalog.DATASET_CSV = catalog_csv
+    catalog.SNAPSHOT_DIR = str(work / "catalog_snapshot")
+    app.profile_store.db_file = str(work / "profiles.sqlite3")
+    return app.create_app(background=False)
+
+
+@pytest.fixture
+def v1_client(v1_app):
+    return v1_app.test_client()
+
+
+@pytest.fixture
+def v2_client(v2_app):
+    return v2_app.test_client()
+
+
+@pytest.fixture
+def omdb_stub():
+    """The fake OMDB from the benchmarks, answering straight away (set .error_rate / .miss_rate per test)"""
+    from omdb_stub import OmdbStub
+    stub = OmdbStub(latency=0.0).start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def poster_enricher(omdb_stub, tmp_path):
+    """A v2 PosterEnricher talking to the stub, with its own empty cache"""
+    from posters import PosterEnricher, PosterStore
+    enricher = PosterEnricher("test-key", store=PosterStore(str(tmp_path / "posters.sqlite3")),
+                              omdb_url=omdb_stub.url, timeout=2)
+    yield enricher
+    enricher.executor.shutdown(wait=True)
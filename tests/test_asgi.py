@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+# The async server (asgi.py) is the same API as app.py - same status, same bytes
+SAME_ANSWERS = [
+    ("GET", "/suggest?q=the&limit=5", None),
+    ("GET", "/suggest?q=drak", None),
+    ("GET", "/suggest?q=the&limit=abc", None),
+    ("GET", "/similar/3", None),
+    ("GET", "/similar/3?limit=2", None),
+    ("GET", "/similar/999999", None),
+    ("GET", "/similar/abc", None),
+    ("GET", "/ready", None),
+    ("POST", "/search", {"genre": "Drama", "decade": 1990, "min_rating": 7}),
+    ("POST", "/search", {"genre": "Drama", "min_rating": "abc"}),
+    ("POST", "/search/text", {"query": "the"}),
+]
+
+
+async def asgi_requests(requests, app=None):
+    import asgi
+    transport = httpx.ASGITransport(app=app or asgi.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return [await client.request(method, path, json=body, headers=headers)
+                for method, path, body, headers in requests]
+
+
+def flask_request(client, method, path, body=None, headers=None):
+    return client.open(path, method=method, json=body, headers=headers)
+
+
+@pytest.mark.parametrize("method, path, body", SAME_ANSWERS)
+def test_asgi_answers_like_flask(v2_client, method, path, body):
+    flask = flask_request(v2_client, method, path, body)
+    [response] = asyncio.run(asgi_requests([(method, path, body, None)]))
+    assert response.status_code == flask.status_code
+    assert response.content == flask.data
+    assert response.headers["x-catalog-version"] == flask.headers["X-Catalog-Version"]
+
+
+def test_asgi_profiles_and_recommendations_like_flask(v2_client):
+    # Same searches as two different users, one through each server - they end up with the same profile
+    searches = [{"genre": "Drama", "min_rating": 8}, {"genre": "Comedy", "decade": 2000, "min_rating": 7}]
+    flask_user, asgi_user = {"X-User-Id": "parity-flask"}, {"X-User-Id": "parity-asgi"}
+    for search in searches:
+        flask_request(v2_client, "POST", "/search", search, flask_user)
+    responses = asyncio.run(asgi_requests(
+        [("POST", "/search", search, asgi_user) for search in searches] +
+        [("GET", "/profile", None, asgi_user), ("GET", "/recommendations", None, asgi_user)]
+    ))
+    assert [r.status_code for r in responses] == [200] * 4
+    assert responses[2].content == flask_request(v2_client, "GET", "/profile", headers=flask_user).data
+    recommendations = flask_request(v2_client, "GET", "/recommendations", headers=flask_user).get_json()
+    assert recommendations and responses[3].json() == recommendations
+
+    [reset, profile] = asyncio.run(asgi_requests([("POST", "/reset", None, asgi_user),
+                                                  ("GET", "/profile", None, asgi_user)]))
+    assert reset.json() == {"message": "Profile reset"}
+    assert profile.content == flask_request(v2_client, "GET", "/profile", headers={"X-User-Id": "nobody"}).data
+
+
+def test_asgi_unknown_paths_and_methods(v2_client):
+    not_found, wrong_method = asyncio.run(asgi_requests([("GET", "/nope", None, None), ("GET", "/search", None, None)]))
+    assert not_found.status_code == flask_request(v2_client, "GET", "/nope").status_code == 404
+    assert wrong_method.status_code == flask_request(v2_client, "GET", "/search").status_code == 405
+
+
+def test_same_poster_at_once_is_one_omdb_call(poster_enricher, omdb_stub):
+    from posters import AsyncPosterEnricher
+    omdb_stub.latency = 0.2
+    posters = AsyncPosterEnricher(poster_enricher)
+
+    async def lookups():
+        try:
+            return await asyncio.gather(*(posters.posters_for([("Dark Harbor", 1994)]) for _ in range(5)))
+        finally:
+            await posters.close()
+
+    results = asyncio.run(lookups())
+    assert omdb_stub.requests == 1
+    assert results[0][0] and all(result == results[0] for result in results)
+    assert poster_enricher.store.get_many([("Dark Harbor", 1994)]) == {("Dark Harbor", 1994): results[0][0]}
+
+
+def test_slow_posters_dont_hold_up_other_requests(v2_app, poster_enricher, omdb_stub, monkeypatch):
+    import asgi
+    from posters import AsyncPosterEnricher
+    omdb_stub.latency = 1.0
+    monkeypatch.setattr(asgi, "posters", AsyncPosterEnricher(poster_enricher))
+
+    async def requests():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def timed(coro):
+                response = await coro
+                return response, time.monotonic()
+            # A search nobody made before = its posters come from (slow) OMDB
+            searches = [timed(client.post("/search", json={"genre": genre, "min_rating": 8.5}))
+                        for genre in ("Drama", "Crime", "Comedy", "Action")]
+            others = [timed(client.get(path)) for path in ("/filters", "/profile", "/suggest?q=the")]
+            try:
+                done = await asyncio.gather(*searches, *others)
+                return done[:len(searches)], done[len(searches):]
+            finally:
+                await asgi.posters.close()
+
+    start = time.monotonic()
+    searches, others = asyncio.run(requests())
+    assert all(response.status_code == 200 for response, _ in searches + others)
+    assert omdb_stub.requests > 0
+    # The 4 searches waited on OMDB at the same time (not one after the other)...
+    assert max(done for _, done in searches) - start < 3.0
+    # ...and everything else answered while they were waiting
+    assert max(done for _, done in others) < min(done for _, done in searches)
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+
+@pytest.fixture(params=["v1", "v2"])
+def client(request):
+    return request.getfixturevalue(f"{request.param}_client")
+
+
+def busiest_search(client):
+    """The genre + decade with the most movies, in whatever format the app's /filters uses"""
+    filters = client.get("/filters").get_json()
+    decades = filters["decades"]
+    genre = max(filters["genres"], key=lambda g: filters.get("counts", {}).get("genres", {}).get(g, 0))
+    best = None
+    for decade in decades:
+        lines = export(client, {"genre": genre, "decade": decade, "min_rating": 0})
+        if best is None or len(lines) > len(best[1]):
+            best = (decade, lines)
+    return {"genre": genre, "decade": best[0], "min_rating": 0}, best[1]
+
+
+def export(client, body):
+    response = client.post("/search/export", json=body)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def test_limit_takes_the_first_matches(client):
+    search, everything = busiest_search(client)
+    assert len(everything) > 5
+    assert export(client, {**search, "limit": 3}) == everything[:3]
+    assert export(client, {**search, "limit": len(everything) + 10}) == everything
+
+
+@pytest.mark.parametrize("limit", [-3, -1, 0, "abc"])
+def test_bad_limit_is_rejected(client, limit):
+    search, _ = busiest_search(client)
+    response = client.post("/search/export", json={**search, "limit": limit})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("field, value", [("decade", "x"), ("decade", [1990]), ("genre", 5),
+                                          ("min_rating", "abc"), ("min_rating", "nan")])
+def test_bad_filters_are_rejected_before_the_stream_starts(client, field, value):
+    response = client.post("/search/export", json={"genre": "Drama", "min_rating": 0, field: value})
+    assert response.status_code == 400
+    assert response.mimetype == "application/json"
+    assert field in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("field, value", [("decade", "x"), ("min_rating", "abc")])
+def test_search_rejects_bad_filters_too(client, field, value):
+    response = client.post("/search", json={"genre": "Drama", "min_rating": 0, field: value})
+    assert response.status_code == 400
+    assert field in response.get_json()["error"]
+
+
+def test_asgi_app_checks_the_limit_too(v2_app):
+    import asgi
+
+    async def post(limit):
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/search/export", json={"genre": "Drama", "min_rating": 0, "limit": limit})
+
+    assert asyncio.run(post(-3)).status_code == 400
+    assert asyncio.run(post(0)).status_code == 400
+    response = asyncio.run(post(2))
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+
+
+def test_asgi_app_checks_the_filters_before_streaming(v2_app):
+    import asgi
+
+    async def post(path, body):
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=body)
+
+    for path in ("/search/export", "/search"):
+        response = asyncio.run(post(path, {"genre": "Drama", "decade": "x", "min_rating": 0}))
+        assert response.status_code == 400
+        assert "decade" in response.json()["error"]
@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+@pytest.fixture(params=["v1", "v2"])
+def client(request):
+    return request.getfixturevalue(f"{request.param}_client")
+
+
+def test_filters_has_an_etag_and_can_be_cached(client):
+    response = client.get("/filters")
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('"')
+    assert "max-age=" in response.headers["Cache-Control"]
+    body = response.get_json()
+    assert body["genres"] and body["decades"] and body["ratings"]
+    # Same catalog = same bytes and the same tag every time
+    again = client.get("/filters")
+    assert again.headers["ETag"] == response.headers["ETag"]
+    assert again.data == response.data
+
+
+@pytest.mark.parametrize("sent", ["{etag}", "W/{etag}", '"something-else", {etag}', "*"])
+def test_filters_304_when_the_browser_has_it(client, sent):
+    etag = client.get("/filters").headers["ETag"]
+    response = client.get("/filters", headers={"If-None-Match": sent.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_filters_200_for_an_old_etag(client):
+    response = client.get("/filters", headers={"If-None-Match": '"from-the-last-catalog"'})
+    assert response.status_code == 200
+    assert response.get_json()["genres"]
+
+
+def test_v2_filter_counts_match_the_searches(v2_client):
+    body = v2_client.get("/filters").get_json()
+    counts = body["counts"]
+    for genre in body["genres"][:5]:
+        movies = v2_client.post("/search/export", json={"genre": genre}).data.splitlines()
+        assert counts["genres"][genre] == len(movies)
+
+
+def test_asgi_filters_match_flask(v2_client):
+    import asgi
+
+    async def get(headers=None):
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/filters", headers=headers)
+
+    flask = v2_client.get("/filters")
+    response = asyncio.run(get())
+    assert response.status_code == 200
+    assert response.headers["etag"] == flask.headers["ETag"]
+    assert response.content == flask.data
+    response = asyncio.run(get({"If-None-Match": flask.headers["ETag"]}))
+    assert response.status_code == 304 and response.content == b""
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+GENRES = [f"Genre{i:02d}" for i in range(70)]  # more than fit in one 64 bit mask
+
+
+@pytest.fixture(scope="module")
+def many_genres_csv(tmp_path_factory):
+    from synthetic import make_catalog
+    df = make_catalog(600, seed=3)
+    rng = np.random.default_rng(3)
+    df["Genre"] = [", ".join(rng.choice(GENRES, size=rng.integers(1, 4), replace=False)) for _ in range(len(df))]
+    path = tmp_path_factory.mktemp("genres") / "many-genres.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def many_genres_catalog(many_genres_csv):
+    import catalog
+    return catalog.read_catalog(many_genres_csv)
+
+
+def movie_genres(catalog):
+    return [set(str(g).split(",")) for g in catalog.column("Genre").to_list()]
+
+
+def test_more_than_64_genres_still_load(many_genres_catalog):
+    assert len(many_genres_catalog.genre_names) == 70
+    assert many_genres_catalog.genre_masks.shape == (many_genres_catalog.size, 2)
+
+
+def test_search_by_genre_past_the_first_64(many_genres_catalog):
+    from search_index import SearchIndex
+    index = SearchIndex(many_genres_catalog)
+    genres = movie_genres(many_genres_catalog)
+    for genre in ["Genre00", "Genre63", "Genre64", "Genre69"]:
+        found = index.search(genre=genre, limit=many_genres_catalog.size)
+        expected = [row for row in np.asarray(index.order) if genre in genres[row]]
+        assert list(found) == expected
+
+
+def test_scores_count_genres_past_the_first_64(many_genres_catalog):
+    from scoring import ScoringEngine
+    engine = ScoringEngine(many_genres_catalog)
+    top = ["Genre01", "Genre64", "Genre68"]
+    scores = engine.int_scores(top, [], 11)  # no decade / rating matches, just the genre part
+    expected = [3 * len(set(top) & genres) for genres in movie_genres(many_genres_catalog)]
+    assert list(scores) == expected
+    assert set(engine.genre_rows("Genre66")) == {row for row, genres in enumerate(movie_genres(many_genres_catalog))
+                                                 if "Genre66" in genres}
+
+
+def test_many_genres_snapshot_round_trip(many_genres_catalog, many_genres_csv, tmp_path):
+    import catalog
+    from snapshot import load_snapshot, save_snapshot
+    save_snapshot(many_genres_catalog, str(tmp_path / "snap"), source_path=many_genres_csv,
+                  indexes=catalog.build_indexes(many_genres_catalog))
+    loaded = load_snapshot(str(tmp_path / "snap"))
+    assert loaded.genre_names == many_genres_catalog.genre_names
+    assert np.array_equal(loaded.genre_masks, many_genres_catalog.genre_masks)
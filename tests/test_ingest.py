@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared.ingest as ingest_module
+from shared.ingest import Dedup, find_csvs, ingest, row_keys
+
+
+@pytest.fixture(scope="module")
+def shards(tmp_path_factory):
+    """
+    One synthetic catalog cut into overlapping shards (a folder with a subfolder) - rows 300-399 are in
+    two shards and row 5 comes back with another rating, so the dedupe has something to do
+    """
+    from synthetic import make_catalog
+    df = make_catalog(900, seed=7)
+    folder = tmp_path_factory.mktemp("shards")
+    os.makedirs(folder / "more")
+    again = df.iloc[[5]].assign(IMDB_Rating=1.0)
+    parts = {
+        "a.csv": df.iloc[:400],
+        "b.csv": pd.concat([df.iloc[300:700], again]),
+        os.path.join("more", "c.csv"): df.iloc[650:],
+    }
+    for name, part in parts.items():
+        part.to_csv(folder / name, index=False)
+    (folder / "notes.txt").write_text("not a csv")
+    return str(folder), pd.concat(parts.values(), ignore_index=True)
+
+
+def test_find_csvs(shards, tmp_path):
+    folder, _ = shards
+    expected = [os.path.join(folder, "a.csv"), os.path.join(folder, "b.csv"), os.path.join(folder, "more", "c.csv")]
+    assert find_csvs(folder) == expected
+    assert find_csvs(os.path.join(folder, "*.csv")) == expected[:2]
+    assert find_csvs(os.path.join(folder, "**", "*.csv")) == sorted(expected)
+    assert find_csvs(os.pathsep.join((expected[2], expected[0]))) == [expected[2], expected[0]]
+    assert find_csvs(str(tmp_path)) == []
+
+
+def test_row_keys_dont_care_how_the_year_was_read():
+    keys = row_keys(["Up", "Up", "Up", "1917", 1917], [2009, 2009.0, 2010, 2019, 2019.0])
+    assert keys[0] == keys[1] != keys[2]
+    assert keys[3] == keys[4]
+    assert keys.dtype == np.uint64
+
+
+def test_dedup_matches_a_set():
+    rng = np.random.default_rng(0)
+    dedup, seen = Dedup(), set()
+    for size in [1, 0, 5, 100, 1000, 37, 5000, 3, 800]:
+        keys = rng.integers(0, 3000, size).astype(np.uint64)
+        expected = []
+        for key in keys.tolist():
+            expected.append(key not in seen)
+            seen.add(key)
+        assert dedup.keep(keys).tolist() == expected
+    assert len(dedup) == len(seen)
+    # Runs stay sorted and each one more than twice the size of the next
+    assert all(np.all(np.diff(run.astype(np.int64)) > 0) for run in dedup.runs)
+    assert all(len(a) > 2 * len(b) for a, b in zip(dedup.runs, dedup.runs[1:]))
+
+
+def prepare(chunk):
+    """Bare bones cleaning: rows without a usable year go"""
+    chunk = chunk.assign(Released_Year=pd.to_numeric(chunk["Released_Year"], errors="coerce"))
+    chunk = chunk.dropna(subset=["Released_Year"])
+    return row_keys(chunk["Series_Title"], chunk["Released_Year"]), chunk[["Series_Title", "Released_Year", "IMDB_Rating"]]
+
+
+def reference(combined):
+    """All the shards read whole with pandas and deduplicated in one go"""
+    return prepare(combined)[1].drop_duplicates(["Series_Title", "Released_Year"]).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("workers, chunk_rows", [(1, 50_000), (1, 97), (2, 97), (3, 1)])
+def test_ingest_matches_reading_everything_at_once(shards, workers, chunk_rows):
+    folder, combined = shards
+    parts = []
+    stats = ingest(find_csvs(folder), prepare, lambda part, keep: parts.append(part[keep]), workers, chunk_rows)
+    result = pd.concat(parts, ignore_index=True)
+    expected = reference(combined)
+    pd.testing.assert_frame_equal(result, expected)
+    assert (stats.files, stats.rows_read, stats.movies) == (3, len(combined), len(expected))
+    assert stats.bad_rows == combined["Released_Year"].eq("PG").sum()
+    assert stats.duplicates == len(combined) - stats.bad_rows - len(expected) == 101 + 50
+    assert stats.chunks >= -(-len(combined) // chunk_rows)
+    assert "rows/s" in stats.report() and stats.as_dict()["movies"] == len(expected)
+    # The first copy of row 5 wins, not the later one with the other rating
+    assert 1.0 not in result["IMDB_Rating"].tolist()
+
+
+def test_a_broken_shard_fails_the_ingest(shards, tmp_path):
+    folder, _ = shards
+    broken = tmp_path / "broken.csv"
+    broken.write_text("Series_Title,Released_Year\n\"never closed,2000\n")
+    for workers in (1, 2):
+        with pytest.raises(Exception):
+            ingest(find_csvs(folder) + [str(broken)], prepare, lambda part, keep: None, workers, 97)
+
+
+def test_v2_catalog_from_shards(shards):
+    import catalog
+    folder, combined = shards
+    whole = catalog.clean_data(combined).drop_duplicates(["Series_Title", "Released_Year"])
+    for workers, chunk_rows in ((1, 97), (2, 200)):
+        movies = catalog.read_catalog(folder, workers, chunk_rows)
+        assert movies.size == len(whole)
+        assert list(movies.titles) == whole["Series_Title"].tolist()
+
+
+def test_v1_dataset_from_shards(shards, monkeypatch):
+    import movie_backend
+    folder, combined = shards
+    monkeypatch.setattr(ingest_module, "INGEST_CHUNK_ROWS", 97)
+    raw_df, movies_df = movie_backend.read_dataset(folder)
+    once = movie_backend.read_dataset(os.path.join(folder, "a.csv"))[1]
+    assert len(raw_df) == len(movies_df)
+    assert list(movies_df.index) == list(range(len(movies_df)))
+    assert movies_df["title"].is_unique  # every synthetic title ends in its own number
+    assert movies_df["title"].tolist()[:len(once)] == once["title"].tolist()
+    assert set(movies_df["title"]) == set(reference(combined)["Series_Title"])
@@ -0,0 +1,106 @@
+import random
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def local(catalog_csv):
+    """The single process indexes everything gets compared against"""
+    import catalog
+    from scoring import RecommendationCache, ScoringEngine
+    from search_index import SearchIndex
+    movies = catalog.read_catalog(catalog_csv)
+    engine = ScoringEngine(movies)
+    return movies, SearchIndex(movies), engine, RecommendationCache(engine)
+
+
+@pytest.fixture(scope="module", params=[("decade", 2), ("decade", 3), ("hash", 2), ("hash", 5)],
+                ids=lambda p: f"{p[0]}-{p[1]}")
+def partitioned(request, local):
+    from partitions import PartitionedCatalog
+    from scoring import RecommendationCache, ScoringEngine
+    movies, index, _, _ = local
+    by, shards = request.param
+    # Its own fallback cache, so the local one above only ever sees the comparison calls
+    parts = PartitionedCatalog(movies, index, RecommendationCache(ScoringEngine(movies)), shards, by, searches=True)
+    yield parts
+    parts.close()
+
+
+def queries(index, count, seed):
+    rng = random.Random(seed)
+    genres = list(index.genre_names.values()) + ["Nope", None]
+    decades = list(index.decade_ranges) + [1800, None, None]
+    for _ in range(count):
+        yield rng.choice(genres), rng.choice(decades), rng.choice([0, 7, 7.5, 8, 8.5, 9])
+
+
+def profiles(engine, count, seed):
+    rng = random.Random(seed)
+    decades = [int(d) for d in engine.catalog.decades]
+    for _ in range(count):
+        yield (rng.sample(engine.genres, rng.choice([0, 1, 2, 3])), rng.sample(decades, rng.choice([0, 1, 2])),
+               rng.choice([6.0, 7.5, 8.0, 8.5]))
+
+
+def test_shards_split_the_whole_catalog(partitioned, local):
+    movies = local[0]
+    assert sum(partitioned.sizes) == movies.size
+    assert partitioned.shards == len(partitioned.sizes) > 1
+
+
+@pytest.mark.parametrize("limit", [1, 10, 50])
+def test_search_pages_match_one_process(partitioned, local, limit):
+    index = local[1]
+    for query in queries(index, 40, seed=limit):
+        after = -1
+        for _ in range(4):
+            rows, last, more = index.search_page(*query, limit=limit, after=after)
+            shard_rows, shard_last, shard_more = partitioned.search_page(*query, limit=limit, after=after)
+            assert np.array_equal(rows, shard_rows) and (last, more) == (shard_last, shard_more), query
+            if not more:
+                break
+            after = last
+
+
+def test_search_many_matches_one_process(partitioned, local):
+    index = local[1]
+    batch = list(queries(index, 30, seed=3))
+    for rows, shard_rows in zip(index.search_many(batch, 20), partitioned.search_many(batch, 20)):
+        assert np.array_equal(rows, shard_rows)
+
+
+@pytest.mark.parametrize("limit", [1, 6, 30])
+def test_recommend_matches_one_process(partitioned, local, limit):
+    engine = local[2]
+    for top_genres, top_decades, avg in profiles(engine, 15, seed=limit):
+        scores = engine.scores(top_genres, top_decades, avg)
+        rows = engine.top_k(scores, limit)
+        shard_rows, shard_scores = partitioned.recommend(top_genres, top_decades, avg, limit)
+        assert np.array_equal(rows, shard_rows), (top_genres, top_decades, avg)
+        assert np.array_equal(scores[rows], shard_scores) and shard_scores.dtype == scores.dtype
+
+
+def test_recommend_with_cached_users_matches_one_process(partitioned, local):
+    cache = local[3]
+    for i, (top_genres, top_decades, avg) in enumerate(profiles(cache.engine, 30, seed=11)):
+        user_id = f"user{i % 4}"
+        rows, scores = cache.top_k(user_id, top_genres, top_decades, avg, 6)
+        shard_rows, shard_scores = partitioned.recommend(top_genres, top_decades, avg, 6, user_id)
+        assert np.array_equal(rows, shard_rows) and np.array_equal(scores, shard_scores)
+    # Same question again is answered from every shard's cache
+    hits = partitioned.hits
+    partitioned.recommend(top_genres, top_decades, avg, 6, user_id)
+    assert partitioned.hits == hits + 1
+
+
+def test_closed_shards_answer_in_this_process(local):
+    from partitions import PartitionedCatalog
+    movies, index, engine, cache = local
+    parts = PartitionedCatalog(movies, index, cache, 2, "hash", searches=True)
+    parts.close()
+    assert parts.shards == 0
+    assert np.array_equal(parts.search("Drama", None, 7, 10), index.search("Drama", None, 7, 10))
+    rows, _ = parts.recommend(["Drama"], [2000], 8.0, 6)
+    assert np.array_equal(rows, engine.top_k(engine.scores(["Drama"], [2000], 8.0), 6))
@@ -0,0 +1,131 @@
+from posters import PosterWarmer
+
+STUB_POSTERS = "https://stub.omdb.local/"
+KEYS = [(f"Stub Movie {i}", 1990 + i) for i in range(10)]
+
+
+def test_miss_then_hit(poster_enricher, omdb_stub):
+    key = ("The Stub Redemption", 1994)
+    assert poster_enricher.store.get_many([key]) == {}
+
+    posters, complete = poster_enricher.resolve([key])
+    assert complete
+    assert posters[0].startswith(STUB_POSTERS)
+    assert omdb_stub.requests == 1
+
+    # Second time its in the sqlite cache, OMDB doesnt get asked
+    assert poster_enricher.posters_for([key]) == posters
+    assert omdb_stub.requests == 1
+
+
+def test_no_poster_is_cached_too(poster_enricher, omdb_stub):
+    omdb_stub.miss_rate = 1.0  # "Movie not found!" for everything
+    key = ("Nobody Filmed This", 2001)
+    assert poster_enricher.resolve([key]) == ([None], True)
+    assert poster_enricher.store.get_many([key]) == {key: None}
+    assert poster_enricher.posters_for([key]) == [None]
+    assert omdb_stub.requests == 1
+
+
+def test_failed_lookups_are_not_cached(poster_enricher, omdb_stub):
+    omdb_stub.error_rate = 1.0  # every call is a 500
+    key = ("Server Error: The Movie", 2010)
+    assert poster_enricher.resolve([key]) == ([None], False)
+    assert poster_enricher.store.get_many([key]) == {}
+
+    # Next time OMDB gets asked again, and once its back the poster is found + cached
+    omdb_stub.error_rate = 0.0
+    posters, complete = poster_enricher.resolve([key])
+    assert complete and posters[0].startswith(STUB_POSTERS)
+    assert omdb_stub.requests == 2
+    assert poster_enricher.store.get_many([key]) == {key: posters[0]}
+
+
+def test_timeouts_count_as_failed(poster_enricher, omdb_stub):
+    omdb_stub.latency = 0.5
+    poster_enricher.timeout = 0.1
+    assert poster_enricher.resolve([("Slow Burn", 1999)]) == ([None], False)
+    assert poster_enricher.store.get_many([("Slow Burn", 1999)]) == {}
+
+
+def test_cache_only_never_calls_omdb(poster_enricher, omdb_stub):
+    poster_enricher.cache_only = True
+    assert poster_enricher.resolve(KEYS[:3]) == ([None, None, None], False)
+    assert omdb_stub.requests == 0
+
+
+def test_warmup_fills_the_cache(poster_enricher, omdb_stub):
+    warmer = PosterWarmer(poster_enricher, rate=0, batch_size=3)
+    stats = warmer.run(KEYS, report=None)
+    assert stats["found"] == len(KEYS) and stats["failed"] == 0
+    assert omdb_stub.requests == len(KEYS)
+
+    # Serving cache only now finds every poster without calling OMDB
+    poster_enricher.cache_only = True
+    posters, complete = poster_enricher.resolve(KEYS)
+    assert complete and all(p.startswith(STUB_POSTERS) for p in posters)
+
+    # A second run from the start only finds cached entries
+    stats = warmer.run(KEYS, resume=False, report=None)
+    assert stats["cached"] == len(KEYS)
+    assert omdb_stub.requests == len(KEYS)
+
+
+def test_warmup_with_omdb_failing(poster_enricher, omdb_stub):
+    omdb_stub.error_rate = 1.0
+    warmer = PosterWarmer(poster_enricher, rate=0, batch_size=4)
+    stats = warmer.run(KEYS, report=None)
+    assert stats["failed"] == len(KEYS) and stats["found"] == 0
+    assert poster_enricher.store.get_many(KEYS) == {}
+
+    # Resuming picks up at the checkpoint (the end), --restart tries the failed ones again
+    assert warmer.run(KEYS, report=None)["done"] == len(KEYS)
+    assert omdb_stub.requests == len(KEYS)
+    omdb_stub.error_rate = 0.0
+    stats = warmer.run(KEYS, resume=False, report=None)
+    assert stats["found"] == len(KEYS)
+
+
+def test_checkpoint_is_for_one_list_of_movies(poster_enricher, omdb_stub):
+    warmer = PosterWarmer(poster_enricher, rate=0, batch_size=4)
+    assert warmer.run(KEYS, report=None)["done"] == len(KEYS)
+    assert omdb_stub.requests == len(KEYS)
+
+    # A reloaded catalog with just as many movies, but other ones - nothing of it was warmed yet
+    other = [(f"Other Movie {i}", 2000 + i) for i in range(len(KEYS))]
+    stats = warmer.run(other, report=None)
+    assert stats["found"] == len(other)
+    assert omdb_stub.requests == 2 * len(KEYS)
+    # ...and going back to the first list doesnt resume from the second one's checkpoint either
+    assert warmer.run(KEYS, report=None)["cached"] == len(KEYS)
+
+
+def test_checkpoints_from_before_signatures_are_ignored(tmp_path):
+    import sqlite3
+    from posters import PosterStore
+    path = str(tmp_path / "old.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE checkpoints (name TEXT PRIMARY KEY, position INTEGER NOT NULL,"
+                     " total INTEGER NOT NULL, updated_at REAL NOT NULL)")
+        conn.execute("INSERT INTO checkpoints VALUES ('catalog', 5, 10, 0)")
+    store = PosterStore(path)
+    assert store.get_checkpoint("catalog", 10, "abc") == 0
+    store.set_checkpoint("catalog", 7, 10, "abc")
+    assert store.get_checkpoint("catalog", 10, "abc") == 7
+
+
+def test_warmup_doesnt_hold_up_live_lookups(poster_enricher, omdb_stub):
+    import time
+    omdb_stub.latency = 0.2
+    keys = [(f"Warm Movie {i}", 1950 + i) for i in range(40)]
+    warmer = PosterWarmer(poster_enricher, rate=0, batch_size=len(keys))
+    thread = warmer.start(keys, report=None)
+    time.sleep(0.05)  # the whole batch is queued up by now
+
+    # In the request pool this would wait for 40 warmup calls, 8 at a time (~1s)
+    started = time.monotonic()
+    posters, complete = poster_enricher.resolve([("Live Request", 2020)])
+    assert complete and posters[0].startswith(STUB_POSTERS)
+    assert time.monotonic() - started < 0.6
+    thread.join(30)
+    assert warmer.stats["found"] == len(keys)
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from shared.profiles import MemoryProfileBackend, ProfileStore, SqliteProfileBackend
+
+
+def new_profile():
+    return {"genres": {}, "searches": 0}
+
+
+@pytest.fixture
+def backend():
+    return MemoryProfileBackend()
+
+
+def make_store(backend, **options):
+    # flush_interval=0: no background flusher, the tests say when to write
+    return ProfileStore(new_profile, backend=backend, flush_interval=0, **options)
+
+
+def test_deltas_add_up(backend):
+    store = make_store(backend)
+    store.add("ann", {"genres": {"Drama": 1}, "searches": 1})
+    store.add("ann", {"genres": {"Drama": 2, "Crime": 1}, "searches": 1})
+    expected = {"genres": {"Drama": 3, "Crime": 1}, "searches": 2}
+    assert store.get("ann") == expected
+    assert backend.load("ann") is None  # batched, nothing written yet
+    store.flush()
+    assert backend.load("ann") == expected
+
+    # Two processes adding to the same user - adding is order independent, nobody's counts get lost
+    other = make_store(backend)
+    other.add("ann", {"genres": {"Drama": 1}, "searches": 1})
+    store.add("ann", {"searches": 1})
+    other.flush()
+    store.flush()
+    assert make_store(backend).get("ann") == {"genres": {"Drama": 4, "Crime": 1}, "searches": 4}
+
+
+def test_least_recently_used_profiles_get_dropped_without_losing_changes(backend):
+    store = make_store(backend, max_cached=2)
+    for user in ("ann", "bob", "cid"):
+        store.add(user, {"searches": 1})
+    assert store.stats() == {"cached_profiles": 2, "pending_writes": 3}
+    assert "ann" not in store._cache
+    # ann gets loaded again with the unsaved change on top
+    assert store.get("ann") == {"genres": {}, "searches": 1}
+    assert list(store._cache) == ["cid", "ann"]
+    store.flush()
+    assert [backend.load(user)["searches"] for user in ("ann", "bob", "cid")] == [1, 1, 1]
+
+
+def test_reset_wipes_memory_pending_and_saved(backend):
+    store = make_store(backend)
+    store.add("ann", {"searches": 2})
+    store.flush()
+    store.add("ann", {"searches": 1})
+    store.reset("ann")
+    assert store.get("ann") == new_profile()
+    store.flush()
+    assert backend.load("ann") is None
+
+
+class SlowBackend(MemoryProfileBackend):
+    """Holds every merge until the test lets it go"""
+
+    def __init__(self):
+        super().__init__()
+        self.merging = threading.Event()
+        self.release = threading.Event()
+
+    def merge(self, deltas):
+        self.merging.set()
+        assert self.release.wait(10)
+        super().merge(deltas)
+
+
+def test_reset_during_a_flush_doesnt_bring_the_counts_back():
+    backend = SlowBackend()
+    store = make_store(backend)
+    store.add("ann", {"searches": 5})
+    flush = threading.Thread(target=store.flush)
+    flush.start()
+    assert backend.merging.wait(10)  # the flush has ann's deltas and is writing them
+
+    reset = threading.Thread(target=store.reset, args=("ann",))
+    reset.start()
+    reset.join(0.2)
+    assert reset.is_alive()  # waits for the write to land, then deletes it
+    backend.release.set()
+    flush.join(10)
+    reset.join(10)
+    assert backend.load("ann") is None
+    assert store.get("ann") == new_profile()
+
+
+def test_deltas_taken_before_a_reset_are_dropped(backend):
+    store = make_store(backend)
+    store.add("ann", {"searches": 5})
+    store.add("bob", {"searches": 1})
+    # A flush takes the deltas but has to wait to write them (somebody else is writing)...
+    store._write_lock.acquire()
+    flush = threading.Thread(target=store.flush)
+    flush.start()
+    while not store._flushing:
+        flush.join(0.01)
+    # ...and ann resets in between. Whichever of the two gets to write first, the 5 searches stay gone
+    reset = threading.Thread(target=store.reset, args=("ann",))
+    reset.start()
+    store._write_lock.release()
+    flush.join(10)
+    reset.join(10)
+    assert backend.load("ann") is None
+    assert backend.load("bob") == {"searches": 1}
+    assert store.get("ann") == new_profile()
+
+
+def test_sqlite_backend_round_trip(tmp_path):
+    path = str(tmp_path / "profiles.sqlite3")
+    store = make_store(SqliteProfileBackend(path))
+    store.add("ann", {"genres": {"Drama": 1}, "searches": 1})
+    store.flush()
+    assert make_store(SqliteProfileBackend(path)).get("ann") == {"genres": {"Drama": 1}, "searches": 1}
+    store.reset("ann")
+    assert SqliteProfileBackend(path).load("ann") is None
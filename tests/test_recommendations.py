@@ -0,0 +1,93 @@
+import random
+import threading
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def v1(v1_app):
+    import movie_backend
+    return movie_backend
+
+
+def random_profiles(catalog, count, seed):
+    """A profile that keeps changing like a user searching around: a few counts go up (or get reset) each step"""
+    rng = random.Random(seed)
+    options = {feature: sorted(rows) for feature, rows in catalog['feature_rows'].items()}
+    profile = {'genres': {}, 'decades': {}, 'ratings': {}}
+    for _ in range(count):
+        for feature, values in options.items():
+            for value in rng.sample(values, rng.choice([0, 1, 2])):
+                profile[feature][value] = profile[feature].get(value, 0) + rng.choice([1, 1, 3])
+            if profile[feature] and rng.random() < 0.2:
+                del profile[feature][rng.choice(sorted(profile[feature]))]
+        if not profile['genres']:
+            profile['genres'][options['genres'][0]] = 1
+        yield {feature: dict(counts) for feature, counts in profile.items()}
+
+
+def full_scores(v1, catalog, profile):
+    """calculate_similarity_score() for every movie, the slow original way"""
+    return np.array([v1.calculate_similarity_score(row, profile)
+                     for row in catalog['movies_df'].to_dict('records')])
+
+
+def smaller_catalog(v1, catalog):
+    """Another catalog version with the movies in a different order, so old rows dont line up with it"""
+    movies_df = catalog['movies_df'].iloc[::-1].iloc[:1500].reset_index(drop=True)
+    ratings = movies_df['rating'].to_numpy(dtype=float)
+    return {'version': catalog['version'] + 100, 'movies_df': movies_df,
+            'feature_rows': v1.build_feature_rows(movies_df, ratings)}
+
+
+def test_v1_patched_scores_match_a_full_rescore(v1):
+    catalog = v1.catalog
+    other = smaller_catalog(v1, catalog)
+    user = "patch-tester"
+    for step, profile in enumerate(random_profiles(catalog, 12, seed=3)):
+        current = other if step == 6 else catalog  # one step on another version, then back again
+        rows = v1.recommendation_rows(current, profile, 10, user)
+        entry = v1.recommendation_cache[user]
+        expected = full_scores(v1, current, profile)
+        assert entry['version'] == current['version']
+        assert np.array_equal(entry['int_scores'] + current['movies_df']['rating'].to_numpy(dtype=float) * 0.5, expected)
+        assert list(rows) == list(v1.top_score_rows(expected, 10))
+        # No user = no cache, worked out from scratch - has to agree
+        assert list(v1.recommendation_rows(current, profile, 10)) == list(rows)
+    v1.forget_recommendations(user)
+    assert user not in v1.recommendation_cache
+
+
+def test_v1_users_dont_wait_on_each_other(v1):
+    catalog = v1.catalog
+    profile = next(random_profiles(catalog, 1, seed=5))
+    v1.recommendation_rows(catalog, profile, 6, "busy-user")
+    done = threading.Event()
+    # busy-user is mid scoring (their entry is locked) - somebody else still gets an answer
+    with v1.recommendation_cache["busy-user"]['lock']:
+        thread = threading.Thread(target=lambda: (v1.recommendation_rows(catalog, profile, 6, "other-user"), done.set()))
+        thread.start()
+        assert done.wait(10)
+        # ...and resetting busy-user doesnt wait either
+        reset = threading.Thread(target=v1.forget_recommendations, args=("busy-user",))
+        reset.start()
+        reset.join(10)
+        assert not reset.is_alive()
+    thread.join()
+
+
+def test_v2_users_dont_wait_on_each_other(catalog_csv):
+    import catalog
+    from scoring import RecommendationCache, ScoringEngine
+    engine = ScoringEngine(catalog.read_catalog(catalog_csv))
+    cache = RecommendationCache(engine)
+    cache.top_k("busy-user", ["Drama"], [1990], 8.0)
+    done = threading.Event()
+    with cache._entry("busy-user")['lock']:
+        thread = threading.Thread(target=lambda: (cache.top_k("other-user", ["Comedy"], [2000], 7.5), done.set()))
+        thread.start()
+        assert done.wait(10)
+    thread.join()
+    rows, _ = cache.top_k("other-user", ["Comedy"], [2000], 7.5)
+    assert np.array_equal(rows, engine.top_k(engine.scores(["Comedy"], [2000], 7.5), 6))
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def other_csv(tmp_path_factory):
+    """A different (smaller) catalog to reload to"""
+    from synthetic import catalog_csv as make_csv
+    return make_csv(600, seed=5, data_dir=str(tmp_path_factory.mktemp("other")))
+
+
+def hammer(app, stop, seen):
+    """GET /filters over and over until stop is set: (status, version header, etag, body) for each"""
+    client = app.test_client()
+    while not stop.is_set():
+        response = client.get("/filters")
+        seen.append((response.status_code, response.headers.get("X-Catalog-Version"),
+                     response.headers.get("ETag"), response.data))
+
+
+def reload_under_load(app, client, status_path):
+    """Reload through the endpoint while 3 threads keep asking for /filters - (old version, new version, responses)"""
+    old_version = client.get(status_path).get_json()["version"]
+    stop, seen = threading.Event(), []
+    threads = [threading.Thread(target=hammer, args=(app, stop, seen)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    try:
+        while len(seen) < 5:
+            time.sleep(0.01)
+        assert client.post("/catalog/reload?rebuild=1").status_code == 202
+        deadline = time.monotonic() + 60
+        while True:
+            status = client.get(status_path).get_json()
+            if not status["reloading"] and status["version"] != old_version:
+                break
+            assert time.monotonic() < deadline and not status.get("last_error")
+            time.sleep(0.05)
+        time.sleep(0.1)  # a few answers from the new version too
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return old_version, status["version"], seen
+
+
+def check_responses(seen, old_version, new_version, versioned=True):
+    """Every answer is all old or all new - never a tag or version number that doesnt go with its body"""
+    assert {status for status, *_ in seen} == {200}
+    assert all(etag == f'"{hashlib.sha1(body).hexdigest()}"' for _, _, etag, body in seen)
+    bodies = {body for *_, body in seen}
+    assert len(bodies) <= 2
+    if versioned:  # v2 says which version answered (X-Catalog-Version)
+        by_version = {}
+        for _, version, _, body in seen:
+            by_version.setdefault(version, set()).add(body)
+        assert set(by_version) <= {str(old_version), str(new_version)}
+        assert all(len(answers) == 1 for answers in by_version.values())
+
+
+def test_v2_reload_swaps_versions_under_load(v2_app, v2_client, other_csv, catalog_csv, monkeypatch):
+    import app
+    import catalog
+    monkeypatch.setattr(app, "RELOAD_ALLOWED", True)
+    monkeypatch.setattr(catalog, "DATASET_CSV", other_csv)
+    search = {"genre": "Drama", "min_rating": 0, "limit": 5}
+    cursor = v2_client.post("/search", json=search).headers["X-Next-Cursor"]
+    try:
+        old_version, new_version, seen = reload_under_load(v2_app, v2_client, "/catalog/status")
+        assert new_version == old_version + 1
+        check_responses(seen, old_version, new_version)
+        assert v2_client.get("/catalog/status").get_json()["movies"] < 1000
+
+        # Cursors from the old version dont carry over, the rows dont line up anymore
+        response = v2_client.post("/search", json={**search, "cursor": cursor})
+        assert response.status_code == 410
+        assert response.headers["X-Catalog-Version"] == str(new_version)
+    finally:
+        # Back to the catalog the other tests expect
+        monkeypatch.setattr(catalog, "DATASET_CSV", catalog_csv)
+        assert app.catalog_versions.reload(rebuild=True, wait=True)
+    assert app.catalog_versions.current.catalog.size == 1998
+
+
+def test_v2_failed_reload_keeps_the_old_version(v2_app, v2_client, tmp_path, monkeypatch):
+    import app
+    import catalog
+    monkeypatch.setattr(catalog, "DATASET_CSV", str(tmp_path / "missing.csv"))
+    before = app.catalog_versions.current
+    assert app.catalog_versions.reload(rebuild=True, wait=True)
+    assert app.catalog_versions.current is before
+    status = v2_client.get("/catalog/status").get_json()
+    assert status["version"] == before.version and status["last_error"]
+    assert v2_client.get("/filters").status_code == 200
+
+
+def test_v1_reload_swaps_versions_under_load(v1_app, v1_client, other_csv, catalog_csv, monkeypatch):
+    import movie_backend
+    monkeypatch.setattr(movie_backend, "RELOAD_ALLOWED", True)
+    monkeypatch.setattr(movie_backend, "DATASET_CSV", other_csv)
+    try:
+        old_version, new_version, seen = reload_under_load(v1_app, v1_client, "/catalog/status")
+        assert new_version == old_version + 1
+        check_responses(seen, old_version, new_version, versioned=False)
+        assert v1_client.get("/catalog/status").get_json()["movies"] < 1000
+    finally:
+        monkeypatch.setattr(movie_backend, "DATASET_CSV", catalog_csv)
+        movie_backend.load_dataset(fallback=False, use_snapshot=False)
+    assert len(movie_backend.catalog["movies_df"]) == 1998
+
+
+def test_reload_is_off_unless_allowed(v1_client, v2_client):
+    assert v1_client.post("/catalog/reload").status_code == 403
+    assert v2_client.post("/catalog/reload").status_code == 403
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope="module")
+def engine(catalog_csv):
+    import catalog
+    from scoring import ScoringEngine
+    return ScoringEngine(catalog.read_catalog(catalog_csv))
+
+
+@pytest.fixture(scope="module")
+def movies_df(catalog_csv):
+    """The CSV cleaned up the way the original app.py did it, row for row"""
+    df = pd.read_csv(catalog_csv)
+    df['clean_rating'] = df['IMDB_Rating'].apply(lambda x: round(float(x) * 2) / 2)
+    df['Released_Year'] = pd.to_numeric(df['Released_Year'], errors='coerce')
+    df = df.dropna(subset=['Released_Year']).reset_index(drop=True)
+    df['decade'] = df['Released_Year'].apply(lambda x: int(x // 10 * 10))
+    df['Genre'] = df['Genre'].astype(str).str.replace(' ', '')
+    return df
+
+
+def pandas_recommend(df, top_genres, top_decades, avg_pref_rating, limit):
+    """The original row-by-row scoring + sort_values, as the reference"""
+    def calculate_score(row):
+        score = 0
+        score += len(set(row['Genre'].split(',')) & set(top_genres)) * 3
+        if row['decade'] in top_decades:
+            score += 2
+        if row['clean_rating'] >= avg_pref_rating:
+            score += 2
+        score += (row['IMDB_Rating'] / 10.0) * 0.5
+        return score
+
+    rec_df = df.copy()
+    rec_df['score'] = rec_df.apply(calculate_score, axis=1)
+    results = rec_df.sort_values(by=['score', 'IMDB_Rating'], ascending=[False, False]).head(limit)
+    return list(results.index), rec_df['score'].to_numpy()
+
+
+def profiles(engine, count, seed):
+    """Random (top genres, top decades, avg rating) like the ones real profiles end up with"""
+    rng = random.Random(seed)
+    decades = [int(d) for d in engine.catalog.decades]
+    for _ in range(count):
+        yield (rng.sample(engine.genres, rng.choice([0, 1, 2, 3])), rng.sample(decades, rng.choice([0, 1, 2])),
+               rng.choice([5.0, 7.5, 7.75, 8.0, 8.5, 9.5]))
+
+
+def test_scores_match_the_pandas_formula(engine, movies_df):
+    assert engine.size == len(movies_df)
+    for top_genres, top_decades, avg in profiles(engine, 10, seed=1):
+        _, expected = pandas_recommend(movies_df, top_genres, top_decades, avg, 1)
+        assert np.array_equal(engine.scores(top_genres, top_decades, avg), expected)
+
+
+@pytest.mark.parametrize("limit", [1, 6, 50, 5000])
+def test_top_k_matches_sort_values_with_ties(engine, movies_df, limit):
+    for top_genres, top_decades, avg in profiles(engine, 8, seed=limit):
+        expected, _ = pandas_recommend(movies_df, top_genres, top_decades, avg, limit)
+        rows = engine.top_k(engine.scores(top_genres, top_decades, avg), limit)
+        assert list(rows) == expected, (top_genres, top_decades, avg)
+
+
+def test_top_k_when_everything_ties(engine, movies_df):
+    # Nobody matches anything, so the score is just the rating boost - all down to the tiebreak
+    expected, _ = pandas_recommend(movies_df, ["Nope"], [1800], 11.0, 40)
+    assert list(engine.top_k(engine.scores(["Nope"], [1800], 11.0), 40)) == expected
+    assert len(engine.top_k(engine.scores([], [], 8.0), 0)) == 0
+
+
+def test_top_rated_matches_sort_values(engine, movies_df):
+    expected = movies_df.sort_values(by='IMDB_Rating', ascending=False, kind='stable').head(25)
+    assert list(engine.top_rated(25)) == list(expected.index)
+
+
+def test_recommendation_cache_patches_to_the_same_answer(engine):
+    from scoring import RecommendationCache
+    cache = RecommendationCache(engine)
+    # The same few users over and over so most calls patch an older entry instead of starting fresh
+    for i, (top_genres, top_decades, avg) in enumerate(profiles(engine, 60, seed=7)):
+        scores = engine.scores(top_genres, top_decades, avg)
+        rows, row_scores = cache.top_k(f"user{i % 3}", top_genres, top_decades, avg, limit=10)
+        assert np.array_equal(rows, engine.top_k(scores, 10))
+        assert np.array_equal(row_scores, scores[rows])
+    assert cache.misses == 60
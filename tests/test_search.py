@@ -0,0 +1,79 @@
+import random
+
+import pandas as pd
+import pytest
+
+MIN_RATINGS = [0, 7.0, 7.5, 8.0, 8.5, 9.0]
+
+
+@pytest.fixture(scope="module")
+def v2_movies(catalog_csv):
+    """(SearchIndex, the CSV cleaned like the original v2 app did it) - same rows in the same order"""
+    import catalog
+    from search_index import SearchIndex
+    df = pd.read_csv(catalog_csv)
+    df['clean_rating'] = df['IMDB_Rating'].apply(lambda x: round(float(x) * 2) / 2)
+    df['Released_Year'] = pd.to_numeric(df['Released_Year'], errors='coerce')
+    df = df.dropna(subset=['Released_Year']).reset_index(drop=True)
+    df['decade'] = df['Released_Year'].apply(lambda x: int(x // 10 * 10))
+    return SearchIndex(catalog.read_catalog(catalog_csv)), df
+
+
+def v2_reference(df, genre, decade, min_rating, limit):
+    """The old copy + filter + sort_values, with genre as a whole genre (not a substring) like the index"""
+    filtered = df
+    if genre:
+        genres = df['Genre'].fillna('').str.lower().str.split(r'\s*,\s*', regex=True)
+        filtered = filtered[genres.apply(lambda names: genre.lower() in names)]
+    if decade:
+        filtered = filtered[filtered['decade'] == int(decade)]
+    if min_rating > 0:
+        filtered = filtered[filtered['clean_rating'] >= min_rating]
+    # stable, so equal ratings keep catalog order like the index does
+    return list(filtered.sort_values(by='IMDB_Rating', ascending=False, kind='stable').head(limit).index)
+
+
+def queries(genres, decades, count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield rng.choice([None] + genres), rng.choice([None] + decades), rng.choice(MIN_RATINGS)
+
+
+def test_v2_index_matches_the_pandas_filter(v2_movies):
+    searcher, df = v2_movies
+    genres = sorted(searcher.genre_names.values())
+    decades = sorted(df['decade'].unique().tolist())
+    for genre, decade, min_rating in queries(genres, decades, 100, seed=2):
+        for limit in (10, 100):
+            expected = v2_reference(df, genre, decade, min_rating, limit)
+            assert list(searcher.search(genre, decade, min_rating, limit)) == expected, (genre, decade, min_rating)
+
+
+def test_v2_genre_is_a_whole_genre_any_case(v2_movies):
+    searcher, df = v2_movies
+    assert list(searcher.search("drama", None, 0, 50)) == list(searcher.search("DRAMA", None, 0, 50))
+    assert list(searcher.search("Dram", None, 0, 50)) == []
+
+
+def test_v1_index_matches_the_pandas_filter(v1_app):
+    import movie_backend
+    catalog = movie_backend.catalog
+    movies_df = catalog['movies_df']
+    genres = sorted(movies_df['genre'].unique().tolist())
+    decades = sorted(movies_df['decade_str'].unique().tolist())
+    rng = random.Random(4)
+    for _ in range(200):
+        genre, decade, min_rating = rng.choice(genres), rng.choice(decades), rng.choice(MIN_RATINGS)
+        # The original v1 /search: filter on all three, then nlargest(10, 'rating')
+        expected = movies_df[(movies_df['genre'] == genre) & (movies_df['decade_str'] == decade) &
+                             (movies_df['rating'] >= float(min_rating))].nlargest(10, 'rating')
+        rows, _ = movie_backend.lookup_page(catalog, genre, decade, float(min_rating))
+        assert list(movies_df.index[rows]) == list(expected.index), (genre, decade, min_rating)
+
+
+def test_search_endpoints_use_the_index(v1_client, v2_client):
+    body = {"genre": "Drama", "decade": "1990s", "min_rating": 7.5}
+    movies = v1_client.post("/search", json=body).get_json()["movies"]
+    assert movies and all(m["genre"] == "Drama" and m["rating"] >= 7.5 and 1990 <= m["year"] < 2000 for m in movies)
+    movies = v2_client.post("/search", json={**body, "decade": 1990}).get_json()
+    assert movies and all(m["IMDB_Rating"] >= 7.25 and 1990 <= int(m["Released_Year"]) < 2000 for m in movies)
@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+import pytest
+
+QUERIES = [
+    {"genre": "Drama", "decade": "1990", "min_rating": 8},
+    {"genre": "Comedy", "min_rating": 7.5},
+    {"decade": 2010, "min_rating": 0},
+    {"genre": "NoSuchGenre", "min_rating": 0},
+]
+
+
+def asgi_post(path, body, headers=None):
+    import asgi
+
+    async def post():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=body, headers=headers)
+    return asyncio.run(post())
+
+
+def test_batch_answers_match_single_searches(v2_client):
+    results = v2_client.post("/search/batch", json={"queries": QUERIES, "record": False}).get_json()["results"]
+    assert len(results) == len(QUERIES)
+    for query, movies in zip(QUERIES, results):
+        assert movies == v2_client.post("/search", json=query).get_json()
+    assert results[-1] == []
+
+
+@pytest.mark.parametrize("bad", [{"decade": "x"}, {"min_rating": "abc"}, {"genre": ["Drama"]}, "Drama"])
+def test_a_bad_query_in_a_batch_is_a_400(v2_client, bad):
+    headers = {"X-User-Id": "batch-tester"}
+    before = v2_client.get("/profile", headers=headers).get_json()
+    response = v2_client.post("/search/batch", json={"queries": [QUERIES[0], bad]}, headers=headers)
+    assert response.status_code == 400
+    error = response.get_json()["error"]
+    assert "queries[1]" in error or "Each query" in error
+    # Nothing from the batch got counted, not even the good query before it
+    assert v2_client.get("/profile", headers=headers).get_json() == before
+
+
+@pytest.mark.parametrize("body", [{}, {"queries": []}, {"queries": [{}] * 101}])
+def test_batch_shape_is_checked(v2_client, body):
+    assert v2_client.post("/search/batch", json=body).status_code == 400
+
+
+def test_asgi_batch_matches_flask(v2_client):
+    body = {"queries": QUERIES, "record": False}
+    assert asgi_post("/search/batch", body).json() == v2_client.post("/search/batch", json=body).get_json()
+    response = asgi_post("/search/batch", {"queries": [{"decade": "x"}]})
+    assert response.status_code == 400
+    assert "queries[0]" in response.json()["error"]
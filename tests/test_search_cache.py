@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+
+STUB_POSTERS = "https://stub.omdb.local/"
+
+
+def search_cache_hits():
+    import app
+    return app.current_catalog().search_cache.hits
+
+
+def test_pages_with_failed_poster_lookups_are_not_cached(v2_client, poster_enricher, omdb_stub, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "poster_enricher", poster_enricher)
+    search = {"genre": "Drama", "min_rating": 0, "limit": 7}
+
+    omdb_stub.error_rate = 1.0
+    first = v2_client.post("/search", json=search).get_json()
+    assert len(first) == 7
+    assert not any(movie["Poster_Link"].startswith(STUB_POSTERS) for movie in first)
+    hits, calls = search_cache_hits(), omdb_stub.requests
+    v2_client.post("/search", json=search)
+    assert search_cache_hits() == hits          # not answered from the cache...
+    assert omdb_stub.requests == calls + 7      # ...OMDB got asked again
+
+    # OMDB is back - the posters show up straight away, and now the page gets cached
+    omdb_stub.error_rate = 0.0
+    fixed = v2_client.post("/search", json=search).get_json()
+    assert all(movie["Poster_Link"].startswith(STUB_POSTERS) for movie in fixed)
+    hits = search_cache_hits()
+    assert v2_client.post("/search", json=search).get_json() == fixed
+    assert search_cache_hits() == hits + 1
+
+
+def test_asgi_pages_with_failed_poster_lookups_are_not_cached(v2_app, poster_enricher, omdb_stub, monkeypatch):
+    import asgi
+    from posters import AsyncPosterEnricher
+    search = {"genre": "Drama", "min_rating": 0, "limit": 8}
+
+    async def post_twice():
+        monkeypatch.setattr(asgi, "posters", AsyncPosterEnricher(poster_enricher))
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.post("/search", json=search)).json()
+            hits = search_cache_hits()
+            await client.post("/search", json=search)
+            await asgi.posters.close()
+            return first, search_cache_hits() - hits
+
+    omdb_stub.error_rate = 1.0
+    first, cache_hits = asyncio.run(post_twice())
+    assert not any(movie["Poster_Link"].startswith(STUB_POSTERS) for movie in first)
+    assert cache_hits == 0
+
+    omdb_stub.error_rate = 0.0
+    first, cache_hits = asyncio.run(post_twice())
+    assert all(movie["Poster_Link"].startswith(STUB_POSTERS) for movie in first)
+    assert cache_hits == 1
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+import shared.similar as similar
+from shared.similar import CREDIT_WEIGHTS, NEIGHBORS, NeighborIndex, content_features
+
+
+def small_catalog(size, seed):
+    """Few distinct genres/decades/ratings (so lots of movies share a group) and a small pool of people"""
+    rng = np.random.default_rng(seed)
+    genre_hot = (rng.random((size, 6)) < 0.3).astype(np.uint8)
+    decades = rng.integers(0, 5, size) / 4
+    ratings = rng.integers(0, 4, size) / 3
+    people = np.array([f"Person {i}" for i in range(40)] + ["", None], dtype=object)
+    credits = [("director", people[rng.integers(0, len(people), size)])] + [
+        ("star", people[rng.integers(0, len(people), size)]) for _ in range(3)]
+    return content_features(genre_hot, decades, ratings), credits
+
+
+def brute_force(features, credits):
+    """The whole movies x movies cosine matrix, names as weighted one-hot columns"""
+    names = sorted({(role, name) for role, column in credits for name in column if name})
+    column = {key: i for i, key in enumerate(names)}
+    people = np.zeros((len(features), len(names)))
+    for role, values in credits:
+        for row, name in enumerate(values):
+            if name:
+                people[row, column[role, name]] = CREDIT_WEIGHTS[role]
+    vectors = np.hstack((features.astype(np.float64), people))
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1
+    vectors /= norms[:, None]
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -np.inf)
+    return sims
+
+
+def check_against(index, sims):
+    for row in range(len(sims)):
+        found = index.similar(row)
+        rows = [r for r, _ in found]
+        assert row not in rows and len(set(rows)) == len(rows) == NEIGHBORS
+        expected = np.sort(sims[row])[::-1][:NEIGHBORS]
+        # The same scores as the true top k (which movie wins a tie can depend on float32 rounding)
+        assert np.allclose(sims[row, rows], expected, atol=1e-4), row
+        assert np.allclose([score for _, score in found], expected, atol=2e-3), row
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_neighbors_match_the_full_similarity_matrix(seed):
+    features, credits = small_catalog(500, seed)
+    check_against(NeighborIndex(features, credits), brute_force(features, credits))
+
+
+def test_same_answers_in_small_blocks(monkeypatch):
+    features, credits = small_catalog(500, 2)
+    whole = NeighborIndex(features, credits)
+    # A few groups per block and a few hundred name pairs per batch
+    monkeypatch.setattr(similar, "BLOCK_CELLS", 1000)
+    monkeypatch.setattr(similar, "PAIR_BUDGET", 300)
+    blocked = NeighborIndex(features, credits)
+    assert np.array_equal(blocked.neighbors, whole.neighbors)
+    assert np.array_equal(blocked.scores, whole.scores)
+    check_against(blocked, brute_force(features, credits))
+
+
+def test_without_names():
+    features, _ = small_catalog(300, 3)
+    check_against(NeighborIndex(features), brute_force(features, []))
+
+
+def test_names_on_too_many_movies_dont_count(monkeypatch):
+    features, credits = small_catalog(300, 4)
+    monkeypatch.setattr(similar, "PERSON_MAX_MOVIES", 7)
+    # Same as if those names were never in the CSV
+    movies = {}
+    for role, column in credits:
+        for row, name in enumerate(column):
+            if name:
+                movies.setdefault((role, name), set()).add(row)
+    kept = [(role, np.array([name if name and len(movies[role, name]) <= 7 else None for name in column], dtype=object))
+            for role, column in credits]
+    assert sum(name is not None for _, column in kept for name in column) < sum(bool(name) for _, column in credits for name in column)
+    check_against(NeighborIndex(features, credits), brute_force(features, kept))
+
+
+def test_tiny_catalogs():
+    features, credits = small_catalog(4, 5)
+    index = NeighborIndex(features, credits)
+    for row in range(4):
+        rows = [r for r, _ in index.similar(row)]
+        assert sorted(rows + [row]) == [0, 1, 2, 3]
+    assert NeighborIndex(features[:0], [], k=NEIGHBORS).size == 0
+
+
+def test_memory_is_k_per_movie():
+    features, credits = small_catalog(500, 6)
+    index = NeighborIndex(features, credits)
+    assert index.neighbors.shape == index.scores.shape == (500, NEIGHBORS)
+    assert index.memory_usage()["total"] == index.neighbors.nbytes + index.scores.nbytes
+    # Loads back from its own arrays (that's what the snapshot does)
+    arrays, meta = index.shared_arrays()
+    assert NeighborIndex(shared=(arrays, meta)).similar(7) == index.similar(7)
+
+
+@pytest.fixture(params=["v1", "v2"])
+def client(request):
+    return request.getfixturevalue(f"{request.param}_client")
+
+
+def similar_movies(client, path):
+    body = client.get(path).get_json()
+    return body["movies"] if isinstance(body, dict) else body
+
+
+def test_similar_endpoint(client):
+    movies = similar_movies(client, "/similar/5")
+    assert len(movies) == NEIGHBORS
+    scores = [movie["similarity"] for movie in movies]
+    assert scores == sorted(scores, reverse=True) and all(0 < score <= 1 for score in scores)
+    assert 5 not in [movie["id"] for movie in movies]
+    assert similar_movies(client, "/similar/5?limit=3") == movies[:3]
+    # Any movie on the list can be asked about in turn
+    assert similar_movies(client, f"/similar/{movies[0]['id']}")
+
+    for missing in ("/similar/999999", "/similar/-1", "/similar/abc"):
+        assert client.get(missing).status_code == 404
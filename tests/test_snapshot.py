@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def v1_snapshot(catalog_csv, tmp_path, monkeypatch):
+    """v1's snapshot functions pointed at an empty folder, plus what to save in it"""
+    import movie_backend
+    monkeypatch.setattr(movie_backend, "SNAPSHOT_DIR", str(tmp_path / "catalog_snapshot"))
+    raw_df, movies_df = movie_backend.read_dataset(catalog_csv)
+    movies_df = movie_backend.compact_columns(movies_df)
+    return movie_backend, movies_df, movie_backend.build_indexes(raw_df, movies_df)
+
+
+def _save_and_load(module, movies_df, indexes, source, rounds):
+    for _ in range(rounds):
+        module.save_snapshot(movies_df, indexes, source)
+        loaded = module.load_snapshot()
+        # Somebody else can be publishing theirs, but there is always a whole snapshot to get
+        if loaded is None or len(loaded[0]) != len(movies_df):
+            os._exit(1)
+    os._exit(0)
+
+
+def is_mapped(array):
+    """Is this array (a view of) a memory mapped file"""
+    while array is not None and not isinstance(array, np.memmap):
+        array = getattr(array, "base", None)
+    return array is not None
+
+
+def assert_only_live_version(snapshot_dir):
+    with open(os.path.join(snapshot_dir, "CURRENT")) as f:
+        live = f.read()
+    assert sorted(os.listdir(snapshot_dir)) == sorted([".lock", "CURRENT", live])
+
+
+def test_v1_snapshot_round_trip(v1_snapshot, catalog_csv):
+    module, movies_df, indexes = v1_snapshot
+    module.save_snapshot(movies_df, indexes, catalog_csv)
+    module.save_snapshot(movies_df, indexes, catalog_csv)  # replaces the first one
+    loaded_df, loaded_indexes = module.load_snapshot()
+    assert loaded_df.to_dict("records") == movies_df.to_dict("records")
+    assert loaded_df.dtypes.to_dict() == movies_df.dtypes.to_dict()
+    assert set(loaded_indexes) == set(indexes)
+    # Just the live version left, no temp/old folders
+    assert os.listdir(os.path.dirname(module.SNAPSHOT_DIR)) == ["catalog_snapshot"]
+    assert_only_live_version(module.SNAPSHOT_DIR)
+
+
+def test_v1_snapshot_columns_stay_memory_mapped(v1_snapshot, catalog_csv):
+    module, movies_df, indexes = v1_snapshot
+    movies_df = movies_df.copy()
+    movies_df.loc[movies_df.index[3], "poster"] = None
+    module.save_snapshot(movies_df, indexes, catalog_csv)
+    loaded_df, _ = module.load_snapshot()
+    # Numbers and category codes are the mapped files themselves, not a copy of them
+    for column in ("year", "rating", "decade"):
+        assert is_mapped(loaded_df[column].to_numpy())
+    for column in ("genre", "decade_str", "rating_range"):
+        assert is_mapped(loaded_df[column].array.codes)
+    # Text is a utf-8 blob on disk, not fixed width (4 bytes a character) strings
+    snapshot = module.live_snapshot_dir()
+    assert not os.path.exists(os.path.join(snapshot, "poster.npy"))
+    blob = np.load(os.path.join(snapshot, "poster.data.npy"))
+    assert blob.dtype == np.uint8
+    assert len(blob) == sum(len(poster.encode()) for poster in movies_df["poster"].dropna())
+    assert loaded_df["poster"].isna().tolist() == movies_df["poster"].isna().tolist()
+    assert list(loaded_df["poster"].iloc[4:10]) == list(movies_df["poster"].iloc[4:10])
+
+
+def test_v1_snapshot_saves_from_several_processes_at_once(v1_snapshot, catalog_csv):
+    module, movies_df, indexes = v1_snapshot
+    context = multiprocessing.get_context("fork")
+    procs = [context.Process(target=_save_and_load, args=(module, movies_df, indexes, catalog_csv, 5))
+             for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(60)
+    assert [proc.exitcode for proc in procs] == [0, 0, 0, 0]
+
+    loaded_df, _ = module.load_snapshot()
+    assert list(loaded_df["title"]) == list(movies_df["title"])
+    assert os.listdir(os.path.dirname(module.SNAPSHOT_DIR)) == ["catalog_snapshot"]
+    assert_only_live_version(module.SNAPSHOT_DIR)
+
+
+def _keep_loading(snapshot_dir, stop_file):
+    from snapshot import load_snapshot
+    while not os.path.exists(stop_file):
+        if load_snapshot(snapshot_dir) is None:
+            os._exit(1)
+    os._exit(0)
+
+
+def test_v2_snapshot_is_always_there_while_a_new_one_goes_live(catalog_csv, tmp_path):
+    import catalog
+    from snapshot import load_snapshot, save_snapshot
+    movies = catalog.read_catalog(catalog_csv)
+    snapshot_dir = str(tmp_path / "catalog_snapshot")
+    save_snapshot(movies, snapshot_dir, source_path=catalog_csv)
+
+    # A worker starting at any point finds a snapshot - the old one or the new one, never nothing
+    stop_file = str(tmp_path / "stop")
+    reader = multiprocessing.get_context("fork").Process(target=_keep_loading, args=(snapshot_dir, stop_file))
+    reader.start()
+    for _ in range(10):
+        save_snapshot(movies, snapshot_dir, source_path=catalog_csv)
+    open(stop_file, "w").close()
+    reader.join(60)
+    assert reader.exitcode == 0
+
+    assert load_snapshot(snapshot_dir).titles.to_list() == movies.titles.to_list()
+    assert os.listdir(tmp_path).count("catalog_snapshot") == 1
+    assert_only_live_version(snapshot_dir)
+
+
+def test_v2_snapshot_replaces_the_old_layout(catalog_csv, tmp_path):
+    import catalog
+    from snapshot import load_snapshot, save_snapshot
+    movies = catalog.read_catalog(catalog_csv)
+    snapshot_dir = tmp_path / "catalog_snapshot"
+    snapshot_dir.mkdir()
+    (snapshot_dir / "manifest.json").write_text("{}")  # files straight in the folder, from before versions
+    assert load_snapshot(str(snapshot_dir)) is None
+    save_snapshot(movies, str(snapshot_dir), source_path=catalog_csv)
+    assert load_snapshot(str(snapshot_dir)).size == movies.size
+    assert_only_live_version(str(snapshot_dir))
@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Every test here runs in a fresh python - the session's apps are already imported and loaded
+
+
+def run(folder, code, tmp_path, **env):
+    """Run code inside v1/ or v2/ like `python app.py` would, returns its stdout (fails the test if it fails)"""
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join((os.path.join(ROOT, folder), ROOT)),
+        "MOVIE_SNAPSHOT_DIR": str(tmp_path / "catalog_snapshot"),
+        "PROFILE_DB_FILE": str(tmp_path / "profiles.sqlite3"),
+        "POSTER_CACHE_FILE": str(tmp_path / "posters.sqlite3"),
+        "OMDB_API_KEY": "YOUR_API_KEY_HERE",
+        **env,
+    }
+    result = subprocess.run([sys.executable, "-c", textwrap.dedent(code)], cwd=os.path.join(ROOT, folder),
+                            env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+@pytest.mark.parametrize("folder, module", [("v1", "movie_backend"), ("v2", "app"), ("v2", "asgi")])
+def test_importing_the_app_reads_nothing(folder, module, tmp_path):
+    out = run(folder, f"""
+        import socket, sys
+        def no_network(*args):
+            raise AssertionError("importing connected to " + repr(args))
+        socket.socket.connect = no_network
+        import {module}
+        print(sorted(name for name in ("pandas", "sklearn", "kagglehub", "scipy") if name in sys.modules))
+    """, tmp_path, MOVIE_CSV=str(tmp_path / "missing.csv"))
+    assert out.strip() == "[]"
+    assert os.listdir(tmp_path) == []  # no snapshot, no profile or poster database
+
+
+V2_BACKGROUND_LOAD = """
+    import asyncio, threading
+    import httpx
+    import app, asgi, catalog
+
+    gate = threading.Event()
+    load_catalog = catalog.load_catalog
+    def slow_load(**kwargs):
+        assert gate.wait(30)
+        return load_catalog(**kwargs)
+    catalog.load_catalog = slow_load
+
+    client = app.create_app(background=True).test_client()
+    ready = client.get("/ready")
+    assert ready.status_code == 503 and ready.headers["Retry-After"] == "2", ready.status_code
+    assert client.post("/search", json={"genre": "Drama"}).status_code == 503
+    assert client.get("/catalog/status").get_json()["ready"] is False
+    assert client.get("/profile").status_code == 200
+
+    async def asgi_ready():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url="http://test") as c:
+            return (await c.get("/ready")).status_code
+    assert asyncio.run(asgi_ready()) == 503
+
+    gate.set()
+    assert app.catalog_versions.wait_ready(60)
+    assert client.get("/ready").get_json() == {"ready": True, "version": 1}
+    assert client.post("/search", json={"genre": "Drama"}).status_code == 200
+    assert asyncio.run(asgi_ready()) == 200
+    print("ok")
+"""
+
+V1_BACKGROUND_LOAD = """
+    import threading, time
+    import movie_backend
+
+    gate = threading.Event()
+    load_dataset = movie_backend.load_dataset
+    def slow_load(**kwargs):
+        assert gate.wait(30)
+        return load_dataset(**kwargs)
+    movie_backend.load_dataset = slow_load
+
+    client = movie_backend.create_app(background=True).test_client()
+    ready = client.get("/ready")
+    assert ready.status_code == 503 and ready.headers["Retry-After"] == "2", ready.status_code
+    assert ready.get_json()["loading"] is True
+    assert client.post("/search", json={"genre": "Drama"}).status_code == 503
+    assert client.get("/catalog/status").get_json()["version"] is None
+
+    gate.set()
+    deadline = time.monotonic() + 60
+    while client.get("/ready").status_code != 200:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert client.get("/ready").get_json() == {"ready": True, "version": 1}
+    assert client.post("/search", json={"genre": "Drama", "decade": "1990s", "min_rating": 0}).status_code == 200
+    print("ok")
+"""
+
+
+@pytest.mark.parametrize("folder, code", [("v1", V1_BACKGROUND_LOAD), ("v2", V2_BACKGROUND_LOAD)])
+def test_background_load_is_503_until_ready(folder, code, catalog_csv, tmp_path):
+    assert run(folder, code, tmp_path, MOVIE_CSV=catalog_csv).strip().endswith("ok")
+
+
+@pytest.mark.parametrize("folder, module", [("v1", "movie_backend"), ("v2", "app")])
+def test_create_app_loads_before_returning(folder, module, catalog_csv, tmp_path):
+    out = run(folder, f"""
+        import {module}
+        client = {module}.create_app(background=False).test_client()
+        assert client.get("/ready").status_code == 200
+        {module}.create_app(background=False)  # twice is fine, nothing gets loaded again
+        print(client.get("/ready").get_json()["version"])
+    """, tmp_path, MOVIE_CSV=catalog_csv)
+    assert out.strip().endswith("1")
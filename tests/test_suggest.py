@@ -0,0 +1,124 @@
+import random
+
+import numpy as np
+import pytest
+
+from shared.suggest import MAX_SUGGESTIONS, TRIGRAM_CAP, SuggestIndex, normalize
+
+
+@pytest.fixture(scope="module")
+def titles():
+    """Big enough for a few levels of blocks, with a handful of real looking titles mixed in"""
+    from synthetic import make_catalog
+    df = make_catalog(20000, seed=3)
+    df.loc[:4, "Series_Title"] = ["The Dark Knight", "Amélie", "Star Wars", "Stardust", "L'Atalante"]
+    return df
+
+
+@pytest.fixture(scope="module")
+def index(titles):
+    return SuggestIndex(titles["Series_Title"], titles["IMDB_Rating"], titles["No_of_Votes"])
+
+
+@pytest.fixture(scope="module")
+def prefix_reference(titles):
+    """Rows with a word starting with query, best rated first then most votes - a scan of every title"""
+    names = [f" {normalize(title)} " for title in titles["Series_Title"]]
+    best_first = sorted(range(len(names)), key=lambda row: (-titles["IMDB_Rating"][row], -titles["No_of_Votes"][row], row))
+
+    def reference(query, limit):
+        return [row for row in best_first if f" {query}" in names[row]][:limit]
+    return reference
+
+
+def test_prefix_matches_are_the_best_rated_titles_with_that_word(index, titles, prefix_reference):
+    rng = random.Random(1)
+    words = [normalize(title).split() for title in titles["Series_Title"][:2000]]
+    queries = ["the", "star", "st", "a", "dark kn", "night las", "1999", "19"]
+    for _ in range(100):
+        title = rng.choice(words)
+        start = rng.randrange(len(title))
+        query = " ".join(title[start:start + rng.randint(1, 2)])
+        queries.append(query[:rng.randint(1, len(query))])
+    for query in queries:
+        for limit in (1, 10, MAX_SUGGESTIONS):
+            expected = prefix_reference(query, limit)
+            matches = index.suggest(query, limit)
+            if len(expected) == limit:  # fewer = typo guesses fill up the rest
+                assert matches == [(row, 'prefix') for row in expected], (query, limit)
+            assert [row for row, kind in matches if kind == 'prefix'] == expected, (query, limit)
+
+
+def test_queries_longer_than_the_keys(index, titles):
+    query = normalize(titles["Series_Title"][10])
+    assert len(query) > 16
+    assert (10, 'prefix') in index.suggest(query, 5)
+    assert all(kind == 'fuzzy' for _, kind in index.suggest(query + "x", 5))
+
+
+def test_accents_case_and_punctuation_dont_matter(index):
+    assert (1, 'prefix') in index.suggest("AMELIE")
+    assert (1, 'prefix') in index.suggest("amél")
+    assert (4, 'prefix') in index.suggest("atalante")
+    assert (4, 'prefix') in index.suggest("l atal")
+
+
+def test_a_space_means_the_word_is_finished(index, prefix_reference):
+    assert [row for row, kind in index.suggest("stardust ") if kind == 'prefix'] == [3]
+    finished = [row for row, kind in index.suggest("star ", MAX_SUGGESTIONS) if kind == 'prefix']
+    assert finished == prefix_reference("star ", MAX_SUGGESTIONS) and 3 not in finished
+    assert (2, 'prefix') in index.suggest("star wars ", MAX_SUGGESTIONS)
+
+
+@pytest.mark.parametrize("typo, word", [
+    ("drak", "dark"),          # two letters swapped
+    ("darrk", "dark"),         # one letter too many
+    ("shadwo", "shadow"),
+    ("grden", "garden"),       # one letter missing - trigrams
+    ("sumemr stor", "summer storm"),
+    ("knigth", "knight"),
+])
+def test_typos_still_find_the_title(index, titles, typo, word):
+    matches = index.suggest(typo, 5)
+    assert matches and all(kind == 'fuzzy' for _, kind in matches)
+    assert all(word in normalize(titles["Series_Title"][row]) for row, _ in matches[:2])
+
+
+def test_no_guessing_on_short_or_hopeless_queries(index):
+    assert index.suggest("xq") == []
+    assert index.suggest("zzzzqqqq") == []
+    assert index.suggest("") == [] and index.suggest("  ") == []
+    assert index.suggest("dark", 0) == []
+
+
+def test_index_size_is_bounded(index, titles):
+    usage = index.memory_usage()
+    assert usage["total"] == sum(size for part, size in usage.items() if part != "total")
+    # At most TRIGRAM_CAP movies per trigram, and one prefix entry per word of every title
+    counts = np.diff(index.trigram_offsets)
+    assert counts.max() <= TRIGRAM_CAP
+    assert len(index.keys) == sum(len(normalize(title).split()) for title in titles["Series_Title"])
+
+
+@pytest.fixture(params=["v1", "v2"])
+def client(request):
+    return request.getfixturevalue(f"{request.param}_client")
+
+
+def title_of(movie):
+    return movie.get("title") or movie.get("Series_Title")
+
+
+def test_suggest_endpoint(client):
+    movies = client.get("/suggest?q=dark&limit=5").get_json()
+    assert len(movies) == 5
+    assert all(movie["match"] == "prefix" and "dark" in title_of(movie).lower() for movie in movies)
+    ratings = [movie.get("rating", movie.get("IMDB_Rating")) for movie in movies]
+    assert ratings == sorted(ratings, reverse=True)
+    # The id is what /similar takes
+    assert client.get(f"/similar/{movies[0]['id']}").status_code == 200
+
+    typos = client.get("/suggest?q=drak&limit=3").get_json()
+    assert typos and all(movie["match"] == "fuzzy" and "dark" in title_of(movie).lower() for movie in typos)
+    assert len(client.get("/suggest?q=the&limit=500").get_json()) <= MAX_SUGGESTIONS
+    assert client.get("/suggest").get_json() == []
@@ -0,0 +1,114 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from shared.text_index import B, K1, TITLE_WEIGHT, TextIndex, terms
+
+# Words from the synthetic plots/titles (benchmarks/synthetic.py), so there are plenty of ties
+QUERIES = ["a detective must find the truth", "heist goes wrong", "ghost stories", "war", "nothing matches zzzz"]
+
+
+@pytest.fixture(scope="module")
+def catalog_text(catalog_csv):
+    """(titles, overviews, order) of the test catalog, as v2 builds its text index from them"""
+    import catalog
+    from search_index import SearchIndex
+    movies = catalog.read_catalog(catalog_csv)
+    return movies.titles.to_list(), movies.column("Overview").to_list(), np.asarray(SearchIndex(movies).order)
+
+
+def bm25_scores(titles, overviews, order, query):
+    """Plain python BM25 over every movie (by rank), the slow way"""
+    docs = [Counter({term: TITLE_WEIGHT * count for term, count in Counter(terms(titles[row])).items()})
+            + Counter(terms(overviews[row])) for row in order]
+    average = max(sum(sum(doc.values()) for doc in docs) / len(docs), 1.0)
+    scores = np.zeros(len(docs))
+    for term in set(terms(query)):
+        having = sum(1 for doc in docs if term in doc)
+        idf = math.log1p((len(docs) - having + 0.5) / (having + 0.5))
+        for rank, doc in enumerate(docs):
+            if term in doc:
+                tf = doc[term]
+                scores[rank] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * sum(doc.values()) / average))
+    return scores
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_ranking_matches_brute_force_bm25(catalog_text, query):
+    titles, overviews, order = catalog_text
+    index = TextIndex(titles, overviews, order)
+    expected = bm25_scores(titles, overviews, order, query)
+    rank_of = {int(row): rank for rank, row in enumerate(order)}
+    found = index.search(query, 20)
+    assert len(found) == min(20, int((expected > 0).sum()))
+    if not found:
+        return
+    # Impacts are stored as float16, so scores are only good to a couple of decimals
+    tolerance = 0.01 * len(set(terms(query)))
+    cutoff = np.sort(expected)[::-1][len(found) - 1]
+    for row, relevance in found:
+        assert relevance == pytest.approx(expected[rank_of[row]], abs=tolerance)
+        assert expected[rank_of[row]] >= cutoff - 2 * tolerance
+    # Most relevant first, equal relevance -> better rated (lower rank) first
+    keys = [(-relevance, rank_of[row]) for row, relevance in found]
+    assert keys == sorted(keys)
+
+
+def test_words_are_stemmed_and_titles_count_more():
+    titles = ["Night Woods", "Quiet Town", "The Stories", "Glass House"]
+    overviews = ["a walk in the wood", "the woods at night, woods everywhere", "one story", "the glass"]
+    index = TextIndex(titles, overviews, np.arange(4))
+    assert [row for row, _ in index.search("woods")] == [0, 1]   # title (counts twice) + plot beats twice in the plot
+    assert [row for row, _ in index.search("story")] == [2]      # stories -> story
+    assert [row for row, _ in index.search("glass")] == [3]      # but glass stays glass
+    assert index.search("the in at") == []                       # stopwords only
+    keep = np.array([True, False, True, True])
+    assert [row for row, _ in index.search("woods", keep=keep)] == [0]
+
+
+def test_ties_go_to_the_better_rated_movie():
+    titles = ["Alpha", "Beta", "Gamma"]
+    overviews = ["a heist", "a heist", "a heist"]
+    order = np.array([2, 0, 1])  # Gamma is best rated, then Alpha, then Beta
+    assert [row for row, _ in TextIndex(titles, overviews, order).search("heist")] == [2, 0, 1]
+
+
+@pytest.fixture(params=["v1", "v2"])
+def client(request):
+    return request.getfixturevalue(f"{request.param}_client")
+
+
+@pytest.mark.parametrize("field, value", [("decade", "x"), ("decade", {"from": 1990}), ("min_rating", "abc"),
+                                          ("min_rating", "inf"), ("limit", "ten")])
+def test_bad_filters_are_a_400(client, field, value):
+    response = client.post("/search/text", json={"query": "detective heist", field: value})
+    assert response.status_code == 400
+    assert field in response.get_json()["error"]
+
+
+def test_filters_apply_to_text_search(v2_client):
+    movies = v2_client.post("/search/text", json={"query": "detective heist", "genre": "Drama", "min_rating": 8,
+                                                  "limit": 30}).get_json()
+    assert movies
+    assert all("Drama" in movie["Genre"] and movie["IMDB_Rating"] >= 7.75 for movie in movies)
+    relevance = [movie["relevance"] for movie in movies]
+    assert relevance == sorted(relevance, reverse=True)
+
+
+def test_v1_filters_apply_to_text_search(v1_client):
+    found = v1_client.post("/search/text", json={"query": "detective heist", "genre": "Drama", "limit": 30})
+    movies = found.get_json()["movies"]
+    assert movies and all(movie["genre"] == "Drama" for movie in movies)
+    relevance = [movie["relevance"] for movie in movies]
+    assert relevance == sorted(relevance, reverse=True)
+
+
+def test_asgi_text_search_matches_flask(v2_client):
+    from test_search_batch import asgi_post
+    body = {"query": "detective heist", "decade": 1990, "limit": 15}
+    assert asgi_post("/search/text", body).json() == v2_client.post("/search/text", json=body).get_json()
+    response = asgi_post("/search/text", {"query": "detective heist", "decade": "x"})
+    assert response.status_code == 400
+    assert "decade" in response.json()["error"]
@@ -1,66 +1,351 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler
-import kagglehub
 import os
+import json
+import base64
+import copy
+import fcntl
+import hashlib
+import shutil
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Code v1 and v2 both use lives in ../shared (imported as shared.<module>)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from shared.ingest import find_csvs, ingest, row_keys, source_files
+from shared.profiles import ProfileStore
+from shared.similar import NEIGHBORS, NeighborIndex, content_features
+from shared.suggest import MAX_SUGGESTIONS, SuggestIndex
+from shared.text_index import MAX_TEXT_RESULTS, TextIndex
+# pandas, sklearn and kagglehub get imported where they're used - loading them takes ~2s and
+# nothing needs them until the catalog gets loaded (see create_app())
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # This lets our frontend talk to the backend without issues
 
 # Store our movie data and user preferences here
-# movies_df will hold all the movie information from the dataset
-movies_df = None
+# catalog holds the movie data plus everything built from it (see build_catalog()):
+#   {'version': 1, 'movies_df': ..., 'search_index': ..., 'feature_rows': ..., 'filters_body': ..., 'filters_etag': ...,
+#    'suggest_index': ..., 'similar_index': ..., 'text_index': ...}
+# It never gets changed in place - a reload builds a whole new one and swaps it in (see load_dataset()),
+# so a request that grabbed it at the start keeps a consistent copy even if a reload finishes halfway through
+catalog = None
+catalog_lock = threading.Lock()  # one (re)load at a time
+
+# Set ALLOW_RELOAD=1 to let POST /catalog/reload pick up a new dataset without restarting
+RELOAD_ALLOWED = os.environ.get('ALLOW_RELOAD') == '1'
+reload_lock = threading.Lock()
+reload_status = {'reloading': False, 'loaded_at': None, 'last_error': None}
+
+# Each user's last scores + top picks, so /recommendations doesn't redo everything every time
+# user_id -> {'version': catalog version, 'profile': profile the scores were made from, 'int_scores': array,
+#             'results': {limit: rows}, 'lock': held while that user's scores get patched/read}
+# recommendation_lock only guards the dict itself (find/add/evict/forget an entry), never the scoring,
+# so users dont wait on each other
+recommendation_cache = OrderedDict()
+MAX_CACHED_USERS = 256
+recommendation_lock = threading.Lock()
+
+# The /filters response never changes until the catalog does, so it gets built once
+# in build_catalog() along with an ETag so browsers can just get a 304 back
+RATING_OPTIONS = [round(x * 0.5, 1) for x in range(10, 21)]  # 10*0.5=5.0 to 20*0.5=10.0
+FILTERS_MAX_AGE = 300  # seconds before the browser checks /filters again
+
+# /search paging: each page ends with a cursor for the next one, /search/export streams everything
+MAX_PAGE_SIZE = 100
+EXPORT_CHUNK = 1000  # movies per chunk of the export stream
+
+# Same weights as calculate_similarity_score()
+FEATURE_WEIGHTS = {'genres': 3, 'decades': 2, 'ratings': 2}
+
+# Cleaned data gets saved here so restarts can skip the Kaggle download + CSV parsing.
+# Each save is its own v<time>-<pid> folder in there and the CURRENT file names the live one (see publish_snapshot)
+SNAPSHOT_DIR = os.environ.get('MOVIE_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog_snapshot'))
+SNAPSHOT_VERSION = 5  # bump this if prepare_data() changes so old snapshots get rebuilt
+SNAPSHOT_COLUMNS = ['title', 'year', 'genre', 'rating', 'poster', 'decade', 'decade_str', 'rating_range']
 
-# Track what the user likes - gets smarter as they use the app
-user_profile = {
-    'genres': {},      # counts how many times they search each genre
-    'decades': {},     # tracks their preferred time periods
-    'ratings': {}      # keeps track of rating preferences
-}
+# Set MOVIE_CSV to use a CSV you already have instead of downloading from Kaggle (the benchmarks do this).
+# A folder or glob of CSV shards works too (or several paths joined with ":"), they all get read in chunks (see shared/ingest.py)
+DATASET_CSV = os.environ.get('MOVIE_CSV')
+
+# Raw CSV columns the indexes need that prepare_data() doesn't keep (all the genres, who made it, the plot)
+RAW_COLUMNS = ['Genre', 'Director', 'Star1', 'Star2', 'Star3', 'Star4', 'Overview']
+
+# Track what each user likes - gets smarter as they use the app
+# Every user has their own profile, saved in sqlite with a memory cache in front (see shared/profiles.py)
+def new_profile():
+    return {
+        'genres': {},      # counts how many times they search each genre
+        'decades': {},     # tracks their preferred time periods
+        'ratings': {}      # keeps track of rating preferences
+    }
+
+profile_store = ProfileStore(new_profile, db_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles.sqlite3"))
+
+def current_user_id():
+    """Which user is asking - the frontend sends a random id it keeps in localStorage"""
+    user_id = request.headers.get('X-User-Id') or request.args.get('user_id') or 'default'
+    return user_id[:64]
+
+def load_dataset(fallback=True, use_snapshot=True):
+    """Load the IMDB dataset and make it the current catalog (reloads go through here too)"""
+    global catalog
+    
+    with catalog_lock:
+        movies_df, indexes = read_movies(fallback, use_snapshot)
+        version = catalog['version'] + 1 if catalog else 1
+        new_catalog = build_catalog(movies_df, indexes, version)
+        # The swap - one assignment, so requests see either all of the old catalog or all of the new one
+        catalog = new_catalog
+        reload_status['loaded_at'] = time.time()
+    print(f"Catalog version {version} is live ({len(movies_df)} movies)")
 
-def load_dataset():
-    """Load the IMDB dataset from Kaggle"""
-    global movies_df
+def read_movies(fallback=True, use_snapshot=True):
+    """
+    The cleaned movies dataframe + its prebuilt indexes (see build_indexes) - from the snapshot, the CSV or the sample data
+    (fallback=False raises instead of using the sample data, a reload shouldn't swap 12 movies in)
+    """
+    # Fast path - if we saved a cleaned copy last time and the CSV hasn't changed, just use that
+    if use_snapshot:
+        loaded = load_snapshot()
+        if loaded is not None:
+            return loaded
     
     try:
-        # Try to download the dataset from Kaggle
-        # This might take a minute the first time you run it
-        path = kagglehub.dataset_download("harshitshankhdhar/imdb-dataset-of-top-1000-movies-and-tv-shows")
+        source = DATASET_CSV
+        if not source:
+            # Try to download the dataset from Kaggle
+            # This might take a minute the first time you run it
+            import kagglehub
+            # The dataset could be anywhere in the downloaded folder - every CSV in there gets read
+            source = kagglehub.dataset_download("harshitshankhdhar/imdb-dataset-of-top-1000-movies-and-tv-shows")
         
-        # The dataset could be anywhere in the downloaded folder, so we need to find it
-        csv_file = None
-        for root, dirs, files in os.walk(path):
-            for file in files:
-                if file.endswith('.csv'):
-                    csv_file = os.path.join(root, file)
-                    break
+        raw_df, movies_df = read_dataset(source)
+        print(f"Dataset loaded successfully from {source}")
+        print(f"Total movies: {len(movies_df)}")
         
-        if csv_file:
-            # Found it! Load the CSV into a pandas dataframe
-            movies_df = pd.read_csv(csv_file)
-            print(f"Dataset loaded successfully from {csv_file}")
-            print(f"Total movies: {len(movies_df)}")
-            
-            # Clean up the data so it's easier to work with
-            prepare_data()
-        else:
-            # Couldn't find the CSV file, use backup data
-            print("CSV file not found. Using sample data.")
-            create_sample_data()
+        # Throw away the columns we never use and shrink the rest
+        movies_df = compact_columns(movies_df)
+        # The indexes need columns prepare_data() throws away, so they get worked out here
+        indexes = build_indexes(raw_df, movies_df)
+        del raw_df
+        
+        # Save the cleaned data so next startup is instant
+        save_snapshot(movies_df, indexes, source)
+        return movies_df, indexes
             
     except Exception as e:
+        if not fallback:
+            raise
         # Something went wrong with Kaggle download - no biggie, we have backup data
         print(f"Error loading dataset: {e}")
         print("Using sample data instead.")
-        create_sample_data()
+        raw_df = create_sample_data()
+        movies_df = prepare_data(raw_df)
+        return movies_df, build_indexes(raw_df, movies_df)
+
+def read_dataset(source):
+    """
+    Every CSV of the dataset read a chunk at a time (see shared/ingest.py), cleaned and deduplicated on (title, year).
+    Returns (raw_df, movies_df) with the same index - the raw columns the indexes need + the cleaned movies
+    """
+    import pandas as pd
+    paths = find_csvs(source)
+    if not paths:
+        # Couldn't find the CSV file, use backup data
+        raise FileNotFoundError("CSV file not found")
+    
+    raw_parts, movie_parts = [], []
+    def append(part, keep):
+        raw, movies = part
+        raw_parts.append(raw[keep])
+        movie_parts.append(movies[keep])
+    stats = ingest(paths, prepare_chunk, append)
+    print(stats.report())
+    if not stats.movies:
+        raise ValueError(f"No usable movies in {source}")
+    
+    # Row numbers restart in every chunk, so they get renumbered 0..n-1 (the indexes line rows up by index)
+    raw_df = pd.concat(raw_parts, ignore_index=True)
+    del raw_parts
+    movies_df = pd.concat(movie_parts, ignore_index=True)
+    return raw_df, movies_df
+
+def prepare_chunk(chunk):
+    """One chunk of CSV rows -> (dedupe keys, (its raw columns, its cleaned movies)) - runs in the ingest workers"""
+    raw = chunk[[column for column in RAW_COLUMNS if column in chunk.columns]]
+    movies = clean_movies(chunk)[SNAPSHOT_COLUMNS]
+    return row_keys(movies['title'], movies['year']), (raw.loc[movies.index], movies)
+
+def source_signature(source):
+    """Size + modified time of every CSV of the dataset - if any of these change (or one is added) the snapshot is out of date"""
+    source = os.pathsep.join(os.path.abspath(part) for part in str(source).split(os.pathsep) if part)
+    return {'source': source, 'files': source_files(source)}
+
+def save_snapshot(movies_df, indexes, source):
+    """Save the cleaned columns as .npy files (see save_column), the indexes (<name>.<array>.npy) and a small manifest"""
+    # Our own temp folder (pid in the name) so two processes saving at once dont write into each others
+    tmp_dir = os.path.join(SNAPSHOT_DIR, f'tmp-{os.getpid()}')
+    try:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        
+        columns = {column: save_column(os.path.join(tmp_dir, column), movies_df[column]) for column in SNAPSHOT_COLUMNS}
+        for name, (arrays, meta) in indexes.items():
+            for key, values in arrays.items():
+                np.save(os.path.join(tmp_dir, f'{name}.{key}.npy'), values)
+        
+        manifest = {'version': SNAPSHOT_VERSION, 'created': time.time(), 'rows': len(movies_df), 'source': source_signature(source),
+                    'columns': columns,
+                    'indexes': {name: {'arrays': list(arrays), 'meta': meta} for name, (arrays, meta) in indexes.items()}}
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        
+        publish_snapshot(tmp_dir)
+        print(f"Saved snapshot to {SNAPSHOT_DIR}")
+    except OSError as e:
+        print(f"Could not save snapshot: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def publish_snapshot(tmp_dir):
+    """
+    Write everything first, then make it live by renaming a new CURRENT over the old one - one rename,
+    so readers see the old snapshot or the new one, never half of one (and never none, like swapping
+    whole folders did). Then old versions get deleted, anyone who already mapped their files keeps them.
+    The lock stops two savers deleting each others brand new folder, readers never take it
+    """
+    with open(os.path.join(SNAPSHOT_DIR, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        version = f'v{time.time_ns()}-{os.getpid()}'
+        os.replace(tmp_dir, os.path.join(SNAPSHOT_DIR, version))
+        pointer = os.path.join(SNAPSHOT_DIR, f'CURRENT.tmp-{os.getpid()}')
+        with open(pointer, 'w') as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(SNAPSHOT_DIR, 'CURRENT'))
+        # Everything except saves still being written - older versions and files from before there were versions
+        for name in os.listdir(SNAPSHOT_DIR):
+            if name in (version, 'CURRENT', '.lock') or name.startswith('tmp-'):
+                continue
+            path = os.path.join(SNAPSHOT_DIR, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+def save_column(prefix, values):
+    """
+    One column of the (compacted) movies as .npy files, in a form that can be memory mapped straight back:
+    numbers as they are, categories as their codes (the values go in the manifest) and text as one utf-8
+    blob + offsets - fixed width numpy strings take 4 bytes a character, padded to the longest value
+    """
+    import pandas as pd
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        np.save(f'{prefix}.codes.npy', values.cat.codes.to_numpy())
+        return {'kind': 'category', 'categories': values.cat.categories.tolist()}
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        np.save(f'{prefix}.npy', values.to_numpy())
+        return {'kind': 'number'}
+    nulls = values.isna().to_numpy()
+    encoded = [b'' if null else str(value).encode('utf-8') for value, null in zip(values.tolist(), nulls)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    np.save(f'{prefix}.data.npy', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+    np.save(f'{prefix}.offsets.npy', offsets)
+    if nulls.any():
+        np.save(f'{prefix}.nulls.npy', nulls)
+    return {'kind': 'text', 'has_nulls': bool(nulls.any())}
+
+def load_column(prefix, info):
+    """A column saved by save_column() - numbers and category codes stay memory mapped"""
+    import pandas as pd
+    if info['kind'] == 'number':
+        return np.load(f'{prefix}.npy', mmap_mode='r')
+    if info['kind'] == 'category':
+        return pd.Categorical.from_codes(np.load(f'{prefix}.codes.npy', mmap_mode='r'), info['categories'])
+    # pandas can't keep strings on top of a mapped buffer (not without pyarrow), so text gets decoded -
+    # once, straight from the blob (a bytes copy + slicing is way faster than a str per np.str_)
+    blob = bytes(np.load(f'{prefix}.data.npy', mmap_mode='r'))
+    offsets = np.load(f'{prefix}.offsets.npy', mmap_mode='r').tolist()
+    values = [blob[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+    if info.get('has_nulls'):
+        for row in np.flatnonzero(np.load(f'{prefix}.nulls.npy', mmap_mode='r')).tolist():
+            values[row] = None
+    return values
+
+def live_snapshot_dir():
+    """The version folder CURRENT points at, or None if nothing was saved yet"""
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, 'CURRENT')) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(SNAPSHOT_DIR, name) if name else None
+
+def read_manifest(folder):
+    try:
+        with open(os.path.join(folder, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def snapshot_is_fresh(manifest):
+    # Stale if prepare_data() changed or the CSVs changed since we saved it
+    # (if they are all gone from the Kaggle cache the snapshot is all we have, so keep it)
+    if manifest is None or manifest.get('version') != SNAPSHOT_VERSION:
+        return False
+    source = manifest['source']
+    return not any(os.path.exists(f['path']) for f in source['files']) or source_signature(source['source']) == source
+
+def load_snapshot(attempts=10):
+    """
+    Load the cleaned data + indexes from the snapshot - returns None if it's missing or stale.
+    We only go again when somebody else's save went live meanwhile, so a few saves in a row cant starve us
+    """
+    import pandas as pd
+    for _ in range(attempts):
+        # Everything comes from the one folder CURRENT named just now - if a newer save deletes it
+        # while we're opening files that fails, and we go again with the new one
+        folder = live_snapshot_dir()
+        manifest = read_manifest(folder) if folder else None
+        if manifest is None and folder and live_snapshot_dir() != folder:
+            continue  # deleted before we even got to the manifest
+        if not snapshot_is_fresh(manifest):
+            return None
+        try:
+            # Already compacted when it was saved, and copy=False keeps the mapped arrays as the columns
+            movies_df = pd.DataFrame({
+                column: load_column(os.path.join(folder, column), manifest['columns'][column])
+                for column in SNAPSHOT_COLUMNS
+            }, copy=False)
+            # Memory mapped too, so only the parts a request reads get loaded
+            indexes = {
+                name: ({key: np.load(os.path.join(folder, f'{name}.{key}.npy'), mmap_mode='r') for key in info['arrays']},
+                       info['meta'])
+                for name, info in manifest['indexes'].items()
+            }
+        except (OSError, ValueError, KeyError) as e:
+            if live_snapshot_dir() != folder:
+                continue
+            print(f"Snapshot is broken ({e}), reloading from CSV")
+            return None
+        print(f"Loaded {len(movies_df)} movies from snapshot {folder}")
+        return movies_df, indexes
+    return None
 
 def create_sample_data():
     """Create sample movie data for demonstration"""
-    global movies_df
+    import pandas as pd
     
     # Just some classic movies I know everyone loves
     # This is our fallback if Kaggle download doesn't work
@@ -79,12 +364,19 @@ def create_sample_data():
         {"Series_Title": "Gladiator", "Released_Year": "2000", "Genre": "Action", "IMDB_Rating": 8.5, "Poster_Link": "https://m.media-amazon.com/images/M/MV5BMDliMmNhNDEtODUyOS00MjNlLTgxODEtN2U3NzIxMGVkZTA1L2ltYWdlXkEyXkFqcGdeQXVyNjU0OTQ0OTY@._V1_SX300.jpg"},
     ]
     
-    movies_df = pd.DataFrame(sample_movies)
-    prepare_data()
+    return pd.DataFrame(sample_movies)
 
-def prepare_data():
-    """Prepare and clean the movie data"""
-    global movies_df
+def prepare_data(movies_df):
+    """Prepare and clean the movie data - returns the cleaned copy"""
+    # Throw away the columns we never use and shrink the rest
+    movies_df = compact_columns(clean_movies(movies_df))
+    
+    print(f"Data prepared. Columns: {movies_df.columns.tolist()}")
+    return movies_df
+
+def clean_movies(movies_df):
+    """The cleaning part of prepare_data() - whole columns at a time, so it works on any chunk of rows"""
+    import pandas as pd
     
     # Different datasets might have different column names
     # Let's standardize them so we always know what we're working with
@@ -99,7 +391,7 @@ def prepare_data():
     # Rename columns if they exist in the dataset
     for old_name, new_name in column_mapping.items():
         if old_name in movies_df.columns:
-            movies_df.rename(columns={old_name: new_name}, inplace=True)
+            movies_df = movies_df.rename(columns={old_name: new_name})
     
     # Clean up the year column - sometimes it has weird characters
     if 'year' in movies_df.columns:
@@ -120,35 +412,240 @@ def prepare_data():
         movies_df['rating'] = (movies_df['rating'] * 2).round() / 2
         
         # Create rating range buckets for filtering (e.g., "8.0-8.5")
-        movies_df['rating_range'] = movies_df['rating'].apply(lambda x: f"{x:.1f}")
+        # (always a whole .5 now, so str() already gives the one decimal: 8.0, 8.5...)
+        movies_df['rating_range'] = movies_df['rating'].astype(str)
     
     # Some movies have multiple genres like "Action, Drama" - just take the first one
     if 'genre' in movies_df.columns:
-        movies_df['genre'] = movies_df['genre'].apply(lambda x: str(x).split(',')[0].strip() if pd.notna(x) else 'Unknown')
+        genres = movies_df['genre']
+        movies_df['genre'] = genres.astype(str).str.split(',', n=1).str[0].str.strip().where(genres.notna(), 'Unknown')
     
     # If there's no poster URL, use a placeholder
     if 'poster' not in movies_df.columns:
         movies_df['poster'] = 'https://via.placeholder.com/300x450?text=No+Poster'
     
-    print(f"Data prepared. Columns: {movies_df.columns.tolist()}")
+    return movies_df
+
+def compact_columns(df):
+    """
+    Just the columns the app uses, in the smallest types that hold them.
+    Overview, Star1-4, Gross etc used to stay in memory for nothing, and genre/decade_str/rating_range
+    only have a few different values each so they become categories (a small code per movie)
+    """
+    df = df[SNAPSHOT_COLUMNS].copy()
+    for column in ('genre', 'decade_str', 'rating_range'):
+        df[column] = df[column].astype('category')
+    for column in ('year', 'decade'):
+        df[column] = df[column].astype(np.int16)
+    df['rating'] = df['rating'].astype(np.float32)  # already rounded to .5, so float32 holds it exactly
+    return df
+
+def build_catalog(movies_df, indexes, version):
+    """
+    Everything the requests need for one version of the data. Built off to the side while
+    the old version keeps serving, then load_dataset() swaps it in
+    """
+    ratings = movies_df['rating'].to_numpy(dtype=float)
+    text_order = rating_order(ratings)
+    feature_rows = build_feature_rows(movies_df, ratings)
+    filters_body = build_filters(feature_rows, ratings)
+    return {
+        'version': version,
+        'movies_df': movies_df,
+        # Lookup table for /search so searches don't scan the whole dataset
+        'search_index': build_search_index(movies_df, ratings),
+        # Which rows have each genre / decade / rating - lets us score only the movies a profile touches
+        'feature_rows': feature_rows,
+        'filters_body': filters_body,
+        'filters_etag': hashlib.sha1(filters_body).hexdigest(),
+        # Title autocomplete for /suggest (see shared/suggest.py)
+        'suggest_index': SuggestIndex(movies_df['title'].tolist(), ratings),
+        # Precomputed "more like this" neighbors for /similar (see build_similar_index)
+        'similar_index': NeighborIndex(shared=indexes['similar']),
+        # Free text search over titles + overviews for /search/text (see build_text_index)
+        'text_index': TextIndex(None, None, text_order, shared=indexes['text']),
+        'text_order': text_order,
+    }
+
+def build_indexes(raw_df, movies_df):
+    """The indexes that get saved with the snapshot, as name -> (arrays, meta)"""
+    return {
+        'similar': build_similar_index(raw_df, movies_df).shared_arrays(),
+        'text': build_text_index(raw_df, movies_df).shared_arrays(),
+    }
+
+def rating_order(ratings):
+    """Row positions best rating first (stable, so ties keep dataset order like nlargest does)"""
+    return np.argsort(-ratings, kind='stable')
+
+def build_similar_index(raw_df, movies_df):
+    """
+    Each movie's most similar movies for /similar (see shared/similar.py) from all its genres, its decade and
+    rating and who made it. Takes the raw CSV rows too, prepare_data() only keeps the first genre
+    and drops Director/Star1-4
+    """
+    from sklearn.preprocessing import MinMaxScaler
+    raw_df = raw_df.loc[movies_df.index]  # same rows as the cleaned data
+    genres = raw_df['Genre'] if 'Genre' in raw_df.columns else movies_df['genre']
+    genre_hot = genres.fillna('').astype(str).str.replace(' ', '').str.get_dummies(sep=',')
+    # Decade + rating squeezed into 0..1 so they don't outweigh the genres
+    scaled = MinMaxScaler().fit_transform(movies_df[['decade', 'rating']].to_numpy(dtype=float))
+    features = content_features(genre_hot.to_numpy(), scaled[:, 0], scaled[:, 1])
+    credits = [(role, raw_df[column])
+               for role, column in [('director', 'Director'), ('star', 'Star1'), ('star', 'Star2'),
+                                    ('star', 'Star3'), ('star', 'Star4')]
+               if column in raw_df.columns]
+    return NeighborIndex(features, credits)
+
+def build_text_index(raw_df, movies_df):
+    """
+    BM25 index over the titles + plot overviews for /search/text (see shared/text_index.py). Movies are
+    numbered best rating first, so equally good matches come back best rated first
+    """
+    raw_df = raw_df.loc[movies_df.index]  # same rows as the cleaned data, prepare_data() drops Overview
+    overviews = raw_df['Overview'] if 'Overview' in raw_df.columns else None
+    order = rating_order(movies_df['rating'].to_numpy(dtype=float))
+    return TextIndex(movies_df['title'], overviews, order)
+
+def build_search_index(movies_df, ratings):
+    """
+    Group movies by (genre, decade) with each group already sorted by rating
+    (genre, decade_str) -> row positions sorted best rating first, plus their ratings
+    """
+    # Every movie has exactly one genre and one decade here, so a (genre, decade)
+    # bucket is already the intersection of both filters.
+    # Sort the whole thing by rating once
+    order = rating_order(ratings)
+    genres = movies_df['genre'].to_numpy()[order]
+    decades = movies_df['decade_str'].to_numpy()[order]
+    
+    buckets = {}
+    for pos, genre, decade in zip(order, genres, decades):
+        buckets.setdefault((genre, decade), []).append(pos)
+    
+    search_index = {}
+    for key, positions in buckets.items():
+        positions = np.asarray(positions, dtype=np.int64)
+        search_index[key] = (positions, ratings[positions])
+    return search_index
+
+def build_feature_rows(movies_df, ratings):
+    """Rows for every genre / decade / rating value, used by the recommendation scoring"""
+    feature_rows = {'genres': {}, 'decades': {}, 'ratings': {}}
+    columns = {
+        'genres': movies_df['genre'].to_numpy(),
+        'decades': movies_df['decade_str'].to_numpy(),
+        'ratings': np.array([f"{r:.1f}" for r in ratings])
+    }
+    for feature, values in columns.items():
+        unique_values, inverse = np.unique(values, return_inverse=True)
+        rows_by_value = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[rows_by_value], np.arange(len(unique_values) + 1))
+        for i, value in enumerate(unique_values):
+            feature_rows[feature][str(value)] = rows_by_value[bounds[i]:bounds[i + 1]]
+    return feature_rows
+
+def build_filters(feature_rows, ratings):
+    """Encode the /filters response once, with how many movies each dropdown option matches"""
+    genre_counts = {g: len(rows) for g, rows in sorted(feature_rows['genres'].items())}
+    decade_counts = {d: len(rows) for d, rows in sorted(feature_rows['decades'].items(), reverse=True)}  # newest first
+    # How many movies are rated at least r - binary search on the sorted ratings
+    sorted_ratings = np.sort(ratings)
+    rating_counts = {str(r): int(len(sorted_ratings) - np.searchsorted(sorted_ratings, r)) for r in RATING_OPTIONS}
+    
+    return json.dumps({
+        'genres': list(genre_counts),
+        'decades': list(decade_counts),
+        'ratings': RATING_OPTIONS,
+        'counts': {'genres': genre_counts, 'decades': decade_counts, 'ratings': rating_counts}
+    }).encode('utf-8')
+
+def parse_search(data):
+    """
+    (genre, decade, min_rating) from a search body - genre like "Drama" and decade like "1990s" (None
+    when left out), min_rating a number. ValueError if any of them is no good, so the route can send a
+    400 before it starts on anything (an export stream cant turn into an error halfway through)
+    """
+    if not isinstance(data, dict):
+        raise ValueError('The body should be a JSON object')
+    genre = data.get('genre') or None
+    decade = data.get('decade') or None
+    if genre is not None and not isinstance(genre, str):
+        raise ValueError('genre should be a genre name like "Drama"')
+    if decade is not None and not (isinstance(decade, str) and decade.endswith('s') and decade[:-1].isdigit()):
+        raise ValueError('decade should look like "1990s"')
+    try:
+        min_rating = float(data.get('min_rating') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('min_rating should be a number')
+    if not np.isfinite(min_rating):
+        raise ValueError('min_rating should be a number')
+    return genre, decade, min_rating
+
+def lookup_page(catalog, genre, decade, min_rating, limit=10, start=0):
+    """
+    Row positions of the best rated movies for a genre/decade/min rating search, one page at a time:
+    (rows, where the next page starts or None if thats all of them).
+    A (genre, decade) bucket keeps its order for the whole catalog version, so a position in it
+    is a stable place to carry on from
+    """
+    search_index = catalog['search_index']
+    if (genre, decade) not in search_index:
+        return np.empty(0, dtype=np.int64), None
+    
+    positions, ratings = search_index[(genre, decade)]
+    # Ratings in the bucket go high -> low, so everything passing min_rating is at the front.
+    # Binary search for where that stops instead of checking every movie
+    cut = np.searchsorted(-ratings, -min_rating, side='right')
+    end = min(cut, start + limit)
+    return positions[start:end], (int(end) if end < cut else None)
+
+def make_cursor(catalog, query, start):
+    """Opaque "next page" token - only works for the same search on the same catalog version"""
+    raw = json.dumps([catalog['version'], start, hashlib.sha1(json.dumps(query).encode()).hexdigest()[:12]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def read_cursor(catalog, query, cursor):
+    """(start, None) from a cursor, or (None, (error, status)) if we cant continue from it"""
+    try:
+        version, start, tag = json.loads(base64.urlsafe_b64decode(str(cursor).encode()))
+        start = int(start)
+    except Exception:
+        return None, ('Invalid cursor', 400)
+    if tag != hashlib.sha1(json.dumps(query).encode()).hexdigest()[:12]:
+        return None, ('This cursor belongs to a different search', 400)
+    if version != catalog['version']:
+        # The buckets got rebuilt with the new data, positions in them mean something else now
+        return None, ('The catalog changed since this cursor was made, start again from the first page', 410)
+    return start, None
+
+def export_movies(catalog, genre, decade, min_rating, limit=None):
+    """Every match as NDJSON lines, EXPORT_CHUNK movies at a time so we never hold the whole result"""
+    start = 0
+    while limit is None or start < limit:
+        size = EXPORT_CHUNK if limit is None else min(EXPORT_CHUNK, limit - start)
+        rows, next_start = lookup_page(catalog, genre, decade, min_rating, size, start)
+        chunk = catalog['movies_df'].iloc[rows][['title', 'year', 'genre', 'rating', 'poster']]
+        yield ''.join(json.dumps(movie) + '\n' for movie in chunk.to_dict('records'))
+        if next_start is None:
+            return
+        start = next_start
 
 def get_decade_from_year(year):
     """Convert year to decade string"""
     # Simple helper function - turns 1994 into "1990s"
     return f"{(year // 10) * 10}s"
 
-def update_user_profile(genre, decade, min_rating):
+def update_user_profile(user_id, genre, decade, min_rating):
     """Update user profile with ML-based tracking"""
-    global user_profile
-    
     # This is where the "learning" happens!
     # Every time someone searches, we remember what they looked for
     # Later we can use this to recommend similar stuff
-    user_profile['genres'][genre] = user_profile['genres'].get(genre, 0) + 1
-    user_profile['decades'][decade] = user_profile['decades'].get(decade, 0) + 1
-    user_profile['ratings'][min_rating] = user_profile['ratings'].get(min_rating, 0) + 1
-    
-    return user_profile
+    profile_store.add(user_id, {
+        'genres': {genre: 1},
+        'decades': {decade: 1},
+        'ratings': {min_rating: 1}
+    })
 
 def calculate_similarity_score(movie_row, profile):
     """Calculate similarity score using ML techniques"""
@@ -177,9 +674,86 @@ def calculate_similarity_score(movie_row, profile):
     
     return score
 
-def generate_recommendations(profile, limit=6):
+def apply_profile_counts(feature_rows, int_scores, counts, sign=1):
+    """Add (or with sign=-1 take away) each count * weight to the movies that have that feature"""
+    for feature, weight in FEATURE_WEIGHTS.items():
+        for value, count in counts.get(feature, {}).items():
+            rows = feature_rows[feature].get(str(value))
+            if rows is not None and count:
+                int_scores[rows] += sign * count * weight
+
+def profile_delta(old, new):
+    """Count differences between two profiles, e.g. {'genres': {'Drama': 1}}"""
+    delta = {}
+    for feature in FEATURE_WEIGHTS:
+        old_counts, new_counts = old.get(feature, {}), new.get(feature, {})
+        changed = {k: new_counts.get(k, 0) - old_counts.get(k, 0) for k in set(old_counts) | set(new_counts)}
+        delta[feature] = {k: v for k, v in changed.items() if v}
+    return delta
+
+def top_score_rows(scores, limit):
+    """Rows of the `limit` highest scores, ties in dataset order (same as nlargest)"""
+    if limit >= len(scores):
+        candidates = np.arange(len(scores))
+    else:
+        # argpartition finds the cutoff without sorting everything, keep anything tied with it
+        kth = np.argpartition(-scores, limit - 1)[limit - 1]
+        candidates = np.flatnonzero(scores >= scores[kth])
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:limit]
+
+def recommendation_rows(catalog, profile, limit, user_id=None):
+    """
+    Rows of the best matches for this profile - same scores as calculate_similarity_score()
+    but we only touch the movies whose genre/decade/rating the profile actually mentions.
+    With a user_id we keep their scores around and next time only apply what changed
+    (usually one genre, one decade and one rating went up by 1)
+    """
+    entry = recommendation_entry(catalog, user_id)
+    with entry['lock']:
+        movies_df, feature_rows = catalog['movies_df'], catalog['feature_rows']
+        if entry['profile'] is None:
+            int_scores = np.zeros(len(movies_df), dtype=np.int64)
+            apply_profile_counts(feature_rows, int_scores, profile)
+            entry['int_scores'] = int_scores
+        elif entry['profile'] != profile:
+            apply_profile_counts(feature_rows, entry['int_scores'], profile_delta(entry['profile'], profile))
+            entry['results'] = {}
+        elif limit in entry['results']:
+            return entry['results'][limit]
+        entry['profile'] = copy.deepcopy(profile)
+        
+        # Higher rated movies get a boost regardless (0.5x weight)
+        scores = entry['int_scores'] + movies_df['rating'].to_numpy(dtype=float) * 0.5
+        entry['results'][limit] = top_score_rows(scores, limit)
+        return entry['results'][limit]
+
+def recommendation_entry(catalog, user_id):
+    """This user's cache entry for this catalog version - a new empty one (profile None) if there isn't one yet"""
+    if user_id is None:
+        return new_recommendation_entry(catalog)
+    with recommendation_lock:
+        entry = recommendation_cache.get(user_id)
+        # Scores for another version of the catalog are no good - the rows don't even line up anymore
+        if entry is not None and entry['version'] == catalog['version']:
+            recommendation_cache.move_to_end(user_id)
+            return entry
+        entry = recommendation_cache[user_id] = new_recommendation_entry(catalog)
+        recommendation_cache.move_to_end(user_id)
+        while len(recommendation_cache) > MAX_CACHED_USERS:
+            recommendation_cache.popitem(last=False)
+        return entry
+
+def new_recommendation_entry(catalog):
+    return {'version': catalog['version'], 'profile': None, 'int_scores': None, 'results': {}, 'lock': threading.Lock()}
+
+def forget_recommendations(user_id):
+    with recommendation_lock:
+        recommendation_cache.pop(user_id, None)
+
+def generate_recommendations(catalog, profile, limit=6, user_id=None):
     """Generate movie recommendations using collaborative filtering"""
-    global movies_df
+    movies_df = catalog['movies_df']
     
     # If the user hasn't searched for anything yet, just show them the best movies
     if not profile['genres']:
@@ -187,12 +761,8 @@ def generate_recommendations(profile, limit=6):
     else:
         # Calculate how well each movie matches the user's preferences
         # This is content-based filtering in action!
-        movies_df['similarity_score'] = movies_df.apply(
-            lambda row: calculate_similarity_score(row, profile), axis=1
-        )
-        
-        # Get the movies with the highest similarity scores
-        top_movies = movies_df.nlargest(limit, 'similarity_score')
+        # (vectorized + cached version of calculate_similarity_score, see recommendation_rows)
+        top_movies = movies_df.iloc[recommendation_rows(catalog, profile, limit, user_id)]
     
     # Return just the columns we need for the frontend
     return top_movies[['title', 'year', 'genre', 'rating', 'poster']].to_dict('records')
@@ -200,62 +770,172 @@ def generate_recommendations(profile, limit=6):
 @app.route('/filters', methods=['GET'])
 def get_filters():
     """Get available filter options"""
-    global movies_df
-    
-    # Send back all the unique genres, decades, and rating ranges
+    # Send back all the unique genres, decades, and rating ranges (plus how many movies each has)
     # The frontend uses these to populate the dropdown menus
-    genres = sorted(movies_df['genre'].unique().tolist())
-    decades = sorted(movies_df['decade_str'].unique().tolist(), reverse=True)  # newest first
-    
-    # Generate rating options in 0.5 increments from 5.0 to 10.0
-    ratings = [round(x * 0.5, 1) for x in range(10, 21)]  # 10*0.5=5.0 to 20*0.5=10.0
-    
-    return jsonify({
-        'genres': genres,
-        'decades': decades,
-        'ratings': ratings
-    })
+    # It's all worked out when the data loads, and if the browser already has it we just send a 304
+    current = catalog
+    response = app.response_class(current['filters_body'], mimetype='application/json')
+    response.set_etag(current['filters_etag'])
+    response.headers['Cache-Control'] = f'public, max-age={FILTERS_MAX_AGE}'
+    return response.make_conditional(request)
 
 @app.route('/search', methods=['POST'])
 def search_movies():
-    """Search movies based on filters"""
-    global movies_df
+    """
+    Search movies based on filters
+    Send "limit" (up to MAX_PAGE_SIZE) for bigger pages, and the "next_cursor" from a response
+    back as "cursor" to get the page after it
+    """
+    # Grab the catalog once - if a reload swaps it mid-request we still use this one throughout
+    current = catalog
     
     # Get the search criteria from the frontend
     data = request.json
-    genre = data.get('genre')
-    decade = data.get('decade')
-    min_rating = data.get('min_rating')
-    
-    # Filter the dataset to match what they're looking for
-    # For ratings, get movies with rating >= min_rating
-    filtered = movies_df[
-        (movies_df['genre'] == genre) &
-        (movies_df['decade_str'] == decade) &
-        (movies_df['rating'] >= float(min_rating))
-    ]
+    try:
+        genre, decade, min_rating = parse_search(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        limit = int(data.get('limit', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit should be a number'}), 400
+    cursor = data.get('cursor')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit should be between 1 and {MAX_PAGE_SIZE}'}), 400
+    
+    query = [genre, decade, min_rating]
+    start = 0
+    if cursor:
+        start, error = read_cursor(current, query, cursor)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
     
-    # Sort by rating and grab the top 10
-    top_movies = filtered.nlargest(10, 'rating')
+    # Find the movies that match what they're looking for (rating >= min_rating)
+    # and grab the next page by rating - the index already has them sorted
+    rows, next_start = lookup_page(current, genre, decade, float(min_rating), limit, start)
+    top_movies = current['movies_df'].iloc[rows]
     
     # Remember what they searched for - this helps us learn their preferences
-    update_user_profile(genre, decade, f"{min_rating:.1f}")
+    # (only on the first page, the next pages are the same search)
+    if not cursor:
+        update_user_profile(current_user_id(), genre, decade, f"{min_rating:.1f}")
     
     # Convert to a format the frontend can easily work with
     movies_list = top_movies[['title', 'year', 'genre', 'rating', 'poster']].to_dict('records')
     
     return jsonify({
         'movies': movies_list,
-        'count': len(movies_list)
+        'count': len(movies_list),
+        'next_cursor': make_cursor(current, query, next_start) if next_start is not None else None
     })
 
+@app.route('/search/export', methods=['POST'])
+def export_search():
+    """All the matches for a search (or the first "limit") streamed as NDJSON, one movie per line"""
+    current = catalog
+    data = request.json
+    # Everything gets checked before the stream starts - once it has, the status is already 200
+    try:
+        genre, decade, min_rating = parse_search(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = data.get('limit')
+    try:
+        limit = int(limit) if limit is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit should be a number'}), 400
+    if limit is not None and limit < 1:
+        return jsonify({'error': 'limit should be at least 1 (leave it out to export every match)'}), 400
+    # The generator holds on to `current`, so a reload halfway through the stream doesn't matter
+    return Response(export_movies(current, genre, decade, min_rating, limit), mimetype='application/x-ndjson')
+
+@app.route('/suggest', methods=['GET'])
+def suggest_titles():
+    """Title autocomplete - /suggest?q=godf gives the best rated titles with a word starting with godf"""
+    current = catalog
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_SUGGESTIONS))
+    matches = current['suggest_index'].suggest(request.args.get('q', ''), limit)
+    
+    movies_df = current['movies_df']
+    suggestions = movies_df.iloc[[row for row, _ in matches]][['title', 'year', 'genre', 'rating', 'poster']].to_dict('records')
+    for movie, (row, kind) in zip(suggestions, matches):
+        movie['id'] = row  # for /similar/<id>
+        movie['match'] = kind  # 'prefix' or 'fuzzy' (a typo we guessed)
+    return jsonify(suggestions)
+
+@app.route('/similar/<int:movie_id>', methods=['GET'])
+def similar_movies(movie_id):
+    """
+    "More like this" - /similar/<id>?limit=6 gives the movies most like that one, most similar first.
+    The id is what /suggest sends (the movie's row, only good until the catalog reloads)
+    """
+    current = catalog
+    movies_df = current['movies_df']
+    if movie_id >= len(movies_df):
+        return jsonify({'error': f'No movie with id {movie_id}'}), 404
+    
+    # Worked out when the data loaded, this just reads the movie's row of neighbors
+    limit = max(1, min(request.args.get('limit', NEIGHBORS, type=int), NEIGHBORS))
+    matches = current['similar_index'].similar(movie_id, limit)
+    similar = movies_df.iloc[[row for row, _ in matches]][['title', 'year', 'genre', 'rating', 'poster']].to_dict('records')
+    for movie, (row, score) in zip(similar, matches):
+        movie['id'] = row
+        movie['similarity'] = score  # cosine similarity, 1 = same genres/decade/rating/people
+    return jsonify({'movies': similar})
+
+def text_filter_mask(current, genre, decade, min_rating):
+    """
+    Which movies pass the usual /search filters, as a bool array in text_index order (None without filters).
+    Same meaning as /search: genre is the first genre, decade like "1990s"
+    """
+    if not genre and not decade and not min_rating:
+        return None
+    movies_df = current['movies_df']
+    passed = movies_df['rating'].to_numpy() >= min_rating
+    for feature, value in (('genres', genre), ('decades', decade)):
+        if value:
+            in_rows = np.zeros(len(movies_df), dtype=bool)
+            in_rows[current['feature_rows'][feature].get(value, [])] = True
+            passed &= in_rows
+    return passed[current['text_order']]
+
+@app.route('/search/text', methods=['POST'])
+def search_text():
+    """
+    Search by describing the movie - {"query": "the group splits up in the haunted woods"} gives the
+    movies whose title/plot match best. genre/decade/min_rating/limit work like /search (all optional)
+    """
+    current = catalog
+    data = request.json
+    query = data.get('query')
+    if not isinstance(query, str) or not query.strip():
+        return jsonify({'error': "'query' should be some text to search for"}), 400
+    try:
+        genre, decade, min_rating = parse_search(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        limit = int(data.get('limit', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit should be a number'}), 400
+    if not 1 <= limit <= MAX_TEXT_RESULTS:
+        return jsonify({'error': f'limit should be between 1 and {MAX_TEXT_RESULTS}'}), 400
+    
+    # Only reads the index entries of the words in the query (see shared/text_index.py)
+    keep = text_filter_mask(current, genre, decade, min_rating)
+    matches = current['text_index'].search(query, limit, keep)
+    movies = current['movies_df'].iloc[[row for row, _ in matches]][['title', 'year', 'genre', 'rating', 'poster']].to_dict('records')
+    for movie, (row, relevance) in zip(movies, matches):
+        movie['id'] = row  # for /similar/<id>
+        movie['relevance'] = relevance  # BM25 score, higher = better match
+    return jsonify({'movies': movies})
+
 @app.route('/recommendations', methods=['GET'])
 def get_recommendations():
     """Get personalized recommendations"""
-    global user_profile
-    
     # Generate recommendations based on what the user has been searching for
-    recommendations = generate_recommendations(user_profile)
+    user_id = current_user_id()
+    recommendations = generate_recommendations(catalog, profile_store.get(user_id), user_id=user_id)
     
     return jsonify({
         'movies': recommendations
@@ -264,30 +944,112 @@ def get_recommendations():
 @app.route('/profile', methods=['GET'])
 def get_profile():
     """Get user profile"""
-    global user_profile
-    
     # Send back the user's preference data so the frontend can display it
-    return jsonify(user_profile)
+    return jsonify(profile_store.get(current_user_id()))
 
 @app.route('/reset', methods=['POST'])
 def reset_profile():
     """Reset user profile"""
-    global user_profile
-    
     # Clear everything - start fresh
     # Useful if someone wants to reset their recommendations
-    user_profile = {
-        'genres': {},
-        'decades': {},
-        'ratings': {}
-    }
+    user_id = current_user_id()
+    profile_store.reset(user_id)
+    forget_recommendations(user_id)
     
     return jsonify({'message': 'Profile reset successfully'})
 
+def reload_dataset(rebuild=False, fallback=False):
+    """Build the next catalog version and swap it in - if anything goes wrong the old one keeps serving"""
+    try:
+        load_dataset(fallback=fallback, use_snapshot=not rebuild)
+        reload_status['last_error'] = None
+    except Exception as e:
+        if catalog is None:
+            print(f"Loading the catalog failed: {e}")
+        else:
+            print(f"Reload failed, still serving catalog version {catalog['version']}: {e}")
+        reload_status['last_error'] = str(e)
+    finally:
+        reload_status['reloading'] = False
+        reload_lock.release()
+
+def start_reload(rebuild=False):
+    """Reload in a background thread so requests keep going - False if one is already running"""
+    if not reload_lock.acquire(blocking=False):
+        return False
+    reload_status['reloading'] = True
+    threading.Thread(target=reload_dataset, args=(rebuild,), daemon=True).start()
+    return True
+
+# --- Starting up ---
+# Importing this file doesn't load anything, create_app() does. With background=True the server
+# is up straight away and loads the catalog in a thread - until it's done /ready says 503 and so
+# does everything that needs the catalog, so a load balancer just waits for /ready to go green
+
+# These work without a catalog
+NO_CATALOG_ENDPOINTS = {'ready', 'catalog_status', 'get_profile', 'reset_profile', 'static'}
+LOADING_RETRY_AFTER = 2  # seconds we tell clients to wait while the catalog is loading
+
+def create_app(background=False):
+    """Load the catalog (in a thread with background=True), hook up SIGHUP and return the app"""
+    # kill -HUP <pid> reloads the dataset in the background, same as POST /catalog/reload
+    if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda signum, frame: start_reload())
+    # Already loaded (or loading) -> nothing to do, so calling this twice is fine
+    if catalog is None and reload_lock.acquire(blocking=False):
+        reload_status['reloading'] = True
+        if background:
+            threading.Thread(target=reload_dataset, kwargs={'fallback': True}, daemon=True).start()
+        else:
+            try:
+                load_dataset()
+            finally:
+                reload_status['reloading'] = False
+                reload_lock.release()
+    return app
+
+def not_ready_response():
+    response = jsonify({'error': 'The catalog is still loading, try again in a moment',
+                        'ready': False, 'loading': reload_status['reloading'], 'last_error': reload_status['last_error']})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(LOADING_RETRY_AFTER)
+    return response
+
+@app.before_request
+def wait_for_catalog():
+    if catalog is None and request.endpoint not in NO_CATALOG_ENDPOINTS:
+        return not_ready_response()
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """200 once the catalog is loaded, 503 until then (for health checks)"""
+    current = catalog
+    if current is None:
+        return not_ready_response()
+    return jsonify({'ready': True, 'version': current['version']})
+
+@app.route('/catalog/status', methods=['GET'])
+def catalog_status():
+    """Which catalog version is being served and how the last reload went"""
+    current = catalog
+    if current is None:
+        return jsonify({'version': None, 'movies': 0, **reload_status})
+    return jsonify({'version': current['version'], 'movies': len(current['movies_df']), **reload_status})
+
+@app.route('/catalog/reload', methods=['POST'])
+def reload_catalog():
+    """Pick up a new dataset without restarting (?rebuild=1 re-reads the CSV even if the snapshot looks fresh)"""
+    if not RELOAD_ALLOWED:
+        return jsonify({'error': 'Reloading is turned off (set ALLOW_RELOAD=1)'}), 403
+    if not start_reload(rebuild=request.args.get('rebuild') == '1'):
+        return jsonify({'error': 'A reload is already running'}), 409
+    return jsonify({'reloading': True, 'version': catalog['version']}), 202
+
 if __name__ == '__main__':
     # This runs when you start the server
+    # BACKGROUND_LOAD=1 -> start serving right away and load the catalog in the background (see /ready)
     print("Loading movie dataset...")
-    load_dataset()
+    create_app(background=os.environ.get('BACKGROUND_LOAD') == '1')
     print("Starting Flask server...")
     # debug=True means the server will auto-reload when you change code
     app.run(debug=True, port=5000)
\ No newline at end of file
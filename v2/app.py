@@ -1,329 +1,833 @@
 import os
+import base64
+import hashlib
 import json
+import logging
 import math
-import pandas as pd
-import kagglehub
-from flask import Flask, jsonify, request
+import signal
+import sys
+import threading
+
+# Code v1 and v2 both use lives in ../shared (imported as shared.<module>)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from flask import Flask, Response, g, has_request_context, jsonify, request
 from flask_cors import CORS
-import requests
-from functools import lru_cache
+import logs
+from catalog import CatalogReloader, build_similar_index, build_suggest_index, build_text_index
+from metrics import CONTENT_TYPE, REGISTRY, ProfileArchive, RequestTimer, SamplingProfiler
+from partitions import start_partitions
+from shared.profiles import ProfileStore
+from posters import PosterEnricher, PosterWarmer, catalog_keys, poster_key
+from scoring import RecommendationCache, ScoringEngine
+from search_cache import SearchCache
+from search_index import SearchIndex
+from shared.similar import NEIGHBORS
+from shared.suggest import MAX_SUGGESTIONS
+from shared.text_index import MAX_TEXT_RESULTS
+from serialize import MovieEncoder, PreEncoded, RECOMMENDATION_FIELDS, SEARCH_FIELDS, SIMILAR_FIELDS, SUGGEST_FIELDS, TEXT_FIELDS
 
 # Put your OMDB API key here - get it from omdbapi.com if you dont have one yet
-OMDB_API_KEY = "YOUR_API_KEY_HERE"
+# (or set the OMDB_API_KEY env variable)
+OMDB_API_KEY = os.environ.get("OMDB_API_KEY", "YOUR_API_KEY_HERE")
 
 app = Flask(__name__)
 # CORS lets the frontend talk to backend without throwing a tantrum
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Catalog-Version'])  # let the frontend read our own headers too
+
+# One JSON line per request instead of a bunch of prints - written by a background thread (see logs.py)
+log = logs.setup()
+
+# ALLOW_PROFILING=1 -> requests with an "X-Profile: 1" header get run under the sampling profiler
+# and the response says where to fetch the result (X-Profile-Id -> /debug/profile/<id>).
+# Off by default, nobody on the internet should be able to make us profile stuff
+PROFILING_ALLOWED = os.environ.get("ALLOW_PROFILING") == "1"
+PROFILE_HEADER = "X-Profile"
+profile_archive = ProfileArchive()
+
+# ALLOW_RELOAD=1 -> POST /catalog/reload swaps in a fresh catalog without restarting (SIGHUP does too).
+# Off by default for the same reason as profiling
+RELOAD_ALLOWED = os.environ.get("ALLOW_RELOAD") == "1"
+
+# BACKGROUND_LOAD=1 -> start answering straight away and load the catalog behind it (see init() + /ready)
+BACKGROUND_LOAD = os.environ.get("BACKGROUND_LOAD") == "1"
 
 # --- Global stuff we need ---
-DATASET_FILE = "imdb_top_1000.csv"
-FALLBACK_POSTER = "https://via.placeholder.com/300x450?text=No+Poster"
+# This tracks what each user likes - basically stalking their preferences lol
+# Every user gets their own profile now, kept in sqlite with a memory cache in front (see shared/profiles.py)
+def new_profile():
+    return {
+        "searched_genres": {},   # like how many times they searched for Drama vs Action
+        "searched_decades": {},  # are they into old movies or new stuff?
+        "rating_sum": 0.0,       # the ratings they look for, added up...
+        "rating_count": 0        # ...and how many, so we can get the average without keeping every one
+    }
 
-# This tracks what the user likes - basically stalking their preferences lol
-# In a real app you'd use a database but we're keeping it simple here
-user_profile = {
-    "searched_genres": {},   # like how many times they searched for Drama vs Action
-    "searched_decades": {},  # are they into old movies or new stuff?
-    "rating_history": []     # what ratings they usually look for
-}
+profile_store = ProfileStore(new_profile, db_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles.sqlite3"))
+
+def current_user_id():
+    """Who is asking - the frontend sends a random id it keeps in localStorage"""
+    user_id = request.headers.get('X-User-Id') or request.args.get('user_id') or 'default'
+    return user_id[:64]
+
+# --- Dropdown options for /filters ---
+# These only change when the catalog does, so build the whole response once
+RATING_OPTIONS = [round(x * 0.5, 1) for x in range(10, 21)]  # 5.0 to 10.0 in .5 steps
+FILTERS_MAX_AGE = 300  # seconds browsers can reuse /filters before checking the ETag again
+
+def build_filters_response(index):
+    """The /filters payload with a movie count for every option"""
+    facets = index.facets(RATING_OPTIONS)
+    return PreEncoded({
+        'genres': [g for g, _ in facets['genres']],
+        'decades': [d for d, _ in facets['decades']],
+        'ratings': RATING_OPTIONS,
+        # how many movies each option would match, e.g. counts['genres']['Drama'] = 724
+        'counts': {
+            'genres': dict(facets['genres']),
+            'decades': {str(d): n for d, n in facets['decades']},
+            'ratings': {str(r): n for r, n in facets['ratings']},
+        }
+    })
 
-# --- Loading the movie data ---
+class CatalogVersion:
+    """One version of the catalog and everything built from it - replaced as a whole on reload"""
 
-def load_data():
+    def __init__(self, catalog, version):
+        self.version = version
+        # Its a compact column store, not a dataframe - see compact.py
+        self.catalog = catalog
+        # Precompute the scoring arrays once so /recommendations doesnt redo it every call
+        self.scoring_engine = ScoringEngine(catalog)
+        # Remembers each user's last recommendations so we only redo the work when their taste changes.
+        # Belongs to this version, so a reload starts everyone with an empty cache
+        self.recommendation_cache = RecommendationCache(self.scoring_engine)
+        # Same idea for /search - genre/decade/rating lookup tables built once
+        self.search_index = SearchIndex(catalog)
+        # JSON for each endpoint - NaN cleanup + field picking happens once here, not per request
+        self.search_encoder = MovieEncoder(catalog, SEARCH_FIELDS)
+        self.recommendation_encoder = MovieEncoder(catalog, RECOMMENDATION_FIELDS)
+        self.filters_response = build_filters_response(self.search_index)
+        # Finished /search responses for the popular searches - belongs to this version like the
+        # recommendation cache, so a reload can never send back an answer from the old catalog
+        self.search_cache = SearchCache()
+        # Title autocomplete for /suggest
+        self.suggest_index = build_suggest_index(catalog)
+        self.suggest_encoder = MovieEncoder(catalog, SUGGEST_FIELDS)
+        # "More like this" neighbors for /similar, worked out when the snapshot was built
+        self.similar_index = build_similar_index(catalog)
+        self.similar_encoder = MovieEncoder(catalog, SIMILAR_FIELDS)
+        # Free text search over titles + overviews for /search/text (numbered by the search index ranks)
+        self.text_index = build_text_index(catalog, self.search_index.order)
+        self.text_encoder = MovieEncoder(catalog, TEXT_FIELDS)
+        # CATALOG_SHARDS=N -> /search + /recommendations run on N worker processes (see partitions.py), None otherwise
+        self.partitions = start_partitions(catalog, self.search_index, self.recommendation_cache)
+
+    @property
+    def searcher(self):
+        """Where searches go - the shards if there are any, they answer exactly like the search index"""
+        return self.partitions or self.search_index
+
+    def clear_recommendations(self, user_id=None):
+        self.recommendation_cache.clear(user_id)
+        if self.partitions is not None:
+            self.partitions.clear(user_id)
+
+    def close(self):
+        """Called once a reload has replaced this version - stops the shard workers (if any)"""
+        if self.partitions is not None:
+            self.partitions.close()
+
+def current_catalog():
+    """The catalog version this request started with (or the newest one outside a request)"""
+    if has_request_context() and 'catalog' in g:
+        return g.catalog
+    return catalog_versions.current
+
+# Fetches the HQ posters - in parallel, with a sqlite cache that survives restarts (see posters.py)
+# POSTER_CACHE_ONLY=1 -> never call OMDB during a request, only use what the warmup job saved
+poster_enricher = PosterEnricher(OMDB_API_KEY, cache_only=os.environ.get("POSTER_CACHE_ONLY") == "1")
+
+# POSTER_WARMUP=1 -> fill the poster cache for the whole catalog in the background
+poster_warmer = PosterWarmer(poster_enricher)
+POSTER_WARMUP = poster_enricher.enabled and os.environ.get("POSTER_WARMUP") == "1"
+
+def start_poster_warmup(version):
+    # After a reload this picks up the new movies (the ones already cached get skipped)
+    if POSTER_WARMUP and not poster_warmer.running:
+        poster_warmer.start(catalog_keys(version.catalog))
+
+# The catalog versions - empty until init() loads the first one, importing this file reads nothing
+catalog_versions = CatalogReloader(CatalogVersion, on_reload=start_poster_warmup)
+
+def init(background=False):
     """
-    Tries to download the dataset from Kaggle
-    If that fails (usually does first time), we use backup data so app still works
+    Loads the catalog (from the snapshot if there is a fresh one, see catalog.py) and hooks up SIGHUP.
+    background=True returns right away - /ready says 503 until the catalog is in (so does everything that needs it)
     """
-    df = None
-    try:
-        # kagglehub downloads stuff to a cache folder somewhere on your computer
-        print("⬇️ Attempting to download dataset from Kaggle...")
-        path = kagglehub.dataset_download("harshitshankhdhar/imdb-dataset-of-top-1000-movies-and-tv-shows")
-        csv_path = os.path.join(path, DATASET_FILE)
-        
-        # The file could be anywhere in the folder so we gotta search for it
-        # kinda annoying but whatever
-        for root, dirs, files in os.walk(path):
-            for file in files:
-                if file.endswith(".csv"):
-                    df = pd.read_csv(os.path.join(root, file))
-                    break
-        
-        if df is None:
-            raise FileNotFoundError("CSV not found in downloaded path.")
-            
-        print("✅ Kaggle dataset loaded successfully.")
+    # kill -HUP <pid> reloads the catalog in the background (with gunicorn, HUP the master instead -
+    # it starts new workers on the new snapshot and lets the old ones finish, see gunicorn.conf.py)
+    if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda signum, frame: catalog_versions.reload())
+    catalog_versions.load(background=background)
 
-    except Exception as e:
-        print(f"⚠️ Kaggle load failed ({str(e)}). Using fallback data.")
-        # Backup data - just some classic movies everyone knows
-        # atleast the app wont crash if kaggle is being difficult
-        data = {
-            'Series_Title': ['The Shawshank Redemption', 'The Godfather', 'The Dark Knight', 'Pulp Fiction', 'Forrest Gump', 'Inception', 'Matrix', 'Interstellar', 'Parasite', 'Spirited Away'],
-            'Released_Year': [1994, 1972, 2008, 1994, 1994, 2010, 1999, 2014, 2019, 2001],
-            'Genre': ['Drama', 'Crime,Drama', 'Action,Crime,Drama', 'Crime,Drama', 'Drama,Romance', 'Action,Adventure,Sci-Fi', 'Action,Sci-Fi', 'Adventure,Drama,Sci-Fi', 'Comedy,Drama,Thriller', 'Animation,Adventure,Family'],
-            'IMDB_Rating': [9.3, 9.2, 9.0, 8.9, 8.8, 8.8, 8.7, 8.6, 8.6, 8.6],
-            'Poster_Link': [
-                'https://m.media-amazon.com/images/M/MV5BMDFkYTc0MGEtZmNhMC00ZDIzLWFmNTEtODM1ZmRlYWMwMWFmXkEyXkFqcGdeQXVyMTMxODk2OTU@._V1_UX67_CR0,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BM2MyNjYxNmUtYTAwNi00MTYxLWJmNWYtYzZlODY3ZTk3OTFlXkEyXkFqcGdeQXVyNzkwMjQ5NzM@._V1_UX67_CR0,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BMTMxNTMwODM0NF5BMl5BanBnXkFtZTcwODAyMTk2Mw@@._V1_UX67_CR0,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BNGNhMDIzZTUtNTBlZi00MTRlLWFjM2ItYzViMjE3YzI5MjljXkEyXkFqcGdeQXVyNzkwMjQ5NzM@._V1_UX67_CR0,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BNWIwODRlZTUtY2U3ZS00Yzg1LWJhNzYtMmZiYmEyNmU1NjMzXkEyXkFqcGdeQXVyMTQxNzMzNDI@._V1_UY98_CR1,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BMjAxMzY3NjcxNF5BMl5BanBnXkFtZTcwNTI5OTM0Mw@@._V1_UX67_CR0,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BNzQzOTk3OTAtNDQ0Zi00ZTVkLWI0MTEtMDllZjNkYzNjNTc4L2ltYWdlXkEyXkFqcGdeQXVyNjU0OTQ0OTY@._V1_UX67_CR0,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BZjdkOTU3MDktN2IxOS00OGEyLWFmMjktY2FiMmZkNWIyODZiXkEyXkFqcGdeQXVyMTMxODk2OTU@._V1_UX67_CR0,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BYWZjMjk3ZTItODQ2ZC00NTY5LWE0ZDYtZTI3MjcwN2Q5NTVkXkEyXkFqcGdeQXVyODk4OTc3MTY@._V1_UX67_CR0,0,67,98_AL_.jpg',
-                'https://m.media-amazon.com/images/M/MV5BMjlmZmI5MDctNDE2YS00YWE0LWE5ZWItZDBhYWQ0NTcxNWRhXkEyXkFqcGdeQXVyMTMxODk2OTU@._V1_UX67_CR0,0,67,98_AL_.jpg'
-            ]
-        }
-        df = pd.DataFrame(data)
+def create_app(background=None):
+    """The app with its catalog loaded (or loading, see BACKGROUND_LOAD) - run this one: gunicorn 'app:create_app()'"""
+    init(BACKGROUND_LOAD if background is None else background)
+    return app
 
-    # --- Cleaning up the messy data ---
-    # Round ratings to .5 (cuz who needs 8.73 when 8.5 works fine)
-    df['clean_rating'] = df['IMDB_Rating'].apply(lambda x: round(float(x) * 2) / 2)
-    
-    # Extract year and figure out what decade its from
-    df['Released_Year'] = pd.to_numeric(df['Released_Year'], errors='coerce')
-    df = df.dropna(subset=['Released_Year'])  # drop rows with weird years
-    df['decade'] = df['Released_Year'].apply(lambda x: int(x // 10 * 10))
-    
-    # Remove spaces from genre names bcuz they mess things up later
-    df['Genre'] = df['Genre'].astype(str).str.replace(' ', '')
-    
-    # Make sure theres a poster link, even if its just a placeholder
-    if 'Poster_Link' not in df.columns:
-        df['Poster_Link'] = FALLBACK_POSTER
-    
-    return df
+def version_stat(read, default=None):
+    """Gauge reader for something on the current catalog version (nothing while its still loading)"""
+    def read_current():
+        version = catalog_versions.current
+        return read(version) if version is not None else (default or {})
+    return read_current
+
+# Numbers that already exist somewhere else, read when /metrics gets scraped
+REGISTRY.gauge("movie_recommendation_cache_lookups", "Recommendation cache hits/misses since the catalog loaded",
+               ("result",), read=version_stat(lambda v: {
+                   ("hit",): v.recommendation_cache.hits + (v.partitions.hits if v.partitions else 0),
+                   ("miss",): v.recommendation_cache.misses + (v.partitions.misses if v.partitions else 0)}))
+REGISTRY.gauge("movie_search_cache_lookups", "Search cache hits/misses since the catalog loaded", ("result",),
+               read=version_stat(lambda v: {("hit",): v.search_cache.hits, ("miss",): v.search_cache.misses}))
+REGISTRY.gauge("movie_search_cache", "Search cache entries, bytes, evictions and expired entries", ("stat",),
+               read=version_stat(lambda v: {(k,): n for k, n in v.search_cache.stats().items()
+                                            if k not in ("hits", "misses")}))
+REGISTRY.gauge("movie_profiles", "Profiles cached in memory / waiting to be saved", ("state",),
+               read=lambda: {(k,): v for k, v in profile_store.stats().items()})
+REGISTRY.gauge("movie_catalog_bytes", "Memory used by each catalog column", ("column",),
+               read=version_stat(lambda v: {(k,): n for k, n in v.catalog.memory_usage().items()}))
+REGISTRY.gauge("movie_suggest_index_bytes", "Memory used by each part of the /suggest index", ("part",),
+               read=version_stat(lambda v: {(k,): n for k, n in v.suggest_index.memory_usage().items()}))
+REGISTRY.gauge("movie_catalog_version", "Which catalog version is being served (goes up on every reload)",
+               read=version_stat(lambda v: {(): v.version}, default={(): 0}))
+REGISTRY.gauge("movie_catalog_shards", "Worker processes the catalog is split over for recommendations (0 = none)",
+               read=version_stat(lambda v: {(): v.partitions.shards if v.partitions else 0}, default={(): 0}))
+REGISTRY.gauge("movie_catalog_ready", "1 once the catalog has loaded and requests can be served",
+               read=lambda: {(): int(catalog_versions.ready)})
+REGISTRY.gauge("movie_log_lines_dropped", "Log lines dropped because the log queue was full",
+               read=lambda: {(): logs.dropped})
+
+# --- Timing every request ---
 
-# Load the data when server starts
-movies_df = load_data()
+# Answered even while the catalog is still loading
+NO_CATALOG_ENDPOINTS = {"ready", "catalog_status", "get_metrics", "poster_status", "get_profile", "home", "static"}
+LOADING_RETRY_AFTER = 2  # seconds clients get told to wait while the catalog loads
+
+def not_ready_response():
+    response = jsonify({"error": "The catalog is still loading, try again in a moment", **catalog_versions.status()})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(LOADING_RETRY_AFTER)
+    return response
+
+@app.before_request
+def start_timer():
+    # Pin the catalog version for the whole request, a reload halfway through doesnt affect it
+    g.catalog = catalog_versions.current
+    if g.catalog is None and request.endpoint not in NO_CATALOG_ENDPOINTS:
+        return not_ready_response()
+    # Label by route ("/search") so unknown URLs cant make up new metric names
+    g.timer = RequestTimer(request.url_rule.rule if request.url_rule else "unmatched")
+    g.profiler = None
+    if PROFILING_ALLOWED and request.headers.get(PROFILE_HEADER) == "1":
+        g.profiler = SamplingProfiler(threading.get_ident()).start()
+
+@app.after_request
+def finish_timer(response):
+    timer = g.get("timer")
+    if timer is not None:
+        timer.finish(response.status_code)
+        if timer.stages:
+            response.headers["Server-Timing"] = timer.server_timing()
+    version = g.get("catalog")
+    if version is not None:
+        response.headers["X-Catalog-Version"] = str(version.version)
+    profiler = g.get("profiler")
+    if profiler is not None:
+        response.headers["X-Profile-Id"] = profile_archive.add(profiler.stop().collapsed())
+    return response
+
+def stage(name):
+    """Times part of a request: `with stage("index"): ...` (shows up in /metrics + Server-Timing)"""
+    return g.timer.stage(name)
 
 # --- Helper functions that do the actual work ---
 
-def update_user_profile(genres_list, decade, rating):
+def update_user_profile(user_id, genres_list, decade, rating):
     """Keep track of what the user searches for so we can recommend stuff they actualy like"""
-    # Count how many times they search each genre
-    for g in genres_list:
-        user_profile['searched_genres'][g] = user_profile['searched_genres'].get(g, 0) + 1
+    delta = {
+        # Count how many times they search each genre
+        "searched_genres": {g: 1 for g in genres_list},
+        # Keep track of rating preferences (running total, not a list that grows forever)
+        "rating_sum": float(rating),
+        "rating_count": 1
+    }
     
-    # Remember what decades they prefer
+    # Remember what decades they prefer (as strings, thats what they turn into in JSON anyway)
     if decade:
-        user_profile['searched_decades'][decade] = user_profile['searched_decades'].get(decade, 0) + 1
-        
-    # Keep track of rating preferences
-    user_profile['rating_history'].append(float(rating))
+        delta["searched_decades"] = {str(decade): 1}
+    
+    profile_store.add(user_id, delta)
+
+def parse_search(data):
+    """
+    (genre, decade, min_rating) from a /search body - genre name or None, decade as a number like 1990
+    or None, min_rating a float. ValueError if any of them is no good, so every route can send a 400
+    before doing any work (and an export stream never finds out halfway through)
+    """
+    if not isinstance(data, dict):
+        raise ValueError("The body should be a JSON object")
+    genre = data.get('genre') or None
+    if genre is not None and not isinstance(genre, str):
+        raise ValueError("genre should be a genre name like \"Drama\"")
+    decade = data.get('decade') or None
+    if decade is not None:
+        try:
+            decade = int(decade)
+        except (TypeError, ValueError):
+            raise ValueError("decade should be a year like 1990")
+    try:
+        min_rating = float(data.get('min_rating') or 0)
+    except (TypeError, ValueError):
+        raise ValueError("min_rating should be a number")
+    if not math.isfinite(min_rating):
+        raise ValueError("min_rating should be a number")
+    return genre, decade, min_rating
+
+MAX_BATCH_QUERIES = 100  # per /search/batch request
+MAX_PAGE_SIZE = 100      # most movies one /search page can ask for
+EXPORT_CHUNK = 1000      # movies per chunk of a /search/export stream
+
+class CursorError(ValueError):
+    """A /search cursor we cant continue from - status is what the client gets back"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def search_key(genre, decade, min_rating):
+    """
+    The same search however its written: (lowercase genre, decade as a number, min rating rounded up to .5).
+    Clean ratings only come in .5 steps, so "at least 7.3" and "at least 7.5" are exactly the same movies
+    """
+    return (genre.lower() if genre else None, int(decade) if decade else None,
+            max(0.0, math.ceil(float(min_rating) * 2) / 2))
+
+def search_tag(genre, decade, min_rating):
+    """Short fingerprint of a search so a cursor cant be used with different filters"""
+    return hashlib.sha1(json.dumps(search_key(genre, decade, min_rating)).encode()).hexdigest()[:12]
+
+def make_cursor(catalog_version, after, query):
+    """
+    Opaque "next page" token: which catalog version, the last rank already sent, which search.
+    Ranks never change within a version, so the cursor stays valid as long as the version does
+    """
+    raw = json.dumps([catalog_version, after, search_tag(*query)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def read_cursor(cursor, catalog_version, query):
+    """The rank to continue after, or CursorError"""
+    try:
+        cursor_version, after, tag = json.loads(base64.urlsafe_b64decode(str(cursor).encode()))
+        after = int(after)
+    except Exception:
+        raise CursorError("Invalid cursor")
+    if tag != search_tag(*query):
+        raise CursorError("This cursor belongs to a different search")
+    if cursor_version != catalog_version:
+        raise CursorError("The catalog changed since this cursor was made, start again from the first page", 410)
+    return after
+
+def parse_page(data):
+    """(limit, cursor) from a /search body - both optional, without them its the first 10"""
+    limit = int(data.get('limit', 10))
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise CursorError(f"limit should be between 1 and {MAX_PAGE_SIZE}")
+    return limit, data.get('cursor')
+
+def parse_export_limit(data):
+    """The "limit" of a /search/export body - None (leave it out) exports every match"""
+    if data.get('limit') is None:
+        return None
+    limit = int(data['limit'])
+    if limit < 1:
+        raise ValueError("limit should be at least 1 (leave it out to export every match)")
+    return limit
+
+def parse_search_batch(data):
+    """([(genre, decade, min_rating), ...], record) from a /search/batch body"""
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("'queries' should be a non-empty list of searches")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise ValueError(f"At most {MAX_BATCH_QUERIES} queries per batch")
+    # Every query goes through the same checks as /search, so a bad one is a 400 for the whole batch
+    parsed = []
+    for i, query in enumerate(queries):
+        if not isinstance(query, dict):
+            raise ValueError("Each query should look like a /search body")
+        try:
+            parsed.append(parse_search(query))
+        except ValueError as e:
+            raise ValueError(f"queries[{i}]: {e}")
+    # record=false -> dont count these in the user profile (e.g. pre-rendering carousels)
+    return parsed, data.get('record', True) is not False
+
+def record_search(user_id, genre, decade, min_rating):
+    """Update the user profile with this search"""
+    genre_list = [genre] if genre else []
+    update_user_profile(user_id, genre_list, decade, min_rating)
+
+def record_searches(user_id, queries):
+    """record_search() for each (genre, decade, min_rating), in order"""
+    for genre, decade, min_rating in queries:
+        record_search(user_id, genre, decade, min_rating)
+
+def search_rows(genre, decade, min_rating, limit=10, version=None):
+    """
+    Look up the matching movies in the prebuilt index (see search_index.py)
+    instead of copying and scanning the whole dataframe
+    """
+    return (version or current_catalog()).searcher.search(
+        genre=genre,
+        decade=decade,
+        min_rating=min_rating,
+        limit=limit
+    )
+
+def search_page(genre, decade, min_rating, limit=10, cursor=None, version=None):
+    """
+    One page of results: (rows, next cursor or None when thats everything)
+    The first page (no cursor) is exactly what search_rows() gives
+    """
+    version = version or current_catalog()
+    query = (genre, decade, min_rating)
+    after = read_cursor(cursor, version.version, query) if cursor else -1
+    rows, last, more = version.searcher.search_page(
+        genre=genre,
+        decade=decade,
+        min_rating=min_rating,
+        limit=limit,
+        after=after
+    )
+    return rows, (make_cursor(version.version, last, query) if more else None)
+
+def export_lines(genre, decade, min_rating, limit=None, version=None):
+    """
+    Every match as NDJSON, EXPORT_CHUNK movies at a time - nothing is built for the whole
+    result up front so memory stays flat and the first lines go out straight away.
+    HQ posters only come from the cache here, an export never waits on OMDB
+    """
+    version = version or current_catalog()
+    chunks = version.search_index.iter_search(
+        genre=genre,
+        decade=decade,
+        min_rating=min_rating,
+        chunk_size=EXPORT_CHUNK
+    )
+    for rows in chunks:
+        if limit is not None:
+            rows = rows[:limit]
+            limit -= len(rows)
+        posters = poster_enricher.cached_posters_for(poster_keys(rows, version))
+        yield version.search_encoder.encode_lines(rows, posters)
+        if limit == 0:
+            return
+
+def suggest_body(query, limit=10, version=None):
+    """/suggest JSON: the best titles for what was typed so far, each with how it matched (prefix/fuzzy)"""
+    version = version or current_catalog()
+    matches = version.suggest_index.suggest(query, max(1, min(limit, MAX_SUGGESTIONS)))
+    return version.suggest_encoder.encode([row for row, _ in matches],
+                                          extras=[{'id': row, 'match': kind} for row, kind in matches])
+
+def similar_rows(movie_id, limit=NEIGHBORS, version=None):
+    """
+    (rows, extras) of the movies most like this one for /similar, or None if theres no such movie.
+    The id is the movie's row in this catalog version (what /suggest sends as "id")
+    """
+    version = version or current_catalog()
+    try:
+        row = int(movie_id)
+    except ValueError:
+        return None
+    if not 0 <= row < version.catalog.size:
+        return None
+    matches = version.similar_index.similar(row, max(1, min(limit, NEIGHBORS)))
+    return [r for r, _ in matches], [{'id': r, 'similarity': score} for r, score in matches]
+
+def parse_text_search(data):
+    """(query, genre, decade, min_rating, limit) from a /search/text body, ValueError if its no good"""
+    genre, decade, min_rating = parse_search(data)  # same filters (and checks) as /search
+    query = data.get('query')
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("'query' should be some text to search for")
+    try:
+        limit = int(data.get('limit', 10))
+    except (TypeError, ValueError):
+        raise ValueError("limit should be a number")
+    if not 1 <= limit <= MAX_TEXT_RESULTS:
+        raise ValueError(f"limit should be between 1 and {MAX_TEXT_RESULTS}")
+    return query, genre, decade, min_rating, limit
+
+def text_search_rows(query, genre, decade, min_rating, limit=10, version=None):
+    """
+    (rows, extras) of the movies whose title/overview best match a free text query (see shared/text_index.py),
+    only the ones passing the usual genre/decade/rating filters
+    """
+    version = version or current_catalog()
+    keep = version.search_index.filter_mask(genre, decade, min_rating)
+    matches = version.text_index.search(query, limit, keep)
+    return [row for row, _ in matches], [{'id': row, 'relevance': score} for row, score in matches]
+
+def search_batch_rows(queries, limit=10, version=None):
+    """search_rows() for a list of (genre, decade, min_rating) - all of them in one pass over the index"""
+    return (version or current_catalog()).searcher.search_many(queries, limit=limit)
 
-def get_weighted_recommendations(df, limit=6):
+def recommend_rows(user_profile, limit=6, user_id=None, version=None):
     """
     The "AI" part - figures out what movies to recommend based on past searches
     Its not actually AI but it sounds cooler that way lol
     Formula: Score = (GenreMatch * 3) + (DecadeMatch * 2) + (RatingPref * 2) + (BaseBoost * 0.5)
+    Returns (row positions, scores) - scores is None when there is no profile yet
     """
+    version = version or current_catalog()
+    engine = version.scoring_engine
+
     # If user hasnt searched anything yet, just give them the highest rated stuff
     if not user_profile['searched_genres'] and not user_profile['searched_decades']:
-        return df.sort_values(by='IMDB_Rating', ascending=False).head(limit).to_dict('records')
+        return engine.top_rated(limit), None
 
     # Figure out what the user actually likes
     sorted_genres = sorted(user_profile['searched_genres'].items(), key=lambda x: x[1], reverse=True)
     top_genres = [g[0] for g in sorted_genres[:3]]  # top 3 genres
     
     sorted_decades = sorted(user_profile['searched_decades'].items(), key=lambda x: x[1], reverse=True)
-    top_decades = [d[0] for d in sorted_decades[:2]]  # top 2 decades
+    top_decades = [int(d[0]) for d in sorted_decades[:2]]  # top 2 decades
     
     # Average rating they usually search for
-    avg_pref_rating = sum(user_profile['rating_history']) / len(user_profile['rating_history']) if user_profile['rating_history'] else 8.0
+    avg_pref_rating = user_profile['rating_sum'] / user_profile['rating_count'] if user_profile['rating_count'] else 8.0
 
-    # Calculate a score for each movie - higher score = better match
-    def calculate_score(row):
-        score = 0
-        
-        # Genre matching is most important (3x multiplier)
-        movie_genres = row['Genre'].split(',')
-        common_genres = set(movie_genres) & set(top_genres)
-        score += len(common_genres) * 3
-        
-        # Decade matching matters too (2x multiplier)
-        if row['decade'] in top_decades:
-            score += 2
-            
-        # Prefer movies with ratings they usually search for (2x)
-        if row['clean_rating'] >= avg_pref_rating:
-            score += 2
-            
-        # Give a small boost to highly rated movies (0.5x)
-        # because everyoen likes good movies right?
-        score += (row['IMDB_Rating'] / 10.0) * 0.5
-        
-        return score
+    # Score every movie in one go (see scoring.py) and only pull out the winners -
+    # no more copying the whole dataframe just to add a score column.
+    # With a user id we go through the cache, which skips all of it if their top picks didnt change
+    if version.partitions is not None:
+        # Same thing, each shard scores (and caches) its own movies in parallel
+        return version.partitions.recommend(top_genres, top_decades, avg_pref_rating, limit, user_id)
+    if user_id is not None:
+        return version.recommendation_cache.top_k(user_id, top_genres, top_decades, avg_pref_rating, limit)
 
-    # Apply scoring to all movies
-    rec_df = df.copy()
-    rec_df['score'] = rec_df.apply(calculate_score, axis=1)
-    
-    # Sort by score and return top results
-    results = rec_df.sort_values(by=['score', 'IMDB_Rating'], ascending=[False, False]).head(limit)
-    return results.to_dict('records')
+    scores = engine.scores(top_genres, top_decades, avg_pref_rating)
+    top_rows = engine.top_k(scores, limit)
+    return top_rows, scores[top_rows]
+
+def get_weighted_recommendations(user_profile, limit=6, user_id=None):
+    """Same as recommend_rows() but as a list of movie dicts (with a 'score' when there is one)"""
+    top_rows, top_scores = recommend_rows(user_profile, limit, user_id)
+    results = [movie.as_dict() for movie in current_catalog().catalog.movies(top_rows)]
+    if top_scores is not None:
+        for movie, score in zip(results, top_scores):
+            movie['score'] = float(score)
+    return results
+
+def score_extras(top_scores):
+    """The per-movie 'score' field for /recommendations (None when there are no scores)"""
+    return [{'score': float(score)} for score in top_scores] if top_scores is not None else None
+
+def poster_keys(rows, version=None):
+    catalog = (version or current_catalog()).catalog
+    return [poster_key(catalog.titles[row], catalog.years[row]) for row in rows]
+
+def split_posters(posters, row_lists):
+    """Cut one posters_for() answer for all the rows back into one list per search"""
+    if posters is None:
+        return [None] * len(row_lists)
+    parts, start = [], 0
+    for rows in row_lists:
+        parts.append(posters[start:start + len(rows)])
+        start += len(rows)
+    return parts
+
+def encode_search_batch(row_lists, posters, version=None):
+    """{"results": [...]} with the same movie list /search would send for each query"""
+    encoder = (version or current_catalog()).search_encoder
+    parts = split_posters(posters, row_lists)
+    return b'{"results":[' + b','.join(encoder.encode(rows, p) for rows, p in zip(row_lists, parts)) + b']}'
+
+def hq_posters_for(rows):
+    """HQ poster per row (or None if we dont have a key) - all fetched together, see posters.py"""
+    return poster_enricher.posters_for(poster_keys(rows))
+
+def json_response(body, status=200):
+    """Send already-encoded JSON bytes"""
+    return Response(body, status=status, mimetype='application/json')
 
 # --- API endpoints - this is what the frontend calls ---
 
-@lru_cache(maxsize=1000)  # Cache results so we dont spam the API
 def get_high_quality_poster(title, year):
     """Grabs better posters from OMDB cuz the dataset ones are tiny and blurry"""
-    try:
-        # Clean up the title - remove quotes that break the API
-        clean_title = title.replace("'", "").replace('"', '')
-        
-        url = f"http://www.omdbapi.com/?t={clean_title}&y={int(year)}&apikey={OMDB_API_KEY}"
-        response = requests.get(url, timeout=3)
-        data = response.json()
-        
-        if data.get('Response') == 'True' and data.get('Poster') != 'N/A':
-            return data['Poster']
-        return None
-    except Exception as e:
-        print(f"⚠️ Could not fetch poster for {title}: {str(e)}")
-        return None
+    key = poster_key(title, year)
+    return poster_enricher.lookup([key]).get(key)
 
 @app.route('/filters', methods=['GET'])
 def get_filters():
     """Sends back all available genres, decades and ratings for the dropdowns"""
-    # Get unique genres from the dataset
-    unique_genres = set()
-    for g_str in movies_df['Genre']:
-        for g in str(g_str).split(','):
-            if g:  # skip empty ones
-                unique_genres.add(g)
-            
-    unique_decades = sorted(movies_df['decade'].unique().tolist())
-    
-    return jsonify({
-        'genres': sorted(list(unique_genres)),
-        'decades': unique_decades,
-        'ratings': [round(x * 0.5, 1) for x in range(10, 21)]  # 5.0 to 10.0 in .5 steps
-    })
+    # Already built when the catalog loaded - browsers that have it get a 304
+    filters_response = current_catalog().filters_response
+    response = json_response(filters_response.body)
+    response.set_etag(filters_response.etag)
+    response.headers['Cache-Control'] = f'public, max-age={FILTERS_MAX_AGE}'
+    return response.make_conditional(request)
 
 @app.route('/search', methods=['POST'])
 def search_movies():
-    """Main search function - filters movies based on what user wants"""
+    """
+    Main search function - filters movies based on what user wants
+    Optional "limit" (up to MAX_PAGE_SIZE) and "cursor" in the body for paging: when there are
+    more results the X-Next-Cursor header has the cursor for the next page
+    """
+    try:
+        with stage("parse"):
+            data = request.json
+            genre, decade, min_rating = parse_search(data)
+            limit, cursor = parse_page(data)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Only the first page counts as a search, paging through it isnt searching again
+        # (a cached answer still counts, its still the user searching)
+        if not cursor:
+            with stage("profile"):
+                record_search(current_user_id(), genre, decade, min_rating)
+
+        # First pages of popular searches come straight out of the cache (see search_cache.py)
+        version = current_catalog()
+        cache_key = search_key(genre, decade, min_rating) + (limit,)
+        with stage("cache"):
+            cached = version.search_cache.get(cache_key) if not cursor else None
+        if cached is not None:
+            body, next_cursor = cached
+        else:
+            with stage("index"):
+                top_rows, next_cursor = search_page(genre, decade, min_rating, limit, cursor, version)
+
+            # Try to get better quality posters (all at once, does nothing without an API key)
+            with stage("posters"):
+                posters, complete = poster_enricher.resolve(poster_keys(top_rows, version))
+
+            with stage("encode"):
+                body = version.search_encoder.encode(top_rows, posters)
+            # A page where some poster lookup failed (or got skipped, cache only) doesnt get cached,
+            # the next request gets another go at it instead of the fallback poster sticking around
+            if not cursor and complete:
+                version.search_cache.put(cache_key, body, next_cursor)
+        logs.event(log, "search", genre=genre, decade=decade, min_rating=min_rating,
+                   matched=len(top_rows) if cached is None else None, cached=cached is not None)
+        response = json_response(body)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+    except CursorError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        logs.event(log, "search_failed", level=logging.ERROR, exc_info=True, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/search/export', methods=['POST'])
+def export_search():
+    """
+    Every match of a search (or the first "limit") streamed as NDJSON, one movie per line,
+    for exports over huge result sets. Doesnt count as a search in the user profile
+    """
     try:
         data = request.json
-        print(f"📥 Received search request: {data}")
-        
-        genre = data.get('genre', '')
-        decade = data.get('decade', '')
-        min_rating = float(data.get('min_rating', 0))
+        genre, decade, min_rating = parse_search(data)
+        limit = parse_export_limit(data)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    logs.event(log, "search_export", genre=genre, decade=decade, min_rating=min_rating, limit=limit)
+    # The generator keeps its own reference to this catalog version, so a reload halfway through the stream doesnt matter
+    return Response(export_lines(genre, decade, min_rating, limit, current_catalog()), mimetype='application/x-ndjson')
+
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Lots of searches in one request, e.g. a whole grid of genre/decade carousels
+    Body: {"queries": [{"genre": "Drama", "decade": "1990", "min_rating": 8}, ...], "record": false}
+    Answer: {"results": [[...movies for query 0...], [...], ...]}, each list same as /search would send
+    """
+    try:
+        with stage("parse"):
+            queries, record = parse_search_batch(request.json)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Update the user profile with this search
-        genre_list = [genre] if genre else []
-        update_user_profile(genre_list, int(decade) if decade else None, min_rating)
+    try:
+        if record:
+            with stage("profile"):
+                record_searches(current_user_id(), queries)
+
+        with stage("index"):
+            row_lists = search_batch_rows(queries)
+
+        # One poster lookup for every movie in every result (movies that show up twice are fetched once)
+        with stage("posters"):
+            posters = hq_posters_for([row for rows in row_lists for row in rows])
+
+        with stage("encode"):
+            body = encode_search_batch(row_lists, posters)
+        logs.event(log, "search_batch", queries=len(queries), recorded=record,
+                   matched=sum(len(rows) for rows in row_lists))
+        return json_response(body)
+
+    except Exception as e:
+        logs.event(log, "search_batch_failed", level=logging.ERROR, exc_info=True, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/search/text', methods=['POST'])
+def search_text():
+    """
+    Describe what you want: {"query": "the group splits up in the haunted woods", "genre": "Horror"}
+    -> movies whose plot/title match best, most relevant first. genre/decade/min_rating/limit work
+    like /search. Doesnt count as a search in the user profile (theres no genre/decade to learn from)
+    """
+    try:
+        with stage("parse"):
+            query, genre, decade, min_rating, limit = parse_text_search(request.json)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        with stage("index"):
+            rows, extras = text_search_rows(query, genre, decade, min_rating, limit)
+        with stage("posters"):
+            posters = hq_posters_for(rows)
+        with stage("encode"):
+            body = current_catalog().text_encoder.encode(rows, posters, extras)
+        logs.event(log, "search_text", terms=len(query.split()), genre=genre, decade=decade,
+                   min_rating=min_rating, matched=len(rows))
+        return json_response(body)
 
-        # Start filtering the movies
-        filtered = movies_df.copy()
-        
-        if genre:
-            # Check if movie has this genre
-            filtered = filtered[filtered['Genre'].str.contains(genre, case=False, na=False)]
-            print(f"After genre filter: {len(filtered)} movies")
-        
-        if decade:
-            filtered = filtered[filtered['decade'] == int(decade)]
-            print(f"After decade filter: {len(filtered)} movies")
-        
-        if min_rating > 0:
-            filtered = filtered[filtered['clean_rating'] >= min_rating]
-            print(f"After rating filter: {len(filtered)} movies")
-            
-        # Get top 10 by rating
-        results = filtered.sort_values(by='IMDB_Rating', ascending=False).head(10)
-        results_list = results.to_dict('records')
-        
-        # Try to get better quality posters
-        cleaned_results = []
-        for movie in results_list:
-            cleaned_movie = {}
-            for key, value in movie.items():
-                # Replace NaN and weird values with empty strings so JSON doesnt break
-                if pd.isna(value) or value is None:
-                    cleaned_movie[key] = ""
-                elif isinstance(value, float) and (math.isinf(value) or math.isnan(value)):
-                    cleaned_movie[key] = ""
-                else:
-                    cleaned_movie[key] = value
-            
-            # Fetch high quality poster if we have an API key
-            if OMDB_API_KEY != "YOUR_API_KEY_HERE":
-                hq_poster = get_high_quality_poster(
-                    cleaned_movie.get('Series_Title', ''),
-                    cleaned_movie.get('Released_Year', 2000)
-                )
-                if hq_poster:
-                    cleaned_movie['Poster_Link'] = hq_poster
-                    print(f"✅ Got HQ poster for {cleaned_movie.get('Series_Title')}")
-            
-            cleaned_results.append(cleaned_movie)
-        
-        print(f"✅ Returning {len(cleaned_results)} movies")
-        return jsonify(cleaned_results)
-        
     except Exception as e:
-        print(f"❌ Error in search: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logs.event(log, "search_text_failed", level=logging.ERROR, exc_info=True, error=str(e))
         return jsonify({"error": str(e)}), 500
 
+@app.route('/suggest', methods=['GET'])
+def suggest_titles():
+    """
+    Title autocomplete: /suggest?q=dark kn&limit=8 -> best rated titles with a word starting
+    with "dark kn", then close misspellings if there arent enough (see shared/suggest.py)
+    """
+    with stage("index"):
+        body = suggest_body(request.args.get('q', ''), request.args.get('limit', 10, type=int))
+    return json_response(body)
+
+@app.route('/similar/<movie_id>', methods=['GET'])
+def similar_movies(movie_id):
+    """
+    "More like this": /similar/<id>?limit=6 -> the movies most like that one, most similar first.
+    Its all worked out ahead of time (see shared/similar.py), so this is just reading a row
+    """
+    with stage("index"):
+        found = similar_rows(movie_id, request.args.get('limit', NEIGHBORS, type=int))
+    if found is None:
+        return jsonify({"error": f"No movie with id {movie_id}"}), 404
+    rows, extras = found
+    with stage("posters"):
+        posters = hq_posters_for(rows)
+    with stage("encode"):
+        body = current_catalog().similar_encoder.encode(rows, posters, extras)
+    return json_response(body)
+
 @app.route('/recommendations', methods=['GET'])
 def get_recommendations():
     """Returns personalized recommendations based on user's search histroy"""
     try:
-        recs = get_weighted_recommendations(movies_df)
-        
-        # Clean up the data same as search results
-        cleaned_recs = []
-        for movie in recs:
-            cleaned_movie = {}
-            for key, value in movie.items():
-                if pd.isna(value) or value is None:
-                    cleaned_movie[key] = ""
-                elif isinstance(value, float) and (math.isinf(value) or math.isnan(value)):
-                    cleaned_movie[key] = ""
-                else:
-                    cleaned_movie[key] = value
-            
-            # Get better posters for recommendations too
-            if OMDB_API_KEY != "YOUR_API_KEY_HERE":
-                hq_poster = get_high_quality_poster(
-                    cleaned_movie.get('Series_Title', ''),
-                    cleaned_movie.get('Released_Year', 2000)
-                )
-                if hq_poster:
-                    cleaned_movie['Poster_Link'] = hq_poster
-            
-            cleaned_recs.append(cleaned_movie)
+        user_id = current_user_id()
+        with stage("profile"):
+            user_profile = profile_store.get(user_id)
+        with stage("score"):
+            top_rows, top_scores = recommend_rows(user_profile, user_id=user_id)
         
-        return jsonify(cleaned_recs)
+        # Get better posters for recommendations too
+        with stage("posters"):
+            posters = hq_posters_for(top_rows)
+        with stage("encode"):
+            body = current_catalog().recommendation_encoder.encode(top_rows, posters, score_extras(top_scores))
+        return json_response(body)
     except Exception as e:
-        print(f"❌ Error in recommendations: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logs.event(log, "recommendations_failed", level=logging.ERROR, exc_info=True, error=str(e))
         return jsonify([])
 
+@app.route('/posters/status', methods=['GET'])
+def poster_status():
+    """How far the background poster warmup has got (found / no poster / failed counts)"""
+    return jsonify({
+        "running": poster_warmer.running,
+        "cache_only": poster_enricher.cache_only,
+        **poster_warmer.stats
+    })
+
 @app.route('/profile', methods=['GET'])
 def get_profile():
     """Returns the user's preference data"""
-    return jsonify(user_profile)
+    return jsonify(profile_store.get(current_user_id()))
 
 @app.route('/reset', methods=['POST'])
 def reset_profile():
     """Clears the user profile - usefull if they want to start over"""
-    global user_profile
-    user_profile = { "searched_genres": {}, "searched_decades": {}, "rating_history": [] }
+    user_id = current_user_id()
+    profile_store.reset(user_id)
+    current_catalog().clear_recommendations(user_id)
     return jsonify({"message": "Profile reset"})
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """200 once the catalog is loaded, 503 until then - point the load balancer health check here"""
+    version = current_catalog()
+    if version is None:
+        return not_ready_response()
+    return jsonify({"ready": True, "version": version.version})
+
+@app.route('/catalog/status', methods=['GET'])
+def catalog_status():
+    """Which catalog version is live, and how the last reload went"""
+    return jsonify(catalog_versions.status())
+
+@app.route('/catalog/reload', methods=['POST'])
+def reload_catalog():
+    """
+    Builds a new catalog version in the background and swaps it in when its ready -
+    requests keep going on the old one until then. ?rebuild=1 re-reads the CSV even if the snapshot is fresh
+    """
+    if not RELOAD_ALLOWED:
+        return jsonify({"error": "Reloading is turned off (set ALLOW_RELOAD=1)"}), 403
+    if not catalog_versions.reload(rebuild=request.args.get('rebuild') == '1'):
+        return jsonify({"error": "A reload is already running"}), 409
+    return jsonify({"reloading": True, "version": catalog_versions.current.version}), 202
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request/stage timings + poster cache counters in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/debug/profile/<profile_id>', methods=['GET'])
+def get_profile_result(profile_id):
+    """Collapsed stacks from a profiled request (feed them to flamegraph.pl or speedscope)"""
+    result = profile_archive.get(profile_id) if PROFILING_ALLOWED else None
+    if result is None:
+        return jsonify({"error": "No such profile"}), 404
+    return Response(result, mimetype='text/plain')
+
 @app.route('/', methods=['GET'])
 def home():
     return "<h1>Backend is running!</h1><p>Open 'index.html' to view the app.</p>"
 
 if __name__ == '__main__':
+    create_app()
     print("🎬 Movie Recommendation Backend Running on http://localhost:5001")
     app.run(debug=True, port=5001)
\ No newline at end of file
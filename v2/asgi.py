@@ -0,0 +1,462 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import app as core
+import logs
+from metrics import CONTENT_TYPE, REGISTRY, RequestTimer
+from posters import AsyncPosterEnricher
+
+# --- Async serving mode ---
+#   cd v2 && uvicorn asgi:app --port 5001
+#
+# Same API as app.py - it imports app.py for the catalog, profiles, caches and metrics, only the
+# serving part is different. Requests run as coroutines on one event loop instead of one thread each:
+#   - OMDB poster lookups are awaited (httpx), so requests waiting on a slow OMDB dont hold a thread
+#     and /filters, /profile... still answer straight away no matter how many of those are waiting
+#   - several requests wanting the same poster at once share one OMDB call (see posters.py)
+#   - the recommendation scoring + profile reads run in a small thread pool, not on the event loop
+# No web framework, its a plain ASGI app - the API is small enough for a tiny router lol.
+# X-Profile isnt supported here (the sampler watches one thread, and here one thread runs everything).
+
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_BODY_SIZE = 1024 * 1024  # nothing we accept is anywhere near this
+
+cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+posters = AsyncPosterEnricher(core.poster_enricher)
+
+
+async def in_thread(fn, *args):
+    """Run a blocking function in the thread pool and wait for it without blocking the loop"""
+    return await asyncio.get_running_loop().run_in_executor(cpu_pool, fn, *args)
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        self.query = {k: v[0] for k, v in parse_qs(scope["query_string"].decode("latin-1")).items()}
+        self.body = body
+        self.params = {}
+        # Same as in app.py - the catalog version is pinned for the whole request
+        self.version = core.catalog_versions.current
+        self.timer = None
+
+    def json(self):
+        return json.loads(self.body)
+
+    @property
+    def user_id(self):
+        """Same as app.current_user_id()"""
+        user_id = self.headers.get("x-user-id") or self.query.get("user_id") or "default"
+        return user_id[:64]
+
+
+class Response:
+    def __init__(self, body=b"", status=200, content_type="application/json", headers=None):
+        self.body = body
+        self.status = status
+        self.headers = [("content-type", content_type)] + list(headers or [])
+
+
+class StreamingResponse(Response):
+    """Body comes from a (blocking) generator of bytes, sent chunk by chunk as its made"""
+
+    def __init__(self, chunks, status=200, content_type="application/json", headers=None):
+        super().__init__(b"", status, content_type, headers)
+        self.chunks = chunks
+
+
+def jsonify(obj, status=200):
+    # Byte for byte what flask.jsonify sends, so both servers answer exactly the same
+    body = json.dumps(obj, sort_keys=True, separators=(",", ":")) + "\n"
+    return Response(body.encode("utf-8"), status)
+
+
+# --- Router ---
+
+routes = []  # (method, compiled pattern, rule, handler)
+
+
+def route(rule, methods=("GET",)):
+    """@route('/debug/profile/<profile_id>') - same rule syntax as Flask (no converters)"""
+    pattern = re.compile("^" + re.sub(r"<(\w+)>", r"(?P<\1>[^/]+)", rule) + "$")
+
+    def register(handler):
+        for method in methods:
+            routes.append((method, pattern, rule, handler))
+        return handler
+    return register
+
+
+def match(method, path):
+    """(rule, handler, params) - handler is None for 404/405"""
+    allowed = False
+    for route_method, pattern, rule, handler in routes:
+        found = pattern.match(path)
+        if found is None:
+            continue
+        if route_method == method or (method == "HEAD" and route_method == "GET"):
+            return rule, handler, found.groupdict()
+        allowed = True
+    return ("method_not_allowed" if allowed else "unmatched"), None, {}
+
+
+# --- Endpoints (see app.py for the Flask versions) ---
+
+@route("/filters")
+async def get_filters(req):
+    filters_response = req.version.filters_response
+    etag = f'"{filters_response.etag}"'
+    headers = [("etag", etag), ("cache-control", f"public, max-age={core.FILTERS_MAX_AGE}")]
+    # Browser already has it -> 304, same as make_conditional() in app.py
+    sent = req.headers.get("if-none-match", "")
+    if sent.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in sent.split(",")):
+        return Response(b"", 304, headers=headers)
+    return Response(filters_response.body, headers=headers)
+
+
+@route("/search", methods=("POST",))
+async def search_movies(req):
+    timer = req.timer
+    try:
+        with timer.stage("parse"):
+            data = req.json()
+            genre, decade, min_rating = core.parse_search(data)
+            limit, cursor = core.parse_page(data)
+    except Exception as e:
+        return jsonify({"error": str(e)}, 400)
+
+    try:
+        if not cursor:
+            with timer.stage("profile"):
+                await in_thread(core.record_search, req.user_id, genre, decade, min_rating)
+        cache_key = core.search_key(genre, decade, min_rating) + (limit,)
+        with timer.stage("cache"):
+            cached = req.version.search_cache.get(cache_key) if not cursor else None
+        if cached is not None:
+            body, next_cursor = cached
+        else:
+            with timer.stage("index"):
+                top_rows, next_cursor = core.search_page(genre, decade, min_rating, limit, cursor, req.version)
+            # The slow part - but its just waiting, other requests keep going meanwhile
+            with timer.stage("posters"):
+                hq_posters, complete = await posters.resolve(core.poster_keys(top_rows, req.version))
+            with timer.stage("encode"):
+                body = req.version.search_encoder.encode(top_rows, hq_posters)
+            if not cursor and complete:  # same as app.py - pages missing a poster dont get cached
+                req.version.search_cache.put(cache_key, body, next_cursor)
+        logs.event(core.log, "search", genre=genre, decade=decade, min_rating=min_rating,
+                   matched=len(top_rows) if cached is None else None, cached=cached is not None)
+        return Response(body, headers=[("x-next-cursor", next_cursor)] if next_cursor else None)
+    except core.CursorError as e:
+        return jsonify({"error": str(e)}, e.status)
+    except Exception as e:
+        logs.event(core.log, "search_failed", level=logging.ERROR, exc_info=True, error=str(e))
+        return jsonify({"error": str(e)}, 500)
+
+
+@route("/search/export", methods=("POST",))
+async def export_search(req):
+    try:
+        data = req.json()
+        genre, decade, min_rating = core.parse_search(data)
+        limit = core.parse_export_limit(data)
+    except Exception as e:
+        return jsonify({"error": str(e)}, 400)
+    logs.event(core.log, "search_export", genre=genre, decade=decade, min_rating=min_rating, limit=limit)
+    return StreamingResponse(core.export_lines(genre, decade, min_rating, limit, req.version),
+                             content_type="application/x-ndjson")
+
+
+@route("/search/batch", methods=("POST",))
+async def search_batch(req):
+    timer = req.timer
+    try:
+        with timer.stage("parse"):
+            queries, record = core.parse_search_batch(req.json())
+    except Exception as e:
+        return jsonify({"error": str(e)}, 400)
+
+    try:
+        if record:
+            with timer.stage("profile"):
+                await in_thread(core.record_searches, req.user_id, queries)
+        with timer.stage("index"):
+            row_lists = core.search_batch_rows(queries, version=req.version)
+        with timer.stage("posters"):
+            all_rows = [row for rows in row_lists for row in rows]
+            hq_posters = await posters.posters_for(core.poster_keys(all_rows, req.version))
+        with timer.stage("encode"):
+            body = core.encode_search_batch(row_lists, hq_posters, req.version)
+        logs.event(core.log, "search_batch", queries=len(queries), recorded=record,
+                   matched=sum(len(rows) for rows in row_lists))
+        return Response(body)
+    except Exception as e:
+        logs.event(core.log, "search_batch_failed", level=logging.ERROR, exc_info=True, error=str(e))
+        return jsonify({"error": str(e)}, 500)
+
+
+@route("/search/text", methods=("POST",))
+async def search_text(req):
+    timer = req.timer
+    try:
+        with timer.stage("parse"):
+            query, genre, decade, min_rating, limit = core.parse_text_search(req.json())
+    except Exception as e:
+        return jsonify({"error": str(e)}, 400)
+
+    try:
+        with timer.stage("index"):
+            rows, extras = core.text_search_rows(query, genre, decade, min_rating, limit, req.version)
+        with timer.stage("posters"):
+            hq_posters = await posters.posters_for(core.poster_keys(rows, req.version))
+        with timer.stage("encode"):
+            body = req.version.text_encoder.encode(rows, hq_posters, extras)
+        logs.event(core.log, "search_text", terms=len(query.split()), genre=genre, decade=decade,
+                   min_rating=min_rating, matched=len(rows))
+        return Response(body)
+    except Exception as e:
+        logs.event(core.log, "search_text_failed", level=logging.ERROR, exc_info=True, error=str(e))
+        return jsonify({"error": str(e)}, 500)
+
+
+@route("/suggest")
+async def suggest_titles(req):
+    try:
+        limit = int(req.query.get("limit", 10))
+    except ValueError:
+        limit = 10  # same as request.args.get(type=int) in app.py
+    with req.timer.stage("index"):
+        body = core.suggest_body(req.query.get("q", ""), limit, req.version)
+    return Response(body)
+
+
+@route("/similar/<movie_id>")
+async def similar_movies(req):
+    try:
+        limit = int(req.query.get("limit", core.NEIGHBORS))
+    except ValueError:
+        limit = core.NEIGHBORS
+    with req.timer.stage("index"):
+        found = core.similar_rows(req.params["movie_id"], limit, req.version)
+    if found is None:
+        return jsonify({"error": f"No movie with id {req.params['movie_id']}"}, 404)
+    rows, extras = found
+    with req.timer.stage("posters"):
+        hq_posters = await posters.posters_for(core.poster_keys(rows, req.version))
+    with req.timer.stage("encode"):
+        body = req.version.similar_encoder.encode(rows, hq_posters, extras)
+    return Response(body)
+
+
+@route("/recommendations")
+async def get_recommendations(req):
+    timer = req.timer
+    try:
+        user_id = req.user_id
+        with timer.stage("profile"):
+            user_profile = await in_thread(core.profile_store.get, user_id)
+        # Scoring is numpy work on the whole catalog - keep it off the event loop
+        with timer.stage("score"):
+            top_rows, top_scores = await in_thread(core.recommend_rows, user_profile, 6, user_id, req.version)
+        with timer.stage("posters"):
+            hq_posters = await posters.posters_for(core.poster_keys(top_rows, req.version))
+        with timer.stage("encode"):
+            body = req.version.recommendation_encoder.encode(top_rows, hq_posters, core.score_extras(top_scores))
+        return Response(body)
+    except Exception as e:
+        logs.event(core.log, "recommendations_failed", level=logging.ERROR, exc_info=True, error=str(e))
+        return jsonify([])
+
+
+@route("/posters/status")
+async def poster_status(req):
+    return jsonify({
+        "running": core.poster_warmer.running,
+        "cache_only": core.poster_enricher.cache_only,
+        **core.poster_warmer.stats
+    })
+
+
+@route("/profile")
+async def get_profile(req):
+    return jsonify(await in_thread(core.profile_store.get, req.user_id))
+
+
+@route("/reset", methods=("POST",))
+async def reset_profile(req):
+    user_id = req.user_id
+    await in_thread(core.profile_store.reset, user_id)
+    req.version.clear_recommendations(user_id)
+    return jsonify({"message": "Profile reset"})
+
+
+@route("/ready")
+async def ready(req):
+    if req.version is None:
+        return not_ready()
+    return jsonify({"ready": True, "version": req.version.version})
+
+
+@route("/catalog/status")
+async def catalog_status(req):
+    return jsonify(core.catalog_versions.status())
+
+
+@route("/catalog/reload", methods=("POST",))
+async def reload_catalog(req):
+    if not core.RELOAD_ALLOWED:
+        return jsonify({"error": "Reloading is turned off (set ALLOW_RELOAD=1)"}, 403)
+    if not core.catalog_versions.reload(rebuild=req.query.get("rebuild") == "1"):
+        return jsonify({"error": "A reload is already running"}, 409)
+    return jsonify({"reloading": True, "version": core.catalog_versions.current.version}, 202)
+
+
+@route("/metrics")
+async def get_metrics(req):
+    return Response(REGISTRY.render().encode("utf-8"), content_type=CONTENT_TYPE)
+
+
+@route("/debug/profile/<profile_id>")
+async def get_profile_result(req):
+    result = core.profile_archive.get(req.params["profile_id"]) if core.PROFILING_ALLOWED else None
+    if result is None:
+        return jsonify({"error": "No such profile"}, 404)
+    return Response(result.encode("utf-8"), content_type="text/plain; charset=utf-8")
+
+
+@route("/")
+async def home(req):
+    return Response(b"<h1>Backend is running!</h1><p>Open 'index.html' to view the app.</p>",
+                    content_type="text/html; charset=utf-8")
+
+
+# --- The ASGI app ---
+
+def cors_headers(req):
+    # Same as CORS(app) in app.py: any origin (echoed back), preflights allow whatever headers were asked for
+    origin = req.headers.get("origin")
+    headers = [("access-control-allow-origin", origin), ("vary", "Origin")] if origin else []
+    if origin and req.method != "OPTIONS":
+        headers.append(("access-control-expose-headers", "X-Catalog-Version, X-Next-Cursor"))
+    if req.method == "OPTIONS":
+        headers.append(("access-control-allow-methods", "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"))
+        if "access-control-request-headers" in req.headers:
+            headers.append(("access-control-allow-headers", req.headers["access-control-request-headers"]))
+    return headers
+
+
+async def read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def handle(req):
+    if req.method == "OPTIONS":
+        return "preflight", Response(b"", 200, content_type="text/html; charset=utf-8")
+    rule, handler, req.params = match(req.method, req.path)
+    if handler is None:
+        status = 405 if rule == "method_not_allowed" else 404
+        return "unmatched", jsonify({"error": "Method not allowed" if status == 405 else "Not found"}, status)
+    req.timer = RequestTimer(rule)
+    if req.version is None and handler.__name__ not in core.NO_CATALOG_ENDPOINTS:
+        return rule, not_ready()
+    return rule, await handler(req)
+
+
+def not_ready():
+    """503 while the catalog is still loading (same as app.not_ready_response())"""
+    response = jsonify({"error": "The catalog is still loading, try again in a moment",
+                        **core.catalog_versions.status()}, 503)
+    response.headers.append(("retry-after", str(core.LOADING_RETRY_AFTER)))
+    return response
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Loads the catalog before we say we're up - or behind it with BACKGROUND_LOAD=1 (see /ready)
+            core.init(core.BACKGROUND_LOAD)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await posters.close()
+            cpu_pool.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    body = await read_body(receive)
+    if body is None:
+        await send({"type": "http.response.start", "status": 413, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    req = Request(scope, body)
+    rule, response = await handle(req)
+
+    headers = response.headers + cors_headers(req)
+    if req.version is not None:
+        headers.append(("x-catalog-version", str(req.version.version)))
+    timer = req.timer or RequestTimer(rule)
+    timer.finish(response.status)
+    if timer.stages:
+        headers.append(("server-timing", timer.server_timing()))
+    streaming = isinstance(response, StreamingResponse)
+    if not streaming:
+        headers.append(("content-length", str(len(response.body))))
+
+    await send({
+        "type": "http.response.start",
+        "status": response.status,
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    })
+    if streaming and req.method != "HEAD":
+        await stream(response.chunks, receive, send)
+    else:
+        await send({"type": "http.response.body", "body": b"" if req.method == "HEAD" else response.body})
+
+
+async def stream(chunks, receive, send):
+    # Each chunk gets made in the thread pool (its numpy + encoding work), and we stop
+    # making them as soon as the client goes away instead of finishing a huge export for nobody
+    gone = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while not gone.done():
+            chunk = await in_thread(next, chunks, None)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            return
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        gone.cancel()
+        chunks.close()
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
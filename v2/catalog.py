@@ -0,0 +1,330 @@
+import logging
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+# Code v1 and v2 both use lives in ../shared (imported as shared.<module>)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from compact import Catalog, CatalogBuilder, memory_report, pack_frame
+from shared.ingest import find_csvs, ingest, row_keys
+from logs import event
+from scoring import ScoringEngine
+from search_index import SearchIndex
+from shared.similar import NeighborIndex, content_features
+from shared.suggest import SuggestIndex
+from shared.text_index import TextIndex
+from snapshot import load_snapshot, save_snapshot
+
+# --- Loading + cleaning the movie catalog ---
+# Lives in its own file so we can build the snapshot without starting the whole server:
+#   python catalog.py     -> downloads/parses the CSV and (re)writes the snapshot
+#
+# The snapshot also holds the search index + scoring arrays, so with several server processes
+# (gunicorn, see gunicorn.conf.py) the work happens once and every process just maps the files.
+# pandas/kagglehub only get imported when we actually have to read the CSV, and the CSV gets read a
+# chunk at a time (see shared/ingest.py) - MOVIE_CSV can be a folder or glob of shards too.
+#
+# CatalogReloader (at the bottom) swaps in a new version of the catalog while the server keeps running.
+
+log = logging.getLogger("movies.catalog")
+
+DATASET_FILE = "imdb_top_1000.csv"
+FALLBACK_POSTER = "https://via.placeholder.com/300x450?text=No+Poster"
+
+# Where the cleaned catalog gets saved so restarts dont have to parse the CSV again
+SNAPSHOT_DIR = os.environ.get(
+    "MOVIE_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog_snapshot")
+)
+
+# Point this at a CSV to skip the Kaggle download (the benchmarks use it for their fake catalogs).
+# A folder, a glob (shards/*.csv) or several paths joined with ":" work too - they all get read into one catalog
+DATASET_CSV = os.environ.get("MOVIE_CSV")
+
+
+def read_dataset(fallback=True):
+    """
+    Streams the dataset into a compact catalog - MOVIE_CSV if its set, otherwise downloaded from Kaggle
+    If the download fails (usually does first time), we use backup data so app still works
+    (fallback=False raises instead - a reload shouldnt swap the real catalog for 10 movies lol)
+    Returns (catalog, where the CSVs are) - the source is None for the backup data
+    """
+    if DATASET_CSV:
+        print(f"📄 Loading dataset from {DATASET_CSV}")
+        return read_catalog(DATASET_CSV), DATASET_CSV
+
+    try:
+        import kagglehub
+        # kagglehub downloads stuff to a cache folder somewhere on your computer
+        print("⬇️ Attempting to download dataset from Kaggle...")
+        path = kagglehub.dataset_download("harshitshankhdhar/imdb-dataset-of-top-1000-movies-and-tv-shows")
+
+        # Every CSV in that folder gets read (theres just the one, but a catalog in shards works the same)
+        catalog = read_catalog(path)
+        print("✅ Kaggle dataset loaded successfully.")
+        return catalog, path
+
+    except Exception as e:
+        if not fallback:
+            raise
+        print(f"⚠️ Kaggle load failed ({str(e)}). Using fallback data.")
+        return Catalog.from_dataframe(clean_data(fallback_data())), None
+
+
+def read_catalog(source, workers=None, chunk_rows=None):
+    """
+    Every CSV of a dataset (a file, folder, glob... see ingest.find_csvs) streamed chunk by chunk into
+    a compact Catalog - cleaned, deduplicated on (title, year), never all in memory as a dataframe
+    """
+    paths = find_csvs(source)
+    if not paths:
+        raise FileNotFoundError(f"No CSV files in {source}")
+    builder = CatalogBuilder()
+    stats = ingest(paths, prepare_chunk, builder.append, workers, chunk_rows)
+    if not builder.rows:
+        raise ValueError(f"No usable movies in {source}")
+    print(stats.report())
+    event(log, "catalog_ingested", **stats.as_dict())
+    return builder.build()
+
+
+def prepare_chunk(chunk):
+    """One chunk of CSV rows -> (dedupe keys, packed columns) - runs in the ingest workers (see shared/ingest.py)"""
+    df = clean_data(chunk)
+    return row_keys(df['Series_Title'], df['Released_Year']), pack_frame(df)
+
+
+def fallback_data():
+    import pandas as pd
+    # Backup data - just some classic movies everyone knows
+    # atleast the app wont crash if kaggle is being difficult
+    data = {
+        'Series_Title': ['The Shawshank Redemption', 'The Godfather', 'The Dark Knight', 'Pulp Fiction', 'Forrest Gump', 'Inception', 'Matrix', 'Interstellar', 'Parasite', 'Spirited Away'],
+        'Released_Year': [1994, 1972, 2008, 1994, 1994, 2010, 1999, 2014, 2019, 2001],
+        'Genre': ['Drama', 'Crime,Drama', 'Action,Crime,Drama', 'Crime,Drama', 'Drama,Romance', 'Action,Adventure,Sci-Fi', 'Action,Sci-Fi', 'Adventure,Drama,Sci-Fi', 'Comedy,Drama,Thriller', 'Animation,Adventure,Family'],
+        'IMDB_Rating': [9.3, 9.2, 9.0, 8.9, 8.8, 8.8, 8.7, 8.6, 8.6, 8.6],
+        'Poster_Link': [
+            'https://m.media-amazon.com/images/M/MV5BMDFkYTc0MGEtZmNhMC00ZDIzLWFmNTEtODM1ZmRlYWMwMWFmXkEyXkFqcGdeQXVyMTMxODk2OTU@._V1_UX67_CR0,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BM2MyNjYxNmUtYTAwNi00MTYxLWJmNWYtYzZlODY3ZTk3OTFlXkEyXkFqcGdeQXVyNzkwMjQ5NzM@._V1_UX67_CR0,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BMTMxNTMwODM0NF5BMl5BanBnXkFtZTcwODAyMTk2Mw@@._V1_UX67_CR0,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BNGNhMDIzZTUtNTBlZi00MTRlLWFjM2ItYzViMjE3YzI5MjljXkEyXkFqcGdeQXVyNzkwMjQ5NzM@._V1_UX67_CR0,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BNWIwODRlZTUtY2U3ZS00Yzg1LWJhNzYtMmZiYmEyNmU1NjMzXkEyXkFqcGdeQXVyMTQxNzMzNDI@._V1_UY98_CR1,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BMjAxMzY3NjcxNF5BMl5BanBnXkFtZTcwNTI5OTM0Mw@@._V1_UX67_CR0,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BNzQzOTk3OTAtNDQ0Zi00ZTVkLWI0MTEtMDllZjNkYzNjNTc4L2ltYWdlXkEyXkFqcGdeQXVyNjU0OTQ0OTY@._V1_UX67_CR0,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BZjdkOTU3MDktN2IxOS00OGEyLWFmMjktY2FiMmZkNWIyODZiXkEyXkFqcGdeQXVyMTMxODk2OTU@._V1_UX67_CR0,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BYWZjMjk3ZTItODQ2ZC00NTY5LWE0ZDYtZTI3MjcwN2Q5NTVkXkEyXkFqcGdeQXVyODk4OTc3MTY@._V1_UX67_CR0,0,67,98_AL_.jpg',
+            'https://m.media-amazon.com/images/M/MV5BMjlmZmI5MDctNDE2YS00YWE0LWE5ZWItZDBhYWQ0NTcxNWRhXkEyXkFqcGdeQXVyMTMxODk2OTU@._V1_UX67_CR0,0,67,98_AL_.jpg'
+        ]
+    }
+    return pd.DataFrame(data)
+
+
+def clean_data(df):
+    """Adds clean_rating/decade and tidies up the genres (whole columns at once, works on any chunk of rows)"""
+    import pandas as pd
+    # --- Cleaning up the messy data ---
+    # Round ratings to .5 (cuz who needs 8.73 when 8.5 works fine)
+    df['IMDB_Rating'] = pd.to_numeric(df['IMDB_Rating'], errors='coerce')
+    df['clean_rating'] = (df['IMDB_Rating'] * 2).round() / 2
+    
+    # Extract year and figure out what decade its from
+    df['Released_Year'] = pd.to_numeric(df['Released_Year'], errors='coerce')
+    df = df.dropna(subset=['Released_Year', 'IMDB_Rating'])  # drop rows with weird years (or no rating)
+    df['decade'] = (df['Released_Year'] // 10 * 10).astype(int)
+    
+    # Remove spaces from genre names bcuz they mess things up later
+    df['Genre'] = df['Genre'].astype(str).str.replace(' ', '')
+    
+    # Make sure theres a poster link, even if its just a placeholder
+    if 'Poster_Link' not in df.columns:
+        df['Poster_Link'] = FALLBACK_POSTER
+    
+    return df
+
+
+def build_indexes(catalog):
+    """The lookup tables that get saved with the snapshot, as name -> (arrays, meta)"""
+    search_index = SearchIndex(catalog)
+    return {
+        'scoring': ScoringEngine(catalog).shared_arrays(),
+        'search': search_index.shared_arrays(),
+        'suggest': build_suggest_index(catalog).shared_arrays(),
+        'similar': build_similar_index(catalog).shared_arrays(),
+        'text': build_text_index(catalog, search_index.order).shared_arrays(),
+    }
+
+
+def build_suggest_index(catalog):
+    """Title autocomplete index (see shared/suggest.py) - the one saved in the snapshot if there is one"""
+    votes = catalog.column('No_of_Votes') if catalog.has('No_of_Votes') else None
+    return SuggestIndex(catalog.titles, catalog.ratings, votes, shared=catalog.prebuilt.get('suggest'))
+
+
+def scale_0_1(values):
+    """Squeeze values into 0..1 (same as sklearn's MinMaxScaler, without needing sklearn)"""
+    values = np.asarray(values, dtype=np.float64)
+    low, high = np.nanmin(values), np.nanmax(values)
+    return (values - low) / (high - low) if high > low else np.zeros(len(values))
+
+
+def build_similar_index(catalog):
+    """Precomputed "more like this" neighbors (see shared/similar.py) - the one saved in the snapshot if there is one"""
+    shared = catalog.prebuilt.get('similar')
+    if shared is not None:
+        return NeighborIndex(shared=shared)
+    # Bit i of the genre mask -> column i
+    masks = np.ascontiguousarray(catalog.genre_masks)
+    genre_hot = np.unpackbits(masks.view(np.uint8).reshape(len(masks), -1), axis=1,
+                              bitorder='little')[:, :len(catalog.genre_names)]
+    credits = [(role, catalog.column(name))
+               for role, name in [('director', 'Director'), ('star', 'Star1'), ('star', 'Star2'),
+                                  ('star', 'Star3'), ('star', 'Star4')]
+               if catalog.has(name)]
+    features = content_features(genre_hot, scale_0_1(catalog.decades[catalog.decade_codes]),
+                                scale_0_1(catalog.clean_ratings))
+    return NeighborIndex(features, credits)
+
+
+def build_text_index(catalog, order):
+    """Free text search over titles + overviews (see shared/text_index.py) - the one saved in the snapshot if there is one"""
+    overviews = catalog.column('Overview') if catalog.has('Overview') else None
+    return TextIndex(catalog.titles, overviews, order, shared=catalog.prebuilt.get('text'))
+
+
+def load_catalog(use_snapshot=True, report=False, fallback=True):
+    """
+    Gets the cleaned, compact catalog (see compact.py) - straight from the snapshot if theres
+    a fresh one, otherwise the slow way (kaggle + CSV + cleaning) and then saves a new snapshot
+    """
+    if use_snapshot:
+        catalog = load_snapshot(SNAPSHOT_DIR)
+        if catalog is not None:
+            print(f"⚡ Loaded catalog snapshot ({catalog.size} movies) from {SNAPSHOT_DIR}")
+            return catalog
+
+    catalog, source = read_dataset(fallback)
+    if report:
+        print(memory_report(catalog))
+
+    # Only snapshot the real dataset, the backup data is tiny anyway
+    if source:
+        try:
+            save_snapshot(catalog, SNAPSHOT_DIR, source_path=source, indexes=build_indexes(catalog))
+            print(f"💾 Saved catalog snapshot to {SNAPSHOT_DIR}")
+            # Switch to the memory mapped copy so the in-memory one can go
+            catalog = load_snapshot(SNAPSHOT_DIR) or catalog
+        except OSError as e:
+            print(f"⚠️ Could not save catalog snapshot ({e})")
+
+    return catalog
+
+
+# --- Reloading without a restart ---
+# Everything built from the catalog (indexes, caches, the /filters response...) goes into one
+# object per version, built off to the side and then swapped in with a single assignment.
+# A request grabs `reloader.current` once when it starts and uses that the whole way through,
+# so it never sees half of the old catalog and half of the new one. Once the last request
+# holding the old version is done, python frees it (memory maps included).
+
+class CatalogReloader:
+    """The current catalog version + rebuilding the next one in a background thread"""
+
+    def __init__(self, build, on_reload=None):
+        self._build = build          # build(catalog, version number) -> one version (.version, .catalog, .close())
+        self._on_reload = on_reload  # called with the new version after each swap (the first load too)
+        self._lock = threading.Lock()  # one load/reload at a time
+        self._loaded = threading.Event()  # set once the first load is over (worked or not)
+        self.reloading = False
+        self.last_error = None
+        self.last_reload_seconds = None
+        # Nothing gets read until load() - importing the app stays cheap (tools, tests, forked workers)
+        self.current = None
+        self.loaded_at = None
+
+    @property
+    def ready(self):
+        return self.current is not None
+
+    def load(self, background=False):
+        """
+        The first version: from the snapshot if its fresh, otherwise the CSV (with the backup data if that fails)
+        background=True returns straight away, `ready` says when its done. False if its loaded/loading already
+        """
+        if self.current is not None or not self._lock.acquire(blocking=False):
+            return False
+        self.reloading = True
+        if background:
+            threading.Thread(target=self._run, args=(False, True), daemon=True, name="catalog-load").start()
+        else:
+            self._run(False, True, raise_errors=True)
+        return True
+
+    def wait_ready(self, timeout=None):
+        """Blocks until the first load is over - True if there is a catalog to serve"""
+        self._loaded.wait(timeout)
+        return self.ready
+
+    def reload(self, rebuild=False, wait=False):
+        """
+        Build a new version and swap it in - False if a reload is already running
+        rebuild=True parses the CSV again even if the snapshot looks fresh
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        self.reloading = True
+        thread = threading.Thread(target=self._run, args=(rebuild,), daemon=True, name="catalog-reload")
+        thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def _run(self, rebuild, first=False, raise_errors=False):
+        started = time.perf_counter()
+        try:
+            number = self.current.version + 1 if self.current else 1
+            catalog = load_catalog(use_snapshot=not rebuild, fallback=first)
+            new = self._build(catalog, number)
+            old, self.current = self.current, new  # <- the swap
+            self.loaded_at = time.time()
+            self.last_error = None
+            self.last_reload_seconds = round(time.perf_counter() - started, 3)
+            event(log, "catalog_loaded" if first else "catalog_reloaded", version=number, movies=new.catalog.size,
+                  seconds=self.last_reload_seconds)
+            if old is not None:
+                old.close()  # its worker processes (requests still on it get answered without them)
+            if self._on_reload:
+                self._on_reload(new)
+        except Exception as e:
+            # Keep serving the old version, its still perfectly good (nothing to serve if this was the first load)
+            self.last_error = str(e)
+            event(log, "catalog_load_failed" if first else "catalog_reload_failed", level=logging.ERROR,
+                  exc_info=True, error=str(e))
+            if raise_errors:
+                raise
+        finally:
+            self.reloading = False
+            self._loaded.set()
+            self._lock.release()
+
+    def status(self):
+        current = self.current
+        return {
+            "ready": current is not None,
+            "version": current.version if current else None,
+            "movies": current.catalog.size if current else 0,
+            "loaded_at": self.loaded_at,
+            "reloading": self.reloading,
+            "last_reload_seconds": self.last_reload_seconds,
+            "last_error": self.last_error,
+        }
+
+
+if __name__ == '__main__':
+    # Build step - force a fresh parse of the CSV and rewrite the snapshot
+    catalog = load_catalog(use_snapshot=False, report=True)
+    print(f"Catalog has {catalog.size} movies")
@@ -0,0 +1,650 @@
+import os
+
+import numpy as np
+
+# --- Compact in-memory catalog ---
+# The catalog used to be a pandas dataframe full of python objects: every title, genre string,
+# runtime and poster URL was its own python str (~50 bytes of overhead each), numbers were all
+# 64 bit, and columns nobody uses (Overview, Star1-4, Gross...) sat in memory too.
+# Here each column gets the smallest thing that can hold it:
+#   - text         -> one utf-8 blob + offsets (TextColumn), common prefix stored once
+#   - few distinct -> small int codes + the distinct values (CodedColumn), e.g. "Crime,Drama"
+#   - numbers      -> float32 / smallest int type that fits
+#   - genres       -> one bitmask per movie, bit i = genre_names[i] (a row of 64 bit words if there are more than 64)
+#   - decades      -> a uint8 code per movie, decade = decades[code]
+# Loaded from a snapshot every column is memory mapped, so columns nobody reads (Overview, Star1-4,
+# Gross...) never actually take up RAM - the OS only reads the pages something touches.
+#
+# pandas is only imported by the functions that build a catalog from a dataframe, so server
+# processes that just map a snapshot dont pay for importing it (~40MB + a quarter second each).
+
+
+def smallest_int_dtype(low, high, signed=True):
+    """Smallest numpy int type that holds every value between low and high"""
+    types = (np.int8, np.int16, np.int32, np.int64) if signed else (np.uint8, np.uint16, np.uint32, np.uint64)
+    for dtype in types:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    raise ValueError(f"No int type holds {low}..{high}")
+
+
+def exact_float64(values):
+    """
+    float32 -> float64 without the float32 noise (8.1 stays 8.1, not 8.100000381...)
+    IMDB ratings have one decimal so rounding is enough, anything else takes the slow exact route
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values.astype(np.float64)
+    rounded = np.round(values.astype(np.float64), 1)
+    if np.array_equal(rounded.astype(np.float32), values, equal_nan=True):
+        return rounded
+    return values.astype(str).astype(np.float64)
+
+
+def popcount(values):
+    """Number of 1 bits in each value (for the genre masks) - one count per row for a 2d array"""
+    if hasattr(np, "bitwise_count"):  # numpy 2+
+        counts = np.bitwise_count(values)
+        return counts.sum(axis=1, dtype=np.int64) if counts.ndim == 2 else counts
+    values = np.ascontiguousarray(values)
+    return np.unpackbits(values.view(np.uint8).reshape(len(values), -1), axis=1).sum(axis=1)
+
+
+# Up to 64 genres a movie's genres are one int (bit i = genre i). More than that and each movie gets
+# a row of uint64 words instead (bit i = bit i % 64 of word i // 64). These work with either one.
+
+def genre_mask(masks, bits):
+    """A mask with these genre numbers set, in the same layout as `masks` so they can be ANDed"""
+    if masks.ndim == 1:
+        value = 0
+        for i in bits:
+            value |= 1 << i
+        return masks.dtype.type(value)
+    words = np.zeros(masks.shape[1], dtype=masks.dtype)
+    for i in bits:
+        words[i // 64] |= np.uint64(1 << (i % 64))
+    return words
+
+
+def has_genre(masks, mask):
+    """Bool per movie - does it have any of the genres in mask"""
+    hits = masks & mask
+    return hits.any(axis=1) if hits.ndim == 2 else hits != 0
+
+
+def count_genres(masks, mask):
+    """How many of the genres in mask each movie has"""
+    return popcount(masks & mask).astype(np.int64)
+
+
+class TextColumn:
+    """Strings glued into one utf-8 blob + where each one starts/ends - decoded one at a time when asked for"""
+
+    kind = "text"
+
+    def __init__(self, data, offsets, nulls=None, prefix=""):
+        self.data = data        # uint8 array (can be memory mapped)
+        self.offsets = offsets  # int64, len + 1 entries
+        self.nulls = nulls      # bool array or None if nothing is missing
+        self.prefix = prefix    # shared start of every string (like "https://m.media-amazon.com/images/M/")
+        self._blob = None
+
+    @classmethod
+    def from_values(cls, values):
+        import pandas as pd
+        values = list(values)
+        nulls = pd.isna(pd.Series(values, dtype=object)).to_numpy()
+        strings = ["" if null else str(v) for v, null in zip(values, nulls)]
+        present = [s for s, null in zip(strings, nulls) if not null]
+        prefix = os.path.commonprefix(present) if len(present) > 1 else ""
+        encoded = [s[len(prefix):].encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets, nulls if nulls.any() else None, prefix)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def blob(self):
+        # bytes view of the data, made once (a memoryview doesnt copy a memory mapped array)
+        if self._blob is None:
+            self._blob = memoryview(np.ascontiguousarray(self.data)).cast("B")
+        return self._blob
+
+    def __getitem__(self, row):
+        if self.nulls is not None and self.nulls[row]:
+            return None
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self.prefix + bytes(self.blob[start:end]).decode("utf-8")
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+    def to_list(self):
+        # Everything at once - one bytes copy + slicing is way faster than going through __getitem__
+        blob, offsets, prefix = bytes(self.blob), self.offsets.tolist(), self.prefix
+        values = [prefix + blob[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+        if self.nulls is not None:
+            for row in np.flatnonzero(self.nulls).tolist():
+                values[row] = None
+        return values
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes + (self.nulls.nbytes if self.nulls is not None else 0)
+
+
+class CodedColumn:
+    """A column with few different values: a small int code per movie + the list of values (-1 = missing)"""
+
+    kind = "coded"
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.values = list(values)
+
+    @classmethod
+    def from_values(cls, values):
+        import pandas as pd
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        dtype = smallest_int_dtype(-1, max(len(uniques) - 1, 0))
+        return cls(codes.astype(dtype), [str(v) for v in uniques])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        code = self.codes[row]
+        return self.values[code] if code >= 0 else None
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+    def to_list(self):
+        # code -1 (missing) picks the None on the end
+        values = self.values + [None]
+        return [values[code] for code in self.codes.tolist()]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + sum(len(v) + 49 for v in self.values)  # ~49 bytes per python str
+
+
+def compact_numbers(values):
+    """Smallest numpy array that holds a numeric column"""
+    if values.dtype == bool:
+        return values
+    if np.issubdtype(values.dtype, np.integer):
+        if not len(values):
+            return values.astype(np.int8)
+        return values.astype(smallest_int_dtype(values.min(), values.max()))
+    values = values.astype(np.float64, copy=False)
+    finite = values[np.isfinite(values)]
+    # Whole numbers with nothing missing (years after cleaning) -> ints
+    if len(finite) == len(values) and len(values) and np.array_equal(finite, np.round(finite)):
+        return values.astype(smallest_int_dtype(finite.min(), finite.max()))
+    return values.astype(np.float32)
+
+
+def compact_column(series):
+    """Best compact version of one dataframe column"""
+    import pandas as pd
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series) or pd.api.types.is_float_dtype(series):
+        return compact_numbers(series.to_numpy())
+    # Text: if values repeat a lot store each one once, otherwise pack them into a blob
+    if series.nunique(dropna=True) <= max(len(series) // 4, 1):
+        return CodedColumn.from_values(series)
+    return TextColumn.from_values(series)
+
+
+# --- Building a catalog one chunk at a time (see shared/ingest.py) ---
+# A chunk of cleaned CSV rows gets packed into plain arrays first (pack_frame - runs in the ingest
+# worker processes, and what it returns pickles small), then CatalogBuilder appends those to the
+# columns. Nothing of the whole catalog is ever a python object per movie: text is kept as utf-8
+# bytes, and columns with few different values as codes, same as the finished catalog.
+# What comes out is the same as Catalog.from_dataframe() on all the rows at once (the one difference:
+# a column that looked unique for its first CODED_SWITCH_MIN+ values stays text even if it ends up
+# repeating enough to be coded).
+
+CODED_SWITCH_MIN = 4096  # a coded column only turns into text once it has more values than this
+
+
+def _encode_text(values):
+    """(utf-8 blob, byte length per value, nulls or None, common prefix or None) for a list of values"""
+    import pandas as pd
+    nulls = pd.isna(np.asarray(values, dtype=object))
+    strings = ["" if null else str(v) for v, null in zip(values, nulls.tolist())]
+    present = [string for string, null in zip(strings, nulls.tolist()) if not null]
+    encoded = [string.encode("utf-8") for string in strings]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    prefix = os.path.commonprefix(present) if present else None
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), lengths, (nulls if nulls.any() else None), prefix
+
+
+def pack_frame(df):
+    """
+    One cleaned chunk as column name -> piece:
+    ('numbers', array) / ('coded', int32 codes, distinct values) / ('text', blob, lengths, nulls, prefix)
+    """
+    import pandas as pd
+    pieces = {}
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            pieces[name] = ('numbers', series.to_numpy())
+            continue
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        if len(uniques) <= len(series) // 2:
+            pieces[name] = ('coded', codes.astype(np.int32), [str(v) for v in uniques])
+        else:
+            pieces[name] = ('text',) + _encode_text(series.to_list())
+    return pieces
+
+
+def _take_text(piece, keep):
+    """The rows of a text piece where keep is True"""
+    _, data, lengths, nulls, prefix = piece
+    data = data[np.repeat(keep, lengths)]
+    return 'text', data, lengths[keep], (nulls[keep] if nulls is not None else None), prefix
+
+
+def _decode_text(piece):
+    _, data, lengths, nulls, _ = piece
+    blob, ends = data.tobytes(), np.cumsum(lengths).tolist()
+    values = [blob[start:end].decode("utf-8") for start, end in zip([0] + ends[:-1], ends)]
+    if nulls is not None:
+        for row in np.flatnonzero(nulls).tolist():
+            values[row] = None
+    return values
+
+
+class _ColumnBuilder:
+    """One column being built: numbers, coded (codes + distinct values) or text (utf-8 pieces)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.pieces = []    # numbers: arrays / coded: code arrays / text: (data, lengths, nulls)
+        self.values = []    # coded: the distinct values, in the order first seen
+        self._codes = {}    # coded: value -> code
+        self.prefix = None  # text: what every value so far starts with (None = no values yet)
+        self.present = 0    # text: how many values arent missing
+
+    # --- Appending ---
+
+    def append(self, piece):
+        kind = piece[0]
+        if kind == 'numbers' and self.kind != 'numbers':
+            piece = self._numbers_as_text(piece[1])
+            kind = 'text'
+        if self.kind == 'numbers':
+            if kind == 'numbers':
+                self.pieces.append(piece[1])
+                self.rows += len(piece[1])
+                return
+            self._to_objects()  # text showed up in a column that looked numeric so far
+        if self.kind == 'coded':
+            if kind == 'text':
+                piece = ('coded',) + self._factorize(_decode_text(piece))
+            self._append_coded(piece[1], piece[2])
+        else:
+            if kind == 'coded':
+                piece = self._coded_as_text(piece[1], piece[2])
+            self._append_text(piece)
+
+    def append_missing(self, count):
+        if self.kind == 'numbers':
+            self.append(('numbers', np.full(count, np.nan)))
+        elif self.kind == 'coded':
+            self._append_coded(np.full(count, -1, dtype=np.int32), [])
+        else:
+            self._append_text(('text', np.empty(0, dtype=np.uint8), np.zeros(count, dtype=np.int64),
+                               np.ones(count, dtype=bool), None))
+
+    @staticmethod
+    def _factorize(values):
+        import pandas as pd
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        return codes.astype(np.int32), [str(v) for v in uniques]
+
+    def _numbers_as_text(self, values):
+        import pandas as pd
+        values = values.astype(object)
+        values[pd.isna(values)] = None
+        return ('text',) + _encode_text(values.tolist())
+
+    def _append_coded(self, codes, uniques):
+        import pandas as pd
+        # Codes of this piece -> codes of the whole column, new values go on the end in the order they
+        # first show up (only the ones some row still uses - the chunk might have lost rows to the dedupe)
+        mapping = np.full(len(uniques) + 1, -1, dtype=np.int32)
+        for code in pd.unique(codes[codes >= 0]).tolist():
+            value = uniques[code]
+            if value not in self._codes:
+                self._codes[value] = len(self.values)
+                self.values.append(value)
+            mapping[code] = self._codes[value]
+        self.pieces.append(mapping[codes])
+        self.rows += len(codes)
+        # Too many different values to be worth coding - keep it as text from now on
+        if len(self.values) > max(self.rows // 4, CODED_SWITCH_MIN):
+            self._to_text()
+
+    def _coded_as_text(self, codes, values):
+        encoded = [value.encode("utf-8") for value in values] + [b""]
+        lengths = np.array([len(value) for value in encoded], dtype=np.int64)[codes]
+        nulls = codes < 0
+        present = [values[code] for code in np.unique(codes[~nulls]).tolist()]
+        prefix = os.path.commonprefix(present) if present else None
+        data = np.frombuffer(b"".join([encoded[code] for code in codes.tolist()]), dtype=np.uint8)
+        return 'text', data, lengths, (nulls if nulls.any() else None), prefix
+
+    def _append_text(self, piece):
+        _, data, lengths, nulls, prefix = piece
+        self.pieces.append((data, lengths, nulls))
+        self.rows += len(lengths)
+        self.present += len(lengths) - (int(nulls.sum()) if nulls is not None else 0)
+        if prefix is not None:
+            self.prefix = prefix if self.prefix is None else os.path.commonprefix([self.prefix, prefix])
+
+    def _to_text(self):
+        pieces, values = self.pieces, self.values
+        self.kind, self.pieces, self.values, self._codes, self.rows = 'text', [], [], {}, 0
+        for codes in pieces:
+            self._append_text(self._coded_as_text(codes, values))
+
+    def _to_objects(self):
+        pieces = self.pieces
+        self.kind, self.pieces, self.rows = 'coded', [], 0
+        for values in pieces:
+            self.append(self._numbers_as_text(values))
+
+    # --- The finished column ---
+
+    def build(self):
+        if self.kind == 'numbers':
+            return compact_numbers(np.concatenate(self.pieces) if self.pieces else np.empty(0))
+        if self.kind == 'coded':
+            # Same rule as compact_column()
+            if len(self.values) <= max(self.rows // 4, 1):
+                codes = np.concatenate(self.pieces) if self.pieces else np.empty(0, dtype=np.int32)
+                return CodedColumn(codes.astype(smallest_int_dtype(-1, max(len(self.values) - 1, 0))), self.values)
+            self._to_text()
+        return self._build_text()
+
+    def _build_text(self):
+        # Like TextColumn.from_values: the common start of every value is stored once (if theres more than one value)
+        prefix = self.prefix if self.present > 1 and self.prefix else ""
+        cut = len(prefix.encode("utf-8"))
+        total = sum(len(data) for data, _, _ in self.pieces) - cut * self.present
+        data = np.empty(total, dtype=np.uint8)
+        offsets = np.zeros(self.rows + 1, dtype=np.int64)
+        nulls = np.zeros(self.rows, dtype=bool)
+        row = position = 0
+        self.pieces.reverse()
+        while self.pieces:
+            piece_data, lengths, piece_nulls = self.pieces.pop()  # let go of each piece once its copied
+            count = len(lengths)
+            present = np.ones(count, dtype=bool) if piece_nulls is None else ~piece_nulls
+            if cut:
+                # Drop the first `cut` bytes of every value that isnt missing
+                skipped = cut * present
+                pattern = np.tile(np.array([False, True]), count)
+                piece_data = piece_data[np.repeat(pattern, np.column_stack((skipped, lengths - skipped)).ravel())]
+                lengths = lengths - skipped
+            data[position:position + len(piece_data)] = piece_data
+            np.cumsum(lengths, out=offsets[row + 1:row + count + 1])
+            offsets[row + 1:row + count + 1] += position
+            if piece_nulls is not None:
+                nulls[row:row + count] = piece_nulls
+            row += count
+            position += len(piece_data)
+        return TextColumn(data, offsets, nulls if nulls.any() else None, prefix)
+
+
+class CatalogBuilder:
+    """Collects packed chunks (see pack_frame) into the columns of one Catalog"""
+
+    def __init__(self):
+        self.columns = {}  # name -> _ColumnBuilder, in the order the columns first showed up
+        self.rows = 0
+
+    def append(self, pieces, keep=None):
+        """Adds the rows of a packed chunk (only the ones where keep is True, if given)"""
+        count = len(pieces[next(iter(pieces))][1]) if pieces else 0
+        if keep is not None and not keep.all():
+            pieces = {name: self._take(piece, keep) for name, piece in pieces.items()}
+            count = int(keep.sum())
+        for name, piece in pieces.items():
+            if name not in self.columns:
+                # Text starts out coded, it turns into text by itself once it has too many different values
+                column = self.columns[name] = _ColumnBuilder('numbers' if piece[0] == 'numbers' else 'coded')
+                if self.rows:
+                    column.append_missing(self.rows)  # a shard that has a column the earlier ones didnt
+            self.columns[name].append(piece)
+        for name, column in self.columns.items():
+            if name not in pieces and count:
+                column.append_missing(count)
+        self.rows += count
+
+    @staticmethod
+    def _take(piece, keep):
+        if piece[0] == 'numbers':
+            return 'numbers', piece[1][keep]
+        if piece[0] == 'coded':
+            return 'coded', piece[1][keep], piece[2]
+        return _take_text(piece, keep)
+
+    def build(self):
+        """The finished Catalog (the builder is used up after this)"""
+        columns = {}
+        for name in list(self.columns):
+            columns[name] = self.columns.pop(name).build()
+        return Catalog.from_columns(columns)
+
+
+class Movie:
+    """One movie, for the rare places that want a row instead of whole columns"""
+
+    __slots__ = ('row', 'title', 'year', 'genre', 'rating', 'runtime', 'poster', 'decade', 'clean_rating')
+
+    def __init__(self, row, title, year, genre, rating, runtime, poster, decade, clean_rating):
+        self.row = row
+        self.title = title
+        self.year = year
+        self.genre = genre
+        self.rating = rating
+        self.runtime = runtime
+        self.poster = poster
+        self.decade = decade
+        self.clean_rating = clean_rating
+
+    def as_dict(self):
+        """Same keys as the CSV columns, like the old to_dict('records') gave"""
+        return {
+            'Series_Title': self.title,
+            'Released_Year': self.year,
+            'Genre': self.genre,
+            'IMDB_Rating': self.rating,
+            'Runtime': self.runtime,
+            'Poster_Link': self.poster,
+            'decade': self.decade,
+            'clean_rating': self.clean_rating,
+        }
+
+    def __repr__(self):
+        return f"Movie({self.title!r}, {self.year}, {self.rating})"
+
+
+class Catalog:
+    """All the movies as compact columns + the genre bitmasks and decade codes built from them"""
+
+    def __init__(self, columns, shared=None):
+        """
+        columns: CSV column name -> numpy array / TextColumn / CodedColumn
+        shared: (arrays, meta) from shared_arrays(), e.g. memory mapped from a snapshot - skips the work below
+        """
+        self._columns = dict(columns)
+        self.size = len(self._columns['Series_Title'])
+        # Lookup tables other parts of the app built for this catalog and saved with the snapshot
+        # (name -> (arrays, meta)), so every server process can map them instead of rebuilding them
+        self.prebuilt = {}
+
+        genre_col = self._columns['Genre']
+        if not isinstance(genre_col, CodedColumn):
+            genre_col = self._columns['Genre'] = CodedColumn.from_values(genre_col.to_list())
+
+        if shared is not None:
+            arrays, meta = shared
+            self.genre_names = list(meta['genre_names'])
+            self.genre_masks = arrays['genre_masks']
+            self.decades = np.asarray(meta['decades'], dtype=np.asarray(self._columns['decade']).dtype)
+            self.decade_codes = arrays['decade_codes']
+        else:
+            self._build_masks(genre_col)
+        self._decade_code = {int(d): i for i, d in enumerate(self.decades)}
+
+    def _build_masks(self, genre_col):
+        # Genre bitmask per movie - worked out once per distinct genre string, then spread with the codes
+        combo_genres = [[g for g in str(combo).split(',') if g] for combo in genre_col.values]
+        self.genre_names = sorted({g for genres in combo_genres for g in genres})
+        number = {g: i for i, g in enumerate(self.genre_names)}
+        if len(self.genre_names) <= 64:
+            mask_dtype = smallest_int_dtype(0, (1 << max(len(self.genre_names), 1)) - 1, signed=False)
+            combo_masks = np.zeros(len(combo_genres) + 1, dtype=mask_dtype)
+        else:
+            # Too many for one int - a row of 64 bit words per movie (see genre_mask())
+            combo_masks = np.zeros((len(combo_genres) + 1, (len(self.genre_names) + 63) // 64), dtype=np.uint64)
+        for code, genres in enumerate(combo_genres):
+            combo_masks[code] = genre_mask(combo_masks, [number[g] for g in set(genres)])
+        # code -1 (missing genre) picks the 0 on the end = no genres
+        self.genre_masks = combo_masks[genre_col.codes.astype(np.int64)]
+
+        # Decades as small codes
+        decades = np.asarray(self._columns['decade'])
+        self.decades, codes = np.unique(decades, return_inverse=True)
+        self.decade_codes = codes.astype(smallest_int_dtype(0, max(len(self.decades) - 1, 0), signed=False))
+
+    def shared_arrays(self):
+        """The genre masks + decade codes as (arrays, meta) so a snapshot can store them"""
+        arrays = {'genre_masks': self.genre_masks, 'decade_codes': self.decade_codes}
+        meta = {'genre_names': self.genre_names, 'decades': [int(d) for d in self.decades]}
+        return arrays, meta
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Compact version of a cleaned dataframe (every column is kept, just smaller)"""
+        return cls.from_columns({name: compact_column(df[name]) for name in df.columns})
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Catalog from compact columns (from_dataframe or a CatalogBuilder), with the fixed types some columns get"""
+        if 'decade' in columns:
+            columns['decade'] = np.asarray(columns['decade']).astype(np.int16)
+        if 'clean_rating' in columns:
+            columns['clean_rating'] = np.asarray(columns['clean_rating'], dtype=np.float32)
+        if 'IMDB_Rating' in columns:
+            columns['IMDB_Rating'] = np.asarray(columns['IMDB_Rating'], dtype=np.float32)
+        return cls(columns)
+
+    # --- Columns ---
+
+    @property
+    def column_names(self):
+        return list(self._columns)
+
+    def has(self, name):
+        return name in self._columns
+
+    def column(self, name):
+        """A column by CSV name"""
+        return self._columns[name]
+
+    @property
+    def titles(self):
+        return self._columns['Series_Title']
+
+    @property
+    def years(self):
+        return self._columns['Released_Year']
+
+    @property
+    def ratings(self):
+        return self._columns['IMDB_Rating']
+
+    @property
+    def clean_ratings(self):
+        return self._columns['clean_rating']
+
+    @property
+    def posters(self):
+        return self._columns['Poster_Link']
+
+    def decade_code(self, decade):
+        """Code for a decade like 1990, or None if no movie is from then"""
+        return self._decade_code.get(int(decade))
+
+    def genre_bit(self, genre):
+        """Mask for one genre (all 0 if no movie has it), see genre_mask()"""
+        bits = [self.genre_names.index(genre)] if genre in self.genre_names else []
+        return genre_mask(np.asarray(self.genre_masks), bits)
+
+    # --- Rows ---
+
+    def movie(self, row):
+        """One movie as a Movie record"""
+        years = self.years
+        return Movie(
+            row=int(row),
+            title=self.titles[row],
+            year=int(years[row]) if np.issubdtype(np.asarray(years).dtype, np.integer) else years[row],
+            genre=self._columns['Genre'][row],
+            rating=float(exact_float64(self.ratings[row:row + 1])[0]),
+            runtime=self._columns['Runtime'][row] if 'Runtime' in self._columns else None,
+            poster=self.posters[row] if 'Poster_Link' in self._columns else None,
+            decade=int(self.decades[self.decade_codes[row]]),
+            clean_rating=float(self.clean_ratings[row]),
+        )
+
+    def movies(self, rows):
+        return [self.movie(row) for row in rows]
+
+    def to_dataframe(self, columns=None):
+        """Back to pandas (decodes everything, so only for tools/debugging)"""
+        import pandas as pd
+        data = {}
+        for name in columns or self.column_names:
+            col = self.column(name)
+            data[name] = col.to_list() if isinstance(col, (TextColumn, CodedColumn)) else np.asarray(col)
+        return pd.DataFrame(data)
+
+    # --- How big is it ---
+
+    def memory_usage(self):
+        """Bytes per column + the derived arrays + 'total' (memory mapped columns count in full)"""
+        usage = {}
+        for name, col in self._columns.items():
+            usage[name] = int(col.nbytes)
+        usage['genre_masks'] = int(self.genre_masks.nbytes)
+        usage['decade_codes'] = int(self.decade_codes.nbytes)
+        for name, (arrays, _) in self.prebuilt.items():
+            usage[f'{name}_index'] = sum(int(a.nbytes) for a in arrays.values())
+        usage['total'] = sum(usage.values())
+        return usage
+
+
+def memory_report(catalog, df=None):
+    """Readable memory breakdown, optionally next to what the old dataframe took"""
+    usage = catalog.memory_usage()
+    lines = [f"Catalog: {catalog.size:,} movies, {usage['total'] / 1e6:.1f} MB"]
+    for name, nbytes in sorted(usage.items(), key=lambda item: -item[1]):
+        if name != 'total':
+            lines.append(f"  {name:<16} {nbytes / 1e6:9.2f} MB")
+    if df is not None:
+        old = df.memory_usage(deep=True).sum()
+        lines.append(f"Dataframe was {old / 1e6:.1f} MB -> {old / max(usage['total'], 1):.1f}x smaller")
+    return "\n".join(lines)
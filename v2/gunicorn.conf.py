@@ -0,0 +1,32 @@
+import os
+
+# --- Running v2 with several worker processes ---
+#   cd v2 && gunicorn -c gunicorn.conf.py
+#
+# The master process builds the catalog snapshot (CSV parse, cleaning, search index, scoring
+# arrays - see catalog.py) once before any worker starts. Workers then just memory-map those
+# files read-only, so they boot in well under a second and all of them share one copy of the
+# catalog through the OS page cache - adding workers doesnt add catalog memory.
+# New data: kill -HUP <master pid> (see on_reload below).
+
+bind = os.environ.get("BIND", "0.0.0.0:5001")
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+threads = int(os.environ.get("THREADS", "4"))  # poster lookups wait on OMDB a lot, threads help there
+timeout = 60
+# The app factory - importing app.py reads nothing, create_app() maps the snapshot (see app.py)
+wsgi_app = "app:create_app()"
+
+
+def on_starting(server):
+    # Runs in the master before forking. Only build the files here, the app itself gets imported
+    # by each worker (its background threads + sqlite connections dont survive a fork)
+    from catalog import load_catalog
+
+    catalog = load_catalog()
+    server.log.info("Catalog ready: %d movies, workers will map the snapshot", catalog.size)
+
+
+def on_reload(server):
+    # kill -HUP <master pid>: refresh the snapshot first (rebuilt only if the CSV changed), then
+    # gunicorn starts new workers on it and lets the old ones finish their requests - no downtime
+    on_starting(server)
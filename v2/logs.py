@@ -0,0 +1,84 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# --- Logging that doesnt slow requests down ---
+# The request handlers used to print() a few lines each, straight to the terminal, while the
+# user waited. Now they log one JSON line per event which just goes into a queue - a background
+# thread does the actual writing. If the queue fills up (terminal frozen, disk slow...) we drop
+# lines and count them instead of making requests wait.
+#
+#   {"ts": 1700000000.123, "level": "INFO", "logger": "movies", "event": "search", "matched": 10, ...}
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.environ.get("LOG_FILE")  # default is stderr
+LOG_QUEUE_SIZE = 10000
+
+dropped = 0  # log lines thrown away because the queue was full
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never waits - full queue means the line gets dropped"""
+
+    def enqueue(self, record):
+        global dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped += 1
+
+    def prepare(self, record):
+        # Format the traceback now, the background thread cant see the exception anymore
+        if record.exc_info:
+            record = copy.copy(record)
+            record.fields = {**getattr(record, "fields", {}),
+                             "traceback": logging.Formatter().formatException(record.exc_info)}
+            record.exc_info = None
+        return super().prepare(record)
+
+
+_listener = None
+
+
+def setup(name="movies"):
+    """The app logger, with the background writer started the first time this is called"""
+    global _listener
+    logger = logging.getLogger(name)
+    if _listener is None:
+        output = logging.FileHandler(LOG_FILE, delay=True) if LOG_FILE else logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter())
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+        atexit.register(_listener.stop)  # writes out whatever is still queued
+
+        logger.addHandler(DroppingQueueHandler(log_queue))
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
+
+
+def event(logger, name, level=logging.INFO, exc_info=False, **fields):
+    """Log one event with some fields: event(log, "search", genre="Drama", matched=10)"""
+    if logger.isEnabledFor(level):
+        logger.log(level, name, exc_info=exc_info, extra={"fields": fields})
+
@@ -0,0 +1,245 @@
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# --- Metrics for /metrics ---
+# Counters and histograms kept in memory and printed in the Prometheus text format,
+# so anything that can scrape Prometheus can graph how long each part of a request takes.
+# No prometheus_client needed, its like 100 lines lol.
+#
+# Every server process has its own numbers (thats normal for Prometheus, it adds them up).
+
+# Seconds - from "basically free" to "OMDB is having a bad day"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_str(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _num(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A number that only goes up, one per combination of label values"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield self.name + _label_str(self.labelnames, labels), value
+
+
+class Histogram:
+    """Counts observations into buckets (plus their sum), one set per combination of label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += 1
+            entry[-1] += value
+
+    def count(self, *labels):
+        entry = self._values.get(labels)
+        return entry[-2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, list(entry)) for labels, entry in self._values.items())
+        for labels, entry in items:
+            for bound, count in zip(self.buckets + (float("inf"),), entry[:-1]):
+                yield self.name + "_bucket" + _label_str(self.labelnames, labels, [("le", _num(bound))]), count
+            yield self.name + "_sum" + _label_str(self.labelnames, labels), entry[-1]
+            yield self.name + "_count" + _label_str(self.labelnames, labels), entry[-2]
+
+
+class Gauge:
+    """A value worked out when /metrics is scraped, from a function that returns {labels: value}"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), read=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.read = read
+
+    def samples(self):
+        values = self.read() if self.read else {}
+        for labels, value in sorted(values.items()):
+            yield self.name + _label_str(self.labelnames, labels), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = OrderedDict()
+
+    def _add(self, metric):
+        # Same name twice just returns the first one, so re-importing a module doesnt break anything
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, labelnames=(), read=None):
+        return self._add(Gauge(name, help, labelnames, read))
+
+    def render(self):
+        """Everything in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {_num(value)}" for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "movie_request_seconds", "Whole request time per endpoint", ("endpoint", "status"))
+STAGE_SECONDS = REGISTRY.histogram(
+    "movie_stage_seconds", "Time spent in each step of a request", ("endpoint", "stage"))
+# result: hit / miss (cache), found / not_found / error / timeout (OMDB calls) and
+# deduped (async server: joined a call another request had already started for the same movie)
+POSTER_LOOKUPS = REGISTRY.counter(
+    "movie_poster_lookups_total", "Poster cache hits/misses and OMDB call results", ("result",))
+
+
+class RequestTimer:
+    """Times the stages of one request: `with timer.stage('index'): ...`"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint or "unknown"
+        self.started = time.perf_counter()
+        self.stages = []  # (stage, seconds) in the order they ran
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages.append((name, elapsed))
+            STAGE_SECONDS.observe(elapsed, self.endpoint, name)
+
+    def finish(self, status):
+        elapsed = time.perf_counter() - self.started
+        REQUEST_SECONDS.observe(elapsed, self.endpoint, str(status))
+        return elapsed
+
+    def server_timing(self):
+        """Server-Timing header value so the stages show up in the browser dev tools too"""
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages)
+
+
+# --- Sampling profiler ---
+# Looks at what one thread is doing every `interval` seconds and counts the call stacks.
+# Much cheaper than cProfile (which hooks every single function call), and the output is
+# in the "collapsed stack" format flamegraph.pl / speedscope understand:
+#   app.py:search_movies;search_index.py:search 12
+
+class SamplingProfiler:
+    def __init__(self, thread_id=None, interval=0.001):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.samples = StackCounter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._stack(frame)] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sampling-profiler")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class ProfileArchive:
+    """The last few profiles, so they can be fetched after the request that made them"""
+
+    def __init__(self, keep=20):
+        self.keep = keep
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def add(self, text):
+        with self._lock:
+            self._next_id += 1
+            profile_id = str(self._next_id)
+            self._profiles[profile_id] = text
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
@@ -0,0 +1,348 @@
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, TimeoutError as ShardTimeout
+
+import numpy as np
+
+from logs import event
+from scoring import RecommendationCache, ScoringEngine
+from search_index import SearchIndex
+
+log = logging.getLogger("movies.partitions")
+
+# --- Partitioned catalog (scatter/gather over worker processes) ---
+# Scoring every movie for /recommendations and walking the search index both run on one core, so a
+# big catalog is slow no matter how many cores the machine has. With CATALOG_SHARDS=N the movies
+# get split into N shards, each one in its own worker process with its own SearchIndex, ScoringEngine
+# and RecommendationCache (the exact same code, just over fewer movies). A query goes to every
+# shard at once, each sends back its own best `limit`, and we merge those with a heap.
+#
+# The results are exactly what one process gives: a shard keeps its movies in catalog order, so
+# it sorts them the same way the whole catalog does (rating, then catalog order) and its best
+# `limit` are the only ones of its movies that can make the overall top `limit`.
+#
+# SHARD_BY=decade (default) puts whole decades on a shard, so a search for one decade only goes to
+# the shard that has it. SHARD_BY=hash spreads the movies evenly instead (every query goes everywhere).
+#
+# Recommendations are what this is for - they score every movie, so N cores do it ~N times faster.
+# /search only goes to the shards with SHARD_SEARCHES=1: the search index already answers in tens of
+# microseconds, less than one round trip to a worker (see `python bench.py shards`). Searches without
+# a genre or decade are just the first ranks, those never leave this process either way.
+#
+# This process keeps the normal indexes too - if the workers die or get shut down by a reload
+# while a request is still running, that request just gets answered here the normal way.
+# Each server process gets its own shards, so this is meant for one big process, not gunicorn -w 8.
+
+CATALOG_SHARDS = int(os.environ.get("CATALOG_SHARDS", 0))  # 0 or 1 = everything in this process
+SHARD_BY = os.environ.get("SHARD_BY", "decade")            # "decade" or "hash"
+SHARD_SEARCHES = os.environ.get("SHARD_SEARCHES") == "1"   # /search on the shards too, not just recommendations
+SHARD_TIMEOUT = 10.0  # seconds to wait on a shard before answering here instead
+
+SHARD_MODES = ("decade", "hash")
+
+# glibc malloc settings for the shard workers (see _keep_scratch_memory)
+M_TRIM_THRESHOLD = -1
+M_MMAP_THRESHOLD = -3
+SCRATCH_BYTES = 32 * 1024 * 1024  # biggest array that still comes from the heap (the most glibc allows)
+
+
+def start_partitions(catalog, search_index, recommendation_cache, shards=None, by=None):
+    """A PartitionedCatalog if CATALOG_SHARDS (or shards) is more than 1, else None - also None if the workers wont start"""
+    shards = CATALOG_SHARDS if shards is None else shards
+    if shards <= 1 or catalog.size == 0:
+        return None
+    try:
+        return PartitionedCatalog(catalog, search_index, recommendation_cache, shards, by)
+    except (OSError, RuntimeError) as e:
+        event(log, "shards_failed", level=logging.ERROR, exc_info=True, error=str(e))
+        print(f"⚠️ Could not start the catalog shards ({e}), everything runs in this process.")
+        return None
+
+
+def partition(catalog, shards, by="decade"):
+    """
+    Shard number of every movie + which shard each decade is on (only for by="decade").
+    Decades go biggest first to the emptiest shard, so the shards come out about the same size
+    """
+    if by not in SHARD_MODES:
+        raise ValueError(f"SHARD_BY should be one of {', '.join(SHARD_MODES)}, not {by!r}")
+    codes = np.asarray(catalog.decade_codes)
+    if by == "hash":
+        # Fibonacci hashing of the row number - neighbours end up on different shards
+        hashed = (np.arange(catalog.size, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+        return (hashed % np.uint64(shards)).astype(np.int32), None
+
+    sizes = np.bincount(codes, minlength=len(catalog.decades))
+    load = np.zeros(shards, dtype=np.int64)
+    shard_of_code = np.zeros(len(catalog.decades), dtype=np.int32)
+    for code in np.argsort(-sizes, kind='stable').tolist():
+        shard = int(np.argmin(load))
+        shard_of_code[code] = shard
+        load[shard] += sizes[code]
+    decade_shard = {int(catalog.decades[code]): int(shard_of_code[code]) for code in range(len(catalog.decades))}
+    return shard_of_code[codes], decade_shard
+
+
+def shard_arrays(catalog, search_index, shard_of_row, shards):
+    """(arrays, meta) for each shard - just what SearchIndex + ScoringEngine read, for its own movies"""
+    rank_of_row = np.empty(catalog.size, dtype=np.int64)
+    rank_of_row[np.asarray(search_index.order)] = np.arange(catalog.size, dtype=np.int64)
+    # Stable, so each shard's rows stay in catalog order
+    by_shard = np.argsort(shard_of_row, kind='stable')
+    ends = np.cumsum(np.bincount(shard_of_row, minlength=shards))
+    meta = {'genre_names': list(catalog.genre_names), 'decades': [int(d) for d in catalog.decades]}
+    pieces = []
+    for start, end in zip(np.concatenate(([0], ends[:-1])).tolist(), ends.tolist()):
+        rows = by_shard[start:end].astype(np.int64)
+        pieces.append(({
+            'rows': rows,
+            'ranks': rank_of_row[rows],
+            'ratings': np.asarray(catalog.ratings)[rows],
+            'clean_ratings': np.asarray(catalog.clean_ratings)[rows],
+            'genre_masks': np.asarray(catalog.genre_masks)[rows],
+            'decade_codes': np.asarray(catalog.decade_codes)[rows],
+        }, meta))
+    return pieces
+
+
+class ShardCatalog:
+    """Stands in for a compact.Catalog with just the arrays SearchIndex + ScoringEngine read"""
+
+    def __init__(self, arrays, meta):
+        self.size = len(arrays['rows'])
+        self.ratings = arrays['ratings']
+        self.clean_ratings = arrays['clean_ratings']
+        self.genre_masks = arrays['genre_masks']
+        self.decade_codes = arrays['decade_codes']
+        self.genre_names = meta['genre_names']
+        self.decades = np.asarray(meta['decades'], dtype=np.int64)
+        self._decade_code = {d: i for i, d in enumerate(meta['decades'])}
+        self.prebuilt = {}
+
+    def decade_code(self, decade):
+        return self._decade_code.get(int(decade))
+
+
+class Shard:
+    """One shard, living in a worker process - answers in catalog rows / ranks, not its own"""
+
+    def __init__(self, arrays, meta):
+        self.rows = arrays['rows']    # catalog row of each of its movies (going up)
+        self.ranks = arrays['ranks']  # ...and its rank in the whole catalog's search index
+        catalog = ShardCatalog(arrays, meta)
+        self.search_index = SearchIndex(catalog)
+        self.engine = ScoringEngine(catalog)
+        self.cache = RecommendationCache(self.engine)
+        # Catalog rank of each of our ranks - goes up too, we sort our movies the same way
+        self.rank_by_local_rank = self.ranks[np.asarray(self.search_index.order)]
+
+    def size(self):
+        return len(self.rows)
+
+    def search_page(self, genre, decade, min_rating, limit, after):
+        """(catalog ranks of our next `limit` matches after catalog rank `after`, more after those?)"""
+        local_after = int(np.searchsorted(self.rank_by_local_rank, after, side='right')) - 1
+        rows, _, more = self.search_index.search_page(genre, decade, min_rating, limit, local_after)
+        return self.ranks[rows].tolist(), more
+
+    def search_many(self, queries, limit):
+        return [self.ranks[rows].tolist() for rows in self.search_index.search_many(queries, limit)]
+
+    def recommend(self, top_genres, top_decades, avg_pref_rating, limit, user_id):
+        """
+        Our best `limit` as (-score, -rating, catalog row, score) - sorted, ready for the heap merge -
+        and whether it came out of the cache
+        """
+        engine = self.engine
+        if user_id is None:
+            scores = engine.scores(top_genres, top_decades, avg_pref_rating)
+            rows = engine.top_k(scores, limit)
+            scores, hit = scores[rows], False
+        else:
+            hits = self.cache.hits
+            rows, scores = self.cache.top_k(user_id, top_genres, top_decades, avg_pref_rating, limit)
+            hit = self.cache.hits > hits
+        # Same sort key as ScoringEngine.top_k (NaN scores last), the catalog row breaks ties
+        score_key = np.where(np.isnan(scores), -np.inf, scores)
+        entries = list(zip((-score_key).tolist(), (-engine._rating_key[rows]).tolist(),
+                           self.rows[rows].tolist(), scores.tolist()))
+        return entries, hit
+
+    def clear(self, user_id=None):
+        self.cache.clear(user_id)
+
+
+# The shard this worker process owns (set by the pool initializer)
+_shard = None
+
+
+def _keep_scratch_memory():
+    """
+    Scoring makes a few catalog sized temporary arrays per query. In a fresh process glibc gives each
+    one back to the OS when its freed and the next query page faults it all in again, which made a
+    shard ~1.6x slower than the same code in the server process. Keeping freed memory around fixes that
+    """
+    try:
+        import ctypes
+        libc = ctypes.CDLL("libc.so.6")
+    except OSError:
+        return  # not glibc (macOS, musl...) - nothing to tune
+    libc.mallopt(M_MMAP_THRESHOLD, SCRATCH_BYTES)
+    libc.mallopt(M_TRIM_THRESHOLD, 16 * SCRATCH_BYTES)
+
+
+def _start_shard(arrays, meta):
+    global _shard
+    _keep_scratch_memory()
+    _shard = Shard(arrays, meta)
+
+
+def _call(method, *args):
+    return getattr(_shard, method)(*args)
+
+
+class PartitionedCatalog:
+    """The shards of one catalog version + scatter/gather over them (search_index / cache are this process's own)"""
+
+    def __init__(self, catalog, search_index, recommendation_cache, shards=None, by=None, searches=None):
+        shards = CATALOG_SHARDS if shards is None else shards
+        self.by = by or SHARD_BY
+        self.searches = SHARD_SEARCHES if searches is None else searches
+        self.search_index = search_index
+        self.cache = recommendation_cache
+        self.closed = False
+        self.hits = 0
+        self.misses = 0
+
+        shard_of_row, decade_shard = partition(catalog, shards, self.by)
+        pieces = shard_arrays(catalog, search_index, shard_of_row, shards)
+        # Less decades than shards? Then some shards are empty - no worker for those
+        used = [shard for shard, (arrays, _) in enumerate(pieces) if len(arrays['rows'])]
+        number = {shard: i for i, shard in enumerate(used)}
+        self.decade_shard = ({d: number[s] for d, s in decade_shard.items() if s in number}
+                             if decade_shard is not None else None)
+        self.sizes = [len(pieces[shard][0]['rows']) for shard in used]
+
+        # spawn, not fork - the server has threads running (log writer, poster warmup...) by now
+        context = multiprocessing.get_context("spawn")
+        self._pools = [ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_start_shard,
+                                           initargs=pieces[shard]) for shard in used]
+        del pieces
+        # Wait for every shard to have built its indexes, so the first requests dont pay for it
+        if self._gather([(shard, 'size', ()) for shard in range(len(self._pools))], timeout=None) is None:
+            raise RuntimeError("Catalog shards failed to start")
+        event(log, "shards_started", shards=len(self._pools), by=self.by, sizes=self.sizes, searches=self.searches)
+
+    @property
+    def shards(self):
+        return 0 if self.closed else len(self._pools)
+
+    def _targets(self, decade):
+        """Shards that can have movies from this decade (all of them unless theyre split by decade)"""
+        if decade is None or self.decade_shard is None:
+            return range(len(self._pools))
+        shard = self.decade_shard.get(int(decade))
+        return [shard] if shard is not None else []
+
+    def _gather(self, calls, timeout=SHARD_TIMEOUT):
+        """Runs (shard, method, args) on all those shards at once, results in the same order - None = answer it here"""
+        if self.closed:
+            return None
+        try:
+            futures = [self._pools[shard].submit(_call, method, *args) for shard, method, args in calls]
+        except RuntimeError:
+            return None  # shut down by a reload while this request was running (or a worker died)
+        try:
+            return [future.result(timeout) for future in futures]
+        except BrokenExecutor as e:
+            event(log, "shards_failed", level=logging.ERROR, error=str(e))
+            self.close()
+            return None
+        except ShardTimeout:
+            event(log, "shard_timeout", level=logging.WARNING, seconds=timeout)
+            return None
+
+    # --- /search (same as the SearchIndex methods) ---
+
+    def search(self, genre=None, decade=None, min_rating=0, limit=10):
+        return self.search_page(genre, decade, min_rating, limit)[0]
+
+    def search_page(self, genre=None, decade=None, min_rating=0, limit=10, after=-1):
+        if not self.searches or (genre is None and decade is None) or limit <= 0:
+            return self.search_index.search_page(genre, decade, min_rating, limit, after)
+        results = self._gather([(shard, 'search_page', (genre, decade, min_rating, limit, after))
+                                for shard in self._targets(decade)])
+        if results is None:
+            return self.search_index.search_page(genre, decade, min_rating, limit, after)
+        ranks = list(itertools.islice(heapq.merge(*(shard_ranks for shard_ranks, _ in results)), limit + 1))
+        more = len(ranks) > limit or any(shard_more for _, shard_more in results)
+        ranks = np.array(ranks[:limit], dtype=np.int64)
+        return np.asarray(self.search_index.order)[ranks], (int(ranks[-1]) if len(ranks) else after), more
+
+    def search_many(self, queries, limit=10):
+        if not self.searches:
+            return self.search_index.search_many(queries, limit)
+        # Each shard gets the queries it can answer in one go, then every query gets its lists merged
+        targets = {}
+        local = []
+        for i, (genre, decade, _) in enumerate(queries):
+            if genre is None and decade is None:
+                local.append(i)
+                continue
+            for shard in self._targets(decade):
+                targets.setdefault(shard, []).append(i)
+        results = self._gather([(shard, 'search_many', ([queries[i] for i in members], limit))
+                                for shard, members in targets.items()])
+        if results is None:
+            return self.search_index.search_many(queries, limit)
+
+        lists = [[] for _ in queries]
+        for members, shard_lists in zip(targets.values(), results):
+            for i, shard_ranks in zip(members, shard_lists):
+                lists[i].append(shard_ranks)
+        order = np.asarray(self.search_index.order)
+        answers = [order[np.array(list(itertools.islice(heapq.merge(*shard_lists), limit)), dtype=np.int64)]
+                   for shard_lists in lists]
+        if local:
+            for i, rows in zip(local, self.search_index.search_many([queries[i] for i in local], limit)):
+                answers[i] = rows
+        return answers
+
+    # --- /recommendations ---
+
+    def recommend(self, top_genres, top_decades, avg_pref_rating, limit=6, user_id=None):
+        """
+        (row positions, scores) of the best `limit` movies - RecommendationCache.top_k() with a user id
+        (every shard keeps the cache for its own movies), a fresh scoring without
+        """
+        results = self._gather([(shard, 'recommend', (list(top_genres), list(top_decades), avg_pref_rating,
+                                                      limit, user_id))
+                                for shard in range(len(self._pools))])
+        if results is None:
+            if user_id is not None:
+                return self.cache.top_k(user_id, top_genres, top_decades, avg_pref_rating, limit)
+            engine = self.cache.engine
+            scores = engine.scores(top_genres, top_decades, avg_pref_rating)
+            top_rows = engine.top_k(scores, limit)
+            return top_rows, scores[top_rows]
+
+        if user_id is not None:
+            if all(hit for _, hit in results):
+                self.hits += 1
+            else:
+                self.misses += 1
+        best = list(itertools.islice(heapq.merge(*(entries for entries, _ in results)), max(limit, 0)))
+        return (np.array([entry[2] for entry in best], dtype=np.int64),
+                np.array([entry[3] for entry in best], dtype=np.float64))
+
+    def clear(self, user_id=None):
+        self._gather([(shard, 'clear', (user_id,)) for shard in range(len(self._pools))])
+
+    def close(self):
+        """Stops the workers - anything still asking after this gets answered in this process"""
+        self.closed = True
+        for pool in self._pools:
+            pool.shutdown(wait=False, cancel_futures=True)
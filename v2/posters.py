@@ -0,0 +1,509 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import event
+from metrics import POSTER_LOOKUPS
+
+log = logging.getLogger("movies.posters")
+
+# --- High quality posters from OMDB ---
+# The dataset posters are tiny and blurry so we ask OMDB for better ones.
+# Used to be one blocking request per movie (10 movies = up to 30s if OMDB is slow)
+# with an lru_cache that forgot everything on restart and remembered failures forever.
+# Now:
+#   - all the lookups for a page of results run at the same time (small thread pool)
+#   - one shared requests.Session so connections get reused (requests/httpx get imported on the
+#     first lookup, the app shouldnt pay ~0.1s each at import for something it might never call)
+#   - results go in a sqlite file so they survive restarts, and both found + not found
+#     answers expire after a while so we eventually retry
+
+# Point this somewhere else (like a local stub server) for testing
+OMDB_URL = os.environ.get("OMDB_URL", "http://www.omdbapi.com/")
+POSTER_CACHE_FILE = os.environ.get(
+    "POSTER_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "poster_cache.sqlite3")
+)
+
+HIT_TTL = 30 * 24 * 3600   # found a poster -> keep it for a month
+MISS_TTL = 24 * 3600       # OMDB said no poster -> try again tomorrow
+REQUEST_TIMEOUT = 3        # seconds, same as before
+MAX_WORKERS = 8            # how many OMDB calls can run at once
+ASYNC_MAX_FETCHES = 64     # same for the async server - no thread per call there, so it can be higher
+WARMUP_RATE = 5.0          # OMDB calls per second for the warmup job (free keys have a daily limit!)
+WARMUP_BATCH = 50          # save results + checkpoint every this many movies
+WARMUP_WORKERS = 2         # the warmup's own OMDB threads, so it never takes the ones /search pages wait on
+
+
+def poster_key(title, year):
+    """Cache key for a movie - (title, year) with the year as a plain int"""
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        year = 0
+    return (str(title), year)
+
+
+class PosterStore:
+    """sqlite backed poster cache. A NULL poster means OMDB didnt have one (a cached miss)"""
+
+    def __init__(self, path=POSTER_CACHE_FILE, hit_ttl=HIT_TTL, miss_ttl=MISS_TTL):
+        self.path = path
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            # WAL lets several server processes read while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS posters ("
+                " title TEXT NOT NULL, year INTEGER NOT NULL, poster TEXT, fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (title, year))"
+            )
+            # Where the warmup job got to, so it can pick up again after a crash/restart.
+            # signature = which list of movies that position is in (see keys_signature)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " name TEXT PRIMARY KEY, position INTEGER NOT NULL, total INTEGER NOT NULL, updated_at REAL NOT NULL,"
+                " signature TEXT)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(checkpoints)")]
+            if "signature" not in columns:  # cache file from before signatures - its checkpoints just wont match
+                self._conn.execute("ALTER TABLE checkpoints ADD COLUMN signature TEXT")
+
+    def _is_fresh(self, poster, fetched_at, now):
+        ttl = self.hit_ttl if poster is not None else self.miss_ttl
+        return now - fetched_at < ttl
+
+    def get_many(self, keys):
+        """
+        Fresh cache entries for these keys as {key: poster_or_None}
+        Keys that are missing or expired are just left out
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._lock:
+            # sqlite has a limit on how many ? we can use so go in batches
+            for i in range(0, len(keys), 400):
+                batch = keys[i:i + 400]
+                where = " OR ".join(["(title = ? AND year = ?)"] * len(batch))
+                params = [v for key in batch for v in key]
+                rows = self._conn.execute(
+                    f"SELECT title, year, poster, fetched_at FROM posters WHERE {where}", params
+                ).fetchall()
+                for title, year, poster, fetched_at in rows:
+                    if self._is_fresh(poster, fetched_at, now):
+                        found[(title, year)] = poster
+        return found
+
+    def put_many(self, results):
+        """Save {key: poster_or_None} in one transaction"""
+        if not results:
+            return
+        now = time.time()
+        rows = [(title, year, poster, now) for (title, year), poster in results.items()]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO posters VALUES (?, ?, ?, ?)", rows)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM posters")
+            self._conn.execute("DELETE FROM checkpoints")
+
+    def get_checkpoint(self, name, total, signature):
+        """
+        Saved position for a warmup run, or 0 if there is none or it was for another list of movies -
+        the same number of movies isnt enough, a reloaded catalog can have as many but different ones
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT position, total, signature FROM checkpoints WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None or row[1] != total or row[2] != signature:
+            return 0
+        return row[0]
+
+    def set_checkpoint(self, name, position, total, signature):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, position, total, updated_at, signature) VALUES (?, ?, ?, ?, ?)",
+                (name, position, total, time.time(), signature)
+            )
+
+
+class PosterEnricher:
+    """Looks up posters for a whole page of movies at once - cache first, then OMDB in parallel"""
+
+    def __init__(self, api_key, store=None, omdb_url=OMDB_URL, max_workers=MAX_WORKERS,
+                 timeout=REQUEST_TIMEOUT, cache_only=False):
+        self.api_key = api_key
+        # cache_only = never call OMDB while serving, just use whatever the warmup job saved
+        self.cache_only = cache_only
+        self.omdb_url = omdb_url
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._store = store
+        self._store_lock = threading.Lock()
+        self._session = None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="omdb")
+
+    @property
+    def enabled(self):
+        return bool(self.api_key) and self.api_key != "YOUR_API_KEY_HERE"
+
+    @property
+    def store(self):
+        # Opened on first use so just importing the app doesnt create the sqlite file
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = PosterStore()
+        return self._store
+
+    @property
+    def session(self):
+        # One session for everything so we keep connections to OMDB open between requests
+        # (made on first use too, same as the store)
+        if self._session is None:
+            with self._store_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    # room for the warmup's threads too (PosterWarmer), they share the session
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers + WARMUP_WORKERS)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def fetch(self, title, year):
+        """
+        Ask OMDB for one poster. Returns (ok, poster) - ok is False if the request itself
+        failed (timeout, network, bad json) so we know not to cache that answer
+        """
+        import requests
+        try:
+            response = self.session.get(self.omdb_url, params=self.params(title, year), timeout=self.timeout)
+            data = response.json()
+        except requests.Timeout:
+            return self.failed("timeout", title, year)
+        except Exception as e:
+            return self.failed("error", title, year, e)
+        return self.poster_from(data)
+
+    def params(self, title, year):
+        # Clean up the title - remove quotes that break the API
+        clean_title = str(title).replace("'", "").replace('"', '')
+        return {"t": clean_title, "y": int(year), "apikey": self.api_key}
+
+    def failed(self, result, title, year, error=None):
+        POSTER_LOOKUPS.inc(result)
+        if error is None:
+            event(log, f"poster_{result}", level=logging.WARNING, title=str(title), year=year)
+        else:
+            event(log, f"poster_{result}", level=logging.WARNING, title=str(title), year=year, error=str(error))
+        return False, None
+
+    def poster_from(self, data):
+        """(ok, poster) from an OMDB answer"""
+        if data.get('Response') == 'True' and data.get('Poster') not in (None, '', 'N/A'):
+            POSTER_LOOKUPS.inc("found")
+            return True, data['Poster']
+        POSTER_LOOKUPS.inc("not_found")
+        return True, None
+
+    def lookup(self, keys):
+        """
+        {key: poster_or_None} for all keys - cached answers first, the rest fetched in parallel.
+        Keys we got no answer for (the OMDB call failed, or cache_only and its not cached) are left out
+        """
+        keys = list(dict.fromkeys(keys))
+        posters = self.store.get_many(keys)
+        missing = [key for key in keys if key not in posters]
+        POSTER_LOOKUPS.inc("hit", amount=len(posters))
+        POSTER_LOOKUPS.inc("miss", amount=len(missing))
+        if not missing or self.cache_only:
+            return posters
+
+        fetched = {}
+        for key, (ok, poster) in zip(missing, self.executor.map(lambda k: self.fetch(*k), missing)):
+            if ok:
+                posters[key] = fetched[key] = poster
+        self.store.put_many(fetched)
+        return posters
+
+    def posters_for(self, keys):
+        """HQ poster (or None) for each key in order, or None for all of them if theres no API key"""
+        return self.resolve(keys)[0]
+
+    def resolve(self, keys):
+        """
+        (posters_for(keys), complete) - complete is False if some of them got no answer (failed or
+        cache_only), so whatever gets built with these posters shouldnt be kept around
+        """
+        if not self.enabled or not keys:
+            return None, True
+        posters = self.lookup(keys)
+        return [posters.get(key) for key in keys], all(key in posters for key in keys)
+
+    def cached_posters_for(self, keys):
+        """Like posters_for() but only whats already in the cache - never waits on OMDB"""
+        if not self.enabled or not keys:
+            return None
+        posters = self.store.get_many(keys)
+        return [posters.get(key) for key in keys]
+
+    def enrich(self, movies):
+        """Swap in the high quality Poster_Link for every movie dict that has one (in place)"""
+        keys = [poster_key(m.get('Series_Title', ''), m.get('Released_Year', 2000)) for m in movies]
+        for movie, poster in zip(movies, self.posters_for(keys) or []):
+            if poster:
+                movie['Poster_Link'] = poster
+        return movies
+
+
+# --- Async version for asgi.py ---
+# In the normal server every request that waits on OMDB holds a thread, so a slow OMDB
+# uses up all the threads and even /filters has to queue behind it. Here the waiting is
+# just a paused coroutine, so any number of requests can wait without blocking anything.
+# On top of that, if several requests want the same poster at the same time only the
+# first one actually calls OMDB and the rest wait for its answer.
+
+class AsyncPosterEnricher:
+    """Same lookups as PosterEnricher (same cache, same settings) but with httpx + asyncio"""
+
+    def __init__(self, enricher, max_fetches=ASYNC_MAX_FETCHES):
+        # httpx is only needed for the async server (asgi.py), the normal one works without it
+        try:
+            import httpx
+        except ImportError:
+            raise RuntimeError("The async server needs httpx (pip install httpx)") from None
+        self._httpx = httpx
+        self.enricher = enricher
+        self.max_fetches = max_fetches
+        self._client = None
+        self._limit = None
+        self._inflight = {}  # key -> task fetching it right now
+
+    @property
+    def enabled(self):
+        return self.enricher.enabled
+
+    def _start(self):
+        # Made on first use so they belong to the event loop thats actually running
+        if self._client is None:
+            limits = self._httpx.Limits(max_connections=self.max_fetches, max_keepalive_connections=self.max_fetches)
+            self._client = self._httpx.AsyncClient(timeout=self.enricher.timeout, limits=limits)
+            self._limit = asyncio.Semaphore(self.max_fetches)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, title, year):
+        """Ask OMDB for one poster, returns (ok, poster) like PosterEnricher.fetch"""
+        enricher = self.enricher
+        try:
+            async with self._limit:
+                response = await self._client.get(enricher.omdb_url, params=enricher.params(title, year))
+            data = response.json()
+        except self._httpx.TimeoutException:
+            return enricher.failed("timeout", title, year)
+        except Exception as e:
+            return enricher.failed("error", title, year, e)
+        return enricher.poster_from(data)
+
+    def _fetch_shared(self, key):
+        """(task, True if we started it) - joins the fetch thats already running for this key if there is one"""
+        task = self._inflight.get(key)
+        if task is not None:
+            POSTER_LOOKUPS.inc("deduped")
+            return task, False
+        task = asyncio.ensure_future(self.fetch(*key))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task, True
+
+    async def lookup(self, keys):
+        """{key: poster_or_None} for all keys - cache first (sqlite runs in a thread), then OMDB (failed ones left out)"""
+        loop = asyncio.get_running_loop()
+        store = self.enricher.store
+        keys = list(dict.fromkeys(keys))
+        posters = await loop.run_in_executor(None, store.get_many, keys)
+        missing = [key for key in keys if key not in posters]
+        POSTER_LOOKUPS.inc("hit", amount=len(posters))
+        POSTER_LOOKUPS.inc("miss", amount=len(missing))
+        if not missing or self.enricher.cache_only:
+            return posters
+
+        self._start()
+        shared = [self._fetch_shared(key) for key in missing]
+        # shield = if this request goes away (client hung up) the fetch keeps going for the others
+        results = await asyncio.gather(*(asyncio.shield(task) for task, _ in shared))
+        fetched = {}
+        for key, (_, started), (ok, poster) in zip(missing, shared, results):
+            if ok:
+                posters[key] = poster
+                if started:  # whoever started the fetch saves it
+                    fetched[key] = poster
+        if fetched:
+            await loop.run_in_executor(None, store.put_many, fetched)
+        return posters
+
+    async def posters_for(self, keys):
+        """HQ poster (or None) for each key in order, or None if theres no API key"""
+        return (await self.resolve(keys))[0]
+
+    async def resolve(self, keys):
+        """(posters_for(keys), complete) - see PosterEnricher.resolve()"""
+        if not self.enabled or not keys:
+            return None, True
+        posters = await self.lookup(keys)
+        return [posters.get(key) for key in keys], all(key in posters for key in keys)
+
+
+# --- Warmup job ---
+# Goes through the whole catalog ahead of time and saves every poster in the store,
+# so once its done the server can run with cache_only=True and never wait on OMDB.
+# Run it offline with `python posters.py warm` or in the background with PosterWarmer.start()
+
+def catalog_keys(catalog):
+    """Unique (title, year) keys for every movie in the catalog, in catalog order"""
+    keys = (poster_key(t, y) for t, y in zip(catalog.titles.to_list(), catalog.years.tolist()))
+    return list(dict.fromkeys(keys))
+
+
+def keys_signature(keys):
+    """Hash of a list of poster keys (order included) - tells a checkpoint which list its a position in"""
+    digest = hashlib.sha1()
+    for title, year in keys:
+        digest.update(f"{title}\t{year}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PosterWarmer:
+    """Fetches posters for a list of movies at a fixed rate, saving progress as it goes"""
+
+    def __init__(self, enricher, rate=WARMUP_RATE, batch_size=WARMUP_BATCH, checkpoint_name="catalog",
+                 workers=WARMUP_WORKERS):
+        self.enricher = enricher
+        self.rate = rate
+        self.batch_size = batch_size
+        self.checkpoint_name = checkpoint_name
+        # Not the enricher's pool - a batch of warmup calls there would make live /search lookups queue behind it
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="omdb-warmup")
+        self.stats = {"total": 0, "done": 0, "cached": 0, "found": 0, "not_found": 0, "failed": 0}
+        self.running = False
+        self._stop = threading.Event()
+
+    def run(self, keys, resume=True, report=print):
+        """Warm the store for these keys - returns the final counts"""
+        store = self.enricher.store
+        total = len(keys)
+        signature = keys_signature(keys)
+        start = store.get_checkpoint(self.checkpoint_name, total, signature) if resume else 0
+        self.stats = {"total": total, "done": start, "cached": 0, "found": 0, "not_found": 0, "failed": 0}
+        self.running = True
+        self._stop.clear()
+        interval = 1.0 / self.rate if self.rate > 0 else 0
+        next_call = time.monotonic()
+
+        try:
+            for i in range(start, total, self.batch_size):
+                if self._stop.is_set():
+                    break
+                batch = keys[i:i + self.batch_size]
+
+                # Anything already fresh in the store doesnt need a call
+                cached = store.get_many(batch)
+                self.stats["cached"] += len(cached)
+
+                futures = []
+                for key in batch:
+                    if key in cached:
+                        continue
+                    # Simple rate limit - wait for our slot before sending the next request
+                    delay = next_call - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_call = max(next_call, time.monotonic()) + interval
+                    futures.append((key, self.executor.submit(self.enricher.fetch, *key)))
+
+                fetched = {}
+                for key, future in futures:
+                    ok, poster = future.result()
+                    if not ok:
+                        self.stats["failed"] += 1
+                        continue
+                    fetched[key] = poster
+                    self.stats["found" if poster else "not_found"] += 1
+
+                store.put_many(fetched)
+                self.stats["done"] = i + len(batch)
+                store.set_checkpoint(self.checkpoint_name, self.stats["done"], total, signature)
+                if report:
+                    report(self.progress())
+        finally:
+            self.running = False
+        return dict(self.stats)
+
+    def progress(self):
+        s = self.stats
+        pct = 100.0 * s["done"] / s["total"] if s["total"] else 100.0
+        return (f"🖼️ Poster warmup {s['done']}/{s['total']} ({pct:.1f}%) - "
+                f"cached {s['cached']}, found {s['found']}, no poster {s['not_found']}, failed {s['failed']}")
+
+    def start(self, keys, resume=True, report=print):
+        """Run the warmup in a background thread"""
+        thread = threading.Thread(target=self.run, args=(keys, resume, report), daemon=True, name="poster-warmup")
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def coverage(store, keys):
+    """How much of the catalog the store already covers: {total, found, not_found, missing}"""
+    cached = store.get_many(keys)
+    found = sum(1 for poster in cached.values() if poster)
+    return {
+        "total": len(keys),
+        "found": found,
+        "not_found": len(cached) - found,
+        "missing": len(keys) - len(cached),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fill the poster cache for the whole catalog")
+    parser.add_argument("command", choices=["warm", "status"])
+    parser.add_argument("--rate", type=float, default=WARMUP_RATE, help="max OMDB calls per second")
+    parser.add_argument("--batch-size", type=int, default=WARMUP_BATCH)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    from catalog import load_catalog
+    keys = catalog_keys(load_catalog())
+    enricher = PosterEnricher(os.environ.get("OMDB_API_KEY", "YOUR_API_KEY_HERE"))
+
+    if args.command == "warm":
+        if not enricher.enabled:
+            raise SystemExit("Set OMDB_API_KEY first")
+        PosterWarmer(enricher, rate=args.rate, batch_size=args.batch_size).run(keys, resume=not args.restart)
+
+    c = coverage(enricher.store, keys)
+    pct = 100.0 * (c["found"] + c["not_found"]) / c["total"] if c["total"] else 100.0
+    print(f"Poster cache covers {pct:.1f}% of the catalog: {c}")
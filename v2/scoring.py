@@ -0,0 +1,237 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from compact import count_genres, exact_float64, genre_mask, has_genre
+
+# --- Vectorized recommendation scoring ---
+# The old version ran a python function on every single row (split the genre
+# string, build two sets, etc) on every /recommendations call which got slow fast.
+# Now we do all the string stuff ONCE when the catalog loads and keep plain
+# numpy arrays around, so scoring is just a few array ops.
+
+
+class ScoringEngine:
+    """
+    Holds the precomputed arrays for a catalog and scores every movie at once
+    Formula is the same as before: Score = (GenreMatch * 3) + (DecadeMatch * 2) + (RatingPref * 2) + (BaseBoost * 0.5)
+    """
+
+    # The arrays below get saved with the catalog snapshot (see catalog.py), so server
+    # processes started after that just map them instead of each doing the sorts again
+    SHARED_ARRAYS = ('clean_ratings', 'ratings', 'base_boost', '_rating_key',
+                     'rating_order', 'clean_order', 'clean_sorted')
+
+    def __init__(self, catalog):
+        self.size = catalog.size
+
+        # Genres are one bitmask per movie (see compact.py) - "Action,Crime,Drama" has the
+        # Action, Crime and Drama bits set, so "how many of these genres" is a popcount
+        self.genres = catalog.genre_names
+        self.genre_ids = {g: i for i, g in enumerate(self.genres)}
+        self.genre_masks = catalog.genre_masks
+
+        # Decades are small codes, decade = catalog.decades[code]
+        self.catalog = catalog
+        self.decade_codes = catalog.decade_codes
+
+        # Which rows belong to each genre/decade - filled in lazily by genre_rows()/decade_rows()
+        self._genre_rows = {}
+        self._decade_rows = {}
+
+        shared = catalog.prebuilt.get('scoring')
+        if shared is not None:
+            arrays, _ = shared
+            for name in self.SHARED_ARRAYS:
+                setattr(self, name, arrays[name])
+            return
+
+        # float32 in the catalog, but the score math (and its output) needs the exact values
+        self.clean_ratings = np.asarray(catalog.clean_ratings, dtype=np.float64)
+        self.ratings = exact_float64(catalog.ratings)
+
+        # Small boost for highly rated movies - this part never changes so do it now
+        self.base_boost = (self.ratings / 10.0) * 0.5
+
+        # Used for the tiebreak - NaN ratings go to the very bottom like pandas does
+        self._rating_key = np.where(np.isnan(self.ratings), -np.inf, self.ratings)
+
+        # Best rated first (stable, so equal ratings keep catalog order)
+        self.rating_order = np.argsort(-self._rating_key, kind='stable')
+
+        # Clean ratings sorted low -> high, so "which movies are between rating X and Y" is a binary search
+        self.clean_order = np.argsort(self.clean_ratings, kind='stable')
+        self.clean_sorted = self.clean_ratings[self.clean_order]
+
+    def shared_arrays(self):
+        """(arrays, meta) for the snapshot - see SHARED_ARRAYS"""
+        return {name: getattr(self, name) for name in self.SHARED_ARRAYS}, {}
+
+    def _genre_mask(self, genres):
+        return genre_mask(self.genre_masks, [self.genre_ids[g] for g in set(genres) if g in self.genre_ids])
+
+    def _decade_code_list(self, decades):
+        codes = (self.catalog.decade_code(d) for d in decades)
+        return [c for c in codes if c is not None]
+
+    def genre_rows(self, genre):
+        """Row positions of every movie with this genre"""
+        if genre not in self._genre_rows:
+            mask = self._genre_mask([genre])
+            rows = np.flatnonzero(has_genre(self.genre_masks, mask)) if mask.any() else np.empty(0, dtype=np.int64)
+            self._genre_rows[genre] = rows
+        return self._genre_rows[genre]
+
+    def decade_rows(self, decade):
+        """Row positions of every movie from this decade"""
+        if decade not in self._decade_rows:
+            code = self.catalog.decade_code(decade)
+            rows = np.flatnonzero(self.decade_codes == code) if code is not None else np.empty(0, dtype=np.int64)
+            self._decade_rows[decade] = rows
+        return self._decade_rows[decade]
+
+    def rating_band_rows(self, low, high):
+        """Row positions of movies with low <= clean_rating < high"""
+        start = np.searchsorted(self.clean_sorted, low, side='left')
+        end = np.searchsorted(self.clean_sorted, high, side='left')
+        return self.clean_order[start:end]
+
+    def int_scores(self, top_genres, top_decades, avg_pref_rating):
+        """The whole-number part of the score (genre + decade + rating pref) for every movie"""
+        mask = self._genre_mask(top_genres)
+        if mask.any():
+            # popcount of the shared bits = how many of the top genres the movie has
+            genre_matches = count_genres(self.genre_masks, mask)
+        else:
+            genre_matches = np.zeros(self.size, dtype=np.int64)
+
+        decade_match = np.isin(self.decade_codes, self._decade_code_list(top_decades))
+        rating_pref = self.clean_ratings >= avg_pref_rating
+        return genre_matches * 3 + decade_match * 2 + rating_pref * 2
+
+    def scores(self, top_genres, top_decades, avg_pref_rating):
+        """Score for every movie in the catalog as one float array"""
+        # Integer part first then add the float boost - same order of operations
+        # as the old row-by-row version so the floats come out identical
+        return self.int_scores(top_genres, top_decades, avg_pref_rating) + self.base_boost
+
+    def top_k(self, scores, limit=6):
+        """
+        Row positions of the best `limit` scores, ordered by score then IMDB_Rating
+        (ties after that keep catalog order, exactly like the old sort_values)
+        """
+        if limit <= 0 or self.size == 0:
+            return np.empty(0, dtype=np.int64)
+
+        score_key = np.where(np.isnan(scores), -np.inf, scores)
+
+        if limit < self.size:
+            # argpartition finds the k-th best score without sorting everything,
+            # then we keep anything tied with it so the tiebreak still works
+            kth = np.argpartition(-score_key, limit - 1)[limit - 1]
+            candidates = np.flatnonzero(score_key >= score_key[kth])
+        else:
+            candidates = np.arange(self.size)
+
+        # lexsort uses the LAST key as the primary one and is stable
+        order = np.lexsort((-self._rating_key[candidates], -score_key[candidates]))
+        return candidates[order][:limit]
+
+    def top_rated(self, limit=6):
+        """Row positions of the highest rated movies (used when there is no profile yet)"""
+        return self.rating_order[:max(limit, 0)]
+
+
+# --- Per-user recommendation cache ---
+# The score only depends on three things: the top 3 genres, the top 2 decades and the
+# average rating. Most searches dont change any of them (Drama just goes from 5 to 6 searches),
+# so we remember the last answer per user and hand it straight back if nothing moved.
+# When something did move we only touch the movies it affects - e.g. a genre dropping out of
+# the top 3 takes 3 points off just the movies in that genre - instead of rescoring everything.
+
+MAX_CACHED_USERS = 256  # each cached user holds one small int per movie
+
+
+class RecommendationCache:
+    """Remembers each user's scores + top-k and patches them when their preferences shift"""
+
+    def __init__(self, engine, max_users=MAX_CACHED_USERS):
+        self.engine = engine
+        self.max_users = max_users
+        self._entries = OrderedDict()  # user_id -> {'key', 'int_scores', 'results', 'lock'}
+        # Only guards _entries (find/add/evict) - each entry's own lock covers patching + scoring it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _patch(self, int_scores, old_key, new_key):
+        """Update int_scores in place for the genres/decades/avg rating that changed"""
+        engine = self.engine
+        old_genres, old_decades, old_avg = old_key
+        new_genres, new_decades, new_avg = new_key
+
+        for g in new_genres - old_genres:
+            int_scores[engine.genre_rows(g)] += 3
+        for g in old_genres - new_genres:
+            int_scores[engine.genre_rows(g)] -= 3
+        for d in new_decades - old_decades:
+            int_scores[engine.decade_rows(d)] += 2
+        for d in old_decades - new_decades:
+            int_scores[engine.decade_rows(d)] -= 2
+
+        # Movies between the old and new average flip their "rating pref" bonus
+        if new_avg > old_avg:
+            int_scores[engine.rating_band_rows(old_avg, new_avg)] -= 2
+        elif new_avg < old_avg:
+            int_scores[engine.rating_band_rows(new_avg, old_avg)] += 2
+
+    def top_k(self, user_id, top_genres, top_decades, avg_pref_rating, limit=6):
+        """(row positions, their scores) of the user's best `limit` movies"""
+        key = (frozenset(top_genres), frozenset(top_decades), avg_pref_rating)
+        entry = self._entry(user_id)
+        # Only this user's entry is locked for the scoring, so other users' requests dont wait on it
+        with entry['lock']:
+            if entry['key'] == key and limit in entry['results']:
+                self._count(hit=True)
+                return entry['results'][limit]
+
+            self._count(hit=False)
+            if entry['key'] is None:
+                entry['int_scores'] = self.engine.int_scores(top_genres, top_decades, avg_pref_rating).astype(np.int16)
+            elif entry['key'] != key:
+                self._patch(entry['int_scores'], entry['key'], key)
+                entry['results'] = {}
+            entry['key'] = key
+
+            scores = entry['int_scores'] + self.engine.base_boost
+            rows = self.engine.top_k(scores, limit)
+            entry['results'][limit] = (rows, scores[rows])
+            return entry['results'][limit]
+
+    def _entry(self, user_id):
+        """The user's entry (a new empty one if they dont have one) - the cache lock is only held for this"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                return entry
+            entry = {'key': None, 'int_scores': None, 'results': {}, 'lock': threading.Lock()}
+            self._entries[user_id] = entry
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+            return entry
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
@@ -1,6 +1,13 @@
 // Backend runs on port 5001 - make sure its actualy running before complaining it doesnt work
 const API_URL = "http://localhost:5001";
 
+// Every browser gets its own random id so the backend keeps a separate taste profile for each user
+let USER_ID = localStorage.getItem('userId');
+if (!USER_ID) {
+    USER_ID = Math.random().toString(36).slice(2) + Date.now().toString(36);
+    localStorage.setItem('userId', USER_ID);
+}
+
 // --- Setup when page loads ---
 document.addEventListener('DOMContentLoaded', () => {
     fetchFilters();           // load dropdown options
@@ -43,8 +50,9 @@ async function fetchFilters() {
             const data = JSON.parse(text);
             
             // Populate the dropdowns with the data
-            populateDropdown('genre-select', data.genres);
-            populateDropdown('decade-select', data.decades);
+            const counts = data.counts || {};
+            populateDropdown('genre-select', data.genres, counts.genres);
+            populateDropdown('decade-select', data.decades, counts.decades);
             
             // Rating dropdown needs special formatting
             const ratingSel = document.getElementById('rating-select');
@@ -52,7 +60,7 @@ async function fetchFilters() {
             data.ratings.forEach(r => {
                 const opt = document.createElement('option');
                 opt.value = r;
-                opt.textContent = `${r}+ Stars`;
+                opt.textContent = withCount(`${r}+ Stars`, counts.ratings && counts.ratings[r.toFixed(1)]);
                 ratingSel.appendChild(opt);
             });
 
@@ -76,7 +84,7 @@ async function fetchRecommendations() {
     grid.innerHTML = '<div class="loading">Thinking... (Crunching numbers) 🧠</div>';
     
     try {
-        const res = await fetch(`${API_URL}/recommendations`);
+        const res = await fetch(`${API_URL}/recommendations`, { headers: { 'X-User-Id': USER_ID } });
         const movies = await res.json();
         renderMovies(movies, grid);
     } catch (err) {
@@ -87,7 +95,7 @@ async function fetchRecommendations() {
 // Get the user's preference profile
 async function fetchProfile() {
     try {
-        const res = await fetch(`${API_URL}/profile`);
+        const res = await fetch(`${API_URL}/profile`, { headers: { 'X-User-Id': USER_ID } });
         const data = await res.json();
         
         // Only show the stats panel if they actualy searched for stuff
@@ -134,7 +142,7 @@ async function handleSearch(e) {
     try {
         const res = await fetch(`${API_URL}/search`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'X-User-Id': USER_ID },
             body: JSON.stringify(payload)
         });
         
@@ -162,7 +170,7 @@ async function handleSearch(e) {
 // Reset the user's profile
 async function resetProfile() {
     if(confirm("Clear your taste profile? This resets recommendations.")) {
-        await fetch(`${API_URL}/reset`, { method: 'POST' });
+        await fetch(`${API_URL}/reset`, { method: 'POST', headers: { 'X-User-Id': USER_ID } });
         location.reload();  // just reload the page, easiest way
     }
 }
@@ -200,13 +208,18 @@ function renderMovies(movies, container) {
     });
 }
 
+// "Drama (245)" - shows how many movies an option has, if the backend sent counts
+function withCount(label, count) {
+    return count === undefined ? label : `${label} (${count})`;
+}
+
 // Helper function to populate dropdowns
-function populateDropdown(id, items) {
+function populateDropdown(id, items, counts) {
     const sel = document.getElementById(id);
     items.forEach(item => {
         const opt = document.createElement('option');
         opt.value = item;
-        opt.textContent = item;
+        opt.textContent = withCount(item, counts && counts[item]);
         sel.appendChild(opt);
     });
 }
\ No newline at end of file
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+# --- Cache of finished /search responses ---
+# A handful of genre/decade/rating combos are most of the /search traffic, and for one catalog
+# version the answer never changes. So the encoded JSON (+ the next page cursor) gets kept and
+# sent straight back next time - no index walk, no poster lookup, no encoding.
+# The same search written differently ("drama" vs "Drama", 7.3 vs 7.5...) is one entry, the
+# caller normalizes the key (see search_key() in app.py).
+#
+# Bounded by bytes, not by entries (a limit=100 page is way bigger than a limit=10 one) and the
+# least recently used ones go first. A page where a poster lookup failed (or was skipped, cache only)
+# never gets in here, so a fallback poster doesnt stick around. Entries also expire after a while so
+# posters OMDB said it didnt have get another chance. Lives on the CatalogVersion, so a reload starts
+# with an empty one and old answers can never come back.
+
+SEARCH_CACHE_BYTES = 16 * 1024 * 1024  # encoded responses kept per process
+SEARCH_CACHE_TTL = 300.0               # seconds an answer is reused for
+ENTRY_OVERHEAD = 200                   # rough bytes for the key, tuple and dict slot of an entry
+
+
+class SearchCache:
+    """Size bounded LRU of (body, next cursor) by normalized search, with a TTL"""
+
+    def __init__(self, max_bytes=SEARCH_CACHE_BYTES, ttl=SEARCH_CACHE_TTL, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (body, cursor, size, stored_at)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # pushed out to make room
+        self.expired = 0    # dropped because they were older than the ttl
+
+    def get(self, key):
+        """(body, next cursor) for this search, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[3] > self.ttl:
+                self._remove(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key, body, cursor=None):
+        size = len(body) + len(cursor or "") + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return  # would push everything else out and still not fit
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, cursor, size, self._clock())
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expired': self.expired,
+            }
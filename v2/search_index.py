@@ -0,0 +1,258 @@
+import numpy as np
+
+from compact import exact_float64, genre_mask, has_genre
+
+# --- Precomputed search index ---
+# /search used to copy the whole dataframe and scan every column on every request
+# (and the genre regex matched "Drama" inside "Docudrama" lol). Here we build the
+# lookup tables once when the catalog loads, so a query only touches the movies
+# that can actually end up in the results.
+#
+# Everything lives in "rank space": rank 0 is the best rated movie, rank 1 the
+# next one and so on. That way walking any list of ranks front to back is already
+# walking in rating order, and we can stop as soon as we have enough results.
+
+CHUNK_SIZE = 256  # how many candidates we check at a time while walking
+
+
+class SearchIndex:
+    """Genre bitsets, decade ranges and the rating-sorted order for one catalog"""
+
+    def __init__(self, catalog):
+        self.size = catalog.size
+        # Built once and saved with the catalog snapshot (see catalog.py) - just map those if we have them
+        shared = catalog.prebuilt.get('search')
+        if shared is not None:
+            self._attach(*shared)
+        else:
+            self._build(catalog)
+
+    def _build(self, catalog):
+        ratings = exact_float64(catalog.ratings)
+        rating_key = np.where(np.isnan(ratings), -np.inf, ratings)
+
+        # Best rated first, equal ratings keep catalog order
+        self.order = np.argsort(-rating_key, kind='stable')
+
+        # clean_rating is just IMDB_Rating rounded to .5, so in rank order it never goes up.
+        # That means "rating >= X" is always a prefix of any rank-sorted list
+        self.clean_by_rank = np.asarray(catalog.clean_ratings, dtype=np.float64)[self.order]
+        self._neg_clean_by_rank = -self.clean_by_rank
+        self.decade_by_rank = catalog.decades[catalog.decade_codes[self.order]].astype(np.int64)
+
+        # Genre -> sorted ranks (posting list) + packed bitset for quick "has this genre?" checks.
+        # Keys are lowercase so "drama" and "Drama" are the same thing
+        masks_by_rank = catalog.genre_masks[self.order]
+        postings = {}
+        first_rank = {}
+        self.genre_names = {}  # lowercase -> how its written in the dataset (first one we see)
+        for i, name in enumerate(catalog.genre_names):
+            ranks = np.flatnonzero(has_genre(masks_by_rank, genre_mask(masks_by_rank, [i])))
+            if not len(ranks):
+                continue
+            key = name.lower()
+            postings[key] = np.union1d(postings[key], ranks) if key in postings else ranks
+            if key not in first_rank or ranks[0] < first_rank[key]:
+                first_rank[key] = ranks[0]
+                self.genre_names[key] = name
+
+        self.genre_postings = {}
+        self.genre_bits = {}
+        for g, ranks in postings.items():
+            bits = np.zeros(self.size, dtype=bool)
+            bits[ranks] = True
+            self.genre_postings[g] = ranks.astype(np.int64)
+            self.genre_bits[g] = np.packbits(bits)
+
+        # Decade -> contiguous (start, end) slice of decade_ranks.
+        # decade_ranks is sorted by decade first and rank second, so each slice is in rating order too
+        self.decade_ranks = np.lexsort((np.arange(self.size), self.decade_by_rank))
+        sorted_decades = self.decade_by_rank[self.decade_ranks]
+        unique_decades, starts = np.unique(sorted_decades, return_index=True)
+        ends = np.append(starts[1:], self.size)
+        self.decade_ranges = {int(d): (int(s), int(e)) for d, s, e in zip(unique_decades, starts, ends)}
+
+    def shared_arrays(self):
+        """
+        Everything as (arrays, meta) for the snapshot - the per-genre lists get glued into
+        one array + offsets (like the text columns in compact.py), the bitsets into one 2D array
+        """
+        keys = list(self.genre_postings)
+        lengths = [len(self.genre_postings[g]) for g in keys]
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        empty = np.empty(0, dtype=np.int64)
+        arrays = {
+            'order': self.order,
+            'clean_by_rank': self.clean_by_rank,
+            'neg_clean_by_rank': self._neg_clean_by_rank,
+            'decade_by_rank': self.decade_by_rank,
+            'decade_ranks': self.decade_ranks,
+            'postings': np.concatenate([self.genre_postings[g] for g in keys]) if keys else empty,
+            'posting_offsets': offsets,
+            'genre_bits': (np.stack([self.genre_bits[g] for g in keys]) if keys
+                           else np.zeros((0, (self.size + 7) // 8), dtype=np.uint8)),
+        }
+        meta = {
+            'genres': keys,
+            'genre_names': self.genre_names,
+            'decade_ranges': [[d, start, end] for d, (start, end) in self.decade_ranges.items()],
+        }
+        return arrays, meta
+
+    def _attach(self, arrays, meta):
+        self.order = arrays['order']
+        self.clean_by_rank = arrays['clean_by_rank']
+        self._neg_clean_by_rank = arrays['neg_clean_by_rank']
+        self.decade_by_rank = arrays['decade_by_rank']
+        self.decade_ranks = arrays['decade_ranks']
+        # Slices of the shared arrays, not copies
+        postings, offsets = arrays['postings'], arrays['posting_offsets']
+        self.genre_postings = {g: postings[offsets[i]:offsets[i + 1]] for i, g in enumerate(meta['genres'])}
+        self.genre_bits = {g: arrays['genre_bits'][i] for i, g in enumerate(meta['genres'])}
+        self.genre_names = dict(meta['genre_names'])
+        self.decade_ranges = {int(d): (int(start), int(end)) for d, start, end in meta['decade_ranges']}
+
+    def _rank_cutoff(self, min_rating):
+        """First rank that fails the min rating - everything before it passes"""
+        if min_rating <= 0:
+            return self.size
+        # clean ratings are non-increasing along ranks, so flip the sign to get an ascending array
+        return int(np.searchsorted(self._neg_clean_by_rank, -min_rating, side='right'))
+
+    def facets(self, ratings=()):
+        """
+        Every genre and decade with how many movies it has, plus how many movies
+        are rated at least each of the given ratings - used for the /filters dropdowns
+        """
+        genres = sorted((self.genre_names[g], len(ranks)) for g, ranks in self.genre_postings.items())
+        decades = sorted((d, end - start) for d, (start, end) in self.decade_ranges.items())
+        return {
+            'genres': genres,
+            'decades': decades,
+            'ratings': [(r, self._rank_cutoff(r)) for r in ratings],
+        }
+
+    def _has_genre(self, ranks, genre):
+        bits = self.genre_bits[genre]
+        return ((bits[ranks >> 3] >> (7 - (ranks & 7))) & 1).astype(bool)
+
+    def filter_mask(self, genre=None, decade=None, min_rating=0):
+        """
+        Bool array by rank of the movies passing the filters, or None if there arent any filters.
+        For when the scoring happens somewhere else (text search) and just needs to know whos allowed
+        """
+        genre = genre.lower() if genre else None
+        if genre is None and decade is None and min_rating <= 0:
+            return None
+        mask = np.zeros(self.size, dtype=bool)
+        if genre is not None and genre not in self.genre_bits:
+            return mask
+        if decade is not None and decade not in self.decade_ranges:
+            return mask
+        # rating >= X is a prefix of the ranks, the decade a slice of decade_ranks
+        mask[:self._rank_cutoff(min_rating)] = True
+        if decade is not None:
+            start, end = self.decade_ranges[decade]
+            in_decade = np.zeros(self.size, dtype=bool)
+            in_decade[self.decade_ranks[start:end]] = True
+            mask &= in_decade
+        if genre is not None:
+            mask &= np.unpackbits(self.genre_bits[genre], count=self.size).astype(bool)
+        return mask
+
+    def search(self, genre=None, decade=None, min_rating=0, limit=10):
+        """
+        Row positions (iloc) of the best rated movies matching all the filters
+        Genre is an exact genre match now (case doesnt matter), not a substring
+        """
+        genre = genre.lower() if genre else None
+        return self.order[self._matching_ranks(genre, decade, self._rank_cutoff(min_rating), limit)]
+
+    def search_page(self, genre=None, decade=None, min_rating=0, limit=10, after=-1):
+        """
+        search() one page at a time: (rows, last rank on this page, more after it?)
+        Only movies ranked after `after` count - ranks only change with the catalog, so
+        "after rank X" is a stable place to carry on from no matter how deep the page is
+        """
+        genre = genre.lower() if genre else None
+        ranks = self._matching_ranks(genre, decade, self._rank_cutoff(min_rating), limit + 1, after)
+        more = len(ranks) > limit
+        ranks = ranks[:limit]
+        return self.order[ranks], (int(ranks[-1]) if len(ranks) else after), more
+
+    def iter_search(self, genre=None, decade=None, min_rating=0, chunk_size=1000):
+        """Every match of search() in order, chunk_size rows at a time (for streaming huge results)"""
+        genre = genre.lower() if genre else None
+        cutoff = self._rank_cutoff(min_rating)
+        after = -1
+        while True:
+            ranks = self._matching_ranks(genre, decade, cutoff, chunk_size, after)
+            if len(ranks):
+                yield self.order[ranks]
+            if len(ranks) < chunk_size:
+                return
+            after = int(ranks[-1])
+
+    def search_many(self, queries, limit=10):
+        """
+        search() for a list of (genre, decade, min_rating) queries, same results in the same order.
+        Queries for the same genre + decade share one walk: results are in rank order, so the
+        answer for a higher min rating is just the front of the answer for the lowest one
+        """
+        groups = {}
+        for i, (genre, decade, min_rating) in enumerate(queries):
+            groups.setdefault((genre.lower() if genre else None, decade), []).append(i)
+
+        results = [None] * len(queries)
+        for (genre, decade), members in groups.items():
+            cutoffs = [self._rank_cutoff(queries[i][2]) for i in members]
+            ranks = self._matching_ranks(genre, decade, max(cutoffs), limit)
+            for i, cutoff in zip(members, cutoffs):
+                results[i] = self.order[ranks[:np.searchsorted(ranks, cutoff)]]
+        return results
+
+    def _matching_ranks(self, genre, decade, cutoff, limit, after=-1):
+        """The first `limit` ranks between `after` and `cutoff` that match the (lowercase) genre + decade, in order"""
+        if limit <= 0:
+            return np.empty(0, dtype=np.int64)
+        if genre is not None and genre not in self.genre_postings:
+            return np.empty(0, dtype=np.int64)
+        if decade is not None and decade not in self.decade_ranges:
+            return np.empty(0, dtype=np.int64)
+
+        if genre is None and decade is None:
+            return np.arange(after + 1, min(cutoff, after + 1 + limit), dtype=np.int64)
+
+        # Pick the smallest list of candidates to walk, the other filters become lookups
+        check_genre = check_decade = False
+        if decade is not None:
+            start, end = self.decade_ranges[decade]
+            candidates = self.decade_ranks[start:end]
+            check_genre = genre is not None
+            if check_genre and len(self.genre_postings[genre]) < len(candidates):
+                candidates = self.genre_postings[genre]
+                check_genre, check_decade = False, True
+        else:
+            candidates = self.genre_postings[genre]
+
+        # Candidate lists are sorted by rank, so the rating filter (and the page start) is just a binary search
+        candidates = candidates[np.searchsorted(candidates, after, side='right'):np.searchsorted(candidates, cutoff)]
+        if not check_genre and not check_decade:
+            return candidates[:limit]
+
+        # Bounded walk - check a chunk at a time and stop once we have enough
+        found = []
+        needed = limit
+        for i in range(0, len(candidates), CHUNK_SIZE):
+            chunk = candidates[i:i + CHUNK_SIZE]
+            if check_genre:
+                chunk = chunk[self._has_genre(chunk, genre)]
+            if check_decade:
+                chunk = chunk[self.decade_by_rank[chunk] == decade]
+            found.append(chunk[:needed])
+            needed -= len(found[-1])
+            if needed == 0:
+                break
+
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+# orjson is a lot faster than the standard json module, but the app works fine without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# --- Turning movies into JSON ---
+# Before, every response did to_dict('records') on all 16+ CSV columns and then looped over
+# every single field checking for NaN/inf. Now:
+#   - each endpoint says once which fields it actually sends (the frontend only shows a few)
+#   - each movie's JSON is built the first time its needed and then reused as raw bytes,
+#     so a response is basically just gluing some byte strings together
+
+# What the movie cards in script.js actually use
+SEARCH_FIELDS = ('Series_Title', 'Released_Year', 'Genre', 'IMDB_Rating', 'Runtime', 'Poster_Link')
+RECOMMENDATION_FIELDS = SEARCH_FIELDS  # + 'score', which is added per request
+SUGGEST_FIELDS = ('Series_Title', 'Released_Year', 'Genre', 'IMDB_Rating', 'Poster_Link')  # + 'id', 'match'
+SIMILAR_FIELDS = SEARCH_FIELDS  # + 'id', 'similarity'
+TEXT_FIELDS = SEARCH_FIELDS  # + 'id', 'relevance'
+
+
+def dumps(obj):
+    """JSON as bytes - orjson if we have it, plain json if not"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_value(value):
+    """A catalog value as something JSON can hold - missing/NaN/inf become "" like before"""
+    if value is None:
+        return ""
+    if isinstance(value, np.floating):
+        if not np.isfinite(value):
+            return ""
+        # float32 -> shortest text that round-trips, so 8.1 comes out as 8.1 and not 8.100000381
+        return float(str(value)) if value.dtype == np.float32 else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return value
+
+
+class MovieEncoder:
+    """Cached JSON bytes for each movie, for one set of fields (values come straight from the catalog columns)"""
+
+    def __init__(self, catalog, fields):
+        self.size = catalog.size
+        # Poster_Link is handled separately because the HQ poster can replace it per request
+        self.has_poster = 'Poster_Link' in fields and catalog.has('Poster_Link')
+        self.fields = [f for f in fields if catalog.has(f) and f != 'Poster_Link']
+        self._columns = {field: catalog.column(field) for field in self.fields}
+        self.poster_links = catalog.posters if self.has_poster else None
+        self._fragments = {}  # row -> bytes, only for movies that were actually sent
+        self._lock = threading.Lock()
+
+    def _value(self, field, row):
+        return json_value(self._columns[field][row])
+
+    def fragment(self, row, keep=True):
+        """This movie's fields as JSON bytes without the surrounding {} - built once, then cached"""
+        frag = self._fragments.get(row)
+        if frag is None:
+            frag = dumps({field: self._value(field, row) for field in self.fields})[1:-1]
+            if keep:
+                with self._lock:
+                    self._fragments[row] = frag
+        return frag
+
+    def _item(self, row, poster=None, extras=None, keep=True):
+        parts = [self.fragment(row, keep)]
+        if self.has_poster:
+            parts.append(b'"Poster_Link":' + dumps(poster or self.poster_links[row] or ""))
+        if extras:
+            parts.extend(dumps(key) + b':' + dumps(value) for key, value in extras.items())
+        return b'{' + b','.join(p for p in parts if p) + b'}'
+
+    def encode(self, rows, posters=None, extras=None):
+        """
+        JSON array bytes for these rows
+        posters: optional Poster_Link per row (falsy = keep the dataset one)
+        extras: optional dict per row of extra fields, like {'score': 12.4}
+        """
+        items = [self._item(row, posters[i] if posters else None, extras[i] if extras else None)
+                 for i, row in enumerate(rows)]
+        return b'[' + b','.join(items) + b']'
+
+    def encode_lines(self, rows, posters=None):
+        """
+        Same movies as encode() but as NDJSON, one per line. Doesnt fill the fragment cache -
+        exports go through way more movies than anyone will ever look at again
+        """
+        return b''.join(self._item(row, posters[i] if posters else None, keep=False) + b'\n'
+                        for i, row in enumerate(rows))
+
+
+class PreEncoded:
+    """A response body encoded once up front, with an ETag so browsers can revalidate with a 304"""
+
+    def __init__(self, obj):
+        self.body = dumps(obj)
+        self.etag = hashlib.sha1(self.body).hexdigest()
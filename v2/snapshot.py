@@ -0,0 +1,237 @@
+import fcntl
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+# Code v1 and v2 both use lives in ../shared (imported as shared.<module>)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from compact import Catalog, CodedColumn, TextColumn
+from shared.ingest import source_files
+
+# --- Binary catalog snapshot ---
+# Saves the compact catalog (see compact.py) as a folder of plain .npy files so the next
+# startup can just memory-map them instead of downloading + parsing + cleaning the CSV again.
+# The files are already in the compact layout, so loading doesnt decode a single string,
+# and every server process on the machine shares the same pages through the OS page cache.
+#
+# Every save is its own folder, and a small CURRENT file says which one is live. Publishing a new one
+# is a single rename of CURRENT, so a worker starting at any moment finds either the old snapshot or
+# the new one (swapping whole folders needs two renames, with no snapshot at all in between):
+#   <snapshot_dir>/CURRENT     name of the live version folder
+#   <snapshot_dir>/v<time>-<pid>/  one saved snapshot (laid out like below)
+#   <snapshot_dir>/tmp-<pid>/  a save that is still being written
+#
+# Layout of a version folder:
+#   manifest.json            format version, where the data came from, column list
+#   col<i>.npy               numeric columns, stored as-is
+#   col<i>.data.npy          text columns - all the strings glued together (utf-8)
+#   col<i>.offsets.npy       ...and where each string starts/ends in that blob
+#   col<i>.nulls.npy         which rows were missing (only for text columns that had any)
+#   col<i>.codes.npy         coded columns - the small int code per movie
+#   col<i>.values.*.npy      ...and the distinct values, stored like a text column
+#   <index>.<array>.npy      lookup tables built from the catalog (genre masks, the search index,
+#                            the scoring arrays...) so server processes dont each rebuild them
+
+# Bump this whenever the cleaning code or the file layout changes so old snapshots get rebuilt
+SNAPSHOT_VERSION = 8
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+
+
+def source_signature(source):
+    """Where the data came from + size/modified time of each of its CSVs - if any of that changes the snapshot is stale"""
+    if not source:
+        return None
+    # Absolute paths, so it still matches when the server gets started from another folder
+    source = os.pathsep.join(os.path.abspath(part) for part in str(source).split(os.pathsep) if part)
+    files = source_files(source)
+    return {"source": source, "files": files} if files else None
+
+
+def read_manifest(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def live_dir(snapshot_dir):
+    """The version folder CURRENT points at, or None if nothing has been published yet"""
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(snapshot_dir, name) if name else None
+
+
+def is_fresh(manifest, version=SNAPSHOT_VERSION):
+    """
+    A snapshot is good to use if it was written by this version of the code and the CSVs
+    it came from havent changed (none added or removed either). If they are all gone (kaggle
+    cache cleared etc) we still trust the snapshot - its the only copy of the data we have left
+    """
+    if manifest is None or manifest.get("format_version") != version:
+        return False
+    source = manifest.get("source")
+    if not source or not any(os.path.exists(f["path"]) for f in source["files"]):
+        return True
+    return source_signature(source["source"]) == source
+
+
+def _save_text(prefix, col):
+    np.save(f"{prefix}.data.npy", np.asarray(col.data))
+    np.save(f"{prefix}.offsets.npy", np.asarray(col.offsets))
+    if col.nulls is not None:
+        np.save(f"{prefix}.nulls.npy", np.asarray(col.nulls))
+    return {"has_nulls": col.nulls is not None, "prefix": col.prefix}
+
+
+def _save_index(snapshot_dir, name, arrays, meta):
+    for key, array in arrays.items():
+        np.save(os.path.join(snapshot_dir, f"{name}.{key}.npy"), np.asarray(array))
+    return {"arrays": list(arrays), "meta": meta}
+
+
+def save_snapshot(catalog, snapshot_dir, source_path=None, version=SNAPSHOT_VERSION, indexes=None):
+    """
+    Write the catalog to a new version folder in snapshot_dir and make it the live one (see _publish)
+    indexes: optional name -> (arrays, meta) of lookup tables to save along with it
+    """
+    tmp_dir = os.path.join(snapshot_dir, f"tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, name in enumerate(catalog.column_names):
+        col = catalog.column(name)
+        prefix = os.path.join(tmp_dir, f"col{i}")
+        if isinstance(col, TextColumn):
+            columns.append({"name": name, "kind": "text", **_save_text(prefix, col)})
+        elif isinstance(col, CodedColumn):
+            np.save(f"{prefix}.codes.npy", np.asarray(col.codes))
+            values = _save_text(f"{prefix}.values", TextColumn.from_values(col.values))
+            columns.append({"name": name, "kind": "coded", "values": values})
+        else:
+            np.save(f"{prefix}.npy", np.asarray(col))
+            columns.append({"name": name, "kind": "numeric"})
+
+    saved_indexes = {"catalog": _save_index(tmp_dir, "catalog", *catalog.shared_arrays())}
+    for name, (arrays, meta) in (indexes or {}).items():
+        saved_indexes[name] = _save_index(tmp_dir, name, arrays, meta)
+
+    manifest = {
+        "format_version": version,
+        "created": time.time(),
+        "rows": catalog.size,
+        "source": source_signature(source_path),
+        "columns": columns,
+        "indexes": saved_indexes,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    _publish(snapshot_dir, tmp_dir)
+    return manifest
+
+
+def _publish(snapshot_dir, tmp_dir):
+    """
+    Give a fully written snapshot its version folder and point CURRENT at it (one rename, so readers
+    see the old snapshot or the new one, never none), then clear out the versions nobody can pick up
+    anymore. Processes that already mapped an old one keep their pages, deleted files stay readable.
+    The lock is only so two savers dont clean up each others brand new folder - readers never take it
+    """
+    with open(os.path.join(snapshot_dir, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        os.replace(tmp_dir, os.path.join(snapshot_dir, version))
+        pointer = os.path.join(snapshot_dir, f"{CURRENT_FILE}.tmp-{os.getpid()}")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(snapshot_dir, CURRENT_FILE))
+        # Everything else but saves still being written (and the lock) - old versions, and the files
+        # of a snapshot from before there were versions
+        for name in os.listdir(snapshot_dir):
+            if name in (version, CURRENT_FILE, LOCK_FILE) or name.startswith("tmp-"):
+                continue
+            path = os.path.join(snapshot_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _load_text(prefix, info):
+    nulls = np.load(f"{prefix}.nulls.npy", mmap_mode="r") if info.get("has_nulls") else None
+    return TextColumn(
+        np.load(f"{prefix}.data.npy", mmap_mode="r"),
+        np.load(f"{prefix}.offsets.npy", mmap_mode="r"),
+        nulls,
+        info.get("prefix", ""),
+    )
+
+
+def _load_column(snapshot_dir, i, info):
+    prefix = os.path.join(snapshot_dir, f"col{i}")
+    if info["kind"] == "text":
+        return _load_text(prefix, info)
+    if info["kind"] == "coded":
+        values = _load_text(f"{prefix}.values", info["values"]).to_list()
+        return CodedColumn(np.load(f"{prefix}.codes.npy", mmap_mode="r"), values)
+    return np.load(f"{prefix}.npy", mmap_mode="r")
+
+
+def _load_index(snapshot_dir, name, info):
+    arrays = {key: np.load(os.path.join(snapshot_dir, f"{name}.{key}.npy"), mmap_mode="r")
+              for key in info["arrays"]}
+    return arrays, info["meta"]
+
+
+def load_snapshot(snapshot_dir, version=SNAPSHOT_VERSION, attempts=10):
+    """
+    Load the live snapshot back as a Catalog (with its saved lookup tables in catalog.prebuilt),
+    or None if its missing/stale/broken. Another attempt only happens when a newer save went live
+    meanwhile, so a few saves in a row cant starve us
+    """
+    for _ in range(attempts):
+        # Everything gets read from the one version folder CURRENT pointed at just now. A newer save can
+        # still go live meanwhile and delete this one - then opening fails and we go again with the new one
+        folder = live_dir(snapshot_dir)
+        manifest = read_manifest(folder) if folder else None
+        if manifest is None and folder and live_dir(snapshot_dir) != folder:
+            continue  # deleted before we even got to the manifest
+        if not is_fresh(manifest, version):
+            return None
+
+        try:
+            # Everything is memory mapped, so columns nothing reads (Overview, Star1...) cost no RAM,
+            # and all the server processes on the machine share one copy of the rest (the OS page cache)
+            columns = {info["name"]: _load_column(folder, i, info) for i, info in enumerate(manifest["columns"])}
+            indexes = {name: _load_index(folder, name, info) for name, info in manifest["indexes"].items()}
+            catalog = Catalog(columns, shared=indexes.pop("catalog"))
+            catalog.prebuilt = indexes
+        except (OSError, ValueError, KeyError) as e:
+            if live_dir(snapshot_dir) != folder:
+                continue
+            print(f"⚠️ Snapshot at {folder} is broken ({e}), ignoring it.")
+            return None
+        break
+    else:
+        return None
+
+    if catalog.size != manifest["rows"]:
+        return None
+    return catalog